@@ -10,6 +10,7 @@ workplace-roleplay メインアプリケーション
 from typing import Optional
 from datetime import datetime
 from flask import Flask
+from werkzeug.routing import Rule
 
 # 設定モジュール
 from config import get_cached_config
@@ -64,8 +65,8 @@ def create_app(config=None) -> Flask:
     # カスタムJinjaフィルターの登録
     _register_template_filters(app)
 
-    # Gemini APIの初期化
-    _initialize_gemini_api(config)
+    # Gemini SDK（google.generativeai）は import だけで重いため起動時には初期化しない。
+    # LLMService・モデル一覧取得が初回利用時に genai.configure を行う
 
     return app
 
@@ -92,7 +93,9 @@ def _initialize_gemini_api(config):
 
         api_key = config.GOOGLE_API_KEY
         if api_key and not config.TESTING:
-            genai.configure(api_key=api_key)
+            from services.llm_service import gemini_endpoint_options
+
+            genai.configure(api_key=api_key, **gemini_endpoint_options())
             print("✅ Gemini API初期化完了")
         elif config.TESTING:
             print("📝 テストモード: Gemini API初期化スキップ")
@@ -171,7 +174,9 @@ def get_available_gemini_models():
         if not config.GOOGLE_API_KEY:
             return []
 
-        genai.configure(api_key=config.GOOGLE_API_KEY)
+        from services.llm_service import gemini_endpoint_options
+
+        genai.configure(api_key=config.GOOGLE_API_KEY, **gemini_endpoint_options())
         models = genai.list_models()
 
         gemini_models = []
@@ -190,26 +195,41 @@ def get_available_gemini_models():
 
 # シナリオのロード
 def _load_scenarios():
-    """シナリオをロード"""
+    """シナリオをロード（カタログは scenarios モジュールで一度だけ読み込み、各所で共有）"""
     global scenarios
     try:
-        from scenarios import load_scenarios
+        from scenarios import get_all_scenarios
 
-        scenarios = load_scenarios()
+        scenarios = get_all_scenarios()
         print(f"✅ シナリオロード成功: {len(scenarios)}個")
     except Exception as e:
         print(f"❌ シナリオロードエラー: {e}")
         scenarios = {}
 
 
-# 初期化時にシナリオをロード
-_load_scenarios()
+# ========== アプリケーションインスタンス ==========
 
+# デフォルトのアプリケーションインスタンス（後方互換性のため）。
+# `from app import app` や gunicorn の `app:app` で初めて参照された時に生成する。
+# ルートから `from app import initialize_llm` 等で参照される場合はアプリを生成しない
+_default_app: Optional[Flask] = None
 
-# ========== アプリケーションインスタンス ==========
 
-# デフォルトのアプリケーションインスタンス（後方互換性のため）
-app = create_app()
+def __getattr__(name: str):
+    if name == "app":
+        return get_default_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_default_app() -> Flask:
+    """デフォルトのアプリケーションインスタンスを取得（初回のみ生成）"""
+    global _default_app
+    if _default_app is None:
+        _load_scenarios()
+        app = create_app()
+        _register_legacy_endpoints(app)
+        _default_app = app
+    return _default_app
 
 
 # ========== 後方互換性のためのルート別名登録 ==========
@@ -219,67 +239,66 @@ app = create_app()
 # 例: url_for('index') -> url_for('main.index')
 # 以下はその間の移行期間用の互換性レイヤー
 
-# 後方互換性用（実際の使用箇所は削除済み）
-
-# Blueprintの関数を取得して別名でルートを登録
-_main_index = app.view_functions.get("main.index")
-_main_chat_page = app.view_functions.get("main.chat_page")
-_scenario_list = app.view_functions.get("scenario.list_scenarios")
-_scenario_show = app.view_functions.get("scenario.show_scenario")
-_scenario_regular = app.view_functions.get("scenario.list_regular_scenarios")
-_scenario_harassment = app.view_functions.get("scenario.list_harassment_scenarios")
-_watch_mode = app.view_functions.get("watch.watch_mode")
-
-# 別名エンドポイントを登録（既存のルールとは異なるエンドポイント名で）
-if _main_index:
-    app.view_functions["index"] = _main_index
-if _main_chat_page:
-    app.view_functions["chat"] = _main_chat_page
-if _scenario_list:
-    app.view_functions["list_scenarios"] = _scenario_list
-if _scenario_show:
-    app.view_functions["show_scenario"] = _scenario_show
-if _scenario_regular:
-    app.view_functions["list_regular_scenarios"] = _scenario_regular
-if _scenario_harassment:
-    app.view_functions["list_harassment_scenarios"] = _scenario_harassment
-if _watch_mode:
-    app.view_functions["watch_mode"] = _watch_mode
-
-# 追加のview_functions参照
-_journal_view = app.view_functions.get("journal.view_journal")
-_strength_page = app.view_functions.get("strength.strength_analysis_page")
-_scenario_chat = app.view_functions.get("scenario.scenario_chat")
-
-if _journal_view:
-    app.view_functions["view_journal"] = _journal_view
-if _strength_page:
-    app.view_functions["strength_analysis_page"] = _strength_page
-if _scenario_chat:
-    app.view_functions["scenario_chat"] = _scenario_chat
-
-# url_mapにルールを追加（url_for互換性のため）
-from werkzeug.routing import Rule
 
-try:
-    # 既存のルールに別名エンドポイントを追加
-    app.url_map.add(Rule("/", endpoint="index", methods=["GET"]))
-    app.url_map.add(Rule("/chat", endpoint="chat", methods=["GET"]))
-    app.url_map.add(Rule("/scenarios", endpoint="list_scenarios", methods=["GET"]))
-    app.url_map.add(Rule("/scenario/<scenario_id>", endpoint="show_scenario", methods=["GET"]))
-    app.url_map.add(Rule("/scenarios/regular", endpoint="list_regular_scenarios", methods=["GET"]))
-    app.url_map.add(Rule("/scenarios/harassment", endpoint="list_harassment_scenarios", methods=["GET"]))
-    app.url_map.add(Rule("/watch", endpoint="watch_mode", methods=["GET"]))
-    app.url_map.add(Rule("/journal", endpoint="view_journal", methods=["GET"]))
-    app.url_map.add(Rule("/strength_analysis", endpoint="strength_analysis_page", methods=["GET"]))
-    app.url_map.add(Rule("/api/scenario_chat", endpoint="scenario_chat", methods=["POST"]))
-    print("✅ テンプレート互換性のためのルート別名を登録しました")
-except Exception as e:
-    print(f"⚠️ ルート別名登録の一部がスキップされました: {e}")
+def _register_legacy_endpoints(app: Flask):
+    """Blueprintの関数を旧エンドポイント名でも参照できるよう別名登録"""
+    # Blueprintの関数を取得して別名でルートを登録
+    _main_index = app.view_functions.get("main.index")
+    _main_chat_page = app.view_functions.get("main.chat_page")
+    _scenario_list = app.view_functions.get("scenario.list_scenarios")
+    _scenario_show = app.view_functions.get("scenario.show_scenario")
+    _scenario_regular = app.view_functions.get("scenario.list_regular_scenarios")
+    _scenario_harassment = app.view_functions.get("scenario.list_harassment_scenarios")
+    _watch_mode = app.view_functions.get("watch.watch_mode")
+
+    # 別名エンドポイントを登録（既存のルールとは異なるエンドポイント名で）
+    if _main_index:
+        app.view_functions["index"] = _main_index
+    if _main_chat_page:
+        app.view_functions["chat"] = _main_chat_page
+    if _scenario_list:
+        app.view_functions["list_scenarios"] = _scenario_list
+    if _scenario_show:
+        app.view_functions["show_scenario"] = _scenario_show
+    if _scenario_regular:
+        app.view_functions["list_regular_scenarios"] = _scenario_regular
+    if _scenario_harassment:
+        app.view_functions["list_harassment_scenarios"] = _scenario_harassment
+    if _watch_mode:
+        app.view_functions["watch_mode"] = _watch_mode
+
+    # 追加のview_functions参照
+    _journal_view = app.view_functions.get("journal.view_journal")
+    _strength_page = app.view_functions.get("strength.strength_analysis_page")
+    _scenario_chat = app.view_functions.get("scenario.scenario_chat")
+
+    if _journal_view:
+        app.view_functions["view_journal"] = _journal_view
+    if _strength_page:
+        app.view_functions["strength_analysis_page"] = _strength_page
+    if _scenario_chat:
+        app.view_functions["scenario_chat"] = _scenario_chat
+
+    # url_mapにルールを追加（url_for互換性のため）
+    try:
+        # 既存のルールに別名エンドポイントを追加
+        app.url_map.add(Rule("/", endpoint="index", methods=["GET"]))
+        app.url_map.add(Rule("/chat", endpoint="chat", methods=["GET"]))
+        app.url_map.add(Rule("/scenarios", endpoint="list_scenarios", methods=["GET"]))
+        app.url_map.add(Rule("/scenario/<scenario_id>", endpoint="show_scenario", methods=["GET"]))
+        app.url_map.add(Rule("/scenarios/regular", endpoint="list_regular_scenarios", methods=["GET"]))
+        app.url_map.add(Rule("/scenarios/harassment", endpoint="list_harassment_scenarios", methods=["GET"]))
+        app.url_map.add(Rule("/watch", endpoint="watch_mode", methods=["GET"]))
+        app.url_map.add(Rule("/journal", endpoint="view_journal", methods=["GET"]))
+        app.url_map.add(Rule("/strength_analysis", endpoint="strength_analysis_page", methods=["GET"]))
+        app.url_map.add(Rule("/api/scenario_chat", endpoint="scenario_chat", methods=["POST"]))
+        print("✅ テンプレート互換性のためのルート別名を登録しました")
+    except Exception as e:
+        print(f"⚠️ ルート別名登録の一部がスキップされました: {e}")
 
 
 # ========== メイン起動 ==========
 
 if __name__ == "__main__":
     config = get_cached_config()
-    app.run(debug=config.DEBUG, host=config.HOST, port=config.PORT, use_reloader=config.HOT_RELOAD)
+    get_default_app().run(debug=config.DEBUG, host=config.HOST, port=config.PORT, use_reloader=config.HOT_RELOAD)
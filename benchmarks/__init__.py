@@ -0,0 +1,3 @@
+"""
+ベンチマークスクリプト群（LLMはスタブを使用し、ネットワークに依存しない）
+"""
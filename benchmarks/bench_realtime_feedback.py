@@ -0,0 +1,103 @@
+"""
+リアルタイムフィードバック: 個別呼び出しと統合呼び出しの比較ベンチマーク
+
+analyze_message + generate_alternatives（2回のLLM呼び出し）と
+analyze_with_alternatives（1回）の呼び出し回数・レイテンシを、
+固定遅延を持つスタブLLMで比較する。
+
+使い方:
+    python -m benchmarks.bench_realtime_feedback [--latency-ms 300] [--iterations 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+
+from services.realtime_feedback_service import RealtimeFeedbackService
+
+_HISTORY = [
+    {"role": "assistant", "content": "進捗はどうですか"},
+    {"role": "user", "content": "まあなんとかやってます"},
+]
+_MESSAGE = "明日までには終わると思います、たぶん"
+
+
+class _Response:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+
+class StubLLM:
+    """プロンプト長に比例した入力トークン数と固定遅延を模擬するスタブLLM"""
+
+    def __init__(self, latency_ms: float) -> None:
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def invoke(self, messages: List[Any]) -> _Response:
+        self.calls += 1
+        prompt = "".join(getattr(m, "content", "") for m in messages)
+        self.prompt_chars += len(prompt)
+        time.sleep(self.latency_ms / 1000)
+        if "JSON配列のみ" in prompt:
+            return _Response('["明日の午前中までに完了予定です","明日中に仕上げます"]')
+        return _Response(
+            json.dumps(
+                {
+                    "has_feedback": True,
+                    "feedback_type": "clarity",
+                    "suggestion": "期限を断定的に伝えると安心感が増します",
+                    "alternatives": ["明日の午前中までに完了予定です", "明日中に仕上げます"],
+                },
+                ensure_ascii=False,
+            )
+        )
+
+
+def _run(mode: str, latency_ms: float, iterations: int) -> Dict[str, Any]:
+    llm = StubLLM(latency_ms)
+    svc = RealtimeFeedbackService(llm=llm)
+    durations: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        if mode == "separate":
+            svc.analyze_message(_MESSAGE, _HISTORY, {"title": "進捗報告"})
+            svc.generate_alternatives(_MESSAGE, _HISTORY)
+        else:
+            svc.analyze_with_alternatives(_MESSAGE, _HISTORY, {"title": "進捗報告"})
+        durations.append((time.perf_counter() - start) * 1000)
+    return {
+        "mode": mode,
+        "llm_calls_per_turn": llm.calls / iterations,
+        "prompt_chars_per_turn": llm.prompt_chars / iterations,
+        "mean_ms": round(statistics.mean(durations), 1),
+        "p95_ms": round(sorted(durations)[max(0, int(len(durations) * 0.95) - 1)], 1),
+    }
+
+
+def run_benchmark(latency_ms: float = 300, iterations: int = 20) -> List[Dict[str, Any]]:
+    """個別呼び出し・統合呼び出しの計測結果を返す"""
+    return [_run("separate", latency_ms, iterations), _run("combined", latency_ms, iterations)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=300, help="スタブLLMの1呼び出しあたりの遅延")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'calls/turn':>12}{'prompt chars':>14}{'mean ms':>10}{'p95 ms':>10}")
+    for r in run_benchmark(args.latency_ms, args.iterations):
+        print(
+            f"{r['mode']:<10}{r['llm_calls_per_turn']:>12.1f}{r['prompt_chars_per_turn']:>14.0f}"
+            f"{r['mean_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
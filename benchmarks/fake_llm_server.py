@@ -0,0 +1,425 @@
+"""
+決定的なフェイクLLMサーバー（負荷試験・オフライン計測用）
+
+実際のGemini / Ollama Cloudのクォータを消費せずにアプリ全体を動かすためのスタンドイン。
+以下の2種類のAPIに応答する:
+
+- OpenAI互換API（LLMService.create_ollama_llm が使う ChatOpenAI）
+    POST /v1/chat/completions（stream=true の場合はSSE）
+    GET  /v1/models
+    GET  /v1beta/models（genai.list_models 用）
+- Gemini REST API（ChatGoogleGenerativeAI を transport="rest" で接続）
+    POST /v1beta/models/<model>:generateContent
+    POST /v1beta/models/<model>:streamGenerateContent（JSON配列ストリーム / alt=sse）
+
+応答内容はプロンプトのハッシュから決まるため、同じ入力には常に同じ応答を返す。
+初回トークンまでの遅延・トークン生成速度・エラー注入率を設定できる。
+
+使い方:
+    python -m benchmarks.fake_llm_server --port 8765 --latency-ms 300 --tokens-per-second 40 --error-rate 0.01
+
+アプリ側の設定（.env）:
+    GEMINI_API_BASE_URL=http://127.0.0.1:8765
+    OLLAMA_BASE_URL=http://127.0.0.1:8765/v1
+    OLLAMA_API_KEY=fake
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# 通常会話用の定型応答（プロンプトのハッシュで選択）
+_CANNED_REPLIES = [
+    "お疲れさまです。その件でしたら、まず現状を整理してから進めましょうか。",
+    "なるほど、ありがとうございます。期限について少し確認させてください。",
+    "いいですね。もう少し具体的に教えてもらえると助かります。",
+    "承知しました。チームにも共有しておきますね。",
+    "確かにそうですね。別の方法も一緒に考えてみましょう。",
+    "そうなんですね。最近忙しそうですが、無理していませんか。",
+]
+
+_FEEDBACK_REPLY = (
+    "## 良かった点\n- 相手の話を受け止めてから意見を伝えられていました\n\n"
+    "## 改善点\n- 結論を先に述べるとより伝わりやすくなります\n\n"
+    "## 次回のポイント\n- 期限や数値を具体的に伝えましょう"
+)
+
+_REALTIME_FEEDBACK_REPLY = json.dumps(
+    {
+        "has_feedback": True,
+        "feedback_type": "clarity",
+        "suggestion": "結論を先に伝えると分かりやすくなります",
+        "alternatives": ["結論から申し上げますと、明日までに完了します", "明日の午前中に提出します"],
+    },
+    ensure_ascii=False,
+)
+
+_ALTERNATIVES_REPLY = json.dumps(["明日の午前中に提出します", "本日中に確認してご連絡します"], ensure_ascii=False)
+
+
+GEMINI_MODELS = ["gemini-1.5-flash", "gemini-1.5-pro", "gemini-2.5-flash"]
+
+
+@dataclass
+class FakeLLMConfig:
+    """フェイクLLMの振る舞い設定"""
+
+    latency_ms: float = 200.0  # 初回トークンまでの遅延
+    tokens_per_second: float = 50.0  # 0以下で即時
+    chars_per_token: int = 2  # 日本語の概算（1トークン ≒ 2文字）
+    error_rate: float = 0.0  # エラー応答の割合（0〜1）
+    error_status: int = 429  # 注入するエラーのHTTPステータス
+    seed: int = 0
+
+
+def select_reply(prompt: str) -> str:
+    """プロンプトから決定的に応答を選ぶ（用途はプロンプトの内容から推定）"""
+    if "has_feedback" in prompt:
+        return _REALTIME_FEEDBACK_REPLY
+    if "JSON配列" in prompt:
+        return _ALTERNATIVES_REPLY
+    if "フィードバック" in prompt or "評価" in prompt:
+        return _FEEDBACK_REPLY
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return _CANNED_REPLIES[digest[0] % len(_CANNED_REPLIES)]
+
+
+def split_tokens(text: str, chars_per_token: int) -> List[str]:
+    """テキストを擬似トークンに分割"""
+    size = max(1, chars_per_token)
+    return [text[i : i + size] for i in range(0, len(text), size)] or [""]
+
+
+class FakeLLMServer:
+    """フェイクLLMサーバー（スレッドで起動・停止できる）"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[FakeLLMConfig] = None) -> None:
+        self.config = config or FakeLLMConfig()
+        self._lock = threading.Lock()
+        self._request_count = 0
+        self.stats: Dict[str, int] = {"requests": 0, "errors": 0, "streams": 0}
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    # ========== 振る舞い ==========
+
+    def next_request_fails(self) -> bool:
+        """エラー注入の判定（リクエスト番号とシードから決定的に決まる）"""
+        with self._lock:
+            self._request_count += 1
+            n = self._request_count
+            self.stats["requests"] += 1
+        if self.config.error_rate <= 0:
+            return False
+        failed = random.Random(f"{self.config.seed}:{n}").random() < self.config.error_rate
+        if failed:
+            with self._lock:
+                self.stats["errors"] += 1
+        return failed
+
+    def token_stream(self, reply: str) -> Iterator[str]:
+        """初回遅延とトークン生成速度に従ってトークンを返す"""
+        time.sleep(self.config.latency_ms / 1000)
+        delay = 1.0 / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0.0
+        for i, token in enumerate(split_tokens(reply, self.config.chars_per_token)):
+            if i and delay:
+                time.sleep(delay)
+            yield token
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                pass
+
+            # ---------- 共通 ----------
+
+            def _read_json(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    return json.loads(raw or b"{}")
+                except json.JSONDecodeError:
+                    return {}
+
+            def _send_json(self, status: int, body: Any) -> None:
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _start_chunked(self, content_type: str) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+
+            def _write_chunk(self, text: str) -> None:
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _end_chunked(self) -> None:
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            # ---------- ルーティング ----------
+
+            def do_GET(self) -> None:  # noqa: N802
+                path = urlparse(self.path).path
+                if path in ("/healthz", "/health"):
+                    self._send_json(200, {"status": "ok", **server.stats})
+                elif path.rstrip("/") == "/v1/models":
+                    self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+                elif path.rstrip("/") == "/v1beta/models":
+                    self._send_json(200, {"models": [_gemini_model(name) for name in GEMINI_MODELS]})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self) -> None:  # noqa: N802
+                parsed = urlparse(self.path)
+                body = self._read_json()
+                if parsed.path.rstrip("/") == "/v1/chat/completions":
+                    self._openai_chat(body)
+                    return
+                match = re.match(r"^/v1(?:beta)?/models/([^:]+):(generateContent|streamGenerateContent)$", parsed.path)
+                if match:
+                    alt = parse_qs(parsed.query).get("alt", [""])[0]
+                    self._gemini(match.group(1), match.group(2) == "streamGenerateContent", alt, body)
+                    return
+                self._send_json(404, {"error": {"message": "not found"}})
+
+            # ---------- OpenAI互換 ----------
+
+            def _openai_chat(self, body: Dict[str, Any]) -> None:
+                model = body.get("model", "fake-model")
+                prompt = "\n".join(_message_text(m.get("content")) for m in body.get("messages", []))
+                if server.next_request_fails():
+                    self._send_json(
+                        server.config.error_status,
+                        {"error": {"message": "injected error", "type": "rate_limit_error", "code": "rate_limit"}},
+                    )
+                    return
+
+                reply = select_reply(prompt)
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                created = int(time.time())
+                usage = _usage(prompt, reply, server.config.chars_per_token)
+
+                if not body.get("stream"):
+                    text = "".join(server.token_stream(reply))
+                    self._send_json(
+                        200,
+                        {
+                            "id": completion_id,
+                            "object": "chat.completion",
+                            "created": created,
+                            "model": model,
+                            "choices": [
+                                {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                            ],
+                            "usage": {
+                                "prompt_tokens": usage[0],
+                                "completion_tokens": usage[1],
+                                "total_tokens": sum(usage),
+                            },
+                        },
+                    )
+                    return
+
+                with server._lock:
+                    server.stats["streams"] += 1
+                self._start_chunked("text/event-stream")
+
+                def event(delta: Dict[str, Any], finish: Optional[str] = None) -> str:
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                    }
+                    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+                self._write_chunk(event({"role": "assistant", "content": ""}))
+                for token in server.token_stream(reply):
+                    self._write_chunk(event({"content": token}))
+                self._write_chunk(event({}, finish="stop"))
+                self._write_chunk("data: [DONE]\n\n")
+                self._end_chunked()
+
+            # ---------- Gemini REST ----------
+
+            def _gemini(self, model: str, stream: bool, alt: str, body: Dict[str, Any]) -> None:
+                parts: List[str] = []
+                system = body.get("systemInstruction") or body.get("system_instruction") or {}
+                for part in system.get("parts", []):
+                    parts.append(part.get("text", ""))
+                for content in body.get("contents", []):
+                    for part in content.get("parts", []):
+                        parts.append(part.get("text", ""))
+                prompt = "\n".join(parts)
+
+                if server.next_request_fails():
+                    self._send_json(
+                        server.config.error_status,
+                        {
+                            "error": {
+                                "code": server.config.error_status,
+                                "message": "injected error",
+                                "status": "RESOURCE_EXHAUSTED" if server.config.error_status == 429 else "UNAVAILABLE",
+                            }
+                        },
+                    )
+                    return
+
+                reply = select_reply(prompt)
+                prompt_tokens, completion_tokens = _usage(prompt, reply, server.config.chars_per_token)
+
+                def candidate(text: str, final: bool) -> Dict[str, Any]:
+                    payload: Dict[str, Any] = {
+                        "candidates": [
+                            {
+                                "content": {"role": "model", "parts": [{"text": text}]},
+                                "index": 0,
+                                **({"finishReason": "STOP"} if final else {}),
+                            }
+                        ],
+                        "modelVersion": model,
+                    }
+                    if final:
+                        payload["usageMetadata"] = {
+                            "promptTokenCount": prompt_tokens,
+                            "candidatesTokenCount": completion_tokens,
+                            "totalTokenCount": prompt_tokens + completion_tokens,
+                        }
+                    return payload
+
+                if not stream:
+                    self._send_json(200, candidate("".join(server.token_stream(reply)), final=True))
+                    return
+
+                with server._lock:
+                    server.stats["streams"] += 1
+                if alt == "sse":
+                    self._start_chunked("text/event-stream")
+                    pending: Optional[str] = None
+                    for token in server.token_stream(reply):
+                        if pending is not None:
+                            self._write_chunk(f"data: {json.dumps(candidate(pending, False), ensure_ascii=False)}\r\n\r\n")
+                        pending = token
+                    self._write_chunk(f"data: {json.dumps(candidate(pending or '', True), ensure_ascii=False)}\r\n\r\n")
+                    self._end_chunked()
+                    return
+
+                # google-api-core の REST ストリーミングは JSON 配列を逐次読み取る
+                self._start_chunked("application/json; charset=utf-8")
+                self._write_chunk("[")
+                pending = None
+                first = True
+                for token in server.token_stream(reply):
+                    if pending is not None:
+                        self._write_chunk(("" if first else ",\r\n") + json.dumps(candidate(pending, False), ensure_ascii=False))
+                        first = False
+                    pending = token
+                self._write_chunk(("" if first else ",\r\n") + json.dumps(candidate(pending or "", True), ensure_ascii=False))
+                self._write_chunk("]")
+                self._end_chunked()
+
+        return Handler
+
+
+def _gemini_model(name: str) -> Dict[str, Any]:
+    return {
+        "name": f"models/{name}",
+        "displayName": name,
+        "inputTokenLimit": 1048576,
+        "outputTokenLimit": 8192,
+        "supportedGenerationMethods": ["generateContent", "streamGenerateContent"],
+    }
+
+
+def _message_text(content: Any) -> str:
+    if isinstance(content, list):
+        return "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content)
+    return str(content or "")
+
+
+def _usage(prompt: str, reply: str, chars_per_token: int) -> Tuple[int, int]:
+    size = max(1, chars_per_token)
+    return -(-len(prompt) // size), -(-len(reply) // size)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="初回トークンまでの遅延")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="トークン生成速度（0で即時）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="エラー応答の割合（0〜1）")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(
+        latency_ms=args.latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    server = FakeLLMServer(args.host, args.port, config)
+    print(f"Fake LLM server listening on {server.url}")
+    print(f"  GEMINI_API_BASE_URL={server.url}")
+    print(f"  OLLAMA_BASE_URL={server.url}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+エンドツーエンド負荷試験ハーネス
+
+実際のFlaskアプリに対して、仮想ユーザーを指定の同時実行数で走らせ、
+エンドポイントごとの p50/p95/p99 レイテンシ・スループット・エラー率を集計する。
+
+- --base-url を省略すると、フェイクLLMサーバーとアプリをこのプロセス内で起動する
+  （Gemini / Ollama Cloud のクォータを消費しない）
+- --base-url を指定すると、起動済みのサーバー（gunicorn 等）を対象にする
+  この場合はサーバー側の GEMINI_API_BASE_URL / OLLAMA_BASE_URL をフェイクLLMサーバーに向けること
+
+使い方:
+    python -m benchmarks.load_test --users 20 --duration 60
+    python -m benchmarks.load_test --flows chat,watch --users 50 --latency-ms 800 --error-rate 0.02
+    python -m benchmarks.load_test --base-url http://127.0.0.1:5001 --users 100 --json result.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from benchmarks.fake_llm_server import FakeLLMConfig, FakeLLMServer
+
+DEFAULT_FLOWS = ("chat", "scenario", "watch", "feedback", "gamification")
+
+_USER_MESSAGES = [
+    "お疲れさまです。今よろしいですか。",
+    "例の資料ですが、明日までに仕上げる予定です。",
+    "少し相談したいことがあるのですが。",
+    "ありがとうございます、助かります。",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近傍順位法によるパーセンタイル"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass
+class EndpointStats:
+    """エンドポイント単位の計測値"""
+
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Counter = field(default_factory=Counter)
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies_ms)
+
+
+class Recorder:
+    """スレッドセーフな計測値の記録"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+    def record(self, name: str, latency_ms: float, status: Optional[int], ok: bool) -> None:
+        with self._lock:
+            stats = self.endpoints.setdefault(name, EndpointStats())
+            stats.latencies_ms.append(latency_ms)
+            stats.statuses[status if status is not None else "exception"] += 1
+            if not ok:
+                stats.errors += 1
+
+    def summary(self, elapsed_seconds: float) -> List[Dict[str, Any]]:
+        """エンドポイントごとの集計結果"""
+        rows = []
+        with self._lock:
+            for name in sorted(self.endpoints):
+                stats = self.endpoints[name]
+                rows.append(
+                    {
+                        "endpoint": name,
+                        "count": stats.count,
+                        "rps": round(stats.count / elapsed_seconds, 2) if elapsed_seconds > 0 else 0.0,
+                        "p50_ms": round(percentile(stats.latencies_ms, 50), 1),
+                        "p95_ms": round(percentile(stats.latencies_ms, 95), 1),
+                        "p99_ms": round(percentile(stats.latencies_ms, 99), 1),
+                        "max_ms": round(max(stats.latencies_ms), 1) if stats.latencies_ms else 0.0,
+                        "error_rate": round(stats.errors / stats.count, 4) if stats.count else 0.0,
+                        "statuses": {str(k): v for k, v in stats.statuses.items()},
+                    }
+                )
+        return rows
+
+
+class VirtualUser:
+    """1人分のブラウザセッション（Cookie・CSRFトークンを保持）"""
+
+    def __init__(self, base_url: str, recorder: Recorder, index: int, scenario_id: str, timeout: float) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        self.index = index
+        self.scenario_id = scenario_id
+        self.timeout = timeout
+        self.http = requests.Session()
+        self.turn = 0
+        self._csrf_token: Optional[str] = None
+
+    def csrf_token(self) -> str:
+        if self._csrf_token is None:
+            response = self.request("GET /api/csrf-token", "GET", "/api/csrf-token")
+            self._csrf_token = (response.json() or {}).get("csrf_token", "") if response is not None else ""
+        return self._csrf_token
+
+    def message(self) -> str:
+        self.turn += 1
+        return _USER_MESSAGES[(self.index + self.turn) % len(_USER_MESSAGES)]
+
+    def request(
+        self, name: str, method: str, path: str, json_body: Optional[Dict[str, Any]] = None
+    ) -> Optional[requests.Response]:
+        """リクエストを送信し、レイテンシとステータスを記録（SSEは本文の受信完了まで計測）"""
+        headers = {}
+        if method == "POST":
+            headers["X-CSRF-Token"] = self.csrf_token()
+        start = time.perf_counter()
+        try:
+            response = self.http.request(
+                method, self.base_url + path, json=json_body, headers=headers, timeout=self.timeout
+            )
+            ok = response.status_code < 400
+            if ok and response.headers.get("Content-Type", "").startswith("text/event-stream"):
+                ok = '"error"' not in response.text
+            self.recorder.record(name, (time.perf_counter() - start) * 1000, response.status_code, ok)
+            return response
+        except requests.RequestException:
+            self.recorder.record(name, (time.perf_counter() - start) * 1000, None, False)
+            return None
+
+
+# ========== シナリオ（利用フロー） ==========
+
+
+def flow_chat(user: VirtualUser, turns: int) -> None:
+    user.request("POST /api/start_chat", "POST", "/api/start_chat", {"partner_type": "colleague"})
+    for _ in range(turns):
+        user.request("POST /api/chat", "POST", "/api/chat", {"message": user.message()})
+
+
+def flow_chat_stream(user: VirtualUser, turns: int) -> None:
+    user.request("POST /api/start_chat", "POST", "/api/start_chat", {"partner_type": "colleague"})
+    for _ in range(turns):
+        user.request("POST /api/chat/stream", "POST", "/api/chat/stream", {"message": user.message()})
+
+
+def flow_scenario(user: VirtualUser, turns: int) -> None:
+    user.request("POST /api/scenario_clear", "POST", "/api/scenario_clear", {"scenario_id": user.scenario_id})
+    for _ in range(turns):
+        user.request(
+            "POST /api/scenario_chat",
+            "POST",
+            "/api/scenario_chat",
+            {"scenario_id": user.scenario_id, "message": user.message()},
+        )
+
+
+def flow_watch(user: VirtualUser, turns: int) -> None:
+    user.request("POST /api/watch/start", "POST", "/api/watch/start", {"topic": "work", "situation": "break"})
+    for _ in range(turns):
+        user.request("POST /api/watch/next", "POST", "/api/watch/next", {})
+
+
+def flow_feedback(user: VirtualUser, turns: int) -> None:
+    flow_chat(user, 1)
+    user.request("POST /api/chat_feedback", "POST", "/api/chat_feedback", {"partner_type": "colleague"})
+    flow_scenario(user, 1)
+    user.request("POST /api/scenario_feedback", "POST", "/api/scenario_feedback", {"scenario_id": user.scenario_id})
+
+
+def flow_gamification(user: VirtualUser, turns: int) -> None:
+    for path in ("/dashboard", "/quests", "/badges", "/growth"):
+        user.request(f"GET /api/gamification{path}", "GET", f"/api/gamification{path}")
+
+
+FLOWS: Dict[str, Callable[[VirtualUser, int], None]] = {
+    "chat": flow_chat,
+    "chat_stream": flow_chat_stream,
+    "scenario": flow_scenario,
+    "watch": flow_watch,
+    "feedback": flow_feedback,
+    "gamification": flow_gamification,
+}
+
+
+# ========== 実行 ==========
+
+
+def run_load_test(
+    base_url: str,
+    users: int = 10,
+    duration_seconds: float = 30.0,
+    iterations: Optional[int] = None,
+    flows: List[str] = list(DEFAULT_FLOWS),
+    turns: int = 3,
+    scenario_id: str = "scenario1",
+    timeout: float = 60.0,
+) -> Dict[str, Any]:
+    """
+    負荷試験を実行して集計結果を返す
+
+    Args:
+        base_url: 対象アプリのURL
+        users: 同時実行する仮想ユーザー数
+        duration_seconds: 実行時間（iterations 指定時は無視）
+        iterations: 各ユーザーがフロー一巡を繰り返す回数
+        flows: 実行するフロー名のリスト
+        turns: 各フローの会話ターン数
+        scenario_id: シナリオフローで使うシナリオID
+        timeout: 1リクエストのタイムアウト（秒）
+    """
+    unknown = [f for f in flows if f not in FLOWS]
+    if unknown:
+        raise ValueError(f"Unknown flows: {unknown}. Available: {sorted(FLOWS)}")
+
+    recorder = Recorder()
+    deadline = time.monotonic() + duration_seconds
+
+    def run_user(index: int) -> None:
+        user = VirtualUser(base_url, recorder, index, scenario_id, timeout)
+        done = 0
+        while (iterations is None and time.monotonic() < deadline) or (iterations is not None and done < iterations):
+            for name in flows:
+                FLOWS[name](user, turns)
+            done += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users, thread_name_prefix="vu") as pool:
+        list(pool.map(run_user, range(users)))
+    elapsed = time.perf_counter() - start
+
+    rows = recorder.summary(elapsed)
+    total = sum(r["count"] for r in rows)
+    errors = sum(round(r["error_rate"] * r["count"]) for r in rows)
+    return {
+        "users": users,
+        "elapsed_seconds": round(elapsed, 2),
+        "total_requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "endpoints": rows,
+    }
+
+
+def start_local_app(fake_llm_url: str):
+    """フェイクLLMに接続したアプリをこのプロセス内で起動（werkzeugのスレッドサーバー）"""
+    os.environ["GEMINI_API_BASE_URL"] = fake_llm_url
+    os.environ["OLLAMA_BASE_URL"] = f"{fake_llm_url}/v1"
+    os.environ.setdefault("OLLAMA_API_KEY", "fake")
+    os.environ.setdefault("GOOGLE_API_KEY", "fake")
+    os.environ.setdefault("FLASK_SECRET_KEY", "load-test-secret-key")
+
+    # 設定スナップショットが作成済みでも接続先の上書きを反映させる
+    from config.snapshot import reset_config_snapshot
+
+    reset_config_snapshot()
+
+    from werkzeug.serving import make_server
+
+    from app import app
+
+    httpd = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, name="load-test-app", daemon=True)
+    thread.start()
+    return httpd, f"http://127.0.0.1:{httpd.server_port}"
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(
+        f"\nusers={result['users']} elapsed={result['elapsed_seconds']}s "
+        f"requests={result['total_requests']} throughput={result['throughput_rps']} req/s "
+        f"errors={result['error_rate']:.2%}\n"
+    )
+    header = f"{'endpoint':<36}{'count':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'err%':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in result["endpoints"]:
+        print(
+            f"{r['endpoint']:<36}{r['count']:>7}{r['rps']:>8.2f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+            f"{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}{r['error_rate'] * 100:>7.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="対象アプリのURL（省略時はプロセス内でアプリとフェイクLLMを起動）")
+    parser.add_argument("--users", type=int, default=10, help="同時実行する仮想ユーザー数")
+    parser.add_argument("--duration", type=float, default=30.0, help="実行時間（秒）")
+    parser.add_argument("--iterations", type=int, help="各ユーザーのフロー一巡の回数（指定時は --duration を無視）")
+    parser.add_argument("--flows", default=",".join(DEFAULT_FLOWS), help=f"実行するフロー（{', '.join(FLOWS)}）")
+    parser.add_argument("--turns", type=int, default=3, help="各フローの会話ターン数")
+    parser.add_argument("--scenario-id", default="scenario1")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="フェイクLLM: 初回トークンまでの遅延")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="フェイクLLM: トークン生成速度")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="フェイクLLM: エラー注入率")
+    parser.add_argument("--json", dest="json_path", help="結果をJSONで保存するパス")
+    args = parser.parse_args()
+
+    fake_llm = None
+    httpd = None
+    base_url = args.base_url
+    if not base_url:
+        fake_llm = FakeLLMServer(
+            config=FakeLLMConfig(
+                latency_ms=args.latency_ms, tokens_per_second=args.tokens_per_second, error_rate=args.error_rate
+            )
+        ).start()
+        httpd, base_url = start_local_app(fake_llm.url)
+        print(f"Fake LLM: {fake_llm.url}  App: {base_url}")
+
+    try:
+        result = run_load_test(
+            base_url,
+            users=args.users,
+            duration_seconds=args.duration,
+            iterations=args.iterations,
+            flows=[f.strip() for f in args.flows.split(",") if f.strip()],
+            turns=args.turns,
+            scenario_id=args.scenario_id,
+            timeout=args.timeout,
+        )
+    finally:
+        if httpd is not None:
+            httpd.shutdown()
+        if fake_llm is not None:
+            result_llm = dict(fake_llm.stats)
+            fake_llm.stop()
+            print(f"Fake LLM stats: {result_llm}")
+
+    print_report(result)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
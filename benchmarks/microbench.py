@@ -0,0 +1,559 @@
+"""
+リクエストのホットパスのマイクロベンチマーク
+
+毎リクエストで実行される処理（メッセージ構築・サニタイズ・モデレーション・CSP nonce注入・
+ユーザーデータ読み書き・分析レポート・シナリオ読み込み等）の1回あたりの実行時間を計測し、
+保存済みのベースラインと比較して劣化を検出する。
+
+- LLM呼び出しはスタブLLMで置き換えるため、オフラインで実行できる
+- マシン差を吸収するため、基準処理（キャリブレーション）に対する相対値で比較する
+- 相対値がベースラインの (1 + threshold) 倍を超えたケースを劣化とみなし、終了コード1を返す
+- 共有CPU環境では計測値が揺れるため、ベースラインの更新・比較はアイドル状態のマシンで行うこと
+
+使い方:
+    python -m benchmarks.microbench                      # ベースラインと比較
+    python -m benchmarks.microbench --filter security    # 名前で絞り込み
+    python -m benchmarks.microbench --update-baseline    # ベースラインを更新
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "microbench_baseline.json")
+DEFAULT_THRESHOLD = 0.3
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class BenchCase:
+    """ベンチマークケース（setup が計測対象の関数を返す）"""
+
+    name: str
+    description: str
+    setup: Callable[["BenchContext"], Callable[[], Any]]
+
+
+class BenchContext:
+    """ケースのセットアップで使う一時リソース"""
+
+    def __init__(self) -> None:
+        self._tmp_dirs: List[str] = []
+        self._cleanups: List[Callable[[], Any]] = []
+
+    def tmp_dir(self) -> str:
+        path = tempfile.mkdtemp(prefix="microbench-")
+        self._tmp_dirs.append(path)
+        return path
+
+    def on_close(self, fn: Callable[[], Any]) -> None:
+        """close() 時の後始末を登録（登録と逆順に実行）"""
+        self._cleanups.append(fn)
+
+    def close(self) -> None:
+        while self._cleanups:
+            self._cleanups.pop()()
+        for path in self._tmp_dirs:
+            shutil.rmtree(path, ignore_errors=True)
+        self._tmp_dirs.clear()
+
+
+CASES: Dict[str, BenchCase] = {}
+
+
+def bench(name: str, description: str) -> Callable:
+    """ベンチマークケースを登録するデコレーター"""
+
+    def decorator(setup: Callable[[BenchContext], Callable[[], Any]]) -> Callable:
+        CASES[name] = BenchCase(name=name, description=description, setup=setup)
+        return setup
+
+    return decorator
+
+
+# ========== テストデータ ==========
+
+
+def _chat_history(turns: int) -> List[Dict[str, str]]:
+    return [
+        {
+            "human": f"{i}件目の確認です。例の資料ですが、明日の会議までに修正版をお送りしてもよろしいでしょうか。",
+            "ai": f"ありがとうございます。{i}件目の件、明日の午前中までに送っていただければ大丈夫です。",
+        }
+        for i in range(turns)
+    ]
+
+
+def _xp_history(entries: int) -> List[Dict[str, Any]]:
+    from services.gamification_constants import SIX_AXES
+
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "timestamp": (start + timedelta(hours=3 * i)).isoformat(),
+            "source": "scenario",
+            "xp_gains": {axis: (i + j) % 7 for j, axis in enumerate(SIX_AXES)},
+        }
+        for i in range(entries)
+    ]
+
+
+_USER_MESSAGE = "  お疲れさまです。\n\n先日の件ですが、   部長に確認したところ\t来週の月曜日で問題ないとのことでした。  " * 8
+
+_AI_RESPONSE = (
+    "<p>ご確認ありがとうございます。<strong>来週の月曜日</strong>で進めましょう。</p>"
+    "<ul><li>資料の最終確認</li><li>関係者への共有</li></ul>"
+    '<script>alert("x")</script><a href="javascript:void(0)">リンク</a>'
+) * 6
+
+
+class _StubResponse:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+
+class StubLLM:
+    """即時に固定応答を返すスタブLLM（ネットワークに接続しない）"""
+
+    def invoke(self, messages: Any) -> _StubResponse:
+        return _StubResponse("承知しました。来週の月曜日に改めてご相談させてください。")
+
+
+class _StubAPIKeyManager:
+    """APIキー不要のキーマネージャー（CompliantAPIManager の代替）"""
+
+    def get_api_key(self) -> str:
+        return "microbench-offline"
+
+    def record_successful_request(self, api_key: str) -> None:
+        pass
+
+    def record_failed_request(self, api_key: str, error: Exception) -> None:
+        pass
+
+
+def _stub_llm_service():
+    """スタブLLMを登録済みのLLMService（APIキー・ネットワーク不要）"""
+    from unittest.mock import patch
+
+    from services.llm_service import LLMService
+
+    with patch("services.llm_service.CompliantAPIManager", _StubAPIKeyManager):
+        service = LLMService()
+    service.models["gemini-1.5-flash"] = StubLLM()
+    return service
+
+
+# ========== ケース ==========
+
+
+@bench("llm_service.build_messages", "LLMService._build_messages（履歴20往復＋システムプロンプト）")
+def _bench_build_messages(ctx: BenchContext):
+    service = _stub_llm_service()
+    history = _chat_history(20)
+    system_prompt = "あなたは職場の先輩社員です。丁寧かつ簡潔に応答してください。" * 20
+    return lambda: service._build_messages(history, "明日の件、よろしくお願いします。", system_prompt)
+
+
+@bench("llm_service.invoke_sync_stub", "LLMService.invoke_sync（スタブLLM、メッセージ構築込み）")
+def _bench_invoke_sync(ctx: BenchContext):
+    service = _stub_llm_service()
+    history = _chat_history(10)
+
+    def run():
+        messages = service._build_messages(history, "明日の件、よろしくお願いします。", "あなたは先輩社員です。")
+        return service.invoke_sync(messages, "gemini-1.5-flash")
+
+    return run
+
+
+@bench("helpers.add_messages_from_history", "add_messages_from_history（履歴50往復から直近5件）")
+def _bench_add_messages_from_history(ctx: BenchContext):
+    from langchain_core.messages import SystemMessage
+
+    from utils.helpers import add_messages_from_history
+
+    history = _chat_history(50)
+    return lambda: add_messages_from_history([SystemMessage(content="system")], history, max_entries=5)
+
+
+@bench("security.sanitize_input", "SecurityUtils.sanitize_input（約500文字のユーザー入力）")
+def _bench_sanitize_input(ctx: BenchContext):
+    from utils.security import SecurityUtils
+
+    return lambda: SecurityUtils.sanitize_input(_USER_MESSAGE)
+
+
+@bench("security.escape_html", "SecurityUtils.escape_html（HTMLを含むAI応答）")
+def _bench_escape_html(ctx: BenchContext):
+    from utils.security import SecurityUtils
+
+    return lambda: SecurityUtils.escape_html(_AI_RESPONSE)
+
+
+@bench("security.escape_json", "SecurityUtils.escape_json（SSEチャンク）")
+def _bench_escape_json(ctx: BenchContext):
+    from utils.security import SecurityUtils
+
+    chunk = {"content": "承知しました。来週の月曜日に改めてご相談させてください。", "done": False}
+    return lambda: SecurityUtils.escape_json(chunk)
+
+
+@bench("moderation.check_message", "ModerationService.check_message（NGワードなし）")
+def _bench_check_message(ctx: BenchContext):
+    from services.moderation_service import ModerationService
+
+    service = ModerationService()
+    return lambda: service.check_message(_USER_MESSAGE)
+
+
+@bench("harassment.detect_harassment", "HarassmentDetector.detect_harassment（検出なし）")
+def _bench_detect_harassment(ctx: BenchContext):
+    from src.utils.harassment_detection import HarassmentDetector
+
+    detector = HarassmentDetector()
+    return lambda: detector.detect_harassment(_USER_MESSAGE)
+
+
+@bench("csp.inject_nonce_to_html", "CSPNonce.inject_nonce_to_html（index.html）")
+def _bench_inject_nonce(ctx: BenchContext):
+    from utils.security import CSPNonce
+
+    with open(os.path.join(_ROOT_DIR, "templates", "index.html"), encoding="utf-8") as f:
+        html = f.read()
+    nonce = CSPNonce.generate()
+    return lambda: CSPNonce.inject_nonce_to_html(html, nonce)
+
+
+@bench("user_data.load", "UserDataService の読み込み（xp_history 1000件）")
+def _bench_user_data_load(ctx: BenchContext):
+    from services.user_data_service import UserDataService
+
+    service = UserDataService(data_dir=ctx.tmp_dir())
+    data = service.get_user_data("bench-user")
+    data["xp_history"] = _xp_history(1000)
+    service.save_user_data("bench-user", data)
+    return lambda: service.get_user_data("bench-user")
+
+
+@bench("user_data.save", "UserDataService の保存（xp_history 1000件）")
+def _bench_user_data_save(ctx: BenchContext):
+    from services.user_data_service import UserDataService
+
+    service = UserDataService(data_dir=ctx.tmp_dir())
+    data = service.get_user_data("bench-user")
+    data["xp_history"] = _xp_history(1000)
+    return lambda: service.save_user_data("bench-user", data)
+
+
+@bench("analytics.reports", "AnalyticsService の練習統計・スキル進捗・週次サマリー（xp_history 5000件）")
+def _bench_analytics(ctx: BenchContext):
+    from services.analytics_service import AnalyticsService
+
+    now = datetime(2026, 8, 1, tzinfo=timezone.utc)
+    service = AnalyticsService(now=lambda: now)
+    user_data = {"skill_xp": {"empathy": 120, "clarity": 40}, "xp_history": _xp_history(5000)}
+
+    def run():
+        service.get_practice_stats("bench-user", user_data)
+        service.get_skill_progress("bench-user", user_data)
+        service.get_weekly_summary("bench-user", user_data)
+
+    return run
+
+
+@bench("scenarios.load_scenarios", "scenarios.load_scenarios（全シナリオYAMLの読み込み）")
+def _bench_load_scenarios(ctx: BenchContext):
+    import contextlib
+    import io
+
+    from scenarios import load_scenarios
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return load_scenarios()
+
+    return run
+
+
+@bench("config.get_config", "get_config()（環境変数・.env の解析とバリデーション。スナップショット導入前の resolve_model の毎回の負荷）")
+def _bench_get_config(ctx: BenchContext):
+    import warnings
+
+    from config import get_config
+
+    def run():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return get_config()
+
+    return run
+
+
+@bench("model_selector.resolve_model", "resolve_model（設定スナップショットの解決表を引く）")
+def _bench_resolve_model(ctx: BenchContext):
+    from config.snapshot import get_config_snapshot
+    from services.model_selector import resolve_model
+
+    get_config_snapshot()
+    return lambda: resolve_model("scenario")
+
+
+def _bench_access_log(ctx: BenchContext, mode: str):
+    # log_request_info（アクセスログ1件）の呼び出し元（リクエスト処理スレッド）での所要時間
+    import logging
+    import queue
+    from logging.handlers import RotatingFileHandler
+
+    from flask import Flask, g
+
+    from utils.logging_config import DroppingQueueHandler, JSONFormatter, log_request_info
+
+    access_logger = logging.getLogger("access")
+    saved = (list(access_logger.handlers), access_logger.level, access_logger.propagate, list(access_logger.filters))
+
+    def restore():
+        access_logger.handlers[:], access_logger.level, access_logger.propagate, access_logger.filters[:] = saved
+
+    ctx.on_close(restore)
+    access_logger.handlers = []
+    access_logger.filters = []
+    access_logger.propagate = False
+    access_logger.setLevel(logging.INFO)
+
+    if mode == "off":
+        access_logger.setLevel(logging.CRITICAL)
+    else:
+        file_handler = RotatingFileHandler(
+            os.path.join(ctx.tmp_dir(), "access.log"), maxBytes=10 * 1024 * 1024, backupCount=1, encoding="utf-8"
+        )
+        file_handler.setFormatter(JSONFormatter())
+        ctx.on_close(file_handler.close)
+        if mode == "sync":
+            access_logger.addHandler(file_handler)
+        else:
+            # 計測中はリスナーを動かさず、キューをその場で空にする（連続投入ではリスナーとGILを取り合い、
+            # 呼び出し元の所要時間ではなくスループットの計測になるため）
+            queue_handler = DroppingQueueHandler(queue.Queue(maxsize=10000))
+            access_logger.addHandler(queue_handler)
+
+    app = Flask(__name__)
+    request_ctx = app.test_request_context("/api/chat", method="POST", headers={"User-Agent": "microbench"})
+    request_ctx.push()
+    ctx.on_close(request_ctx.pop)
+    g.start_time = time.perf_counter()
+    g.request_id = "bench-request"
+
+    class _Response:
+        status_code = 200
+
+    response = _Response()
+    if mode != "async":
+        return lambda: log_request_info(response)
+
+    def run():
+        log_request_info(response)
+        if queue_handler.queue.qsize() >= 1000:
+            queue_handler.queue.queue.clear()
+
+    return run
+
+
+@bench("logging.access_off", "アクセスログ無効時の log_request_info")
+def _bench_access_log_off(ctx: BenchContext):
+    return _bench_access_log(ctx, "off")
+
+
+@bench("logging.access_sync", "アクセスログ1件の同期書き込み（JSON整形＋ファイル書き込み）")
+def _bench_access_log_sync(ctx: BenchContext):
+    return _bench_access_log(ctx, "sync")
+
+
+@bench("logging.access_async", "アクセスログ1件の非同期書き込みの呼び出し元の負荷（キュー投入のみ。整形と書き込みはリスナースレッド）")
+def _bench_access_log_async(ctx: BenchContext):
+    return _bench_access_log(ctx, "async")
+
+
+# ========== 計測 ==========
+
+
+def _calibration_workload() -> None:
+    # 純Pythonの文字列・辞書・ソート処理（マシン性能の基準）
+    items = {f"key{i}": str(i) * 3 for i in range(300)}
+    sorted(items.values())
+    json.dumps(items)
+    re.sub(r"\d+", "#", " ".join(items))
+
+
+def measure(fn: Callable[[], Any], min_time: float = 0.05, repeat: int = 5) -> float:
+    """
+    1回あたりの実行時間（ナノ秒）を計測
+
+    各サンプルが min_time 秒以上になるよう回数を決め、repeat 回のうち最小値を採用する。
+    timeit と同様に計測中はGCを止める。
+    """
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        return _measure(fn, min_time, repeat)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _measure(fn: Callable[[], Any], min_time: float, repeat: int) -> float:
+    fn()  # ウォームアップ
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1e9
+
+
+def run_suite(
+    names: Optional[List[str]] = None, min_time: float = 0.05, repeat: int = 5
+) -> Dict[str, Any]:
+    """
+    ベンチマークを実行
+
+    Returns:
+        {"calibration_ns": float, "results": {name: {"ns_per_op", "relative"}}}
+    """
+    selected = [CASES[name] for name in (names if names is not None else sorted(CASES))]
+
+    # 基準処理は各ケースの前後にも計測し、最小値を採用する（一時的な負荷の影響を抑える）
+    calibration_ns = measure(_calibration_workload, min_time=min_time, repeat=repeat)
+    raw: Dict[str, float] = {}
+    ctx = BenchContext()
+    try:
+        for case in selected:
+            raw[case.name] = measure(case.setup(ctx), min_time=min_time, repeat=repeat)
+            calibration_ns = min(calibration_ns, measure(_calibration_workload, min_time=min_time, repeat=repeat))
+    finally:
+        ctx.close()
+
+    results = {
+        name: {"ns_per_op": round(ns_per_op, 1), "relative": round(ns_per_op / calibration_ns, 4)}
+        for name, ns_per_op in raw.items()
+    }
+    return {"calibration_ns": round(calibration_ns, 1), "results": results}
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """
+    ベースラインとの比較
+
+    Returns:
+        ケースごとの {"name", "ratio", "status"}（status: ok / regression / improved / new）
+    """
+    rows = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("relative"):
+            rows.append({"name": name, "ratio": None, "status": "new"})
+            continue
+        ratio = current["relative"] / base["relative"]
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold):
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({"name": name, "ratio": round(ratio, 3), "status": status})
+    return rows
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, Dict[str, float]]:
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+
+def save_baseline(suite: Dict[str, Any], path: str = BASELINE_PATH) -> None:
+    """ベースラインを保存（既存ケースの値は今回の結果で上書き）"""
+    merged = load_baseline(path)
+    merged.update(suite["results"])
+    payload = {
+        "python": sys.version.split()[0],
+        "calibration_ns": suite["calibration_ns"],
+        "results": dict(sorted(merged.items())),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def _format_ns(ns: float) -> str:
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} us"
+    return f"{ns:.0f} ns"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", help="ケース名の正規表現")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="劣化とみなす増加率")
+    parser.add_argument("--min-time", type=float, default=0.05, help="1サンプルの最小計測時間（秒）")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="結果をベースラインとして保存")
+    parser.add_argument("--json", dest="json_path", help="結果をJSONで保存するパス")
+    args = parser.parse_args(argv)
+
+    names = sorted(n for n in CASES if not args.filter or re.search(args.filter, n))
+    suite = run_suite(names, min_time=args.min_time, repeat=args.repeat)
+    rows = compare(suite["results"], load_baseline(args.baseline), args.threshold)
+
+    print(f"calibration: {_format_ns(suite['calibration_ns'])}  threshold: +{args.threshold:.0%}\n")
+    print(f"{'case':<36}{'time/op':>12}{'relative':>10}{'vs base':>9}  status")
+    for row in rows:
+        result = suite["results"][row["name"]]
+        ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+        print(
+            f"{row['name']:<36}{_format_ns(result['ns_per_op']):>12}{result['relative']:>10.2f}{ratio:>9}  {row['status']}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({**suite, "comparison": rows}, f, ensure_ascii=False, indent=2)
+    if args.update_baseline:
+        save_baseline(suite, args.baseline)
+        print(f"\nbaseline updated: {args.baseline}")
+        return 0
+    return 1 if any(row["status"] == "regression" for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
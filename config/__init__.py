@@ -4,6 +4,7 @@
 """
 from .config import get_config, get_cached_config, Config, DevelopmentConfig, ProductionConfig, ConfigForTesting
 from .feature_flags import FeatureFlags, FeatureDisabledException
+from .snapshot import ConfigSnapshot, get_config_snapshot, reload_config_snapshot
 
 __all__ = [
     "get_config",
@@ -14,4 +15,7 @@ __all__ = [
     "ConfigForTesting",
     "FeatureFlags",
     "FeatureDisabledException",
+    "ConfigSnapshot",
+    "get_config_snapshot",
+    "reload_config_snapshot",
 ]
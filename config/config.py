@@ -8,7 +8,6 @@ import warnings
 from typing import Optional, Dict, Any
 from pydantic_settings import BaseSettings
 from pydantic import Field, field_validator
-from functools import lru_cache
 
 
 class Config(BaseSettings):
@@ -29,6 +28,8 @@ class Config(BaseSettings):
     # Ollama Cloud 設定（OpenAI互換API）
     OLLAMA_API_KEY: Optional[str] = Field(default=None, alias="OLLAMA_API_KEY")
     OLLAMA_BASE_URL: str = Field(default="https://ollama.com/v1", alias="OLLAMA_BASE_URL")
+    # Gemini APIの接続先の上書き（負荷試験用のフェイクLLMサーバー等。未設定時は公式エンドポイント）
+    GEMINI_API_BASE_URL: Optional[str] = Field(default=None, alias="GEMINI_API_BASE_URL")
 
     # モード別モデル設定（Phase B）- 未設定時は DEFAULT_MODEL にフォールバック
     SCENARIO_MODEL: Optional[str] = Field(default=None, alias="SCENARIO_MODEL")
@@ -50,6 +51,13 @@ class Config(BaseSettings):
     # ログ設定
     LOG_LEVEL: str = Field(default="INFO", alias="LOG_LEVEL")
     LOG_FORMAT: str = Field(default="json", alias="LOG_FORMAT")
+    LOG_DIR: str = Field(default="logs", alias="LOG_DIR")
+    # 非同期ログ（ハンドラをバックグラウンドの書き込みスレッドの後ろに置く）
+    LOG_ASYNC: bool = Field(default=True, alias="LOG_ASYNC")
+    LOG_QUEUE_SIZE: int = Field(default=10000, ge=100, alias="LOG_QUEUE_SIZE")
+    # アクセスログのサンプリング（エラーと遅いリクエストは常に記録）
+    ACCESS_LOG_SAMPLE_RATE: float = Field(default=0.1, ge=0.0, le=1.0, alias="ACCESS_LOG_SAMPLE_RATE")
+    ACCESS_LOG_SLOW_MS: float = Field(default=1000.0, ge=0.0, alias="ACCESS_LOG_SLOW_MS")
 
     # アプリケーション設定
     PORT: int = Field(default=5000, alias="PORT")
@@ -64,9 +72,79 @@ class Config(BaseSettings):
     ENABLE_LEARNING_HISTORY: bool = Field(default=True, alias="ENABLE_LEARNING_HISTORY")
     ENABLE_STRENGTH_ANALYSIS: bool = Field(default=True, alias="ENABLE_STRENGTH_ANALYSIS")
 
+    # TTS（ENABLE_TTS かつ TTS_ENGINE 指定時のみ合成。services.tts_pipeline）
+    # 合成エンジンのファクトリ（"モジュール:ファクトリ" 形式）
+    TTS_ENGINE: Optional[str] = Field(default=None, alias="TTS_ENGINE")
+    # 1日（UTC）あたりの合成文字数の上限（全ワーカー合計。キャッシュから返す文は数えない）
+    TTS_DAILY_CHAR_BUDGET: int = Field(default=20000, ge=0, alias="TTS_DAILY_CHAR_BUDGET")
+    TTS_CACHE_DIR: str = Field(default=".tts_cache", alias="TTS_CACHE_DIR")
+    # 1リクエストで受け付けるテキストの最大文字数
+    TTS_MAX_TEXT_CHARS: int = Field(default=1000, ge=1, alias="TTS_MAX_TEXT_CHARS")
+    # ユーザーごとの1日（UTC）あたりの合成文字数の上限（0 は無制限。全体の上限 TTS_DAILY_CHAR_BUDGET とは別に数える）
+    TTS_USER_DAILY_CHAR_BUDGET: int = Field(default=2000, ge=0, alias="TTS_USER_DAILY_CHAR_BUDGET")
+    # 受け付ける音声・スタイル・言語（カンマ区切り。これ以外の指定は400）
+    TTS_VOICES: str = Field(
+        default=(
+            "achernar,achird,algenib,algieba,alnilam,aoede,autonoe,callirrhoe,charon,despina,enceladus,erinome,"
+            "fenrir,gacrux,iapetus,kore,laomedeia,leda,orus,pulcherrima,puck,rasalgethi,sadachbia,sadaltager,"
+            "schedar,sulafat,umbriel,vindemiatrix,zephyr,zubenelgenubi"
+        ),
+        alias="TTS_VOICES",
+    )
+    TTS_STYLES: str = Field(
+        default="happy,excited,sad,tired,angry,worried,calm,confident,professional,friendly,whisper,spooky",
+        alias="TTS_STYLES",
+    )
+    TTS_LANGUAGES: str = Field(default="ja,en,zh,ko", alias="TTS_LANGUAGES")
+
+    # 生成したキャラクター画像の保存先（内容アドレス。/img/<hash>.webp で配信）
+    IMAGE_STORE_DIR: str = Field(default=".image_store", alias="IMAGE_STORE_DIR")
+
     # その他のフラグ
     ENABLE_DEBUG: bool = Field(default=False, alias="ENABLE_DEBUG")
 
+    # バックグラウンドタスクキュー（フィードバック後処理・リアルタイムフィードバック）
+    ENABLE_BACKGROUND_TASKS: bool = Field(default=True, alias="ENABLE_BACKGROUND_TASKS")
+    ENABLE_REALTIME_FEEDBACK_LLM: bool = Field(default=False, alias="ENABLE_REALTIME_FEEDBACK_LLM")
+    TASK_QUEUE_DB_PATH: str = Field(default="user_data/task_queue.db", alias="TASK_QUEUE_DB_PATH")
+    TASK_QUEUE_WORKERS: int = Field(default=2, alias="TASK_QUEUE_WORKERS")
+    TASK_QUEUE_MAX_RETRIES: int = Field(default=3, alias="TASK_QUEUE_MAX_RETRIES")
+    TASK_QUEUE_LEASE_SECONDS: float = Field(default=600.0, alias="TASK_QUEUE_LEASE_SECONDS")
+
+    # 観戦モードの次ターン先読み
+    WATCH_PREFETCH_ENABLED: bool = Field(default=True, alias="WATCH_PREFETCH_ENABLED")
+    WATCH_PREFETCH_MAX_CONCURRENT: int = Field(default=4, alias="WATCH_PREFETCH_MAX_CONCURRENT")
+    # 観戦クイズの事前生成（クイズを出すターンの何ターン前から生成するか。0で無効）
+    QUIZ_PREGENERATE_LEAD_TURNS: int = Field(default=1, ge=0, le=2, alias="QUIZ_PREGENERATE_LEAD_TURNS")
+    QUIZ_PREGENERATE_MAX_CONCURRENT: int = Field(default=2, ge=0, alias="QUIZ_PREGENERATE_MAX_CONCURRENT")
+
+    # 三者会話モードの参加セッション（Redisセッションストア有効時は全ワーカーで共有）
+    THREE_WAY_SESSION_IDLE_SECONDS: int = Field(default=1800, ge=1, alias="THREE_WAY_SESSION_IDLE_SECONDS")
+    THREE_WAY_MAX_SESSIONS: int = Field(default=1000, ge=0, alias="THREE_WAY_MAX_SESSIONS")
+    # ユーザー発言への A・B の応答（B を A と並列に投機生成するか、ユーザーごとの同時生成数）
+    THREE_WAY_SPECULATIVE_ENABLED: bool = Field(default=True, alias="THREE_WAY_SPECULATIVE_ENABLED")
+    THREE_WAY_MAX_CONCURRENT_PER_USER: int = Field(default=1, ge=0, alias="THREE_WAY_MAX_CONCURRENT_PER_USER")
+
+    # メトリクス（/metrics, /api/metrics）
+    # gunicorn等の複数ワーカー構成で全ワーカーのメトリクスを集約する共有ディレクトリ（未設定時はプロセス単位）
+    METRICS_MULTIPROC_DIR: Optional[str] = Field(default=None, alias="METRICS_MULTIPROC_DIR")
+    METRICS_FLUSH_INTERVAL_SECONDS: float = Field(default=5.0, alias="METRICS_FLUSH_INTERVAL_SECONDS")
+    # LLM呼び出しの計測結果をJSONL（1呼び出し1行）で書き出すパス（未設定時は書き出さない）
+    LLM_TRACE_PATH: Optional[str] = Field(default=None, alias="LLM_TRACE_PATH")
+
+    # 設定スナップショット（config.snapshot）の .env 更新確認の間隔（0 で無効。SIGHUP での再読み込みは常に有効）
+    CONFIG_RELOAD_CHECK_SECONDS: float = Field(default=5.0, ge=0.0, alias="CONFIG_RELOAD_CHECK_SECONDS")
+
+    # gunicorn の preload_app 構成でのフォーク前ウォームアップ（gunicorn.conf.py）
+    WARMUP_PRELOAD_SDKS: bool = Field(default=True, alias="WARMUP_PRELOAD_SDKS")
+
+    # オンデマンドのサンプリングプロファイラ（管理トークン未設定時は無効）
+    PROFILER_ADMIN_TOKEN: Optional[str] = Field(default=None, alias="PROFILER_ADMIN_TOKEN")
+    PROFILER_SAMPLE_RATE: float = Field(default=0.0, alias="PROFILER_SAMPLE_RATE")
+    PROFILER_INTERVAL_MS: float = Field(default=5.0, alias="PROFILER_INTERVAL_MS")
+    PROFILER_OUTPUT_DIR: str = Field(default="logs/profiles", alias="PROFILER_OUTPUT_DIR")
+    PROFILER_MAX_PROFILES: int = Field(default=50, alias="PROFILER_MAX_PROFILES")
+
     model_config = {
         "env_file": ".env",
         "env_file_encoding": "utf-8",
@@ -304,10 +382,11 @@ def get_config() -> Config:
         return DevelopmentConfig()
 
 
-@lru_cache()
 def get_cached_config() -> Config:
-    """キャッシュされた設定インスタンスを取得"""
-    return get_config()
+    """キャッシュされた設定インスタンスを取得（設定スナップショットの変更不可の設定。再読み込みで差し替わる）"""
+    from .snapshot import get_config_snapshot
+
+    return get_config_snapshot().config
 
 
 # 機能フラグヘルパー関数
@@ -0,0 +1,182 @@
+"""
+設定スナップショット
+
+環境変数と .env の解析・バリデーションを1回だけ行い、解析済みの設定と
+モード別モデルの解決表（SCENARIO_MODEL 等 → 未設定なら DEFAULT_MODEL）を変更不可のスナップショットにまとめる。
+リクエストごとの BaseSettings 構築をなくし、モデル解決を辞書引きにする。
+スナップショットの設定はプロセス内で共有されるため、読み取り専用として扱うこと（変更は再読み込みで行う）。
+
+再読み込み:
+    - SIGHUP（install_reload_signal で登録。gunicorn ではワーカーごとに post_worker_init で登録）
+    - .env の更新（CONFIG_RELOAD_CHECK_SECONDS 間隔で更新時刻を確認。0 で無効）
+    - reload_config_snapshot() の直接呼び出し
+新しいスナップショットを構築してから差し替えるため、読み取り側は常に一貫した設定を参照する。
+構築に失敗した場合（不正な値など）は直前のスナップショットを使い続ける。
+
+環境変数は .env より優先される（pydantic-settings の優先順位）。
+プロセスの環境変数に既に入っている値は .env を変更しても上書きされない。
+"""
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from .config import Config, get_config
+
+logger = logging.getLogger(__name__)
+
+# モード名 → モード別モデルの設定項目（services.model_selector のモード）
+MODE_MODEL_FIELDS: Mapping[str, str] = MappingProxyType(
+    {
+        "scenario": "SCENARIO_MODEL",
+        "chat": "CHAT_MODEL",
+        "watch": "WATCH_MODEL",
+        "feedback": "FEEDBACK_MODEL",
+    }
+)
+
+# 更新を監視する .env（Config と同じパス）
+ENV_FILE = Config.model_config.get("env_file") or ".env"
+
+
+def _env_file_mtime() -> Optional[float]:
+    try:
+        return os.stat(ENV_FILE).st_mtime
+    except OSError:
+        return None
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """解析済みの設定とモード別モデルの解決表（差し替えのみで、変更はしない）"""
+
+    config: Config
+    models: Mapping[str, str]
+    version: int
+    loaded_at: float = field(default_factory=time.time)
+    env_file_mtime: Optional[float] = None
+
+
+def build_config_snapshot(config: Optional[Config] = None, version: int = 1) -> ConfigSnapshot:
+    """
+    設定スナップショットを構築
+
+    Args:
+        config: 元にする設定（省略時は get_config() で環境変数と .env から構築）
+        version: スナップショットの版数（再読み込みごとに増える）
+    """
+    mtime = _env_file_mtime()
+    config = config or get_config()
+    models = {mode: getattr(config, name) or config.DEFAULT_MODEL for mode, name in MODE_MODEL_FIELDS.items()}
+    return ConfigSnapshot(config=config, models=MappingProxyType(models), version=version, env_file_mtime=mtime)
+
+
+_snapshot: Optional[ConfigSnapshot] = None
+_lock = threading.Lock()
+_reload_requested = False
+_next_check = 0.0
+
+
+def _schedule_next_check(snapshot: ConfigSnapshot) -> None:
+    global _next_check
+    interval = snapshot.config.CONFIG_RELOAD_CHECK_SECONDS
+    _next_check = time.monotonic() + interval if interval > 0 else float("inf")
+
+
+def _swap(config: Optional[Config] = None) -> ConfigSnapshot:
+    global _snapshot, _reload_requested
+    _reload_requested = False
+    version = _snapshot.version + 1 if _snapshot is not None else 1
+    snapshot = build_config_snapshot(config, version=version)
+    _snapshot = snapshot
+    _schedule_next_check(snapshot)
+    if version > 1:
+        # 設定から作る機能フラグのキャッシュも新しい設定で作り直す
+        from .feature_flags import get_feature_flags
+
+        get_feature_flags.cache_clear()
+    return snapshot
+
+
+def _refresh() -> ConfigSnapshot:
+    with _lock:
+        current = _snapshot
+        if current is None:
+            # 初回の構築失敗（不正な設定）は get_config() と同じく呼び出し元に送出する
+            return _swap()
+        if not _reload_requested and time.monotonic() < _next_check:
+            return current  # 他のスレッドが確認済み
+        reason = "signal" if _reload_requested else "env_file"
+        if reason == "env_file" and _env_file_mtime() == current.env_file_mtime:
+            _schedule_next_check(current)
+            return current
+        try:
+            snapshot = _swap()
+        except Exception as e:
+            logger.error(f"Config reload ({reason}) failed, keeping version {current.version}: {e}")
+            _schedule_next_check(current)
+            return current
+        logger.info(f"Config reloaded ({reason}): version {snapshot.version}")
+        return snapshot
+
+
+def get_config_snapshot() -> ConfigSnapshot:
+    """現在の設定スナップショットを取得（初回呼び出し時に構築）"""
+    snapshot = _snapshot
+    if snapshot is None or _reload_requested or time.monotonic() >= _next_check:
+        snapshot = _refresh()
+    return snapshot
+
+
+def reload_config_snapshot(config: Optional[Config] = None) -> bool:
+    """
+    設定を再読み込みしてスナップショットを差し替える
+
+    Args:
+        config: 差し替える設定（省略時は環境変数と .env から構築）
+
+    Returns:
+        差し替えた場合 True（構築に失敗した場合は直前のスナップショットのまま False）
+    """
+    with _lock:
+        try:
+            snapshot = _swap(config)
+        except Exception as e:
+            logger.error(f"Config reload failed: {e}")
+            return False
+    logger.info(f"Config reloaded: version {snapshot.version}")
+    return True
+
+
+def request_config_reload() -> None:
+    """次回の get_config_snapshot() で再読み込みする（シグナルハンドラから呼べるよう、ここでは構築しない）"""
+    global _reload_requested
+    _reload_requested = True
+
+
+def install_reload_signal() -> bool:
+    """
+    SIGHUP で設定を再読み込みするハンドラを登録
+
+    Returns:
+        登録した場合 True（SIGHUP のないプラットフォームやメインスレッド以外では False）
+    """
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(signal.SIGHUP, lambda signum, frame: request_config_reload())
+    return True
+
+
+def reset_config_snapshot() -> None:
+    """スナップショットを破棄する（次回アクセス時に再構築。主にテスト用）"""
+    global _snapshot, _reload_requested, _next_check
+    with _lock:
+        _snapshot = None
+        _reload_requested = False
+        _next_check = 0.0
@@ -12,7 +12,9 @@ from flask import Flask, g, jsonify, request, session
 CSRF_PROTECTED_ENDPOINTS = [
     "/api/clear_history",
     "/api/chat",
+    "/api/chat/stream",
     "/api/scenario_chat",
+    "/api/scenario_chat/stream",
     "/api/watch/start",
     "/api/watch/next",
     "/api/scenario_feedback",
@@ -23,9 +25,17 @@ CSRF_PROTECTED_ENDPOINTS = [
     "/api/session/clear",
 ]
 
+# プロファイル対象外のエンドポイント（管理APIと静的ファイル）
+PROFILER_EXCLUDED_ENDPOINTS = [
+    "/api/admin/profiles",
+    "/static/",
+    "/flasgger_static/",
+]
+
 # パフォーマンス計測対象外のエンドポイント
 PERF_EXCLUDED_ENDPOINTS = [
     "/health",
+    "/metrics",
     "/static/",
     "/flasgger_static/",
 ]
@@ -77,6 +87,15 @@ def register_middleware(app: Flask):
                 # CSRFTokenクラスが存在しない場合はスキップ
                 pass
 
+    _register_profiler(app)
+
+    @app.teardown_request
+    def reset_llm_call_context(exc):
+        """LLM呼び出し計測のモード設定をリクエストごとに解除"""
+        from services.llm_instrumentation import reset_llm_context
+
+        reset_llm_context()
+
     @app.after_request
     def record_metrics(response):
         """リクエスト完了時にメトリクスを記録"""
@@ -90,7 +109,9 @@ def register_middleware(app: Flask):
             if hasattr(g, "start_time"):
                 duration_ms = (time.perf_counter() - g.start_time) * 1000
                 metrics = get_metrics()
-                metrics.record_request(endpoint=request.path, duration_ms=duration_ms, status_code=response.status_code)
+                # パスパラメータごとに系列が増えないよう、ルートのパターン（例: /api/tasks/<task_id>）で集計
+                endpoint = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+                metrics.record_request(endpoint=endpoint, duration_ms=duration_ms, status_code=response.status_code)
 
                 # 遅いリクエストをログ
                 if duration_ms > 1000:  # 1秒以上
@@ -103,6 +124,57 @@ def register_middleware(app: Flask):
         return response
 
 
+def _register_profiler(app: Flask):
+    """
+    オンデマンドのサンプリングプロファイラを登録
+
+    PROFILER_ADMIN_TOKEN が未設定の場合は何も登録しない（通常リクエストへのオーバーヘッドなし）。
+    """
+    from utils.profiler import ADMIN_HEADER, PROFILE_ID_HEADER, get_profiler
+
+    profiler = get_profiler()
+    if not profiler.enabled:
+        return
+
+    @app.before_request
+    def start_profiling():
+        """対象リクエストのスタック採取を開始"""
+        if any(request.path.startswith(ep) for ep in PROFILER_EXCLUDED_ENDPOINTS):
+            return
+        trigger = profiler.select_trigger(request.headers.get(ADMIN_HEADER))
+        if trigger:
+            g.profile_session = profiler.start()
+            g.profile_trigger = trigger
+
+    @app.after_request
+    def tag_profiled_response(response):
+        """プロファイル対象のレスポンスにステータスとプロファイルIDを記録"""
+        session = getattr(g, "profile_session", None)
+        if session is not None:
+            g.profile_status = response.status_code
+            response.headers[PROFILE_ID_HEADER] = session.id
+        return response
+
+    @app.teardown_request
+    def stop_profiling(exc):
+        """採取を終了してプロファイルを保存（ストリーミングはレスポンス送信完了時）"""
+        session = g.pop("profile_session", None)
+        if session is None:
+            return
+        profile = profiler.stop(
+            session,
+            method=request.method,
+            path=request.path,
+            endpoint=request.url_rule.rule if request.url_rule is not None else "<unmatched>",
+            trigger=g.pop("profile_trigger", "unknown"),
+            status_code=g.pop("profile_status", 500 if exc is not None else None),
+        )
+        logging.getLogger("performance").info(
+            f"Profiled {request.method} {request.path}: {profile.id} "
+            f"({profile.sample_count} samples, {profile.duration_ms:.1f}ms)"
+        )
+
+
 def get_csrf_protected_endpoints():
     """
     CSRF保護対象のエンドポイントリストを取得
@@ -0,0 +1,126 @@
+"""
+フォーク前のウォームアップ
+
+gunicorn の preload_app 構成で、マスタープロセスがワーカーをフォークする前に
+不変のカタログ（シナリオ・カテゴリ分類・事前生成プロンプト）、正規表現、Jinjaテンプレート、
+遅延インポートのSDKを読み込み、gc.freeze() で永続世代に移す。
+フォーク後のワーカーはこれらをコピーオンライトで共有し、GCが参照カウント領域に書き込まないため
+ページが複製されない（ワーカーごとのメモリとウォームアップ時間を削減）。
+
+ワーカー固有の状態（スレッド・ソケット・タスクキュー等）はここでは作らないこと。
+"""
+
+from __future__ import annotations
+
+import gc
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+# 正規表現キャッシュを温めるためのサンプル入力（検出なしの通常メッセージとHTMLを含む応答）
+_SAMPLE_MESSAGE = "お疲れさまです。明日の会議の資料について確認させてください。<b>よろしく</b>お願いします。"
+_SAMPLE_HTML = '<html><head><script src="/static/js/app.js"></script><style>p{}</style></head><body></body></html>'
+
+
+def _warm_scenarios() -> None:
+    from services.scenario_service import get_scenario_service
+
+    # シナリオカタログの読み込みと全シナリオのプロンプト事前生成
+    get_scenario_service()
+
+
+def _warm_categories() -> None:
+    from scenarios.category_manager import get_categorized_scenarios, get_scenario_category_summary
+
+    get_categorized_scenarios()
+    get_scenario_category_summary()
+
+
+def _warm_matchers() -> None:
+    # 入力検証・モデレーションで使う正規表現を re モジュールのキャッシュにコンパイルしておく
+    from services.moderation_service import ModerationService
+    from utils.security import CSPNonce, SecurityUtils
+
+    SecurityUtils.sanitize_input(_SAMPLE_MESSAGE)
+    SecurityUtils.escape_html(_SAMPLE_MESSAGE)
+    SecurityUtils.escape_json(_SAMPLE_MESSAGE)
+    CSPNonce.inject_nonce_to_html(_SAMPLE_HTML, "warmup")
+    ModerationService().check_message(_SAMPLE_MESSAGE)
+
+
+def _warm_prompts() -> None:
+    from services.prompt_service import get_prompt_service
+
+    get_prompt_service()
+
+
+def _warm_templates(app: Optional[Flask]) -> None:
+    if app is None:
+        return
+    env = app.jinja_env
+    for name in env.list_templates(extensions=["html"]):
+        try:
+            env.get_template(name)
+        except Exception as e:  # 壊れたテンプレートは起動を妨げない（リクエスト時にエラーになる）
+            logger.warning(f"Failed to precompile template {name}: {e}")
+
+
+def _warm_sdks() -> None:
+    # import のみ行う（gRPC チャネル等の接続はフォーク後に初回利用時に作られる）
+    from services.llm_service import ChatGoogleGenerativeAI, ChatOpenAI, genai
+    from utils.lazy_import import preload
+
+    preload(genai, ChatGoogleGenerativeAI, ChatOpenAI)
+
+
+def warmup(app: Optional[Flask] = None, preload_sdks: bool = True, freeze: bool = True) -> Dict[str, Any]:
+    """
+    フォーク前のウォームアップを実行
+
+    Args:
+        app: テンプレートを事前コンパイルするアプリケーション
+        preload_sdks: 遅延インポートのSDK（Gemini / OpenAI互換）も読み込むか
+        freeze: 最後に gc.freeze() で読み込んだオブジェクトを永続世代に移すか
+
+    Returns:
+        各ステップの所要時間（ミリ秒）と凍結したオブジェクト数
+    """
+    steps: List[Tuple[str, Callable[[], None]]] = [
+        ("scenarios", _warm_scenarios),
+        ("categories", _warm_categories),
+        ("matchers", _warm_matchers),
+        ("prompts", _warm_prompts),
+        ("templates", lambda: _warm_templates(app)),
+    ]
+    if preload_sdks:
+        steps.append(("sdks", _warm_sdks))
+
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    for name, step in steps:
+        step_started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            # ウォームアップの失敗はワーカーでの初回利用時に再試行されるため起動は続行する
+            logger.warning(f"Warmup step {name} failed: {e}")
+        timings[name] = round((time.perf_counter() - step_started) * 1000, 1)
+
+    frozen = 0
+    if freeze and hasattr(gc, "freeze"):
+        # 循環参照のゴミを先に回収してから凍結する（凍結後は回収されないため）
+        gc.collect()
+        gc.freeze()
+        frozen = gc.get_freeze_count()
+
+    report = {
+        "steps_ms": timings,
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        "frozen_objects": frozen,
+    }
+    logger.info(f"Warmup completed: {report}")
+    return report
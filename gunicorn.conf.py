@@ -0,0 +1,94 @@
+"""
+gunicorn 設定
+
+preload_app でマスタープロセスがアプリを読み込み、ワーカーのフォーク前にウォームアップ（core.warmup）して
+シナリオカタログ・カテゴリ分類・事前生成プロンプト・テンプレート・SDKをコピーオンライトで共有する。
+各ワーカーの起動から処理可能になるまでの時間とメモリ使用量はログと /metrics に出力する。
+ログ（utils.logging_config）は各ワーカーで設定し、書き込みはワーカーごとの書き込みスレッドで行う。
+ワーカーに SIGHUP を送ると、そのワーカーの設定スナップショット（config.snapshot）を再読み込みする
+（マスターへの SIGHUP は gunicorn の既定どおりワーカーを入れ替える）。
+
+コマンドライン引数（--workers 等）はこのファイルの設定より優先される。
+"""
+
+import os
+import time
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gevent")
+
+if worker_class == "gevent":
+    # preload_app ではマスターでアプリを import するため、import 前に標準ライブラリをパッチする
+    # （import 時に取得した threading / socket 等がパッチ前のままワーカーに引き継がれないようにする）
+    from gevent import monkey
+
+    monkey.patch_all()
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_connections = 1000
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() not in ("0", "false", "no")
+timeout = 30
+keepalive = 2
+
+
+def on_starting(server):
+    """マスターの起動時に、前回の起動で残ったワーカーのメトリクス（METRICS_MULTIPROC_DIR）を削除する"""
+    from config import get_cached_config
+    from utils.performance import MultiprocessCollector
+
+    config = get_cached_config()
+    directory = config.METRICS_MULTIPROC_DIR
+    if not directory:
+        return
+    # 残したままだと前回のプロセスのカウンターがアーカイブ経由で /metrics に加算され続ける
+    MultiprocessCollector(directory, config.METRICS_FLUSH_INTERVAL_SECONDS).clear()
+    server.log.info(f"Cleared multiprocess metrics directory: {directory}")
+
+
+def when_ready(server):
+    """マスターでアプリを読み込んだ後、ワーカーのフォーク前に呼ばれる"""
+    if not preload_app:
+        return
+    from app import get_default_app
+    from config import get_cached_config
+    from core.warmup import warmup
+
+    report = warmup(get_default_app(), preload_sdks=get_cached_config().WARMUP_PRELOAD_SDKS)
+    server.log.info(f"Pre-fork warmup completed: {report}")
+
+
+def pre_fork(server, worker):
+    # フォーク前に記録した時刻はワーカー側のオブジェクトにもコピーされる
+    worker.spawned_at = time.time()
+
+
+def post_worker_init(worker):
+    """ワーカーがリクエストを処理できる状態になった時点でログを設定し、起動時間とメモリ使用量を記録"""
+    from config import get_cached_config
+    from config.snapshot import install_reload_signal
+    from utils.logging_config import setup_logging
+    from utils.performance import get_metrics, process_memory
+
+    # gunicorn はワーカーの SIGHUP を既定の動作に戻すため、設定の再読み込み用に登録し直す
+    install_reload_signal()
+
+    # 書き込みスレッドはフォーク後に各ワーカーで起動する
+    config = get_cached_config()
+    setup_logging(
+        app=worker.wsgi,
+        log_level=config.LOG_LEVEL,
+        log_format=config.LOG_FORMAT,
+        log_dir=config.LOG_DIR,
+        async_logging=config.LOG_ASYNC,
+        queue_size=config.LOG_QUEUE_SIZE,
+        access_sample_rate=config.ACCESS_LOG_SAMPLE_RATE,
+        access_slow_ms=config.ACCESS_LOG_SLOW_MS,
+        access_log=True,
+    )
+
+    ready_ms = (time.time() - getattr(worker, "spawned_at", time.time())) * 1000
+    get_metrics().mark_ready(ready_ms)
+
+    memory = process_memory()
+    mib = {key: round(value / (1024 * 1024), 1) for key, value in memory.items()}
+    worker.log.info(f"Worker {worker.pid} ready in {ready_ms:.0f}ms (memory MiB: {mib})")
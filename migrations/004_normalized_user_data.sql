@@ -0,0 +1,48 @@
+-- 004: skill_xp / xp_history / badges をサーバーサイドの部分書き込みで使えるようにする
+--
+-- 背景:
+--   SupabaseUserDataService の normalized モード（SUPABASE_PERSISTENCE_MODE=normalized）は
+--   user_data.data の JSONB 全体ではなく、変更部分だけを正規化テーブルに書き込む
+--   （XP の変更は skill_xp、追加された XP 履歴は xp_history、獲得バッジは badges）。
+--   user_data と同様に user_id はセッションのユーザーID（TEXT）のため、002 と同じく型と FK を揃える。
+--
+-- 方針:
+--   - auth.uid() を参照するポリシーを削除してから user_id を TEXT 化し、auth.users への FK を外す
+--   - RLS は有効のままポリシーなし（003 と同じく anon / authenticated からは遮断、service_role のみ）
+--   - xp_history の id は SupabaseUserDataService 側で決定的に生成するため、再送しても重複しない
+--
+-- ロールバック:
+--   SUPABASE_PERSISTENCE_MODE=document に戻せば user_data.data のみを使う（このテーブルは参照されない）
+
+-- ---------------------------------------------------------------------------
+-- skill_xp
+-- ---------------------------------------------------------------------------
+DROP POLICY IF EXISTS "Users can only access own data" ON public.skill_xp;
+ALTER TABLE public.skill_xp DROP CONSTRAINT IF EXISTS skill_xp_user_id_fkey;
+ALTER TABLE public.skill_xp ALTER COLUMN user_id TYPE TEXT;
+ALTER TABLE public.skill_xp ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON public.skill_xp FROM anon;
+REVOKE ALL ON public.skill_xp FROM authenticated;
+
+-- ---------------------------------------------------------------------------
+-- xp_history
+-- ---------------------------------------------------------------------------
+DROP POLICY IF EXISTS "Users can only access own data" ON public.xp_history;
+ALTER TABLE public.xp_history DROP CONSTRAINT IF EXISTS xp_history_user_id_fkey;
+ALTER TABLE public.xp_history ALTER COLUMN user_id TYPE TEXT;
+ALTER TABLE public.xp_history ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON public.xp_history FROM anon;
+REVOKE ALL ON public.xp_history FROM authenticated;
+
+-- 読み込み時は作成日時順に取得する
+CREATE INDEX IF NOT EXISTS idx_xp_history_user_asc ON public.xp_history(user_id, created_at);
+
+-- ---------------------------------------------------------------------------
+-- badges
+-- ---------------------------------------------------------------------------
+DROP POLICY IF EXISTS "Users can only access own data" ON public.badges;
+ALTER TABLE public.badges DROP CONSTRAINT IF EXISTS badges_user_id_fkey;
+ALTER TABLE public.badges ALTER COLUMN user_id TYPE TEXT;
+ALTER TABLE public.badges ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON public.badges FROM anon;
+REVOKE ALL ON public.badges FROM authenticated;
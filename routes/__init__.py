@@ -140,6 +140,15 @@ def register_blueprints(app: Flask):
     except ImportError as e:
         print(f"⚠️ ゲーミフィケーションルートは利用できません: {e}")
 
+    # シナリオ推薦ルート
+    try:
+        from routes.recommendation_routes import recommendation_bp
+
+        app.register_blueprint(recommendation_bp)
+        print("✅ シナリオ推薦ルートを登録しました (/api/recommendations)")
+    except ImportError as e:
+        print(f"⚠️ シナリオ推薦ルートは利用できません: {e}")
+
     # 観戦クイズルート
     try:
         from routes.quiz_routes import quiz_bp
@@ -194,6 +203,24 @@ def register_blueprints(app: Flask):
     except ImportError as e:
         print(f"⚠️ 3者会話ルートは利用できません: {e}")
 
+    # バックグラウンドタスク結果ルート
+    try:
+        from routes.task_routes import task_bp
+
+        app.register_blueprint(task_bp)
+        print("✅ バックグラウンドタスクルートを登録しました (/api/tasks/*)")
+    except ImportError as e:
+        print(f"⚠️ バックグラウンドタスクルートは利用できません: {e}")
+
+    # プロファイル管理ルート（PROFILER_ADMIN_TOKEN 設定時のみ有効）
+    try:
+        from routes.profiling_routes import profiling_bp
+
+        app.register_blueprint(profiling_bp)
+        print("✅ プロファイル管理ルートを登録しました (/api/admin/profiles/*)")
+    except ImportError as e:
+        print(f"⚠️ プロファイル管理ルートは利用できません: {e}")
+
     # ゲーミフィケーション・ダッシュボード画面
     try:
         from routes.gamification_page_routes import gamification_page_bp
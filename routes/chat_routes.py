@@ -3,8 +3,9 @@ Chat routes for the workplace-roleplay application.
 Handles chat API endpoints.
 """
 
+import logging
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
 from flask import Blueprint, Response, jsonify, request, session
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
@@ -12,6 +13,8 @@ from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from config import get_cached_config
 from errors import ValidationError, secure_error_handler, with_error_handling
 
+logger = logging.getLogger(__name__)
+
 # セキュリティ関連のインポート
 try:
     from utils.security import SecurityUtils
@@ -40,6 +43,14 @@ except ImportError:
 # サービス層のインポート
 from services.feedback_service import get_feedback_service
 from services.model_selector import resolve_model
+from services.post_response_tasks import (
+    CHAT_FEEDBACK_POST,
+    REALTIME_FEEDBACK,
+    realtime_feedback_enabled,
+    run_realtime_feedback,
+)
+from services.session_service import SessionService
+from services.task_queue import background_tasks_enabled, describe_task, get_task_queue
 
 from utils.helpers import (
     add_messages_from_history,
@@ -50,6 +61,7 @@ from utils.helpers import (
     get_topic_description,
     initialize_session_history,
 )
+from utils.streaming import sse_response, stream_llm_reply
 
 # Blueprint作成
 chat_bp = Blueprint("chat", __name__)
@@ -58,6 +70,8 @@ chat_bp = Blueprint("chat", __name__)
 config = get_cached_config()
 DEFAULT_MODEL = config.DEFAULT_MODEL
 
+MODERATION_BLOCKED_MESSAGE = "申し訳ございませんが、そのメッセージは送信できません。"
+
 
 def _get_llm_and_invoke(model_name: str, messages: List[BaseMessage]) -> str:
     """
@@ -72,9 +86,16 @@ def _get_llm_and_invoke(model_name: str, messages: List[BaseMessage]) -> str:
     return app_extract_content(response)
 
 
-@chat_bp.route("/api/chat", methods=["POST"])
-def handle_chat() -> Response:
-    """チャットメッセージの処理"""
+def _prepare_chat_turn() -> Tuple[str, str, List[BaseMessage]]:
+    """
+    /api/chat 系リクエストを検証し、LLMに送るメッセージリストを構築する
+
+    Returns:
+        Tuple[str, str, List[BaseMessage]]: (ユーザーメッセージ, モデル名, メッセージリスト)
+
+    Raises:
+        ValidationError: 入力値やセッション状態が不正な場合
+    """
     data = request.get_json()
     if data is None:
         raise ValidationError("無効なJSONデータです")
@@ -114,20 +135,58 @@ def handle_chat() -> Response:
     # 新しいメッセージを追加
     messages.append(HumanMessage(content=message))
 
+    return message, model_name, messages
+
+
+def _check_moderation(message: str) -> Optional[Dict[str, Any]]:
+    """
+    モデレーションチェックを行い、送信不可の場合はその結果を返す
+
+    Returns:
+        Optional[Dict[str, Any]]: ブロック時のモデレーション結果（許可時・チェック失敗時はNone）
+    """
+    try:
+        from services.moderation_service import ModerationService
+
+        mod_svc = ModerationService()
+        moderation_result = mod_svc.check_message(message)
+        if not moderation_result.get("allowed", True):
+            return moderation_result
+    except Exception:
+        pass
+    return None
+
+
+def _to_role_history(history: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    セッションの会話履歴（human/ai形式）をrole/content形式に変換
+
+    RealtimeFeedbackService はrole/content形式の履歴を前提とする。
+    """
+    turns: List[Dict[str, str]] = []
+    for entry in history or []:
+        if not isinstance(entry, dict):
+            continue
+        if entry.get("human"):
+            turns.append({"role": "user", "content": entry["human"]})
+        if entry.get("ai"):
+            turns.append({"role": "assistant", "content": entry["ai"]})
+    return turns
+
+
+@chat_bp.route("/api/chat", methods=["POST"])
+def handle_chat() -> Response:
+    """チャットメッセージの処理"""
+    message, model_name, messages = _prepare_chat_turn()
+
     try:
         # モデレーションチェック
-        moderation_result = None
-        try:
-            from services.moderation_service import ModerationService
-            mod_svc = ModerationService()
-            moderation_result = mod_svc.check_message(message)
-            if not moderation_result.get("allowed", True):
-                return jsonify({
-                    "response": "申し訳ございませんが、そのメッセージは送信できません。",
-                    "moderation": moderation_result,
-                }), 400
-        except Exception:
-            pass
+        moderation_result = _check_moderation(message)
+        if moderation_result is not None:
+            return jsonify({
+                "response": MODERATION_BLOCKED_MESSAGE,
+                "moderation": moderation_result,
+            }), 400
 
         ai_message = _get_llm_and_invoke(model_name, messages)
 
@@ -136,15 +195,25 @@ def handle_chat() -> Response:
 
         response_data = {"response": SecurityUtils.escape_html(ai_message)}
 
-        # リアルタイムフィードバック
+        # リアルタイムフィードバック（LLM呼び出しが1回増えるため ENABLE_REALTIME_FEEDBACK_LLM で有効化）
         try:
             from services.realtime_feedback_service import RealtimeFeedbackService
-            rtf = RealtimeFeedbackService()
-            history = session.get("chat_history", [])
-            if rtf.should_provide_feedback(history):
-                fb = rtf.analyze_message(message, history, None)
-                if fb.get("has_feedback"):
-                    response_data["realtime_feedback"] = fb
+
+            role_history = _to_role_history(session.get("chat_history", []))
+            if realtime_feedback_enabled() and RealtimeFeedbackService().should_provide_feedback(role_history):
+                payload = {
+                    "message": message,
+                    "history": role_history,
+                    "model_name": model_name,
+                    "scenario_context": None,
+                }
+                if background_tasks_enabled():
+                    # 2回目のLLM呼び出しはレスポンス返却後に実行し、結果はポーリングで取得させる
+                    user_id = SessionService().get_user_id()
+                    task_id = get_task_queue().enqueue(REALTIME_FEEDBACK, payload, owner=user_id)
+                    response_data["realtime_feedback_task"] = describe_task(task_id)
+                else:
+                    response_data.update(run_realtime_feedback(payload))
         except Exception:
             pass
 
@@ -153,6 +222,38 @@ def handle_chat() -> Response:
         raise e
 
 
+@chat_bp.route("/api/chat/stream", methods=["POST"])
+def handle_chat_stream() -> Response:
+    """チャットメッセージの処理（SSEストリーミング版）
+
+    トークンを生成順に配信し、完了後に会話履歴へ保存する。
+    ストリーミング非対応のクライアントは従来の /api/chat を使用する。
+    """
+    message, model_name, messages = _prepare_chat_turn()
+
+    moderation_result = _check_moderation(message)
+    if moderation_result is not None:
+        return jsonify({
+            "response": MODERATION_BLOCKED_MESSAGE,
+            "moderation": moderation_result,
+        }), 400
+
+    from app import initialize_llm
+
+    llm = initialize_llm(model_name)
+
+    def on_complete(ai_message: str) -> None:
+        add_to_session_history("chat_history", {"human": message, "ai": ai_message})
+
+    def on_error(e: Exception) -> str:
+        from errors import handle_llm_specific_error
+
+        app_error = handle_llm_specific_error(e, "Gemini")
+        return app_error.message
+
+    return sse_response(stream_llm_reply(llm, messages, on_complete, on_error, endpoint="/api/chat/stream"))
+
+
 @chat_bp.route("/api/start_chat", methods=["POST"])
 @secure_error_handler
 def start_chat() -> Response:
@@ -322,11 +423,30 @@ def get_chat_feedback() -> Response:
 
             strength_service = get_strength_service()
             response_data = strength_service.update_feedback_with_strength_analysis(response_data, "chat")
+            strength_scores = (response_data.get("strength_analysis") or {}).get("scores") or {}
+
+            if background_tasks_enabled():
+                # XP・クエスト・バッジ・会話保存はレスポンス返却後に実行
+                try:
+                    user_id = SessionService().get_user_id()
+                    task_id = get_task_queue().enqueue(
+                        CHAT_FEEDBACK_POST,
+                        {
+                            "user_id": user_id,
+                            "scores": strength_scores,
+                            "history": list(session.get("chat_history", [])),
+                        },
+                        owner=user_id,
+                    )
+                    response_data["post_processing"] = describe_task(task_id)
+                    return jsonify(response_data)
+                except Exception as e:
+                    # 登録できなければこの場で実行する（XP・クエスト・バッジを失わない）
+                    logger.warning(f"Failed to enqueue chat feedback post-processing, running inline: {e}")
 
             try:
                 from services.gamification_hooks import on_chat_feedback
 
-                strength_scores = (response_data.get("strength_analysis") or {}).get("scores") or {}
                 gamification_result = on_chat_feedback(strength_scores)
                 if gamification_result:
                     response_data["gamification"] = gamification_result
@@ -1,9 +1,15 @@
 """
 データエクスポート API ルート
+
+会話履歴のエクスポートは1行ずつ生成するストリーミングレスポンス（Accept-Encoding: gzip なら gzip 圧縮）。
+since / until（YYYY-MM-DD または ISO 8601）で履歴の timestamp を絞り込める。
 """
 
 from __future__ import annotations
 
+from datetime import datetime
+from typing import Any, Iterable, Optional, Tuple
+
 from flask import Blueprint, Response, jsonify, request
 
 from services.session_service import SessionService
@@ -18,38 +24,67 @@ def _user_id() -> str:
     return _session_svc.get_user_id()
 
 
-@export_bp.route("/csv", methods=["POST"])
-def export_csv():
-    """会話履歴をCSVエクスポート"""
+def _date_range(payload: dict) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """日付範囲（since / until）をクエリ文字列またはJSONボディから取得（ValueError は400）"""
+    from services.export_service import parse_date_bound
+
+    since = request.args.get("since") or payload.get("since")
+    until = request.args.get("until") or payload.get("until")
+    return parse_date_bound(since), parse_date_bound(until, end_of_day=True)
+
+
+def _stream_response(lines: Iterable[str], mimetype: str, filename: str) -> Response:
+    """行のストリームを chunked レスポンスにする（クライアントが対応していれば gzip 圧縮）"""
+    from services.export_service import batch_stream, gzip_stream
+
+    chunks: Iterable[Any] = batch_stream(lines)
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "X-Accel-Buffering": "no",
+        "Vary": "Accept-Encoding",
+    }
+    if "gzip" in request.accept_encodings:
+        chunks = gzip_stream(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return Response(chunks, mimetype=mimetype, headers=headers)
+
+
+def _export(kind: str, mimetype: str, filename: str):
     try:
         from services.export_service import ExportService
 
         uid = _user_id()
-        payload = request.get_json(silent=True) or {}
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            payload = {}
+        try:
+            since, until = _date_range(payload)
+        except ValueError:
+            return jsonify({"error": "since / until は YYYY-MM-DD または ISO 8601 形式で指定してください"}), 400
         history = payload.get("history") or []
         svc = ExportService()
-        csv_text = svc.export_conversations_csv(uid, history)
-        return Response(csv_text, mimetype="text/csv",
-                        headers={"Content-Disposition": "attachment; filename=conversations.csv"})
+        lines = getattr(svc, f"iter_conversations_{kind}")(uid, history, since=since, until=until)
+        return _stream_response(lines, mimetype, filename)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@export_bp.route("/csv", methods=["POST"])
+def export_csv():
+    """会話履歴をCSVエクスポート"""
+    return _export("csv", "text/csv", "conversations.csv")
+
+
 @export_bp.route("/json", methods=["POST"])
 def export_json():
     """会話履歴をJSONエクスポート"""
-    try:
-        from services.export_service import ExportService
+    return _export("json", "application/json", "conversations.json")
 
-        uid = _user_id()
-        payload = request.get_json(silent=True) or {}
-        history = payload.get("history") or []
-        svc = ExportService()
-        json_text = svc.export_conversations_json(uid, history)
-        return Response(json_text, mimetype="application/json",
-                        headers={"Content-Disposition": "attachment; filename=conversations.json"})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+
+@export_bp.route("/ndjson", methods=["POST"])
+def export_ndjson():
+    """会話履歴をNDJSON（1行1件）でエクスポート"""
+    return _export("ndjson", "application/x-ndjson", "conversations.ndjson")
 
 
 @export_bp.route("/report", methods=["GET"])
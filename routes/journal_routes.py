@@ -8,14 +8,14 @@ from datetime import datetime
 from config.feature_flags import require_feature
 from flask import Blueprint, render_template, session
 
-from scenarios import load_scenarios
+from scenarios import get_all_scenarios
 
 # Blueprint作成
 journal_bp = Blueprint("journal", __name__)
 
-# シナリオをロード
+# シナリオをロード（共有カタログを参照）
 try:
-    scenarios = load_scenarios()
+    scenarios = get_all_scenarios()
 except Exception as e:
     print(f"❌ シナリオロードエラー (journal_routes): {e}")
     scenarios = {}
@@ -37,7 +37,9 @@ def get_all_available_models() -> Dict[str, Any]:
             return _get_fallback_models()
 
         # 利用可能なモデルを取得
-        genai.configure(api_key=api_key)
+        from services.llm_service import gemini_endpoint_options
+
+        genai.configure(api_key=api_key, **gemini_endpoint_options())
         models = genai.list_models()
 
         # Geminiモデルをフィルタリング
@@ -121,12 +123,18 @@ def get_performance_metrics() -> Response:
             "prompt_cache": get_prompt_cache().stats(),
         }
 
+        # LLM呼び出し（モデル・モード別のローリングウィンドウ集計）
+        from services.llm_instrumentation import get_llm_metrics
+
+        llm_metrics = get_llm_metrics().summary()
+
         return (
             jsonify(
                 {
                     "performance": perf_metrics,
                     "business": business_metrics,
                     "caches": cache_stats,
+                    "llm": llm_metrics,
                 }
             ),
             200,
@@ -135,6 +143,24 @@ def get_performance_metrics() -> Response:
         return jsonify({"error": "Performance metrics not available"}), 503
 
 
+@main_bp.route("/metrics")
+def prometheus_metrics() -> Response:
+    """
+    Prometheus形式のメトリクスを取得
+    ---
+    tags:
+      - health
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: レイテンシヒストグラム・ビジネスメトリクス・キャッシュ統計（Prometheusテキスト形式）
+    """
+    from utils.prometheus import CONTENT_TYPE, render_metrics
+
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
+
+
 @main_bp.route("/")
 def index() -> str:
     """トップページ"""
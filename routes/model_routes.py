@@ -32,7 +32,9 @@ def get_all_available_models():
         if not api_key:
             return _get_fallback_models()
 
-        genai.configure(api_key=api_key)
+        from services.llm_service import gemini_endpoint_options
+
+        genai.configure(api_key=api_key, **gemini_endpoint_options())
         models = genai.list_models()
 
         gemini_models = []
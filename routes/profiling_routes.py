@@ -0,0 +1,98 @@
+"""
+プロファイル管理 API ルート（管理者専用）
+
+オンデマンドのサンプリングプロファイラで採取したプロファイルの一覧・ダウンロードと、
+時間帯（ウィンドウ）指定での一括プロファイリングを提供する。
+X-Profile-Token ヘッダーが PROFILER_ADMIN_TOKEN と一致する場合のみ利用できる。
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+
+from flask import Blueprint, Response, jsonify, request
+
+from utils.profiler import ADMIN_HEADER, get_profiler, to_collapsed, to_speedscope
+
+profiling_bp = Blueprint("profiling", __name__, url_prefix="/api/admin/profiles")
+
+
+def _admin_required(view):
+    """プロファイラが無効なら404、トークン不一致なら403"""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        profiler = get_profiler()
+        if not profiler.enabled:
+            return jsonify({"error": "Not found"}), 404
+        if not profiler.check_token(request.headers.get(ADMIN_HEADER)):
+            return jsonify({"error": "Forbidden"}), 403
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def _window_status() -> dict:
+    remaining = get_profiler().window_remaining()
+    return {"active": remaining > 0, "remaining_seconds": round(remaining, 1)}
+
+
+@profiling_bp.route("", methods=["GET"])
+@_admin_required
+def list_profiles():
+    """最近のプロファイル一覧（新しい順）"""
+    profiler = get_profiler()
+    return jsonify(
+        {
+            "profiles": profiler.store.list(),
+            "window": _window_status(),
+            "sample_rate": profiler.sample_rate,
+            "interval_ms": profiler.interval_ms,
+        }
+    )
+
+
+@profiling_bp.route("/<profile_id>", methods=["GET"])
+@_admin_required
+def download_profile(profile_id: str):
+    """プロファイルをダウンロード（format=collapsed | speedscope）"""
+    output_format = request.args.get("format", "collapsed")
+    if output_format not in ("collapsed", "speedscope"):
+        return jsonify({"error": "format は collapsed または speedscope を指定してください"}), 400
+
+    profile = get_profiler().store.load(profile_id)
+    if profile is None:
+        return jsonify({"error": "プロファイルが見つかりません"}), 404
+
+    if output_format == "speedscope":
+        body = json.dumps(to_speedscope(profile), ensure_ascii=False)
+        mimetype, filename = "application/json", f"{profile.id}.speedscope.json"
+    else:
+        body = to_collapsed(profile.samples)
+        mimetype, filename = "text/plain; charset=utf-8", f"{profile.id}.collapsed.txt"
+    return Response(body, mimetype=mimetype, headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
+@profiling_bp.route("/window", methods=["POST"])
+@_admin_required
+def enable_window():
+    """指定秒数の間、全リクエストをプロファイルする"""
+    data = request.get_json(silent=True) or {}
+    try:
+        seconds = float(data.get("seconds", 60))
+    except (TypeError, ValueError):
+        return jsonify({"error": "seconds は数値で指定してください"}), 400
+    if seconds <= 0:
+        return jsonify({"error": "seconds は正の値で指定してください"}), 400
+
+    get_profiler().enable_window(seconds)
+    return jsonify({"window": _window_status()})
+
+
+@profiling_bp.route("/window", methods=["DELETE"])
+@_admin_required
+def disable_window():
+    """ウィンドウ指定のプロファイリングを解除"""
+    get_profiler().enable_window(0)
+    return jsonify({"window": _window_status()})
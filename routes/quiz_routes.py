@@ -7,7 +7,8 @@ from __future__ import annotations
 from flask import Blueprint, jsonify, request, session
 
 from services.gamification_service import GamificationService
-from services.quiz_service import QuizService
+from services.quiz_pregeneration import get_quiz_pregenerator
+from services.quiz_service import create_llm_quiz_service
 from services.session_service import SessionService
 from services.user_data_service import UserDataService
 
@@ -23,12 +24,25 @@ def _uid() -> str:
     return _session_svc.get_user_id()
 
 
+def _take_pregenerated(conversation_id, turn):
+    """このセッションの観戦で事前生成したクイズを取り出す（他のセッションの会話IDは無視）"""
+    watch_id = (session.get("watch_settings") or {}).get("watch_id")
+    if not conversation_id or conversation_id != watch_id:
+        return None
+    try:
+        return get_quiz_pregenerator().take(watch_id, int(turn))
+    except (TypeError, ValueError):
+        return None
+
+
 @quiz_bp.route("/generate", methods=["POST"])
 def generate():
-    """クイズ生成"""
+    """クイズ生成（観戦中の会話で事前生成済みであればそれを返す）"""
     payload = request.get_json(silent=True) or {}
     ctx = payload.get("context") or []
-    qz = QuizService().generate_quiz(ctx)
+    qz = _take_pregenerated(payload.get("conversation_id"), payload.get("turn"))
+    if qz is None:
+        qz = create_llm_quiz_service().generate_quiz(ctx)
     sess = session.get(_SESSION_KEY) or {"results": []}
     sess["last_quiz"] = qz
     session[_SESSION_KEY] = sess
@@ -53,7 +67,7 @@ def answer():
             ua = int(user_answer)
         except (TypeError, ValueError):
             return jsonify({"error": "user_answer must be int"}), 400
-        svc = QuizService()
+        svc = create_llm_quiz_service()
         result = svc.evaluate_answer(quiz, ua, ctx)
 
         uid = _uid()
@@ -91,6 +105,6 @@ def summary():
     uid = _uid()
     sess = session.get(_SESSION_KEY) or {}
     quizzes = sess.get("results") or []
-    svc = QuizService()
+    svc = create_llm_quiz_service()
     data = svc.get_session_summary(uid, quizzes)
     return jsonify(data)
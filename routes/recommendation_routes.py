@@ -0,0 +1,35 @@
+"""
+シナリオ推薦 API ルート
+"""
+
+from __future__ import annotations
+
+from flask import Blueprint, jsonify, request
+
+from services.session_service import SessionService
+from services.user_data_service import UserDataService
+
+recommendation_bp = Blueprint("recommendation", __name__, url_prefix="/api")
+
+_session_svc = SessionService()
+
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 20
+
+
+@recommendation_bp.route("/recommendations", methods=["GET"])
+def recommendations():
+    """弱点に基づくおすすめシナリオ（?limit= 件数、1〜20）"""
+    try:
+        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if not 1 <= limit <= MAX_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {MAX_LIMIT}"}), 400
+    try:
+        from services.scenario_recommender import get_scenario_recommender
+
+        uid = _session_svc.get_user_id()
+        return jsonify(get_scenario_recommender().recommend(uid, UserDataService(), limit=limit))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
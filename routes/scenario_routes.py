@@ -3,8 +3,9 @@ Scenario routes for the workplace-roleplay application.
 Handles scenario-related API endpoints.
 """
 
+import logging
 from datetime import datetime
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from config.feature_flags import get_feature_flags
 from flask import (
@@ -21,6 +22,9 @@ from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 # サービス層のインポート
 from services.scenario_service import get_scenario_service
 from services.model_selector import resolve_model
+from services.post_response_tasks import SCENARIO_FEEDBACK_POST
+from services.session_service import SessionService
+from services.task_queue import background_tasks_enabled, describe_task, get_task_queue
 
 from config import get_cached_config
 from errors import (
@@ -29,6 +33,8 @@ from errors import (
     with_error_handling,
 )
 
+logger = logging.getLogger(__name__)
+
 # セキュリティ関連のインポート
 try:
     from utils.security import SecurityUtils
@@ -65,6 +71,7 @@ from utils.helpers import (
     initialize_session_history,
     set_session_start_time,
 )
+from utils.streaming import sse_response, stream_llm_reply
 
 # Blueprint作成
 scenario_bp = Blueprint("scenario", __name__)
@@ -219,6 +226,91 @@ def harassment_consent():
 # ========== APIルート ==========
 
 
+def _prepare_scenario_turn(data: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[Response, int]]]:
+    """
+    /api/scenario_chat 系リクエストを検証し、セッション履歴を初期化する
+
+    Args:
+        data: リクエストJSON
+
+    Returns:
+        Tuple: (ターン情報, エラーレスポンス) のいずれか一方がNone
+            ターン情報は user_message / scenario_id / selected_model / scenario_data / is_reverse_role を持つ
+    """
+    # 入力値のサニタイズ
+    user_message = SecurityUtils.sanitize_input(data.get("message", ""))
+    scenario_id = data.get("scenario_id", "")
+    selected_model = resolve_model("scenario", data.get("model"))
+
+    # 入力検証
+    if not SecurityUtils.validate_scenario_id(scenario_id):
+        return None, (jsonify({"error": "無効なシナリオIDです"}), 400)
+    if not SecurityUtils.validate_model_name(selected_model):
+        return None, (jsonify({"error": "無効なモデル名です"}), 400)
+
+    # シナリオロードエラー時の対応
+    if not scenarios:
+        return None, (jsonify({"error": "シナリオデータが利用できません。"}), 503)
+
+    scenario_data = scenario_service.get_scenario_by_id(scenario_id)
+    if not scenario_data:
+        return None, (jsonify({"error": "無効なシナリオIDです"}), 400)
+
+    # リバースロール（上司役）の場合の処理
+    is_reverse_role = scenario_data.get("role_type") == "reverse"
+
+    # セッション初期化
+    initialize_session_history("scenario_history", scenario_id)
+
+    # 初回メッセージの場合はセッション開始時間を記録
+    if len(session["scenario_history"].get(scenario_id, [])) == 0:
+        set_session_start_time("scenario", scenario_id)
+
+    turn = {
+        "user_message": user_message,
+        "scenario_id": scenario_id,
+        "selected_model": selected_model,
+        "scenario_data": scenario_data,
+        "is_reverse_role": is_reverse_role,
+    }
+    return turn, None
+
+
+def _build_scenario_messages(
+    scenario_id: str, scenario_data: Dict[str, Any], is_reverse_role: bool, user_message: str
+) -> Tuple[List[BaseMessage], Optional[str]]:
+    """
+    シナリオ会話のメッセージリストを構築する
+
+    リバースロールの開始時（ユーザー発言なし）はLLMを呼ばずに初期メッセージをそのまま返す。
+
+    Returns:
+        Tuple[List[BaseMessage], Optional[str]]: (メッセージリスト, LLMを介さない即時応答)
+    """
+    # システムプロンプトを構築（サービス層を使用）
+    system_prompt = scenario_service.build_system_prompt(scenario_data, is_reverse_role)
+
+    messages: List[BaseMessage] = []
+    messages.append(SystemMessage(content=system_prompt))
+    add_messages_from_history(messages, session["scenario_history"][scenario_id])
+
+    if len(session["scenario_history"][scenario_id]) == 0:
+        # 初期メッセージの取得（サービス層を使用）
+        initial_message = scenario_service.get_initial_message(scenario_data, is_reverse_role)
+
+        if is_reverse_role:
+            if not user_message and initial_message:
+                return messages, initial_message
+            messages.append(HumanMessage(content=user_message))
+        else:
+            if initial_message:
+                messages.append(HumanMessage(content=initial_message))
+    else:
+        messages.append(HumanMessage(content=user_message))
+
+    return messages, None
+
+
 @scenario_bp.route("/api/scenario_chat", methods=["POST"])
 def scenario_chat() -> Response:
     """ロールプレイモード専用のチャットAPI"""
@@ -227,37 +319,15 @@ def scenario_chat() -> Response:
         if data is None:
             return jsonify({"error": "Invalid JSON"}), 400
 
-        # 入力値のサニタイズ
-        user_message = SecurityUtils.sanitize_input(data.get("message", ""))
-        scenario_id = data.get("scenario_id", "")
-        selected_model = resolve_model("scenario", data.get("model"))
+        turn, error_response = _prepare_scenario_turn(data)
+        if error_response is not None:
+            return error_response
 
-        # 入力検証
-        if not SecurityUtils.validate_scenario_id(scenario_id):
-            return jsonify({"error": "無効なシナリオIDです"}), 400
-        if not SecurityUtils.validate_model_name(selected_model):
-            return jsonify({"error": "無効なモデル名です"}), 400
-
-        # シナリオロードエラー時の対応
-        if not scenarios:
-            return jsonify({"error": "シナリオデータが利用できません。"}), 503
-
-        scenario_data = scenario_service.get_scenario_by_id(scenario_id)
-        if not scenario_data:
-            return jsonify({"error": "無効なシナリオIDです"}), 400
-
-        # リバースロール（上司役）の場合の処理
-        is_reverse_role = scenario_data.get("role_type") == "reverse"
-
-        # セッション初期化
-        initialize_session_history("scenario_history", scenario_id)
-
-        # 初回メッセージの場合はセッション開始時間を記録
-        if len(session["scenario_history"].get(scenario_id, [])) == 0:
-            set_session_start_time("scenario", scenario_id)
-
-        # システムプロンプトを構築（サービス層を使用）
-        system_prompt = scenario_service.build_system_prompt(scenario_data, is_reverse_role)
+        user_message = turn["user_message"]
+        scenario_id = turn["scenario_id"]
+        selected_model = turn["selected_model"]
+        scenario_data = turn["scenario_data"]
+        is_reverse_role = turn["is_reverse_role"]
 
         response = ""
 
@@ -265,29 +335,14 @@ def scenario_chat() -> Response:
             from app import extract_content, initialize_llm
             from errors import handle_llm_specific_error
 
-            messages: List[BaseMessage] = []
-            messages.append(SystemMessage(content=system_prompt))
-            add_messages_from_history(messages, session["scenario_history"][scenario_id])
-
-            if len(session["scenario_history"][scenario_id]) == 0:
-                # 初期メッセージの取得（サービス層を使用）
-                initial_message = scenario_service.get_initial_message(scenario_data, is_reverse_role)
-
-                if is_reverse_role:
-                    if not user_message and initial_message:
-                        add_to_session_history(
-                            "scenario_history",
-                            {"human": "[シナリオ開始]", "ai": initial_message},
-                            scenario_id,
-                        )
-                        return jsonify({"response": SecurityUtils.escape_html(initial_message)})
-                    else:
-                        messages.append(HumanMessage(content=user_message))
-                else:
-                    if initial_message:
-                        messages.append(HumanMessage(content=initial_message))
-            else:
-                messages.append(HumanMessage(content=user_message))
+            messages, initial_reply = _build_scenario_messages(scenario_id, scenario_data, is_reverse_role, user_message)
+            if initial_reply is not None:
+                add_to_session_history(
+                    "scenario_history",
+                    {"human": "[シナリオ開始]", "ai": initial_reply},
+                    scenario_id,
+                )
+                return jsonify({"response": SecurityUtils.escape_html(initial_reply)})
 
             llm = initialize_llm(selected_model)
             llm_response = llm.invoke(messages)
@@ -315,6 +370,77 @@ def scenario_chat() -> Response:
         return jsonify({"error": f"会話処理中にエラーが発生しました: {error_msg}"}), 500
 
 
+@scenario_bp.route("/api/scenario_chat/stream", methods=["POST"])
+def scenario_chat_stream() -> Response:
+    """ロールプレイモード専用のチャットAPI（SSEストリーミング版）
+
+    トークンを生成順に配信し、完了後にシナリオ履歴へ保存する。
+    ストリーミング非対応のクライアントは従来の /api/scenario_chat を使用する。
+    """
+    try:
+        data = request.json
+        if data is None:
+            return jsonify({"error": "Invalid JSON"}), 400
+
+        turn, error_response = _prepare_scenario_turn(data)
+        if error_response is not None:
+            return error_response
+
+        user_message = turn["user_message"]
+        scenario_id = turn["scenario_id"]
+        human_entry = user_message if user_message else "[シナリオ開始]"
+
+        messages, initial_reply = _build_scenario_messages(
+            scenario_id, turn["scenario_data"], turn["is_reverse_role"], user_message
+        )
+
+        def on_complete(ai_message: str) -> None:
+            add_to_session_history("scenario_history", {"human": human_entry, "ai": ai_message}, scenario_id)
+
+        def on_error(e: Exception) -> str:
+            from errors import handle_llm_specific_error
+
+            app_error = handle_llm_specific_error(e, "Gemini")
+            print(f"Error in chat stream: {app_error.message}")
+            # JSON版と同様にエラー応答も履歴に残す
+            on_complete(f"申し訳ありません。{app_error.message}")
+            return app_error.message
+
+        if initial_reply is not None:
+            # LLMを介さない即時応答は1チャンクで配信
+            return sse_response(
+                stream_llm_reply(
+                    _StaticReply(initial_reply),
+                    messages,
+                    on_complete,
+                    on_error,
+                    endpoint="/api/scenario_chat/stream",
+                )
+            )
+
+        from app import initialize_llm
+
+        llm = initialize_llm(turn["selected_model"])
+        return sse_response(
+            stream_llm_reply(llm, messages, on_complete, on_error, endpoint="/api/scenario_chat/stream")
+        )
+
+    except Exception as e:
+        print(f"Conversation stream error: {str(e)}")
+        error_msg = SecurityUtils.get_safe_error_message(e)
+        return jsonify({"error": f"会話処理中にエラーが発生しました: {error_msg}"}), 500
+
+
+class _StaticReply:
+    """固定文をストリーミングLLMとして扱うためのアダプタ"""
+
+    def __init__(self, text: str):
+        self._text = text
+
+    def stream(self, messages: List[BaseMessage]):
+        yield self._text
+
+
 @scenario_bp.route("/api/scenario_clear", methods=["POST"])
 def clear_scenario_history():
     """特定のシナリオの履歴をクリアする"""
@@ -385,6 +511,30 @@ def get_scenario_feedback() -> Response:
                     "model_used": used_model,
                 }
 
+                hist_len = len(history)
+                sess_id = f"{scenario_id}_{session.get('user_id', 'anon')}_{hist_len}"
+
+                if background_tasks_enabled():
+                    # 強み分析・ゲーミフィケーション・会話保存はレスポンス返却後に実行
+                    try:
+                        user_id = SessionService().get_user_id()
+                        task_id = get_task_queue().enqueue(
+                            SCENARIO_FEEDBACK_POST,
+                            {
+                                "user_id": user_id,
+                                "scenario_id": scenario_id,
+                                "scenario_data": scenario_data,
+                                "session_id": sess_id,
+                                "history": list(history),
+                            },
+                            owner=user_id,
+                        )
+                        response_data["post_processing"] = describe_task(task_id)
+                        return jsonify(response_data)
+                    except Exception as e:
+                        # 登録できなければこの場で実行する（強み分析・XP・バッジ・会話保存を失わない）
+                        logger.warning(f"Failed to enqueue scenario feedback post-processing, running inline: {e}")
+
                 # 強み分析を追加（サービス層を使用）
                 from services.strength_service import get_strength_service
 
@@ -397,8 +547,6 @@ def get_scenario_feedback() -> Response:
                     from services.gamification_hooks import on_scenario_feedback
 
                     strength_scores = (response_data.get("strength_analysis") or {}).get("scores") or {}
-                    hist_len = len(session.get("scenario_history", {}).get(scenario_id, []))
-                    sess_id = f"{scenario_id}_{session.get('user_id', 'anon')}_{hist_len}"
                     gamification_result = on_scenario_feedback(
                         strength_scores, scenario_id, scenario_data, session_id=sess_id,
                     )
@@ -46,6 +46,9 @@ def session_health_check():
                         "fallback_active": health["fallback_active"],
                         "connection_info": connection_info,
                         "error": health.get("error"),
+                        "pool": health.get("pool"),
+                        "reconnect_attempts": health.get("reconnect_attempts", 0),
+                        "fallback": health.get("fallback"),
                     },
                 }
             )
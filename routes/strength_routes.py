@@ -142,7 +142,7 @@ def analyze_strengths():
                 "scores": scores,
                 "messages": messages,
                 "history": session["strength_history"][session_type],
-                "model_used": "simple_analyzer",
+                "model_used": "local_scorer",
             }
         )
 
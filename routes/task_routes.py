@@ -0,0 +1,45 @@
+"""
+バックグラウンドタスク結果 API ルート
+
+フィードバック後処理（ゲーミフィケーション等）やリアルタイムフィードバックの
+実行状態と結果をポーリングで取得する。
+"""
+
+from __future__ import annotations
+
+from flask import Blueprint, jsonify, request
+
+from services.session_service import SessionService
+from services.task_queue import get_task_queue
+
+task_bp = Blueprint("tasks", __name__, url_prefix="/api/tasks")
+
+_session_svc = SessionService()
+
+# クライアントに返すタスク情報のフィールド（ペイロードは返さない）
+_PUBLIC_FIELDS = ("id", "name", "status", "attempts", "result", "error", "created_at", "updated_at")
+
+
+def _user_id() -> str:
+    return _session_svc.get_user_id()
+
+
+def _public_view(task: dict) -> dict:
+    return {key: task.get(key) for key in _PUBLIC_FIELDS}
+
+
+@task_bp.route("/<task_id>", methods=["GET"])
+def get_task(task_id: str):
+    """タスクの状態と結果を取得（他ユーザーのタスクは404）"""
+    task = get_task_queue().get_task(task_id)
+    if task is None or task.get("owner") != _user_id():
+        return jsonify({"error": "タスクが見つかりません"}), 404
+    return jsonify(_public_view(task))
+
+
+@task_bp.route("", methods=["GET"])
+def list_tasks():
+    """現在のユーザーの最近のタスク一覧"""
+    limit = request.args.get("limit", 20, type=int)
+    tasks = get_task_queue().list_tasks(_user_id(), limit=limit)
+    return jsonify({"tasks": [_public_view(t) for t in tasks]})
@@ -4,11 +4,19 @@
 
 from __future__ import annotations
 
-from flask import Blueprint, jsonify, request, session
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+from flask import Blueprint, Response, jsonify, request, session
 
 from services.session_service import SessionService
 from utils.security import SecurityUtils
 
+logger = logging.getLogger(__name__)
+
 three_way_bp = Blueprint("three_way", __name__, url_prefix="/api/three-way")
 
 _session_svc = SessionService()
@@ -18,20 +26,55 @@ def _user_id() -> str:
     return _session_svc.get_user_id()
 
 
+def _check_joined(svc, uid: str) -> Optional[tuple]:
+    """参加中でなければエラーレスポンスを返す（参加中なら None。無操作の期限を延長する）"""
+    if not session.get("three_way_active"):
+        return jsonify({"error": "3者会話に参加していません"}), 400
+    if not svc.is_joined(uid):
+        # 無操作で参加セッションが期限切れになった
+        session["three_way_active"] = False
+        session.modified = True
+        return jsonify({"error": "3者会話の参加が期限切れです。再度参加してください"}), 400
+    return None
+
+
+def _history_with_replies(svc, uid: str) -> list:
+    """前回ストリーミングで返した AI の応答を会話履歴に反映して返す"""
+    history = list(session.get("watch_history") or [])
+    replies = svc.pop_replies(uid)
+    if replies:
+        history.extend(replies)
+        session["watch_history"] = history
+        session.modified = True
+    return history
+
+
+def _sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
 @three_way_bp.route("/join", methods=["POST"])
 def join():
     """観戦モードから3者会話に参加"""
     try:
-        from services.three_way_service import ThreeWayConversationService
+        from services.three_way_service import ThreeWayConversationService, get_three_way_service
 
         uid = _user_id()
         history = session.get("watch_history") or []
-        svc = ThreeWayConversationService()
+        svc = get_three_way_service()
         result = svc.join_conversation(uid, history)
         if result.get("joined"):
             session["three_way_turn_order"] = result["turn_order"]
             session["three_way_active"] = True
             session.modified = True
+        elif result.get("error") == ThreeWayConversationService.ERR_ALREADY_JOINED and session.get(
+            "three_way_active"
+        ):
+            # ページの再読み込み等で同じセッションから再参加した場合は参加中のまま続ける
+            svc.is_joined(uid)
+            result = {"joined": True, "turn_order": session.get("three_way_turn_order") or svc.DEFAULT_TURN_ORDER}
+        elif result.get("error") == ThreeWayConversationService.ERR_TOO_MANY_SESSIONS:
+            return jsonify(result), 503
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -41,10 +84,13 @@ def join():
 def send_message():
     """ユーザー発言を追加"""
     try:
-        from services.three_way_service import ThreeWayConversationService
+        from services.three_way_service import get_three_way_service
 
-        if not session.get("three_way_active"):
-            return jsonify({"error": "3者会話に参加していません"}), 400
+        svc = get_three_way_service()
+        uid = _user_id()
+        error = _check_joined(svc, uid)
+        if error is not None:
+            return error
         payload = request.get_json(silent=True) or {}
         message = payload.get("message", "")
         if not message.strip():
@@ -53,9 +99,8 @@ def send_message():
         ok, msg_err = SecurityUtils.validate_message(message)
         if not ok:
             return jsonify({"error": msg_err or "無効なメッセージです"}), 400
-        history = session.get("watch_history") or []
+        history = _history_with_replies(svc, uid)
         turn_order = session.get("three_way_turn_order") or ["A", "B", "user"]
-        svc = ThreeWayConversationService()
         result = svc.add_user_message(history, message, turn_order)
         session["watch_history"] = result["updated_history"]
         session.modified = True
@@ -64,15 +109,79 @@ def send_message():
         return jsonify({"error": str(e)}), 500
 
 
+@three_way_bp.route("/respond", methods=["POST"])
+def respond():
+    """
+    ユーザー発言に続く AI（A・B）の応答を生成し、完成した順に SSE で送る
+
+    B の応答は可能なら A と並列に生成する（services.three_way_generation）。
+    応答は参加セッションに保存し、次の /message・/respond で会話履歴に反映する。
+    """
+    try:
+        from app import initialize_llm
+        from services.llm_instrumentation import llm_call_context
+        from services.model_selector import resolve_model
+        from services.three_way_generation import SPEAKER_NAMES, get_three_way_engine, reply_speakers
+        from services.three_way_service import get_three_way_service
+
+        svc = get_three_way_service()
+        uid = _user_id()
+        error = _check_joined(svc, uid)
+        if error is not None:
+            return error
+        history = _history_with_replies(svc, uid)
+        speakers = reply_speakers(session.get("three_way_turn_order") or svc.DEFAULT_TURN_ORDER)
+        settings = session.get("watch_settings") or {}
+        models = {
+            "A": resolve_model("watch", settings.get("model_a")),
+            "B": resolve_model("watch", settings.get("model_b")),
+        }
+
+        engine = get_three_way_engine()
+        if not engine.acquire(uid):
+            return jsonify({"error": "応答を生成中です。完了してから再度お試しください"}), 429
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    queued_at = time.time()
+
+    def generate_reply(speaker: str, snapshot: list) -> str:
+        with llm_call_context(mode="watch", queued_at=queued_at):
+            return svc.generate_reply(initialize_llm(models[speaker]), snapshot, speaker)
+
+    def stream():
+        replies = []
+        try:
+            for reply in engine.generate(history, speakers, generate_reply):
+                replies.append(dict(reply, timestamp=datetime.now().isoformat()))
+                name = SPEAKER_NAMES.get(reply["speaker"], reply["speaker"])
+                yield _sse({"speaker": reply["speaker"], "message": f"{name}: {reply['message']}"})
+            yield _sse({"done": True})
+        except Exception as e:
+            logger.error(f"3者会話の応答生成に失敗: {e}", exc_info=True)
+            yield _sse({"error": "応答の生成に失敗しました"})
+        finally:
+            if replies:
+                svc.save_replies(uid, replies)
+
+    response = Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # 送信前にクライアントが切断した場合も含め、レスポンスを閉じた時点で生成枠を返す
+    response.call_on_close(lambda: engine.release(uid))
+    return response
+
+
 @three_way_bp.route("/leave", methods=["POST"])
 def leave():
     """3者会話を退出して観戦モードに戻る"""
     try:
-        from services.three_way_service import ThreeWayConversationService
+        from services.three_way_service import get_three_way_service
 
         uid = _user_id()
-        svc = ThreeWayConversationService()
-        result = svc.leave_conversation(uid)
+        result = get_three_way_service().leave_conversation(uid)
         session.pop("three_way_turn_order", None)
         session["three_way_active"] = False
         session.modified = True
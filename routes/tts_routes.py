@@ -1,11 +1,17 @@
 """
 TTS (Text-to-Speech) routes for the workplace-roleplay application.
-NOTE: TTS functionality is currently disabled due to high costs.
+NOTE: TTS functionality is disabled unless ENABLE_TTS and TTS_ENGINE are set
+(services.tts_pipeline: sentence streaming, audio cache and daily character budget).
 """
 
+import base64
+import json
+from typing import FrozenSet, Optional
+
 from config.feature_flags import require_feature
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, session
 
+from config import get_cached_config
 from errors import with_error_handling
 
 # Blueprint作成
@@ -21,6 +27,23 @@ def get_voice_for_emotion(emotion: str) -> str:
     return tts_service.get_voice_for_emotion(emotion)
 
 
+def _allowed(spec: str) -> FrozenSet[str]:
+    """カンマ区切りの設定値（TTS_VOICES 等）を集合にする"""
+    return frozenset(item.strip().lower() for item in (spec or "").split(",") if item.strip())
+
+
+def _invalid_option(voice: object, style: object, lang: object) -> Optional[str]:
+    """音声・スタイル・言語が設定で許可されたものでなければエラーメッセージを返す"""
+    config = get_cached_config()
+    if not isinstance(voice, str) or voice.lower() not in _allowed(config.TTS_VOICES):
+        return "対応していない音声です"
+    if style is not None and (not isinstance(style, str) or style.lower() not in _allowed(config.TTS_STYLES)):
+        return "対応していないスタイルです"
+    if not isinstance(lang, str) or lang.lower() not in _allowed(config.TTS_LANGUAGES):
+        return "対応していない言語です"
+    return None
+
+
 @tts_bp.route("/api/tts", methods=["POST", "HEAD"])
 @require_feature("tts")
 @with_error_handling
@@ -28,16 +51,61 @@ def text_to_speech():
     """
     テキストを音声に変換するAPI
 
-    NOTE: TTS機能は高額請求により現在停止中
+    NOTE: 合成エンジン（TTS_ENGINE）未設定の場合は停止中（503）
 
     HEADリクエスト: フロントエンドでの軽量状態チェック用
-    POSTリクエスト: 実際のTTS生成（現在は停止中）
+    POSTリクエスト: 文単位に合成し、1文ごとに NDJSON の1行で返す（最初の文から再生できる）
+        {"index", "text", "key", "format", "cached", "audio"(base64)}
+        途中で1日の上限に達した場合は {"error", "budget_exceeded": true} の行で終わる
+        voice / style / lang は TTS_VOICES / TTS_STYLES / TTS_LANGUAGES にあるもののみ（それ以外は400）
+        合成文字数は全体の上限に加えてユーザー（セッション）ごとの上限で数える
     """
     # HEADリクエストの場合は軽量レスポンス
     if request.method == "HEAD":
         return "", 200
 
-    # POSTリクエストの場合は詳細なエラー情報を返す
+    from services.tts_pipeline import TTSBudgetExceededError, get_tts_pipeline
+
+    pipeline = get_tts_pipeline()
+    if pipeline is not None:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Invalid JSON"}), 400
+        text = data.get("text") or ""
+        if not isinstance(text, str) or not text.strip():
+            return jsonify({"error": "テキストが必要です"}), 400
+        text = text.strip()
+        if len(text) > get_cached_config().TTS_MAX_TEXT_CHARS:
+            return jsonify({"error": "テキストが長すぎます"}), 400
+        emotion = data.get("emotion")
+        voice = data.get("voice") or get_voice_for_emotion(emotion if isinstance(emotion, str) else "")
+        style = data.get("style") or None
+        lang = data.get("lang") or "ja"
+        error = _invalid_option(voice, style, lang)
+        if error:
+            return jsonify({"error": error}), 400
+        user_key = session.get("user_id") or request.remote_addr
+        segments = pipeline.stream(text, voice.lower(), style and style.lower(), lang.lower(), user_key=user_key)
+
+        # 最初の文は先に合成し、上限に達していれば 429 を返す
+        try:
+            first = next(segments)
+        except TTSBudgetExceededError as e:
+            return jsonify({"error": str(e), "budget_exceeded": True, "fallback_available": True}), 429
+        except StopIteration:
+            return jsonify({"error": "テキストが必要です"}), 400
+
+        def generate():
+            yield _segment_line(first)
+            try:
+                for segment in segments:
+                    yield _segment_line(segment)
+            except TTSBudgetExceededError as e:
+                yield json.dumps({"error": str(e), "budget_exceeded": True}, ensure_ascii=False) + "\n"
+
+        return Response(generate(), mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+    # 合成エンジン未設定の場合は詳細なエラー情報を返す
     return (
         jsonify(
             {
@@ -56,6 +124,33 @@ def text_to_speech():
     )
 
 
+def _segment_line(segment: dict) -> str:
+    payload = {key: segment[key] for key in ("index", "text", "key", "format", "cached")}
+    payload["audio"] = base64.b64encode(segment["audio"]).decode("ascii")
+    return json.dumps(payload, ensure_ascii=False) + "\n"
+
+
+@tts_bp.route("/api/tts/audio/<key>", methods=["GET"])
+@require_feature("tts")
+def get_cached_audio(key: str):
+    """
+    合成済みの音声をキー（POST /api/tts の key）で取得
+
+    内容アドレスのため同じキーの音声は変わらない。ブラウザに長期間キャッシュさせる。
+    """
+    from services.tts_pipeline import get_tts_pipeline
+
+    pipeline = get_tts_pipeline()
+    audio = pipeline.cached_audio(key) if pipeline is not None else None
+    if audio is None:
+        return jsonify({"error": "音声が見つかりません"}), 404
+    return Response(
+        audio,
+        mimetype=f"audio/{pipeline.engine.audio_format}",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+
 @tts_bp.route("/api/tts/voices", methods=["GET"])
 def get_available_voices():
     """
@@ -3,8 +3,10 @@ Watch mode routes for the workplace-roleplay application.
 Handles AI conversation observation functionality.
 """
 
+import time
+import uuid
 from datetime import datetime
-from typing import Any
+from typing import Any, Dict, List, Optional
 
 from config.feature_flags import get_feature_flags
 from flask import Blueprint, jsonify, render_template, request, session
@@ -33,7 +35,10 @@ except ImportError:
 
 # サービス層のインポート
 from services.watch_service import get_watch_service
-from services.quiz_service import QuizService
+from services.watch_prefetch import get_watch_prefetcher
+from services.llm_instrumentation import llm_call_context
+from services.quiz_pregeneration import get_quiz_pregenerator
+from services.quiz_service import QuizService, create_llm_quiz_service
 from services.model_selector import resolve_model
 
 from utils.helpers import (
@@ -58,8 +63,58 @@ def _watch_history_to_quiz_context(history: list) -> list:
 
 
 def get_watch_quiz_service() -> QuizService:
-    """観戦モード用 QuizService（単体テストで差し替え可能）"""
-    return QuizService()
+    """観戦モード用 QuizService（LLMで生成、単体テストで差し替え可能）"""
+    return create_llm_quiz_service()
+
+
+def _prefetch_fingerprint(history: List[Dict[str, Any]], speaker: str) -> tuple:
+    """先読み結果が有効かを判定するための前提（履歴の長さ・最後の発言・次の話者）"""
+    last_message = history[-1].get("message", "") if history else ""
+    return (len(history), last_message, speaker)
+
+
+def _schedule_next_prefetch(settings: Dict[str, Any], history: List[Dict[str, Any]]) -> None:
+    """ターンを返した直後に、その次のターンの生成をバックグラウンドで開始する"""
+    prefetcher = get_watch_prefetcher()
+    watch_id = settings.get("watch_id")
+    if not prefetcher.enabled or not watch_id:
+        return
+
+    from app import initialize_llm
+
+    watch_service = get_watch_service()
+    speaker = watch_service.switch_speaker(settings["current_speaker"])
+    model = settings["model_b"] if speaker == "B" else settings["model_a"]
+    snapshot = [dict(entry) for entry in history]
+    queued_at = time.time()
+
+    def generate() -> str:
+        with llm_call_context(mode="watch", queued_at=queued_at):
+            return watch_service.generate_next_message(initialize_llm(model), snapshot)
+
+    prefetcher.schedule(watch_id, _prefetch_fingerprint(snapshot, speaker), generate)
+
+
+def _schedule_quiz_pregeneration(
+    quiz_svc: QuizService, settings: Dict[str, Any], history: List[Dict[str, Any]]
+) -> None:
+    """クイズを出すターンの手前で、その時点の会話からクイズの生成をバックグラウンドで開始する"""
+    pregenerator = get_quiz_pregenerator()
+    watch_id = settings.get("watch_id")
+    if not pregenerator.enabled or not watch_id or not quiz_svc.has_llm:
+        return
+    turn = pregenerator.target_turn(quiz_svc.should_generate_quiz, len(history))
+    if turn is None:
+        return
+
+    ctx = _watch_history_to_quiz_context(history)
+    queued_at = time.time()
+
+    def generate() -> Optional[dict]:
+        with llm_call_context(mode="watch", queued_at=queued_at):
+            return quiz_svc.generate_quiz(ctx, fallback=False)
+
+    pregenerator.schedule(watch_id, turn, generate)
 
 
 # サービス層を使用するため、関数を削除（watch_serviceに移動済み）
@@ -93,9 +148,15 @@ def start_watch():
         situation = SecurityUtils.sanitize_input(data.get("situation", ""))
         topic = SecurityUtils.sanitize_input(data.get("topic", ""))
 
+        # 話題が変わるため、前回の観戦の先読みを破棄
+        previous_watch_id = (session.get("watch_settings") or {}).get("watch_id")
+        get_watch_prefetcher().cancel(previous_watch_id)
+        get_quiz_pregenerator().cancel(previous_watch_id)
+
         # セッションの初期化
         clear_session_history("watch_history")
         session["watch_settings"] = {
+            "watch_id": uuid.uuid4().hex,
             "model_a": model_a,
             "model_b": model_b,
             "partner_type": partner_type,
@@ -121,6 +182,8 @@ def start_watch():
                 }
             ]
 
+            _schedule_next_prefetch(session["watch_settings"], session["watch_history"])
+
             return jsonify({"message": f"太郎: {initial_message}"})
 
         except Exception as e:
@@ -157,8 +220,14 @@ def next_watch_message() -> Any:
             from errors import handle_llm_specific_error
 
             try:
-                llm = initialize_llm(model)
-                next_message = watch_service.generate_next_message(llm, history)
+                # 先読み済みであればそれを使い、なければその場で生成
+                next_message = get_watch_prefetcher().take(
+                    settings.get("watch_id"), _prefetch_fingerprint(history, next_speaker)
+                )
+                if next_message is None:
+                    llm = initialize_llm(model)
+                    with llm_call_context(mode="watch"):
+                        next_message = watch_service.generate_next_message(llm, history)
             except Exception as e:
                 app_error = handle_llm_specific_error(e, model)
                 return jsonify({"error": app_error.message}), app_error.status_code
@@ -174,12 +243,20 @@ def next_watch_message() -> Any:
             settings["current_speaker"] = next_speaker
             session.modified = True
 
+            _schedule_next_prefetch(settings, history)
+
             message_count = len(history)
             payload: dict = {"message": f"{display_name}: {next_message}"}
             quiz_svc = get_watch_quiz_service()
             if quiz_svc.should_generate_quiz(message_count):
-                ctx = _watch_history_to_quiz_context(history)
-                payload["quiz"] = quiz_svc.generate_quiz(ctx)
+                # 事前生成済みであればそれを使い、なければその場で生成
+                quiz = None
+                if quiz_svc.has_llm:
+                    quiz = get_quiz_pregenerator().take(settings.get("watch_id"), message_count)
+                if quiz is None:
+                    quiz = quiz_svc.generate_quiz(_watch_history_to_quiz_context(history))
+                payload["quiz"] = quiz
+            _schedule_quiz_pregeneration(quiz_svc, settings, history)
 
             return jsonify(payload)
 
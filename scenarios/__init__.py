@@ -5,7 +5,47 @@
 import os
 import yaml
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
+
+# シナリオYAMLの格納ディレクトリ
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def get_data_signature() -> Tuple[Tuple[str, float, int], ...]:
+    """
+    シナリオYAMLファイルの (ファイル名, 更新時刻, サイズ) の一覧を取得する（変更検知用）
+    """
+    signature = []
+    for filename in sorted(os.listdir(DATA_DIR)):
+        if filename.endswith(".yaml") or filename.endswith(".yml"):
+            stat = os.stat(os.path.join(DATA_DIR, filename))
+            signature.append((filename, stat.st_mtime, stat.st_size))
+    return tuple(signature)
+
+
+# LibYAML があれば C実装のローダーを使う（純Python実装より大幅に速い）
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# 解析済みYAMLのキャッシュ: パス → ((更新時刻, サイズ), データ)
+# 変更のないファイルは再解析しない。返すシナリオ辞書は呼び出し元間で共有されるため読み取り専用として扱う
+_parsed_cache: Dict[str, Tuple[Tuple[float, int], Any]] = {}
+
+
+def _read_yaml(path: str) -> Any:
+    """YAMLファイルを読み込む（更新時刻・サイズが同じなら解析済みの結果を返す）"""
+    try:
+        stat = os.stat(path)
+        key: Optional[Tuple[float, int]] = (stat.st_mtime, stat.st_size)
+    except OSError:
+        key = None
+    cached = _parsed_cache.get(path)
+    if key is not None and cached is not None and cached[0] == key:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.load(f, Loader=_YAML_LOADER)
+    if key is not None:
+        _parsed_cache[path] = (key, data)
+    return data
 
 
 def load_scenarios() -> Dict[str, Any]:
@@ -13,23 +53,22 @@ def load_scenarios() -> Dict[str, Any]:
     scenarios/dataディレクトリ内の全シナリオYAMLファイルをロードする
     """
     scenarios = {}
-    data_dir = os.path.join(os.path.dirname(__file__), "data")
+    data_dir = DATA_DIR
 
     # YAMLファイルを探してロード
     for filename in os.listdir(data_dir):
         if filename.endswith(".yaml") or filename.endswith(".yml"):
             scenario_id = filename.rsplit(".", 1)[0]  # 拡張子を除去
             try:
-                with open(os.path.join(data_dir, filename), "r", encoding="utf-8") as f:
-                    data = yaml.safe_load(f)
-                    # リスト形式のYAMLに対応
-                    if isinstance(data, dict) and "scenarios" in data:
-                        # 各シナリオを個別に登録
-                        for scenario in data["scenarios"]:
-                            if "id" in scenario:
-                                scenarios[scenario["id"]] = scenario
-                    else:
-                        scenarios[scenario_id] = data
+                data = _read_yaml(os.path.join(data_dir, filename))
+                # リスト形式のYAMLに対応
+                if isinstance(data, dict) and "scenarios" in data:
+                    # 各シナリオを個別に登録
+                    for scenario in data["scenarios"]:
+                        if "id" in scenario:
+                            scenarios[scenario["id"]] = scenario
+                else:
+                    scenarios[scenario_id] = data
             except Exception as e:
                 print(f"Error loading scenario {filename}: {e}")
 
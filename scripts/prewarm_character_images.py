@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+キャラクター画像の事前生成スクリプト
+
+全シナリオ×感情のうち未生成の画像を Gemini で生成し、ImageStore（IMAGE_STORE_DIR）に登録します。
+登録済みの画像は /api/generate_character_image が生成せずに返します。
+中断しても同じコマンドで続きから再開できます（進捗はチェックポイントに記録）。
+
+使い方:
+    python scripts/prewarm_character_images.py [--workers 2] [--scenario ID ...] [--emotion NAME ...] [--dry-run]
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compliant_api_manager import get_compliant_api_manager
+from config import get_cached_config
+from scenarios import get_all_scenarios
+from services.image_prewarm import PREWARM_EMOTIONS, ImagePrewarmer
+from services.image_store import get_image_store
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="キャラクター画像を事前生成します")
+    parser.add_argument("--workers", type=int, default=2, help="同時に生成する数（デフォルト: 2）")
+    parser.add_argument("--scenario", action="append", help="対象のシナリオID（複数指定可。省略時は全シナリオ）")
+    parser.add_argument("--emotion", action="append", choices=PREWARM_EMOTIONS, help="対象の感情（省略時は全感情）")
+    parser.add_argument("--checkpoint", help="チェックポイントのパス（デフォルト: IMAGE_STORE_DIR/prewarm_checkpoint.json）")
+    parser.add_argument("--max-attempts", type=int, default=3, help="失敗した組み合わせを再試行する回数")
+    parser.add_argument("--dry-run", action="store_true", help="生成せずに対象の件数だけ表示")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """メイン処理"""
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    scenarios = get_all_scenarios()
+    if args.scenario:
+        unknown = sorted(set(args.scenario) - set(scenarios))
+        if unknown:
+            print(f"存在しないシナリオID: {', '.join(unknown)}")
+            return 2
+        scenarios = {sid: scenarios[sid] for sid in args.scenario}
+    emotions = args.emotion or list(PREWARM_EMOTIONS)
+
+    store = get_image_store()
+    checkpoint = args.checkpoint or os.path.join(get_cached_config().IMAGE_STORE_DIR, "prewarm_checkpoint.json")
+
+    try:
+        api_manager = get_compliant_api_manager()
+    except ValueError as e:
+        print(f"APIキーを取得できません: {e}")
+        return 2
+
+    prewarmer = ImagePrewarmer(
+        store,
+        api_manager,
+        max_workers=args.workers,
+        checkpoint_path=checkpoint,
+        max_attempts=args.max_attempts,
+    )
+
+    if args.dry_run:
+        pending = prewarmer.pending(scenarios, emotions)
+        print(f"生成対象: {len(pending)} / {len(scenarios) * len(emotions)} 件")
+        return 0
+
+    stats = prewarmer.run(scenarios, emotions)
+    print(
+        f"完了: 生成 {stats['generated']} 件 / 生成済み {stats['skipped']} 件 / "
+        f"失敗 {stats['failed']} 件（全 {stats['total']} 件）"
+    )
+    return 0 if stats["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
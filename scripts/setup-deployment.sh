@@ -369,7 +369,11 @@ Group=$APP_USER
 WorkingDirectory=$APP_PATH/current
 Environment=PATH=$APP_PATH/current/venv/bin
 EnvironmentFile=$APP_PATH/current/.env
+# 全ワーカーのメトリクス集約（/metrics）。起動時に前回のスナップショットを削除
+Environment=METRICS_MULTIPROC_DIR=$APP_PATH/shared/metrics
+ExecStartPre=/bin/rm -rf $APP_PATH/shared/metrics
 ExecStart=$APP_PATH/current/venv/bin/gunicorn \\
+    --config $APP_PATH/current/gunicorn.conf.py \\
     --bind 0.0.0.0:5000 \\
     --workers 2 \\
     --worker-class gevent \\
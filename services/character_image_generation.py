@@ -0,0 +1,205 @@
+"""
+キャラクター画像の生成（プロンプト構築・Gemini 呼び出し・ImageStore への保存）
+
+/api/generate_character_image と事前生成コマンド（services.image_prewarm）で共有し、
+同じシナリオ×感情には同じプロンプト・同じキャッシュキーを使う。
+"""
+
+from __future__ import annotations
+
+import base64
+from typing import Any, Dict, Optional, Tuple
+
+from services.image_store import VARIANT_WIDTHS, ImageStore, image_url
+
+IMAGE_MODEL = "gemini-2.0-flash-preview-image-generation"
+
+# シナリオごとの固定的な外見特徴
+SCENARIO_APPEARANCES = {
+    # 男性上司系
+    "scenario1": "short black hair with slight gray at temples, clean-shaven, rectangular glasses, serious demeanor",
+    "scenario3": "graying hair neatly styled, clean-shaven, thin-rimmed glasses, authoritative look",
+    "scenario5": "dark hair with professional cut, clean-shaven, no glasses, confident bearing",
+    "scenario9": "salt-and-pepper hair, clean-shaven, round glasses, thoughtful expression",
+    "scenario11": "silver hair, clean-shaven, no glasses, distinguished appearance",
+    "scenario13": "short black hair, clean-shaven, modern glasses, tech-savvy look",
+    "scenario16": "well-groomed dark hair, clean-shaven, designer glasses, strategic thinker",
+    "scenario22": "athletic build, short hair, clean-shaven, energetic presence",
+    "scenario29": "experienced look, graying temples, clean-shaven, warm smile",
+    # 女性上司・先輩系
+    "scenario7": "shoulder-length black hair, professional style, light makeup, leadership aura",
+    "scenario15": "bob-cut hair, elegant makeup, pearl earrings, managerial presence",
+    "scenario17": "sophisticated short hair, refined makeup, executive appearance",
+    "scenario19": "long hair in low ponytail, gentle makeup, mentoring demeanor",
+    "scenario26": "stylish medium-length hair, polished makeup, PR professional look",
+    # デフォルト外見
+    "default_male": "short black hair, clean-shaven, casual professional look",
+    "default_female": "medium-length black hair, natural makeup, approachable appearance",
+}
+
+# 感情から表情への変換
+EMOTION_EXPRESSIONS = {
+    "happy": "with a warm, genuine smile and bright eyes",
+    "sad": "with a concerned, sympathetic expression",
+    "angry": "with a slightly frustrated but controlled expression",
+    "excited": "with an enthusiastic, energetic expression",
+    "worried": "with a worried, concerned look",
+    "tired": "looking slightly fatigued but professional",
+    "calm": "with a calm, composed expression",
+    "confident": "with a confident, assured expression",
+    "professional": "with a professional, neutral expression",
+    "friendly": "with a friendly, approachable expression",
+    "neutral": "with a neutral, attentive expression",
+}
+
+
+def image_cache_key(scenario_id: str, emotion: str) -> str:
+    """シナリオ×感情のキャッシュキー"""
+    return f"{scenario_id}_{emotion}"
+
+
+def build_character_prompt(scenario_id: str, scenario: Dict[str, Any], emotion: str) -> Dict[str, Any]:
+    """
+    シナリオと感情から画像生成プロンプトを構築
+
+    Returns:
+        {"prompt": str, "character_info": {"age", "gender", "position"}}
+    """
+    character_setting = scenario.get("character_setting", {})
+    personality = character_setting.get("personality", "")
+
+    # 年齢・性別・役職の推定
+    age_range = "40s"
+    gender = "male"
+    position = "manager"
+
+    if "女性" in personality or "female" in personality.lower():
+        gender = "female"
+    elif "男性" in personality or "male" in personality.lower():
+        gender = "male"
+
+    if "20代" in personality or "新人" in personality:
+        age_range = "20s"
+    elif "30代" in personality:
+        age_range = "30s"
+    elif "40代" in personality:
+        age_range = "40s"
+    elif "50代" in personality:
+        age_range = "50s"
+
+    if "部長" in personality:
+        position = "department manager"
+    elif "課長" in personality:
+        position = "section manager"
+    elif "先輩" in personality:
+        position = "senior colleague"
+    elif "同僚" in personality:
+        position = "colleague"
+    elif "後輩" in personality or "新人" in personality:
+        position = "junior colleague"
+
+    expression = EMOTION_EXPRESSIONS.get(emotion, EMOTION_EXPRESSIONS["neutral"])
+    gender_text = "woman" if gender == "female" else "man"
+
+    # シナリオに基づいて外見を決定
+    if scenario_id in SCENARIO_APPEARANCES:
+        appearance = SCENARIO_APPEARANCES[scenario_id]
+    else:
+        default_key = f"default_{gender}"
+        appearance = SCENARIO_APPEARANCES.get(default_key, "professional appearance")
+
+    character_seed = f"character_{scenario_id}_{gender}_{age_range}"
+
+    prompt = (
+        f"IMPORTANT: Generate the EXACT SAME person in every image. "
+        f"Character ID: {character_seed}. "
+        f"This is a professional Japanese {gender_text} in their {age_range}, "
+        f"with EXACTLY these features: {appearance}. "
+        f"They must have the SAME face structure, SAME hairstyle, SAME facial features. "
+        f"Only the expression changes to show {expression}. "
+        f"Dressed in appropriate business attire for a {position}, "
+        f"in a modern Japanese office environment, "
+        f"photorealistic portrait style, high quality, professional lighting."
+    )
+
+    # 状況に応じた背景の追加
+    situation = character_setting.get("situation", "")
+    if "会議" in situation:
+        prompt += ", meeting room background"
+    elif "休憩" in situation or "ランチ" in situation:
+        prompt += ", office break room or cafeteria background"
+    elif "懇親会" in situation:
+        prompt += ", casual office party setting"
+
+    return {
+        "prompt": prompt,
+        "character_info": {"age": age_range, "gender": gender, "position": position},
+    }
+
+
+def generate_image(prompt: str, api_key: str) -> Tuple[bytes, Optional[str]]:
+    """
+    Gemini で画像を生成
+
+    Returns:
+        (画像データ, 生成されたテキスト)
+
+    Raises:
+        ValueError: 画像データが生成されなかった場合
+    """
+    from google import genai
+    from google.genai import types
+
+    client = genai.Client(api_key=api_key)
+    response = client.models.generate_content(
+        model=IMAGE_MODEL,
+        contents=prompt,
+        config=types.GenerateContentConfig(response_modalities=["TEXT", "IMAGE"]),
+    )
+
+    image_data = None
+    generated_text = None
+    if response.candidates and response.candidates[0].content:
+        for part in response.candidates[0].content.parts:
+            if hasattr(part, "text") and part.text:
+                generated_text = part.text
+            elif hasattr(part, "inline_data") and part.inline_data:
+                image_data = part.inline_data.data
+
+    if not image_data:
+        raise ValueError("画像データが生成されませんでした")
+    if isinstance(image_data, str):
+        image_data = base64.b64decode(image_data)
+    return image_data, generated_text
+
+
+def store_character_image(
+    store: ImageStore,
+    cache_key: str,
+    image_data: bytes,
+    prompt_info: Dict[str, Any],
+    emotion: str,
+    description: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    画像を ImageStore に保存し、索引に登録した応答データを返す
+
+    索引に使えないキー（感情名が不正など）の場合は索引に登録しない。
+    """
+    image_hash = store.put(image_data)
+    data = {
+        "url": image_url(image_hash),
+        "hash": image_hash,
+        "format": "webp",
+        "widths": list(VARIANT_WIDTHS),
+        "prompt": prompt_info["prompt"],
+        "emotion": emotion,
+        "character_info": dict(prompt_info["character_info"]),
+    }
+    if description:
+        data["description"] = description
+    try:
+        store.set_index(cache_key, data)
+    except ValueError:
+        pass
+    return data
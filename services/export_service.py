@@ -1,13 +1,82 @@
 """
-会話履歴・学習レポートのエクスポート（CSV / JSON）
+会話履歴・学習レポートのエクスポート（CSV / JSON / NDJSON）
+
+iter_* は1行（1件）ずつ文字列を返すジェネレータで、履歴の件数によらず出力全体をメモリに持たない。
+ルートではこれを chunked / gzip のストリーミングレスポンスにする。
 """
 
 from __future__ import annotations
 
 import csv
-import io
 import json
-from typing import Any, Dict, Union
+import zlib
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+# ストリーミング時に1回で送るおおよそのバイト数（行ごとに送るとオーバーヘッドが大きい）
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+class _LineBuffer:
+    """csv.writer の出力先（直前に書かれた1行を取り出す）"""
+
+    def __init__(self) -> None:
+        self.line = ""
+
+    def write(self, text: str) -> None:
+        self.line = text
+
+
+def parse_date_bound(value: Any, end_of_day: bool = False) -> Optional[datetime]:
+    """
+    日付範囲の指定（YYYY-MM-DD または ISO 8601 の日時）を datetime に変換
+
+    Args:
+        value: 指定値（空なら None）
+        end_of_day: 日付のみの指定を終端（その日の終わり）として扱うか
+
+    Raises:
+        ValueError: 形式が不正な場合（JSONボディの数値・配列など文字列以外を含む）
+    """
+    if value is None or value == "":
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"date bound must be a string: {value!r}")
+    value = value.strip()
+    if len(value) == 10:
+        day = date.fromisoformat(value)
+        return datetime.combine(day, time.max if end_of_day else time.min)
+    return _naive_local(datetime.fromisoformat(value.replace("Z", "+00:00")))
+
+
+def _naive_local(value: datetime) -> datetime:
+    # タイムゾーン付きはローカル時刻に揃える（履歴の timestamp はローカル時刻の naive な ISO 形式）
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+def gzip_stream(chunks: Iterable[Union[str, bytes]], level: int = 6) -> Iterator[bytes]:
+    """文字列（バイト列）のストリームを gzip 形式で逐次圧縮"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def batch_stream(lines: Iterable[str], size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """行のストリームをおおよそ size 文字ごとにまとめる"""
+    buf: List[str] = []
+    length = 0
+    for line in lines:
+        buf.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(buf)
+            buf.clear()
+            length = 0
+    if buf:
+        yield "".join(buf)
 
 
 class ExportService:
@@ -16,13 +85,21 @@ class ExportService:
     CSV_COLUMNS = ("user_id", "role", "content")
 
     def export_conversations_csv(self, user_id: str, history: list) -> str:
-        if not isinstance(history, list):
-            history = list(history) if hasattr(history, "__iter__") and not isinstance(history, (str, dict)) else []
-        buf = io.StringIO()
-        writer = csv.writer(buf)
+        return "".join(self.iter_conversations_csv(user_id, history))
+
+    def export_conversations_json(self, user_id: str, history: list) -> str:
+        return "".join(self.iter_conversations_json(user_id, history))
+
+    def iter_conversations_csv(
+        self, user_id: str, history: Any, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> Iterator[str]:
+        """会話履歴をCSVの行ごとに返す（先頭はヘッダ）"""
+        line = _LineBuffer()
+        writer = csv.writer(line)
         writer.writerow(list(self.CSV_COLUMNS))
+        yield line.line
         uid = user_id or ""
-        for turn in history or []:
+        for turn in self._iter_turns(history, since, until):
             if isinstance(turn, dict):
                 role = str(turn.get("role", ""))
                 content = str(turn.get("content", ""))
@@ -30,16 +107,50 @@ class ExportService:
                 role = ""
                 content = str(turn)
             writer.writerow([uid, role, content])
-        return buf.getvalue()
+            yield line.line
 
-    def export_conversations_json(self, user_id: str, history: list) -> str:
-        if not isinstance(history, list):
-            history = list(history) if hasattr(history, "__iter__") and not isinstance(history, (str, dict)) else []
-        payload = {
-            "user_id": user_id or "",
-            "conversations": list(history or []),
-        }
-        return json.dumps(payload, ensure_ascii=False, indent=2)
+    def iter_conversations_json(
+        self, user_id: str, history: Any, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> Iterator[str]:
+        """会話履歴をJSONドキュメント（{"user_id", "conversations"}）として1件ずつ返す"""
+        yield "{\n"
+        yield f'  "user_id": {json.dumps(user_id or "", ensure_ascii=False)},\n'
+        yield '  "conversations": ['
+        separator = "\n    "
+        for turn in self._iter_turns(history, since, until):
+            yield separator + json.dumps(turn, ensure_ascii=False, default=str)
+            separator = ",\n    "
+        yield "\n  ]\n}" if separator != "\n    " else "]\n}"
+
+    def iter_conversations_ndjson(
+        self, user_id: str, history: Any, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> Iterator[str]:
+        """会話履歴をNDJSON（1行1件、各行に user_id を付与。履歴に同名のキーがあっても上書きする）で返す"""
+        uid = user_id or ""
+        for turn in self._iter_turns(history, since, until):
+            record = {**turn, "user_id": uid} if isinstance(turn, dict) else {"user_id": uid, "content": str(turn)}
+            yield json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+    def _iter_turns(self, history: Any, since: Optional[datetime], until: Optional[datetime]) -> Iterator[Any]:
+        if not history or isinstance(history, (str, dict)) or not hasattr(history, "__iter__"):
+            return
+        for turn in history:
+            if (since is None and until is None) or self._in_range(turn, since, until):
+                yield turn
+
+    def _in_range(self, turn: Any, since: Optional[datetime], until: Optional[datetime]) -> bool:
+        # 日付範囲の指定がある場合、timestamp のない（解釈できない）履歴は含めない
+        if not isinstance(turn, dict) or not isinstance(turn.get("timestamp"), str):
+            return False
+        try:
+            ts = _naive_local(datetime.fromisoformat(turn["timestamp"].replace("Z", "+00:00")))
+        except ValueError:
+            return False
+        if since is not None and ts < since:
+            return False
+        if until is not None and ts > until:
+            return False
+        return True
 
     def export_learning_report(self, user_id: str, user_data: Union[dict, None]) -> dict:
         """
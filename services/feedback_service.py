@@ -5,7 +5,6 @@ Handles feedback generation business logic.
 
 from typing import Any, Dict, Optional, Tuple
 
-from google.api_core.exceptions import ResourceExhausted
 from langchain_core.messages import HumanMessage
 from services.scenario_service import get_scenario_service
 
@@ -138,8 +137,10 @@ AIの行動・対応・努力・理解度は一切評価しないこと。
             config = get_cached_config()
             import google.generativeai as genai
 
+            from services.llm_service import gemini_endpoint_options
+
             try:
-                genai.configure(api_key=config.GOOGLE_API_KEY)
+                genai.configure(api_key=config.GOOGLE_API_KEY, **gemini_endpoint_options())
                 models = genai.list_models()
                 gemini_models = [f"gemini/{m.name.split('/')[-1]}" for m in models if "gemini" in m.name.lower()]
             except Exception:
@@ -177,11 +178,12 @@ AIの行動・対応・努力・理解度は一切評価しないこと。
             used_model = model_name
             return content, used_model, None
 
-        except ResourceExhausted:
-            error_msg = "RATE_LIMIT_EXCEEDED"
         except Exception as gemini_error:
             error_msg = str(gemini_error)
-            if any(keyword in str(gemini_error).lower() for keyword in ["rate limit", "quota", "429"]):
+            # google.api_core の ResourceExhausted（import コストを避けるためクラス名で判定）
+            if type(gemini_error).__name__ == "ResourceExhausted" or any(
+                keyword in str(gemini_error).lower() for keyword in ["rate limit", "quota", "429"]
+            ):
                 error_msg = "RATE_LIMIT_EXCEEDED"
 
         return "", None, error_msg or "Gemini model error occurred"
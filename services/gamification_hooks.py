@@ -25,15 +25,26 @@ def _get_user_id() -> str:
     return _session_svc.get_user_id()
 
 
+def _get_session_history(key: str, scenario_id: Optional[str] = None) -> List[Any]:
+    from flask import session as flask_session
+
+    if scenario_id is not None:
+        return flask_session.get(key, {}).get(scenario_id, [])
+    return flask_session.get(key, [])
+
+
 def on_scenario_feedback(
     scores: Dict[str, Any],
     scenario_id: str,
     scenario_data: Optional[dict] = None,
     session_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    history: Optional[List[Any]] = None,
 ) -> Dict[str, Any]:
     """シナリオフィードバック完了時のゲーミフィケーションフック。
 
     session_id を渡すことで同一セッションの二重加算を防止する。
+    user_id / history を渡した場合は Flask セッションを参照しない（バックグラウンド実行用）。
 
     Returns:
         追加レスポンスデータ。new_badges は award_badge の通知オブジェクト
@@ -49,7 +60,7 @@ def on_scenario_feedback(
         )
     except Exception:
         pass
-    uid = _get_user_id()
+    uid = user_id or _get_user_id()
     uds = UserDataService()
 
     data = uds.get_user_data(uid)
@@ -109,13 +120,13 @@ def on_scenario_feedback(
 
     # 会話履歴をDBに永続化
     try:
-        from flask import session as flask_session
         from services.supabase_client import get_supabase_client_manager
         client = get_supabase_client_manager().get_client()
         if client:
             from services.conversation_persistence_service import ConversationPersistenceService
             cps = ConversationPersistenceService(client)
-            history = flask_session.get("scenario_history", {}).get(scenario_id, [])
+            if history is None:
+                history = _get_session_history("scenario_history", scenario_id)
             cps.save_conversation(uid, "scenario", history, scenario_id)
     except Exception:
         pass
@@ -132,9 +143,16 @@ def on_scenario_feedback(
     return result
 
 
-def on_chat_feedback(scores: Dict[str, Any]) -> Dict[str, Any]:
-    """雑談フィードバック完了時のゲーミフィケーションフック。"""
-    uid = _get_user_id()
+def on_chat_feedback(
+    scores: Dict[str, Any],
+    user_id: Optional[str] = None,
+    history: Optional[List[Any]] = None,
+) -> Dict[str, Any]:
+    """雑談フィードバック完了時のゲーミフィケーションフック。
+
+    user_id / history を渡した場合は Flask セッションを参照しない（バックグラウンド実行用）。
+    """
+    uid = user_id or _get_user_id()
     uds = UserDataService()
     gs = GamificationService(uds)
 
@@ -157,13 +175,13 @@ def on_chat_feedback(scores: Dict[str, Any]) -> Dict[str, Any]:
 
     # 会話履歴をDBに永続化
     try:
-        from flask import session as flask_session
         from services.supabase_client import get_supabase_client_manager
         client = get_supabase_client_manager().get_client()
         if client:
             from services.conversation_persistence_service import ConversationPersistenceService
             cps = ConversationPersistenceService(client)
-            history = flask_session.get("chat_history", [])
+            if history is None:
+                history = _get_session_history("chat_history")
             cps.save_conversation(uid, "chat", history)
     except Exception:
         pass
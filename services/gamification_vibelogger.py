@@ -1,5 +1,8 @@
 """
 ゲーミフィケーション用 vibelogger（テストでは GAMIFICATION_VIBE_LOG_FILE で出力先を固定）
+
+非同期ログ（utils.logging_config.setup_logging）が有効な場合、ログ出力（ファイル書き込み）は
+ログキューのリスナースレッドで行い、add_xp 等の呼び出し元をブロックしない。
 """
 
 from __future__ import annotations
@@ -10,6 +13,38 @@ from typing import Any, Optional
 _vibe: Any = None
 
 
+class _QueuedVibeLogger:
+    """ログ出力を非同期ログのキュー経由で実行する vibelogger のラッパー（無効時は同期実行）"""
+
+    def __init__(self, vibe: Any):
+        self._vibe = vibe
+
+    def _log(self, method: str, *args: Any, **kwargs: Any) -> None:
+        from utils.logging_config import defer
+
+        func = getattr(self._vibe, method)
+        if not defer(func, *args, **kwargs):
+            func(*args, **kwargs)
+
+    def debug(self, *args: Any, **kwargs: Any) -> None:
+        self._log("debug", *args, **kwargs)
+
+    def info(self, *args: Any, **kwargs: Any) -> None:
+        self._log("info", *args, **kwargs)
+
+    def warning(self, *args: Any, **kwargs: Any) -> None:
+        self._log("warning", *args, **kwargs)
+
+    def error(self, *args: Any, **kwargs: Any) -> None:
+        self._log("error", *args, **kwargs)
+
+    def critical(self, *args: Any, **kwargs: Any) -> None:
+        self._log("critical", *args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._vibe, name)
+
+
 def reset_gamification_vibe_logger() -> None:
     """テスト用: シングルトンをクリアする"""
     global _vibe
@@ -26,7 +61,7 @@ def get_gamification_vibe_logger() -> Any:
 
     path: Optional[str] = os.environ.get("GAMIFICATION_VIBE_LOG_FILE")
     if path:
-        _vibe = VibeLogger(
+        vibe = VibeLogger(
             VibeLoggerConfig(
                 log_file=path,
                 auto_save=True,
@@ -35,5 +70,6 @@ def get_gamification_vibe_logger() -> Any:
             )
         )
     else:
-        _vibe = create_file_logger("workplace_gamification")
+        vibe = create_file_logger("workplace_gamification")
+    _vibe = _QueuedVibeLogger(vibe)
     return _vibe
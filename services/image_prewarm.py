@@ -0,0 +1,171 @@
+"""
+キャラクター画像の事前生成（全シナリオ×感情）
+
+ImageStore の索引にない組み合わせだけを、上限付きのワーカー数で生成して索引に登録する。
+API キーの取得は CompliantAPIManager を通し、レート制限中は待ってから再開する。
+進捗はチェックポイント（JSON）に記録し、中断しても続きから再開できる。
+
+実行は scripts/prewarm_character_images.py から行う。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from compliant_api_manager import RateLimitException
+from services.character_image_generation import (
+    EMOTION_EXPRESSIONS,
+    build_character_prompt,
+    generate_image,
+    image_cache_key,
+    store_character_image,
+)
+from services.image_store import ImageStore
+
+logger = logging.getLogger(__name__)
+
+# 事前生成する感情（/api/generate_character_image が表情を持つもの）
+PREWARM_EMOTIONS = tuple(EMOTION_EXPRESSIONS)
+
+
+class ImagePrewarmer:
+    """シナリオ×感情の画像を事前生成して ImageStore に登録する"""
+
+    def __init__(
+        self,
+        store: ImageStore,
+        api_manager: Any,
+        generate: Callable[[str, str], Tuple[bytes, Optional[str]]] = generate_image,
+        max_workers: int = 2,
+        checkpoint_path: Optional[str] = None,
+        max_attempts: int = 3,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            store: 画像の保存先
+            api_manager: CompliantAPIManager（get_api_key / get_status / record_success / record_error）
+            generate: (prompt, api_key) -> (画像データ, テキスト)
+            max_workers: 同時に生成する数（レート制限が 10/分 なので少数で十分）
+            checkpoint_path: 進捗の記録先（None なら記録しない）
+            max_attempts: 失敗した組み合わせを再試行する回数（実行をまたいで数える）
+        """
+        self.store = store
+        self.api_manager = api_manager
+        self.generate = generate
+        self.max_workers = max(1, max_workers)
+        self.checkpoint_path = checkpoint_path
+        self.max_attempts = max_attempts
+        self.sleep = sleep
+        self._api_lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        self._checkpoint = self._load_checkpoint()
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        checkpoint = {"done": {}, "failed": {}}
+        if not self.checkpoint_path:
+            return checkpoint
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                loaded = json.load(f)
+        except (OSError, ValueError):
+            return checkpoint
+        if isinstance(loaded, dict):
+            checkpoint["done"] = dict(loaded.get("done") or {})
+            checkpoint["failed"] = dict(loaded.get("failed") or {})
+        return checkpoint
+
+    def _save_checkpoint(self) -> None:
+        """チェックポイントを保存（_checkpoint_lock を保持して呼ぶ）"""
+        if not self.checkpoint_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.checkpoint_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._checkpoint, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.checkpoint_path)
+
+    def pending(
+        self, scenarios: Dict[str, Dict[str, Any]], emotions: Iterable[str] = PREWARM_EMOTIONS
+    ) -> List[Tuple[str, str]]:
+        """生成が必要な (シナリオID, 感情) の一覧（索引にあるもの・再試行上限に達したものは除く）"""
+        result = []
+        for scenario_id in sorted(scenarios):
+            for emotion in emotions:
+                key = image_cache_key(scenario_id, emotion)
+                if self.store.get_index(key) is not None:
+                    continue
+                if self._checkpoint["failed"].get(key, {}).get("attempts", 0) >= self.max_attempts:
+                    continue
+                result.append((scenario_id, emotion))
+        return result
+
+    def _acquire_api_key(self) -> str:
+        """API キーを取得（レート制限中は解除されるまで待つ）"""
+        while True:
+            with self._api_lock:
+                try:
+                    return self.api_manager.get_api_key()
+                except RateLimitException:
+                    wait_seconds = self.api_manager.get_status().get("wait_seconds") or 1.0
+            logger.info(f"レート制限のため {wait_seconds:.1f} 秒待機します")
+            self.sleep(wait_seconds)
+
+    def _prewarm_one(self, scenario_id: str, scenario: Dict[str, Any], emotion: str) -> bool:
+        key = image_cache_key(scenario_id, emotion)
+        prompt_info = build_character_prompt(scenario_id, scenario, emotion)
+        api_key = self._acquire_api_key()
+        try:
+            image_data, description = self.generate(prompt_info["prompt"], api_key)
+            data = store_character_image(self.store, key, image_data, prompt_info, emotion, description)
+        except Exception as e:
+            with self._api_lock:
+                self.api_manager.record_error(e)
+            with self._checkpoint_lock:
+                failed = self._checkpoint["failed"].setdefault(key, {"attempts": 0})
+                failed["attempts"] += 1
+                failed["error"] = str(e)[:200]
+                self._save_checkpoint()
+            logger.warning(f"画像の事前生成に失敗: {key}: {e}")
+            return False
+
+        with self._api_lock:
+            self.api_manager.record_success()
+        with self._checkpoint_lock:
+            self._checkpoint["done"][key] = data["hash"]
+            self._checkpoint["failed"].pop(key, None)
+            self._save_checkpoint()
+        logger.info(f"画像を事前生成: {key}")
+        return True
+
+    def run(self, scenarios: Dict[str, Dict[str, Any]], emotions: Iterable[str] = PREWARM_EMOTIONS) -> Dict[str, int]:
+        """
+        未生成の画像を生成
+
+        Returns:
+            {"total", "skipped", "generated", "failed"}
+        """
+        emotions = list(emotions)
+        targets = self.pending(scenarios, emotions)
+        total = len(scenarios) * len(emotions)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image-prewarm") as executor:
+            results = list(
+                executor.map(lambda target: self._prewarm_one(target[0], scenarios[target[0]], target[1]), targets)
+            )
+
+        generated = sum(1 for ok in results if ok)
+        return {
+            "total": total,
+            "skipped": total - len(targets),
+            "generated": generated,
+            "failed": len(targets) - generated,
+        }
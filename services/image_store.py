@@ -0,0 +1,156 @@
+"""
+内容アドレスの画像ストア（キャラクター画像）
+
+生成した画像は元データの SHA-256 をキーにファイルへ保存し、/img/<hash>.webp で配信する。
+同じキーの画像は変わらないため、ブラウザ・CDN に無期限でキャッシュさせられる。
+
+- 元画像: <dir>/<hashの先頭2文字>/<hash>.orig
+- WebP の派生画像（幅ごと）: <dir>/<hashの先頭2文字>/<hash>-w<幅>.webp（初回要求時に作成）
+- シナリオ×感情 → ハッシュの索引: <dir>/index/<キー>.json（全ワーカーで共有）
+
+派生画像の幅は VARIANT_WIDTHS に限る（任意の幅でのリサイズ要求で負荷をかけられないように）。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+from typing import Any, Dict, Optional
+
+# 派生画像の幅（None は元のサイズ）
+VARIANT_WIDTHS = (128, 256, 512, 1024)
+WEBP_QUALITY = 82
+
+_HASH_RE = re.compile(r"[0-9a-f]{64}")
+_INDEX_KEY_RE = re.compile(r"[A-Za-z0-9_-]{1,128}")
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class ImageStore:
+    """内容アドレスの画像ストア（ファイル。全ワーカーで共有）"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _blob_path(self, image_hash: str, suffix: str) -> str:
+        if not _HASH_RE.fullmatch(image_hash or ""):
+            raise ValueError("Invalid image hash")
+        return os.path.join(self.directory, image_hash[:2], f"{image_hash}{suffix}")
+
+    def _index_path(self, key: str) -> str:
+        if not _INDEX_KEY_RE.fullmatch(key or ""):
+            raise ValueError("Invalid index key")
+        return os.path.join(self.directory, "index", f"{key}.json")
+
+    def put(self, data: bytes) -> str:
+        """
+        元画像を保存してハッシュを返す（同じ内容は一度だけ保存）
+
+        Raises:
+            ValueError: 画像として読み込めないデータの場合
+        """
+        from PIL import Image
+
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image.verify()
+        except Exception as e:
+            raise ValueError(f"Invalid image data: {e}") from e
+        image_hash = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(image_hash, ".orig")
+        if not os.path.exists(path):
+            _atomic_write(path, data)
+        return image_hash
+
+    def exists(self, image_hash: str) -> bool:
+        try:
+            return os.path.exists(self._blob_path(image_hash, ".orig"))
+        except ValueError:
+            return False
+
+    def variant_path(self, image_hash: str, width: Optional[int] = None) -> Optional[str]:
+        """
+        WebP の派生画像のパス（なければ元画像から作成。元画像がなければ None）
+
+        Raises:
+            ValueError: ハッシュが不正、または width が VARIANT_WIDTHS にない場合
+        """
+        if width is not None and width not in VARIANT_WIDTHS:
+            raise ValueError(f"Unsupported width: {width}")
+        suffix = f"-w{width}.webp" if width else ".webp"
+        path = self._blob_path(image_hash, suffix)
+        if os.path.exists(path):
+            return path
+        original = self._blob_path(image_hash, ".orig")
+        if not os.path.exists(original):
+            return None
+
+        from PIL import Image
+
+        with Image.open(original) as image:
+            image.load()
+            if width and image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            buffer = io.BytesIO()
+            image.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=4)
+        _atomic_write(path, buffer.getvalue())
+        return path
+
+    def get_index(self, key: str) -> Optional[Dict[str, Any]]:
+        """索引（シナリオ×感情など）から画像の情報を取得（画像が消えている場合は None）"""
+        try:
+            path = self._index_path(key)
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or not self.exists(entry.get("hash", "")):
+            return None
+        return entry
+
+    def set_index(self, key: str, entry: Dict[str, Any]) -> None:
+        """索引に画像の情報（hash を含む）を保存"""
+        if not self.exists(entry.get("hash", "")):
+            raise ValueError("Image is not stored")
+        _atomic_write(self._index_path(key), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
+
+def image_url(image_hash: str) -> str:
+    """画像の配信URL"""
+    return f"/img/{image_hash}.webp"
+
+
+# グローバルインスタンス
+_image_store: Optional[ImageStore] = None
+
+
+def get_image_store() -> ImageStore:
+    """ImageStoreのシングルトンインスタンスを取得"""
+    global _image_store
+    if _image_store is None:
+        from config import get_cached_config
+
+        _image_store = ImageStore(get_cached_config().IMAGE_STORE_DIR)
+    return _image_store
@@ -0,0 +1,331 @@
+"""
+LLM呼び出しの計測
+
+LLMService が生成するすべてのモデルインスタンスに LangChain のコールバックハンドラー
+（LLMCallTracker）を登録し、呼び出しごとに以下を記録する。
+
+- モデル名・モード（resolve_model のモード、または llm_call_context で指定）
+- キュー待ち時間（バックグラウンドタスク・先読みで、投入から実行開始まで）
+- 初回トークンまでの時間（TTFT）・全体のレイテンシ
+- プロンプト/応答の文字数・トークン数（APIが返す場合）・エラー
+
+記録は直近の一定件数をメモリに保持し、/api/metrics でローリングウィンドウ（1分/5分/15分）ごとに
+集計する。LLM_TRACE_PATH を設定すると、1呼び出し1行のJSONLとしても書き出す（オフライン分析用）。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_MODE = "unknown"
+
+# 呼び出しのコンテキスト（mode, queued_at）。リクエスト・タスク単位で設定する
+_call_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_call_context", default=None)
+
+
+def set_llm_mode(mode: str) -> None:
+    """以降のLLM呼び出しのモードを設定（リクエスト終了時に reset_llm_context で解除）"""
+    context = dict(_call_context.get() or {})
+    context["mode"] = mode
+    _call_context.set(context)
+
+
+def reset_llm_context() -> None:
+    """呼び出しコンテキストを解除（スレッドを再利用するサーバーでの持ち越しを防ぐ）"""
+    _call_context.set(None)
+
+
+@contextmanager
+def llm_call_context(mode: Optional[str] = None, queued_at: Optional[float] = None) -> Iterator[None]:
+    """
+    ブロック内のLLM呼び出しにモード・キュー投入時刻を付与
+
+    Args:
+        mode: モード名（省略時は外側の設定を引き継ぐ）
+        queued_at: 処理がキューに投入された時刻（time.time()）。最初の呼び出しのキュー待ち時間になる
+    """
+    context = dict(_call_context.get() or {})
+    if mode is not None:
+        context["mode"] = mode
+    if queued_at is not None:
+        context["queued_at"] = queued_at
+    token = _call_context.set(context)
+    try:
+        yield
+    finally:
+        _call_context.reset(token)
+
+
+def _take_call_context() -> Dict[str, Any]:
+    # キュー待ち時間はコンテキスト内の最初の呼び出しにのみ計上する
+    context = _call_context.get()
+    if not context:
+        return {}
+    taken = dict(context)
+    context.pop("queued_at", None)
+    return taken
+
+
+@dataclass
+class LLMCallRecord:
+    """LLM呼び出し1回分の計測結果"""
+
+    model: str
+    mode: str
+    started_at: float
+    latency_ms: float
+    ttft_ms: Optional[float] = None
+    queue_wait_ms: Optional[float] = None
+    streamed: bool = False
+    prompt_chars: int = 0
+    completion_chars: int = 0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1], 1)
+
+
+class LLMMetrics:
+    """LLM呼び出しの記録とローリングウィンドウ集計"""
+
+    WINDOWS = {"1m": 60, "5m": 300, "15m": 900}
+
+    def __init__(self, max_records: int = 10000, trace_path: Optional[str] = None) -> None:
+        """
+        Args:
+            max_records: メモリに保持する直近の記録数
+            trace_path: JSONLトレースの出力先（Noneで無効）
+        """
+        self._records: Deque[LLMCallRecord] = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self.trace_path = trace_path
+        self._trace_lock = threading.Lock()
+
+    def record(self, record: LLMCallRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+        if self.trace_path:
+            self._write_trace(record)
+
+    def records(self) -> List[LLMCallRecord]:
+        with self._lock:
+            return list(self._records)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+    def summary(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        ウィンドウ・（モデル, モード）ごとの集計
+
+        Returns:
+            {"windows": {"1m": [ {model, mode, calls, errors, ...}, ... ], "5m": [...], "15m": [...]}}
+        """
+        now = time.time() if now is None else now
+        records = self.records()
+        windows: Dict[str, List[Dict[str, Any]]] = {}
+        for name, seconds in self.WINDOWS.items():
+            groups: Dict[tuple, List[LLMCallRecord]] = {}
+            for rec in records:
+                if rec.started_at >= now - seconds:
+                    groups.setdefault((rec.model, rec.mode), []).append(rec)
+            windows[name] = [self._aggregate(model, mode, recs) for (model, mode), recs in sorted(groups.items())]
+        return {"windows": windows, "tracing": bool(self.trace_path)}
+
+    @staticmethod
+    def _aggregate(model: str, mode: str, records: List[LLMCallRecord]) -> Dict[str, Any]:
+        ok = [r for r in records if r.error is None]
+        latencies = [r.latency_ms for r in ok]
+        ttfts = [r.ttft_ms for r in ok if r.ttft_ms is not None]
+        queue_waits = [r.queue_wait_ms for r in records if r.queue_wait_ms is not None]
+        completion_tokens = sum(r.completion_tokens or 0 for r in ok)
+        generation_seconds = sum(r.latency_ms for r in ok if r.completion_tokens) / 1000
+        return {
+            "model": model,
+            "mode": mode,
+            "calls": len(records),
+            "errors": len(records) - len(ok),
+            "error_rate": round((len(records) - len(ok)) / len(records), 4),
+            "latency_p50_ms": _percentile(latencies, 50),
+            "latency_p95_ms": _percentile(latencies, 95),
+            "ttft_p50_ms": _percentile(ttfts, 50),
+            "ttft_p95_ms": _percentile(ttfts, 95),
+            "queue_wait_avg_ms": round(sum(queue_waits) / len(queue_waits), 1) if queue_waits else None,
+            "prompt_chars": sum(r.prompt_chars for r in records),
+            "completion_chars": sum(r.completion_chars for r in ok),
+            "prompt_tokens": sum(r.prompt_tokens or 0 for r in records),
+            "completion_tokens": completion_tokens,
+            "completion_tokens_per_second": (
+                round(completion_tokens / generation_seconds, 1) if generation_seconds > 0 else None
+            ),
+        }
+
+    def _write_trace(self, record: LLMCallRecord) -> None:
+        line = json.dumps(record.to_dict(), ensure_ascii=False)
+        try:
+            with self._trace_lock:
+                directory = os.path.dirname(self.trace_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.trace_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"Failed to write LLM trace: {e}")
+
+
+def _message_chars(messages: List[Any]) -> int:
+    total = 0
+    for message in messages:
+        content = getattr(message, "content", message)
+        if isinstance(content, str):
+            total += len(content)
+        elif isinstance(content, list):
+            total += sum(len(part.get("text", "")) if isinstance(part, dict) else len(str(part)) for part in content)
+    return total
+
+
+def _usage_from_result(response: Any) -> Dict[str, Optional[int]]:
+    """LLMResult からトークン使用量を取り出す（プロバイダごとの形式の違いを吸収）"""
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {"prompt_tokens": usage.get("input_tokens"), "completion_tokens": usage.get("output_tokens")}
+    llm_output = getattr(response, "llm_output", None) or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage_metadata") or {}
+    if usage:
+        return {
+            "prompt_tokens": usage.get("prompt_tokens", usage.get("input_tokens")),
+            "completion_tokens": usage.get("completion_tokens", usage.get("output_tokens")),
+        }
+    return {"prompt_tokens": None, "completion_tokens": None}
+
+
+def _completion_chars(response: Any) -> int:
+    total = 0
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            text = getattr(generation, "text", "") or ""
+            if not text:
+                text = str(getattr(getattr(generation, "message", None), "content", "") or "")
+            total += len(text)
+    return total
+
+
+class LLMCallTracker(BaseCallbackHandler):
+    """モデルインスタンスに登録するコールバックハンドラー（invoke / stream / astream 共通）"""
+
+    # 同期処理のみで軽量なため、非同期呼び出しでもスレッドプールを経由せずに実行する
+    run_inline = True
+
+    def __init__(self, model_name: str, metrics: Optional[LLMMetrics] = None) -> None:
+        self.model_name = model_name
+        self._metrics = metrics
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def metrics(self) -> LLMMetrics:
+        return self._metrics if self._metrics is not None else get_llm_metrics()
+
+    def _start(self, run_id: UUID, prompt_chars: int) -> None:
+        context = _take_call_context()
+        now = time.time()
+        queued_at = context.get("queued_at")
+        with self._lock:
+            self._runs[run_id] = {
+                "mode": context.get("mode") or UNKNOWN_MODE,
+                "started_at": now,
+                "start": time.perf_counter(),
+                "first_token": None,
+                "queue_wait_ms": round((now - queued_at) * 1000, 1) if queued_at else None,
+                "prompt_chars": prompt_chars,
+            }
+
+    def _finish(self, run_id: UUID, **fields: Any) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        end = time.perf_counter()
+        first_token = run["first_token"]
+        record = LLMCallRecord(
+            model=self.model_name,
+            mode=run["mode"],
+            started_at=run["started_at"],
+            latency_ms=round((end - run["start"]) * 1000, 1),
+            ttft_ms=round((first_token - run["start"]) * 1000, 1) if first_token is not None else None,
+            queue_wait_ms=run["queue_wait_ms"],
+            streamed=first_token is not None,
+            prompt_chars=run["prompt_chars"],
+            **fields,
+        )
+        if record.ttft_ms is None and record.error is None:
+            # ストリーミングしない呼び出しは応答全体が最初のトークン
+            record.ttft_ms = record.latency_ms
+        try:
+            self.metrics.record(record)
+        except Exception as e:  # 計測の失敗でLLM呼び出しを失敗させない
+            logger.warning(f"Failed to record LLM call: {e}")
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, sum(_message_chars(batch) for batch in messages))
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, sum(len(p) for p in prompts))
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None and run["first_token"] is None and token:
+                run["first_token"] = time.perf_counter()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, completion_chars=_completion_chars(response), **_usage_from_result(response))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, error=f"{type(error).__name__}: {str(error)[:200]}")
+
+
+# グローバルインスタンス
+_llm_metrics: Optional[LLMMetrics] = None
+
+
+def get_llm_metrics() -> LLMMetrics:
+    """LLMMetricsのシングルトンインスタンスを取得"""
+    global _llm_metrics
+    if _llm_metrics is None:
+        trace_path = None
+        try:
+            from config import get_cached_config
+
+            trace_path = get_cached_config().LLM_TRACE_PATH
+        except Exception:
+            pass
+        _llm_metrics = LLMMetrics(trace_path=trace_path)
+    return _llm_metrics
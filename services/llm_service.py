@@ -8,18 +8,32 @@ import os
 import sys
 from typing import Any, AsyncGenerator, Dict, List, Optional, Union
 
-import google.generativeai as genai
-from langchain.schema import AIMessage, HumanMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-
-try:  # Ollama Cloud は OpenAI 互換 API 経由で利用
-    from langchain_openai import ChatOpenAI  # type: ignore
-except ImportError:  # pragma: no cover - オプショナル依存
-    ChatOpenAI = None  # type: ignore
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from compliant_api_manager import CompliantAPIManager
-from config import Config
+from config import Config, get_cached_config
+from services.llm_instrumentation import LLMCallTracker
+from utils.lazy_import import is_available, lazy_import
+
+# SDKは import だけで数百ミリ秒かかるため、初回利用時に読み込む（ワーカー起動の高速化）
+genai = lazy_import("google.generativeai")
+ChatGoogleGenerativeAI = lazy_import("langchain_google_genai", "ChatGoogleGenerativeAI")
+# Ollama Cloud は OpenAI 互換 API 経由で利用（langchain_openai はオプショナル依存）
+ChatOpenAI = lazy_import("langchain_openai", "ChatOpenAI")
+
+
+def gemini_endpoint_options() -> Dict[str, Any]:
+    """
+    Gemini APIの接続先上書き設定を取得
+
+    GEMINI_API_BASE_URL が設定されている場合（負荷試験用のフェイクLLMサーバー等）は
+    REST経由でその接続先を使う。ChatGoogleGenerativeAI と genai.configure の両方に渡せる。
+    """
+    base_url = (get_cached_config().GEMINI_API_BASE_URL or "").strip()
+    if not base_url:
+        return {}
+    return {"transport": "rest", "client_options": {"api_endpoint": base_url}}
 
 
 class LLMService:
@@ -53,7 +67,8 @@ class LLMService:
         Args:
             config: 設定オブジェクト（オプション）
         """
-        self.config = config or Config()
+        # 設定は解析済みのスナップショットを共有する（インスタンスごとに環境変数を解析しない）
+        self.config = config or get_cached_config()
         self.api_key_manager = CompliantAPIManager()
         self.models = {}
         self.default_temperature = self.config.DEFAULT_TEMPERATURE
@@ -70,7 +85,7 @@ class LLMService:
         except Exception as e:
             print(f"Warning: Failed to initialize Gemini API: {e}")
 
-    def create_gemini_llm(self, model_name: str = "gemini-1.5-flash") -> ChatGoogleGenerativeAI:
+    def create_gemini_llm(self, model_name: str = "gemini-1.5-flash") -> "ChatGoogleGenerativeAI":
         """
         LangChainのGemini Chat modelインスタンス生成
         廃止されたモデルを自動的に代替モデルに置き換える
@@ -91,6 +106,9 @@ class LLMService:
             # APIキーマネージャーからキーを取得
             current_api_key = self.api_key_manager.get_api_key()
 
+            # 接続先の上書き（負荷試験用のフェイクLLMサーバー等）
+            endpoint_options = gemini_endpoint_options()
+
             # モデルインスタンスを作成
             llm = ChatGoogleGenerativeAI(
                 model=model_name,
@@ -98,6 +116,8 @@ class LLMService:
                 temperature=self.default_temperature,
                 convert_system_message_to_human=True,
                 streaming=True,
+                callbacks=[LLMCallTracker(f"gemini/{model_name}")],
+                **endpoint_options,
             )
 
             # 使用回数を記録
@@ -127,7 +147,7 @@ class LLMService:
         Raises:
             RuntimeError: langchain_openai 未インストール / OLLAMA_API_KEY 未設定
         """
-        if ChatOpenAI is None:
+        if not is_available(ChatOpenAI):
             raise RuntimeError(
                 "langchain-openai is not installed. "
                 "Install with: pip install langchain-openai"
@@ -150,6 +170,7 @@ class LLMService:
             base_url=base_url,
             temperature=self.default_temperature,
             streaming=True,
+            callbacks=[LLMCallTracker(f"ollama/{model_name}")],
         )
 
     def initialize_llm(self, model_name: str):
@@ -18,23 +18,18 @@ feedback モード:
 """
 from __future__ import annotations
 
-import os
 from typing import Optional
 
-from config import get_config
-
-# モード名 → 環境変数名 のマッピング
-_MODE_ENV_MAP = {
-    "scenario": "SCENARIO_MODEL",
-    "chat": "CHAT_MODEL",
-    "watch": "WATCH_MODEL",
-    "feedback": "FEEDBACK_MODEL",
-}
+from config.snapshot import MODE_MODEL_FIELDS, get_config_snapshot
+from services.llm_instrumentation import set_llm_mode
 
 
 def resolve_model(mode: str, session_selected: Optional[str] = None) -> str:
     """モード別にモデル名を解決する。
 
+    <MODE>_MODEL → DEFAULT_MODEL の解決は設定スナップショット（config.snapshot）で
+    事前に計算済みのため、ここでは辞書を引くだけ（設定の再読み込みで差し替わる）。
+
     Args:
         mode: "scenario" | "chat" | "watch" | "feedback"
         session_selected: UI で選択されたモデル名（feedback 以外で最優先）
@@ -45,27 +40,21 @@ def resolve_model(mode: str, session_selected: Optional[str] = None) -> str:
     Raises:
         ValueError: 未知の mode が渡された場合
     """
-    if mode not in _MODE_ENV_MAP:
+    configured = get_config_snapshot().models.get(mode)
+    if configured is None:
         raise ValueError(
             f"Unknown mode: {mode!r}. "
-            f"Expected one of: {sorted(_MODE_ENV_MAP.keys())}"
+            f"Expected one of: {sorted(MODE_MODEL_FIELDS.keys())}"
         )
 
-    # フィードバックは会話モデルと切り離し、FEEDBACK_MODEL / DEFAULT_MODEL のみ
-    if mode == "feedback":
-        session_selected = None
+    # 以降のLLM呼び出しの計測にモードを付与
+    set_llm_mode(mode)
 
-    # 1. session_selected が最優先
-    if session_selected:
+    # 1. session_selected が最優先（フィードバックは会話モデルと切り離し、FEEDBACK_MODEL / DEFAULT_MODEL のみ）
+    if session_selected and mode != "feedback":
         selected = session_selected.strip()
         if selected:
             return selected
 
-    # 2. <MODE>_MODEL env
-    env_key = _MODE_ENV_MAP[mode]
-    env_value = (os.environ.get(env_key) or "").strip()
-    if env_value:
-        return env_value
-
-    # 3. DEFAULT_MODEL フォールバック
-    return get_config().DEFAULT_MODEL
+    # 2. <MODE>_MODEL / 3. DEFAULT_MODEL フォールバック
+    return configured
@@ -81,10 +81,27 @@ class MultilingualTTSService:
                     "success": False,
                     "audio_data_or_error": "unsupported_language",
                 }
-            # 実エンジン未接続時はプレースホルダ（例外は出さない）
+            from services.tts_pipeline import TTSBudgetExceededError, get_tts_pipeline
+
+            pipeline = get_tts_pipeline()
+            if pipeline is None:
+                # 実エンジン未接続時はプレースホルダ（例外は出さない）
+                return {
+                    "success": True,
+                    "audio_data_or_error": b"",
+                }
+            code = self._normalize_lang(lang_code)
+            voice = self.get_voice_for_language(code)["voice_id"]
+            try:
+                segment = pipeline.synthesize_sentence(text.strip(), voice, lang=code)
+            except TTSBudgetExceededError:
+                return {
+                    "success": False,
+                    "audio_data_or_error": "budget_exceeded",
+                }
             return {
                 "success": True,
-                "audio_data_or_error": b"",
+                "audio_data_or_error": segment["audio"],
             }
         except Exception as exc:
             return {
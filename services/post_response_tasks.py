@@ -0,0 +1,101 @@
+"""
+レスポンス返却後に実行するバックグラウンドタスク群
+
+各ハンドラはリクエストコンテキスト外（ワーカースレッド）で実行されるため、
+必要な値（ユーザーID、会話履歴など）はすべてペイロードで受け取る。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from services.llm_instrumentation import llm_call_context
+from services.task_queue import register_task
+
+SCENARIO_FEEDBACK_POST = "scenario_feedback_post"
+CHAT_FEEDBACK_POST = "chat_feedback_post"
+REALTIME_FEEDBACK = "realtime_feedback"
+
+
+@register_task(SCENARIO_FEEDBACK_POST)
+def run_scenario_feedback_post(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    シナリオフィードバック後処理: 強み分析 → ゲーミフィケーション（XP/クエスト/バッジ/アンロック/永続化）
+
+    payload:
+        user_id, scenario_id, scenario_data, session_id, history
+    """
+    from services.gamification_hooks import on_scenario_feedback
+    from services.strength_service import get_strength_service
+
+    history = payload.get("history") or []
+    result: Dict[str, Any] = {}
+
+    strength_analysis = get_strength_service().build_strength_analysis(history)
+    if strength_analysis:
+        result["strength_analysis"] = strength_analysis
+
+    gamification_result = on_scenario_feedback(
+        strength_analysis.get("scores") or {},
+        payload["scenario_id"],
+        payload.get("scenario_data"),
+        session_id=payload.get("session_id"),
+        user_id=payload["user_id"],
+        history=history,
+    )
+    if gamification_result:
+        result["gamification"] = gamification_result
+    return result
+
+
+@register_task(CHAT_FEEDBACK_POST)
+def run_chat_feedback_post(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    雑談フィードバック後処理: ゲーミフィケーション（XP/クエスト/バッジ/永続化）
+
+    payload:
+        user_id, scores, history
+    """
+    from services.gamification_hooks import on_chat_feedback
+
+    gamification_result = on_chat_feedback(
+        payload.get("scores") or {},
+        user_id=payload["user_id"],
+        history=payload.get("history") or [],
+    )
+    return {"gamification": gamification_result} if gamification_result else {}
+
+
+def realtime_feedback_enabled() -> bool:
+    """
+    リアルタイムフィードバックのLLM呼び出しが有効か
+
+    有効時はフィードバック対象の発言ごとにLLM呼び出しが1回増える（バックグラウンド実行でも同期実行でも同じ）。
+    """
+    try:
+        from config import get_cached_config
+
+        return bool(get_cached_config().ENABLE_REALTIME_FEEDBACK_LLM)
+    except Exception:
+        return False
+
+
+@register_task(REALTIME_FEEDBACK)
+def run_realtime_feedback(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    リアルタイムフィードバック: ユーザー発言を分析し改善提案と言い換え候補を生成（LLM呼び出し1回）
+
+    payload:
+        message, history（role/content形式）, model_name, scenario_context
+    """
+    from app import initialize_llm
+    from services.realtime_feedback_service import RealtimeFeedbackService
+
+    llm = initialize_llm(payload["model_name"])
+    rtf = RealtimeFeedbackService(llm=llm)
+    with llm_call_context(mode="realtime_feedback"):
+        fb = rtf.analyze_with_alternatives(
+            payload.get("message", ""), payload.get("history") or [], payload.get("scenario_context")
+        )
+    # フィードバックが不要な発言でも言い換え候補があれば返す
+    return {"realtime_feedback": fb} if fb.get("has_feedback") or fb.get("alternatives") else {}
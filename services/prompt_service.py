@@ -5,6 +5,7 @@
 from typing import Any, Dict, List, Optional
 
 from utils.constants import MAX_FEEDBACK_LENGTH
+from utils.performance import content_hash, get_prompt_cache
 
 
 class PromptService:
@@ -45,6 +46,16 @@ class PromptService:
         Returns:
             str: システムプロンプト
         """
+        key = f"prompt_service:scenario:{content_hash(scenario)}"
+        cache = get_prompt_cache()
+        prompt = cache.get(key)
+        if prompt is None:
+            prompt = cls._render_scenario_system_prompt(scenario)
+            cache.set(key, prompt)
+        return prompt
+
+    @classmethod
+    def _render_scenario_system_prompt(cls, scenario: Dict[str, Any]) -> str:
         character = scenario.get("character", {})
         return f"""あなたは{character.get('name', '相手')}という{character.get('role', '同僚')}です。
 {character.get('personality', '')}
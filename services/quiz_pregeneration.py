@@ -0,0 +1,194 @@
+"""
+観戦クイズの事前生成
+
+クイズを出すターン（QuizService.should_generate_quiz）の1〜2ターン前に、その時点の会話から
+クイズの生成をバックグラウンドで開始し、(会話ID, ターン) をキーに保持する。
+クイズを出すターンでは結果をそのまま返し、見つからない・生成に失敗した場合だけその場で生成する。
+
+- 会話（観戦セッション）ごとに未取得の結果を保持し、観戦の再開始時に破棄する
+- 取り出されないまま残った結果は一定時間で破棄する
+- プロセス（ワーカー）ごとの同時生成数に上限を設け、超過時は事前生成しない
+  （破棄・取り出し済みでも実行中のLLM呼び出しは完了するまで数える）
+- 結果はプロセス内メモリに保持するため、別ワーカーに振り分けられた場合はその場で生成する
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class QuizPregenerator:
+    """(会話ID, ターン) 単位のクイズ事前生成"""
+
+    def __init__(
+        self,
+        lead_turns: int = 1,
+        max_concurrent: int = 2,
+        ttl_seconds: float = 600.0,
+        wait_timeout_seconds: float = 20.0,
+    ) -> None:
+        """
+        Args:
+            lead_turns: クイズを出すターンの何ターン前から生成を始めるか（0で無効）
+            max_concurrent: このプロセスで同時に実行する事前生成の上限（0で無効）
+            ttl_seconds: 取り出されない結果を保持する時間
+            wait_timeout_seconds: 実行中の生成の完了を待つ最大時間
+        """
+        self.lead_turns = max(0, int(lead_turns))
+        self.max_concurrent = max(0, int(max_concurrent))
+        self.ttl_seconds = ttl_seconds
+        self.wait_timeout_seconds = wait_timeout_seconds
+        # Future の取り消し・完了時のコールバックはロック保持中の呼び出し元で実行されることがある
+        self._lock = threading.RLock()
+        self._entries: Dict[Tuple[str, int], Tuple[float, Future]] = {}
+        self._active = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {"scheduled": 0, "hits": 0, "misses": 0, "skipped": 0, "cancelled": 0, "expired": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.lead_turns > 0 and self.max_concurrent > 0
+
+    def target_turn(self, should_generate_quiz: Callable[[int], bool], message_count: int) -> Optional[int]:
+        """
+        事前生成を始めるべきクイズのターン
+
+        Args:
+            should_generate_quiz: QuizService.should_generate_quiz
+            message_count: 現在の会話数
+
+        Returns:
+            Optional[int]: lead_turns 以内にクイズを出すターンがあればそのターン
+        """
+        for ahead in range(1, self.lead_turns + 1):
+            if should_generate_quiz(message_count + ahead):
+                return message_count + ahead
+        return None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="quiz-pregen")
+        return self._executor
+
+    def _on_done(self, _future: Future) -> None:
+        with self._lock:
+            self._active -= 1
+
+    def schedule(self, conversation_id: str, turn: int, generate: Callable[[], Optional[dict]]) -> bool:
+        """
+        クイズの事前生成を開始（同じ会話・ターンが登録済みなら何もしない）
+
+        Args:
+            conversation_id: 会話ID（観戦セッションID）
+            turn: クイズを出すターン
+            generate: クイズを生成する関数（リクエストコンテキスト外で実行。失敗時は None）
+
+        Returns:
+            bool: 事前生成を開始した場合True
+        """
+        if not self.enabled or not conversation_id:
+            return False
+        key = (conversation_id, turn)
+        with self._lock:
+            self._expire()
+            if key in self._entries:
+                return False
+            if self._active >= self.max_concurrent:
+                self._stats["skipped"] += 1
+                return False
+            future = self._get_executor().submit(generate)
+            self._active += 1
+            future.add_done_callback(self._on_done)
+            self._entries[key] = (time.monotonic(), future)
+            self._stats["scheduled"] += 1
+        return True
+
+    def take(self, conversation_id: Optional[str], turn: int) -> Optional[dict]:
+        """
+        事前生成したクイズを取り出す（実行中の場合は完了を待つ）
+
+        Returns:
+            Optional[dict]: 生成に成功していればクイズ、それ以外はNone
+        """
+        if not conversation_id:
+            return None
+        with self._lock:
+            entry = self._entries.pop((conversation_id, turn), None)
+        if entry is None:
+            self._count("misses")
+            return None
+        try:
+            quiz = entry[1].result(timeout=self.wait_timeout_seconds)
+        except FutureTimeoutError:
+            quiz = None
+        except Exception as e:
+            logger.warning(f"Quiz pregeneration failed for {conversation_id}:{turn}: {e}")
+            quiz = None
+        self._count("hits" if quiz is not None else "misses")
+        return quiz
+
+    def cancel(self, conversation_id: Optional[str]) -> None:
+        """会話の事前生成を破棄（観戦再開始時）"""
+        if not conversation_id:
+            return
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == conversation_id]:
+                self._entries.pop(key)[1].cancel()
+                self._stats["cancelled"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """事前生成の統計情報を取得"""
+        with self._lock:
+            return dict(
+                self._stats,
+                pending=len(self._entries),
+                active=self._active,
+                lead_turns=self.lead_turns,
+                max_concurrent=self.max_concurrent,
+            )
+
+    def shutdown(self) -> None:
+        """実行中でない事前生成を取り消し、スレッドプールを停止"""
+        with self._lock:
+            for _, future in self._entries.values():
+                future.cancel()
+            self._entries.clear()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _expire(self) -> None:
+        # ロック保持中に呼び出すこと
+        deadline = time.monotonic() - self.ttl_seconds
+        for key in [key for key, (created, _) in self._entries.items() if created < deadline]:
+            self._entries.pop(key)[1].cancel()
+            self._stats["expired"] += 1
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+
+# グローバルインスタンス
+_quiz_pregenerator: Optional[QuizPregenerator] = None
+
+
+def get_quiz_pregenerator() -> QuizPregenerator:
+    """QuizPregeneratorのシングルトンインスタンスを取得"""
+    global _quiz_pregenerator
+    if _quiz_pregenerator is None:
+        from config import get_cached_config
+
+        config = get_cached_config()
+        _quiz_pregenerator = QuizPregenerator(
+            lead_turns=config.QUIZ_PREGENERATE_LEAD_TURNS,
+            max_concurrent=config.QUIZ_PREGENERATE_MAX_CONCURRENT,
+        )
+    return _quiz_pregenerator
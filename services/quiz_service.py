@@ -36,8 +36,18 @@ class QuizService:
             "correct_answer": 0,
         }
 
-    def generate_quiz(self, conversation_context: list) -> dict:
-        """LLMまたはフォールバックでクイズを生成（3〜4択）"""
+    @property
+    def has_llm(self) -> bool:
+        """LLMでクイズを生成できる場合True（事前生成の対象）"""
+        return self._llm is not None and hasattr(self._llm, "generate_quiz_content")
+
+    def generate_quiz(self, conversation_context: list, fallback: bool = True) -> Optional[dict]:
+        """
+        LLMまたはフォールバックでクイズを生成（3〜4択）
+
+        Args:
+            fallback: False の場合、LLMで生成できなければ _fallback_quiz ではなく None を返す（事前生成用）
+        """
         if conversation_context is None:
             conversation_context = []
         try:
@@ -66,7 +76,7 @@ class QuizService:
                 )
             except Exception:
                 pass
-        return self._fallback_quiz()
+        return self._fallback_quiz() if fallback else None
 
     def _validate_quiz_shape(self, q: dict) -> bool:
         ch = q.get("choices") or []
@@ -126,3 +136,89 @@ class QuizService:
             "total": total,
             "correct": correct_n,
         }
+
+
+class QuizLLM:
+    """
+    LangChain 互換のチャットモデルでクイズを生成する（QuizService の llm_service）
+
+    モデルは最初の生成時に作る（事前生成ではバックグラウンドのスレッドで初期化される）。
+    解説は生成時にクイズへ含めておき、回答時にはLLMを呼ばない。
+    """
+
+    MAX_CONTEXT_MESSAGES = 10
+
+    def __init__(self, model_name: str, llm_factory: Optional[Callable[[str], Any]] = None) -> None:
+        """
+        Args:
+            model_name: 使用するモデル名
+            llm_factory: モデル名から invoke(messages) を持つモデルを作る関数（既定は app.initialize_llm）
+        """
+        self.model_name = model_name
+        self._factory = llm_factory
+        self._llm: Optional[Any] = None
+
+    def _get_llm(self) -> Any:
+        if self._llm is None:
+            factory = self._factory
+            if factory is None:
+                from app import initialize_llm as factory
+            self._llm = factory(self.model_name)
+        return self._llm
+
+    def _build_prompt(self, conversation_context: list) -> str:
+        lines = [
+            f"{turn.get('role', '')}: {turn.get('content', '')}"
+            for turn in conversation_context[-self.MAX_CONTEXT_MESSAGES:]
+            if isinstance(turn, dict)
+        ]
+        joined = "\n".join(lines)
+        return (
+            "以下は職場の会話ログです。会話から学べるコミュニケーションの要点を問う3〜4択のクイズを1問作り、"
+            "JSONのみで返してください。correct_answer は正解の choices の添字（0始まり）です。\n"
+            '形式: {"question":"文字列","choices":["...","...","..."],"correct_answer":0,"explanation":"文字列"}\n\n'
+            f"{joined}"
+        )
+
+    def generate_quiz_content(self, conversation_context: list) -> Optional[dict]:
+        """会話からクイズを生成（会話が空・JSONを取り出せない場合は None）"""
+        if not conversation_context:
+            return None
+        from langchain_core.messages import HumanMessage
+
+        from utils.helpers import extract_llm_text, load_json_lenient
+
+        response = self._get_llm().invoke([HumanMessage(content=self._build_prompt(conversation_context))])
+        data = load_json_lenient(extract_llm_text(response), "{")
+        if not isinstance(data, dict):
+            return None
+        choices = data.get("choices")
+        return {
+            "question": str(data.get("question", "") or ""),
+            "choices": [str(choice) for choice in choices] if isinstance(choices, list) else choices,
+            "correct_answer": data.get("correct_answer", -1),
+            "explanation": str(data.get("explanation", "") or ""),
+        }
+
+    def explain_quiz_answer(self, quiz: dict, user_answer: int, conversation_context: list) -> str:
+        """生成時の解説を返す（なければ正解の選択肢を示す）"""
+        explanation = quiz.get("explanation")
+        if isinstance(explanation, str) and explanation.strip():
+            return explanation
+        choices = quiz.get("choices") or []
+        try:
+            return f"正解は「{choices[int(quiz.get('correct_answer', -1))]}」です。"
+        except (IndexError, TypeError, ValueError):
+            return "お疲れさまでした。"
+
+
+def create_llm_quiz_service(user_data_service: Optional[Any] = None) -> QuizService:
+    """
+    LLMでクイズを生成する QuizService
+
+    モデルは会話で選んだモデルとは独立に FEEDBACK_MODEL（未設定なら DEFAULT_MODEL）を使う。
+    """
+    from config.snapshot import get_config_snapshot
+
+    model_name = get_config_snapshot().models["feedback"]
+    return QuizService(user_data_service, llm_service=QuizLLM(model_name))
@@ -5,19 +5,23 @@
 from __future__ import annotations
 
 import json
-import re
 from typing import Any, List, Optional
 
 from langchain_core.messages import HumanMessage
 
+from utils.helpers import extract_llm_text, load_json_lenient
 
-def _extract_text_from_llm_response(response: Any) -> str:
-    if response is None:
-        return ""
-    if hasattr(response, "content"):
-        c = getattr(response, "content", "")
-        return c if isinstance(c, str) else str(c)
-    return str(response)
+# 1回の呼び出しでフィードバックと言い換え候補を返させるためのスキーマ
+COMBINED_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "has_feedback": {"type": "boolean"},
+        "feedback_type": {"type": ["string", "null"]},
+        "suggestion": {"type": "string"},
+        "alternatives": {"type": "array", "items": {"type": "string"}, "maxItems": 3},
+    },
+    "required": ["has_feedback", "feedback_type", "suggestion", "alternatives"],
+}
 
 
 class RealtimeFeedbackService:
@@ -53,7 +57,7 @@ class RealtimeFeedbackService:
                 return self._empty_analyze()
 
             prompt = self._build_analyze_prompt(msg, history or [], scenario_context)
-            raw = _extract_text_from_llm_response(
+            raw = extract_llm_text(
                 self._llm.invoke([HumanMessage(content=prompt)])
             )
             return self._parse_analyze_response(raw)
@@ -82,13 +86,44 @@ class RealtimeFeedbackService:
                         lines.append(f"{turn.get('role', '')}: {turn.get('content', '')}")
                 prompt += "直近の会話:\n" + "\n".join(lines)
 
-            raw = _extract_text_from_llm_response(
+            raw = extract_llm_text(
                 self._llm.invoke([HumanMessage(content=prompt)])
             )
             return self._parse_string_list(raw, max_items=3)
         except Exception:
             return []
 
+    def analyze_with_alternatives(
+        self,
+        user_message: str,
+        history: list,
+        scenario_context: Any,
+    ) -> dict:
+        """
+        フィードバックと言い換え候補を1回のLLM呼び出しでまとめて生成する。
+
+        analyze_message と generate_alternatives を両方呼ぶ場合の代替。
+        フィードバックが不要な発言でも alternatives は返す。
+
+        Returns:
+            analyze_message と同じ構造（alternatives は最大3件）
+        """
+        msg = (user_message or "").strip()
+        if not msg:
+            return self._empty_analyze()
+
+        try:
+            if self._llm is None:
+                return self._empty_analyze()
+
+            prompt = self._build_combined_prompt(msg, history or [], scenario_context)
+            raw = extract_llm_text(
+                self._llm.invoke([HumanMessage(content=prompt)])
+            )
+            return self._parse_analyze_response(raw)
+        except Exception:
+            return self._empty_analyze()
+
     def should_provide_feedback(self, history: list, interval: int = 3) -> bool:
         """
         ユーザー発話の累計が interval の倍数のとき True（例: interval=3 で 3, 6, 9 回目）。
@@ -119,18 +154,31 @@ class RealtimeFeedbackService:
             "会話履歴:\n" + ("\n".join(lines) if lines else "(なし)")
         )
 
-    def _parse_analyze_response(self, text: str) -> dict:
-        text = (text or "").strip()
-        if not text:
-            return self._empty_analyze()
-        fence = re.search(r"```(?:json)?\s*([\s\S]*?)```", text)
-        if fence:
-            text = fence.group(1).strip()
-        try:
-            data = json.loads(text)
-        except json.JSONDecodeError:
-            return self._empty_analyze()
+    def _build_combined_prompt(self, user_message: str, history: list, scenario_context: Any) -> str:
+        ctx = scenario_context
+        if isinstance(ctx, dict):
+            ctx_str = json.dumps(ctx, ensure_ascii=False)
+        else:
+            ctx_str = str(ctx) if ctx is not None else ""
+
+        lines = []
+        for turn in history[-10:]:
+            if isinstance(turn, dict):
+                lines.append(f"{turn.get('role', '')}: {turn.get('content', '')}")
+
+        return (
+            "あなたは職場コミュニケーションのコーチです。"
+            "ユーザー最新発言への改善フィードバックと、より適切な言い換え候補（最大3つ）を作成し、"
+            "次のJSONスキーマに従うJSONオブジェクトだけを返してください。"
+            "フィードバックが不要な場合も alternatives は返してください。\n"
+            f"{json.dumps(COMBINED_RESPONSE_SCHEMA, ensure_ascii=False)}\n\n"
+            f"シナリオ文脈: {ctx_str}\n"
+            f"ユーザー最新発言: {user_message}\n"
+            "会話履歴:\n" + ("\n".join(lines) if lines else "(なし)")
+        )
 
+    def _parse_analyze_response(self, text: str) -> dict:
+        data = load_json_lenient(text, opener="{")
         if not isinstance(data, dict):
             return self._empty_analyze()
 
@@ -151,18 +199,9 @@ class RealtimeFeedbackService:
         }
 
     def _parse_string_list(self, text: str, max_items: int) -> List[str]:
-        text = (text or "").strip()
-        if not text:
-            return []
-        fence = re.search(r"```(?:json)?\s*([\s\S]*?)```", text)
-        if fence:
-            text = fence.group(1).strip()
-        try:
-            data = json.loads(text)
-        except json.JSONDecodeError:
-            return []
+        data = load_json_lenient(text, opener="[")
         if isinstance(data, list):
-            return [str(x) for x in data[:max_items]]
+            return [str(x) for x in data[:max_items] if x not in (None, "")]
         return []
 
     def _empty_analyze(self) -> dict:
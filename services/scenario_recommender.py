@@ -0,0 +1,241 @@
+"""
+弱点に基づくシナリオ推薦
+
+シナリオカタログの読み込み時に、各シナリオの learning_points / feedback_points から
+「シナリオ×スキル軸」の行列（SkillMatrix）を作っておき、推薦時はユーザーの弱点ベクトルとの
+内積（NumPy）だけで全シナリオを一度に採点する。
+
+- 弱点ベクトル: 6軸の XP（skill_xp）のうち、最も伸びている軸との差が大きい軸ほど重い
+- 難易度: アンロック済みの最上位の難易度に近いシナリオを優先する
+- 完了回数: 何度も完了したシナリオは順位を下げる
+- アンロックされていない難易度のシナリオは推薦しない（UnlockService の状態）
+
+ユーザーごとの推薦結果は、XP 履歴・完了数・アンロック状態が変わる（次の XP 獲得）まで
+プロセス内メモリに保持する。
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.gamification_constants import SIX_AXES
+from services.unlock_service import UnlockService, get_scenario_difficulty
+
+DIFFICULTY_LEVELS = ("beginner", "intermediate", "advanced")
+
+# learning_points / feedback_points の文言からスキル軸を推定するキーワード
+AXIS_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "empathy": ("気持ち", "共感", "立場", "配慮", "寄り添", "感情", "思いやり", "心理", "不安", "受け止め"),
+    "clarity": ("明確", "簡潔", "結論", "説明", "伝え", "具体", "論理", "要点", "わかりやす", "分かりやす", "的確"),
+    "active_listening": ("聞", "聴", "質問", "確認", "引き出", "要約", "把握", "意図"),
+    "adaptability": ("柔軟", "状況", "臨機応変", "調整", "変化", "価値観", "世代", "違い", "対応", "優先"),
+    "positivity": ("前向き", "建設的", "励", "感謝", "褒", "評価", "成長", "認め", "モチベーション", "解決"),
+    "professionalism": (
+        "敬語", "丁寧", "礼儀", "マナー", "報告", "連絡", "相談", "責任", "境界", "ハラスメント", "断", "距離感",
+    ),
+}
+
+# 推薦スコアの重み
+DIFFICULTY_PENALTY = 0.15
+COMPLETION_DECAY = 0.5
+
+_matrix_versions = itertools.count(1)
+
+
+def _scenario_texts(scenario: Dict[str, Any]) -> List[str]:
+    texts = []
+    for field in ("learning_points", "feedback_points"):
+        value = scenario.get(field)
+        if isinstance(value, str):
+            texts.append(value)
+        elif isinstance(value, list):
+            texts.extend(str(item) for item in value if item)
+    return texts
+
+
+def scenario_axis_vector(scenario: Dict[str, Any]) -> np.ndarray:
+    """
+    シナリオがどのスキル軸を練習するか（合計1の6次元ベクトル）
+
+    learning_points / feedback_points にキーワードがなければ全軸に等しく配分する。
+    """
+    counts = np.zeros(len(SIX_AXES))
+    for text in _scenario_texts(scenario):
+        for i, axis in enumerate(SIX_AXES):
+            counts[i] += sum(1 for keyword in AXIS_KEYWORDS[axis] if keyword in text)
+    total = counts.sum()
+    if total == 0:
+        return np.full(len(SIX_AXES), 1.0 / len(SIX_AXES))
+    return counts / total
+
+
+class SkillMatrix:
+    """シナリオカタログから作る「シナリオ×スキル軸」の行列（読み取り専用）"""
+
+    def __init__(self, scenarios: Dict[str, Any]):
+        self.version = next(_matrix_versions)
+        items = [(sid, data) for sid, data in (scenarios or {}).items() if isinstance(data, dict)]
+        self.scenario_ids: List[str] = [sid for sid, _ in items]
+        self.titles: List[str] = [str(data.get("title", sid)) for sid, data in items]
+        self.difficulties: List[str] = [get_scenario_difficulty(data) for _, data in items]
+        self.index = {sid: i for i, sid in enumerate(self.scenario_ids)}
+        self.axes = (
+            np.vstack([scenario_axis_vector(data) for _, data in items])
+            if items
+            else np.zeros((0, len(SIX_AXES)))
+        )
+        self.levels = np.array([DIFFICULTY_LEVELS.index(d) for d in self.difficulties], dtype=int)
+
+    def __len__(self) -> int:
+        return len(self.scenario_ids)
+
+
+def weakness_vector(skill_xp: Dict[str, Any]) -> np.ndarray:
+    """
+    6軸の XP から弱点ベクトル（合計1）を作る
+
+    最も XP の多い軸との差に 1 を足して正規化する（XP がなければ全軸に等しい重み）。
+    """
+    xp = np.array([max(0, _to_int(skill_xp.get(axis))) for axis in SIX_AXES], dtype=float)
+    gap = xp.max() - xp + 1.0
+    return gap / gap.sum()
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class ScenarioRecommender:
+    """弱点ベクトルとシナリオ×スキル軸行列の内積でシナリオを推薦する"""
+
+    def __init__(self, scenario_service: Any, max_cached_users: int = 1024):
+        """
+        Args:
+            scenario_service: get_skill_matrix() を持つ ScenarioService
+            max_cached_users: 推薦結果を保持するユーザー数の上限
+        """
+        self._scenarios = scenario_service
+        self.max_cached_users = max_cached_users
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[Tuple, List[Dict[str, Any]]]]" = OrderedDict()
+
+    def _unlock_flags(self, user_id: str, user_data_service: Any) -> Dict[str, bool]:
+        progress = UnlockService(user_data_service, self._scenarios).get_unlock_progress(user_id)
+        return {level: bool(progress.get(level, {}).get("unlocked")) for level in DIFFICULTY_LEVELS}
+
+    @staticmethod
+    def _signature(matrix: SkillMatrix, data: Dict[str, Any]) -> Tuple:
+        """推薦結果を作り直す必要があるかの判定用（XP 獲得・完了・アンロックで変わる）"""
+        completions = data.get("scenario_completions") or {}
+        unlock_status = data.get("unlock_status") or {}
+        counts = ((sid, _to_int(info.get("count"))) for sid, info in completions.items() if isinstance(info, dict))
+        return (
+            matrix.version,
+            len(data.get("xp_history") or []),
+            tuple(sorted(counts)),
+            tuple(sorted((k, bool(v)) for k, v in unlock_status.items())),
+        )
+
+    def rank(self, matrix: SkillMatrix, data: Dict[str, Any], unlocked: Dict[str, bool]) -> List[Dict[str, Any]]:
+        """
+        全シナリオを採点してスコアの高い順に並べる（アンロックされていないシナリオは除く）
+
+        Returns:
+            [{"scenario_id", "title", "difficulty", "score", "focus_axes"}]
+        """
+        if len(matrix) == 0:
+            return []
+        weakness = weakness_vector(data.get("skill_xp") or {})
+        relevance = matrix.axes @ weakness
+
+        target_level = max((i for i, level in enumerate(DIFFICULTY_LEVELS) if unlocked.get(level)), default=0)
+        completions = data.get("scenario_completions") or {}
+        counts = np.zeros(len(matrix))
+        for sid, info in completions.items():
+            i = matrix.index.get(sid)
+            if i is not None and isinstance(info, dict):
+                counts[i] = _to_int(info.get("count"))
+
+        scores = relevance * len(SIX_AXES) * (1.0 - DIFFICULTY_PENALTY * np.abs(matrix.levels - target_level))
+        scores = scores / (1.0 + COMPLETION_DECAY * counts)
+        mask = np.array([bool(unlocked.get(d)) for d in matrix.difficulties])
+
+        # 同点はカタログ順（安定ソート）
+        order = [i for i in np.argsort(-scores, kind="stable") if mask[i]]
+        # シナリオごとに、弱点と重なりの大きい軸
+        contributions = matrix.axes * weakness
+        results = []
+        for i in order:
+            focus = [SIX_AXES[j] for j in np.argsort(-contributions[i], kind="stable")[:2]]
+            results.append(
+                {
+                    "scenario_id": matrix.scenario_ids[i],
+                    "title": matrix.titles[i],
+                    "difficulty": matrix.difficulties[i],
+                    "score": round(float(scores[i]), 4),
+                    "focus_axes": focus,
+                }
+            )
+        return results
+
+    def recommend(self, user_id: str, user_data_service: Any, limit: int = 5) -> Dict[str, Any]:
+        """
+        ユーザーに推薦するシナリオ
+
+        Returns:
+            {"recommendations": [...], "weakness": {軸: 重み}}
+        """
+        matrix = self._scenarios.get_skill_matrix()
+        data = user_data_service.get_user_data(user_id)
+        signature = self._signature(matrix, data)
+
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached is not None and cached[0] == signature:
+                self._cache.move_to_end(user_id)
+                ranking = cached[1]
+            else:
+                ranking = None
+        if ranking is None:
+            ranking = self.rank(matrix, data, self._unlock_flags(user_id, user_data_service))
+            with self._lock:
+                self._cache[user_id] = (signature, ranking)
+                self._cache.move_to_end(user_id)
+                while len(self._cache) > self.max_cached_users:
+                    self._cache.popitem(last=False)
+
+        weakness = weakness_vector(data.get("skill_xp") or {})
+        return {
+            "recommendations": [dict(item) for item in ranking[: max(0, limit)]],
+            "weakness": {axis: round(float(w), 4) for axis, w in zip(SIX_AXES, weakness)},
+        }
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        """推薦結果の保持を破棄（user_id が None なら全ユーザー）"""
+        with self._lock:
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(user_id, None)
+
+
+# グローバルインスタンス
+_scenario_recommender: Optional[ScenarioRecommender] = None
+
+
+def get_scenario_recommender() -> ScenarioRecommender:
+    """ScenarioRecommenderのシングルトンインスタンスを取得"""
+    global _scenario_recommender
+    if _scenario_recommender is None:
+        from services.scenario_service import get_scenario_service
+
+        _scenario_recommender = ScenarioRecommender(get_scenario_service())
+    return _scenario_recommender
@@ -3,9 +3,11 @@ Scenario service for the workplace-roleplay application.
 Handles scenario-related business logic.
 """
 
-from typing import Any, Dict, Optional, Tuple
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
 
-from scenarios import load_scenarios
+from scenarios import get_data_signature, load_scenarios
 from scenarios.category_manager import (
     get_categorized_scenarios as get_categorized_scenarios_func,
 )
@@ -13,6 +15,16 @@ from scenarios.category_manager import (
     get_scenario_category_summary,
     is_harassment_scenario,
 )
+from services.scenario_recommender import SkillMatrix
+from utils.performance import content_hash, get_prompt_cache
+
+# シナリオファイルの変更確認の最小間隔（秒）
+RELOAD_CHECK_INTERVAL_SECONDS = 5.0
+
+# 事前生成するプロンプトの種類
+_PROMPT_KINDS = ("system", "system_reverse", "initial", "initial_reverse")
+
+_MISSING = object()
 
 
 class ScenarioService:
@@ -21,16 +33,96 @@ class ScenarioService:
     def __init__(self):
         """サービスを初期化"""
         self._scenarios = None
+        # シナリオ辞書（id()）→ 内容ハッシュ。カタログのシナリオは読み取り専用として扱う
+        self._content_hashes: Dict[int, str] = {}
+        self._skill_matrix = None
+        self._data_signature = None
+        self._last_reload_check = time.monotonic()
+        self._reload_lock = threading.Lock()
         self._load_scenarios()
 
     def _load_scenarios(self):
-        """シナリオをロード"""
+        """シナリオをロードし、プロンプトを事前生成する"""
+        try:
+            self._data_signature = get_data_signature()
+        except OSError:
+            self._data_signature = None
         try:
             self._scenarios = load_scenarios()
             print(f"✅ ScenarioService: シナリオロード成功: {len(self._scenarios)}個")
         except Exception as e:
             print(f"❌ ScenarioService: シナリオロードエラー: {e}")
             self._scenarios = {}
+        self._precompute_prompts()
+        self._skill_matrix = SkillMatrix(self._scenarios)
+
+    def _precompute_prompts(self) -> None:
+        """全シナリオの通常/リバースロールのプロンプトと初期メッセージを生成してキャッシュする"""
+        previous = set(self._content_hashes.values())
+        hashes: Dict[int, str] = {}
+        for scenario_data in (self._scenarios or {}).values():
+            if not isinstance(scenario_data, dict):
+                continue
+            digest = content_hash(scenario_data)
+            hashes[id(scenario_data)] = digest
+            for kind in _PROMPT_KINDS:
+                self._cached_prompt(kind, scenario_data, digest)
+        self._content_hashes = hashes
+
+        # 変更・削除されたシナリオのエントリを破棄
+        cache = get_prompt_cache()
+        for digest in previous - set(hashes.values()):
+            for kind in _PROMPT_KINDS:
+                cache.delete(f"scenario:{digest}:{kind}")
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """
+        シナリオファイルが変更されていれば再ロードする（確認は一定間隔ごと）
+
+        Args:
+            force: Trueの場合は確認間隔を無視する
+
+        Returns:
+            bool: 再ロードした場合True
+        """
+        now = time.monotonic()
+        if not force and now - self._last_reload_check < RELOAD_CHECK_INTERVAL_SECONDS:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            self._last_reload_check = now
+            try:
+                signature = get_data_signature()
+            except OSError:
+                return False
+            if signature == self._data_signature:
+                return False
+            print("🔄 ScenarioService: シナリオファイルの変更を検知しました。再ロードします")
+            self._load_scenarios()
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def _cached_prompt(self, kind: str, scenario_data: Dict[str, Any], digest: Optional[str] = None) -> Any:
+        """内容ハッシュをキーにプロンプトキャッシュから取得（なければ生成して保存）"""
+        if digest is None:
+            digest = self._content_hashes.get(id(scenario_data)) or content_hash(scenario_data)
+        key = f"scenario:{digest}:{kind}"
+        cache = get_prompt_cache()
+        value = cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = self._prompt_renderers()[kind](scenario_data)
+            cache.set(key, value)
+        return value
+
+    def _prompt_renderers(self) -> Dict[str, Callable[[Dict[str, Any]], Any]]:
+        return {
+            "system": self._render_system_prompt,
+            "system_reverse": self._render_reverse_role_prompt,
+            "initial": lambda data: self._render_initial_message(data, False),
+            "initial_reverse": lambda data: self._render_initial_message(data, True),
+        }
 
     def get_all_scenarios(self) -> Dict[str, Any]:
         """
@@ -39,8 +131,19 @@ class ScenarioService:
         Returns:
             Dict[str, Any]: シナリオIDをキーとするシナリオデータの辞書
         """
+        self.reload_if_changed()
         return self._scenarios.copy() if self._scenarios else {}
 
+    def get_skill_matrix(self) -> SkillMatrix:
+        """
+        シナリオ×スキル軸の行列を取得（シナリオのロード時に作成）
+
+        Returns:
+            SkillMatrix: シナリオ推薦（services.scenario_recommender）で使う行列
+        """
+        self.reload_if_changed()
+        return self._skill_matrix
+
     def get_scenario_by_id(self, scenario_id: str) -> Optional[Dict[str, Any]]:
         """
         指定されたIDのシナリオを取得
@@ -51,6 +154,7 @@ class ScenarioService:
         Returns:
             Optional[Dict[str, Any]]: シナリオデータ、存在しない場合はNone
         """
+        self.reload_if_changed()
         if not self._scenarios:
             return None
         return self._scenarios.get(scenario_id)
@@ -97,9 +201,9 @@ class ScenarioService:
         Returns:
             str: システムプロンプト
         """
-        if is_reverse_role:
-            return scenario_data.get("system_prompt", "")
+        return self._cached_prompt("system_reverse" if is_reverse_role else "system", scenario_data)
 
+    def _render_system_prompt(self, scenario_data: Dict[str, Any]) -> str:
         character_setting = scenario_data.get("character_setting", {})
         personality = character_setting.get("personality", "未設定")
         speaking_style = character_setting.get("speaking_style", "未設定")
@@ -153,6 +257,9 @@ class ScenarioService:
         Returns:
             str: システムプロンプト
         """
+        return self._cached_prompt("system_reverse", scenario_data)
+
+    def _render_reverse_role_prompt(self, scenario_data: Dict[str, Any]) -> str:
         return scenario_data.get("system_prompt", "")
 
     def get_initial_message(self, scenario_data: Dict[str, Any], is_reverse_role: bool = False) -> Optional[str]:
@@ -166,6 +273,9 @@ class ScenarioService:
         Returns:
             Optional[str]: 初期メッセージ、不要な場合はNone
         """
+        return self._cached_prompt("initial_reverse" if is_reverse_role else "initial", scenario_data)
+
+    def _render_initial_message(self, scenario_data: Dict[str, Any], is_reverse_role: bool) -> Optional[str]:
         if is_reverse_role:
             initial_context = scenario_data.get("initial_context", "")
             if initial_context:
@@ -0,0 +1,470 @@
+"""
+ユーザー単位の短命なセッションの登録簿（三者会話モード等）
+
+ワーカー間で共有する Redis 版と、単一プロセス用のインメモリ版を同じインターフェースで提供する。
+どちらも最終アクセスからの無操作時間（idle_ttl）で自動的に消え、同時セッション数に上限を持つため、
+退出しないユーザーのセッションが溜まり続けることはない。
+
+Redis 版のキー構成:
+    <prefix>:{<namespace>}:session:<user_id>        セッションの内容（JSON、idle_ttl 秒の有効期限）
+    <prefix>:{<namespace>}:session:<user_id>:items  セッションに追記する要素のリスト（append_items / pop_items）
+    <prefix>:{<namespace>}:index                    user_id → 最終アクセス時刻の sorted set（件数の上限判定用）
+    <prefix>:{<namespace>}:slots:<user_id>          ユーザーの処理中の件数（acquire_slot / release_slot）
+作成・延長・追記・取り出し・枠の確保は Lua スクリプトで原子的に行う
+（同じユーザーが別ワーカーから同時に参加・生成しても二重登録や上限超過にならない）。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# create() の結果
+CREATED = "created"
+EXISTS = "exists"
+FULL = "full"
+
+DEFAULT_KEY_PREFIX = "workplace-roleplay"
+
+# KEYS: セッションキー, インデックス, 追記リスト / ARGV: user_id, 内容, idle_ttl, 現在時刻, 上限（0 は無制限）
+_CREATE_SCRIPT = """
+local ttl = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local limit = tonumber(ARGV[5])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - ttl)
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+if limit > 0 and redis.call('ZCARD', KEYS[2]) >= limit then
+    return -1
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ttl)
+redis.call('ZADD', KEYS[2], now, ARGV[1])
+redis.call('DEL', KEYS[3])
+return 1
+"""
+
+# KEYS: セッションキー, インデックス, 追記リスト / ARGV: user_id, idle_ttl, 現在時刻
+_TOUCH_SCRIPT = """
+if redis.call('EXPIRE', KEYS[1], ARGV[2]) == 1 then
+    redis.call('EXPIRE', KEYS[3], ARGV[2])
+    redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+    return 1
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+return 0
+"""
+
+# KEYS: セッションキー, インデックス, 追記リスト / ARGV: user_id, idle_ttl, 現在時刻, 要素（JSON）...
+_APPEND_SCRIPT = """
+if redis.call('EXPIRE', KEYS[1], ARGV[2]) == 0 then
+    return 0
+end
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+for i = 4, #ARGV do
+    redis.call('RPUSH', KEYS[3], ARGV[i])
+end
+redis.call('EXPIRE', KEYS[3], ARGV[2])
+return 1
+"""
+
+# KEYS: 追記リスト
+_POP_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, -1)
+redis.call('DEL', KEYS[1])
+return items
+"""
+
+# KEYS: 処理中の件数 / ARGV: 上限（0 は無制限）, 有効期限（秒）
+_ACQUIRE_SLOT_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local active = redis.call('INCR', KEYS[1])
+if limit > 0 and active > limit then
+    redis.call('DECR', KEYS[1])
+    return 0
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+# KEYS: 処理中の件数
+_RELEASE_SLOT_SCRIPT = """
+if redis.call('DECR', KEYS[1]) <= 0 then
+    redis.call('DEL', KEYS[1])
+end
+return 1
+"""
+
+# KEYS: セッションキー, インデックス / ARGV: user_id, 内容, idle_ttl, 現在時刻
+_UPDATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[4], ARGV[1])
+return 1
+"""
+
+_CREATE_RESULTS = {1: CREATED, 0: EXISTS, -1: FULL}
+
+
+class InMemorySessionRegistry:
+    """
+    単一プロセス用のセッション登録簿（スレッドセーフ）
+
+    最終アクセス順の OrderedDict で持ち、期限切れは先頭から順に削除する。
+    """
+
+    def __init__(self, idle_ttl: float = 1800, max_sessions: int = 1000):
+        """
+        Args:
+            idle_ttl: 最終アクセスからセッションが消えるまでの秒数
+            max_sessions: 同時セッション数の上限（0 は無制限）
+        """
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        # user_id → (内容, 最終アクセスの time.monotonic())
+        self._sessions: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        # user_id → append_items で追記した要素
+        self._items: Dict[str, List[Any]] = {}
+        # user_id → 処理中の件数（acquire_slot / release_slot）
+        self._slots: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _purge_expired(self, now: float) -> None:
+        while self._sessions:
+            user_id, (_, last_seen) = next(iter(self._sessions.items()))
+            if now - last_seen < self.idle_ttl:
+                break
+            del self._sessions[user_id]
+            self._items.pop(user_id, None)
+
+    def create(self, user_id: str, data: Dict[str, Any]) -> str:
+        """
+        セッションを作成
+
+        Returns:
+            CREATED / EXISTS（既に参加中）/ FULL（同時セッション数の上限）
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            if user_id in self._sessions:
+                return EXISTS
+            if self.max_sessions and len(self._sessions) >= self.max_sessions:
+                return FULL
+            self._sessions[user_id] = (dict(data), now)
+            self._items.pop(user_id, None)
+            return CREATED
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """セッションの内容を取得（期限を延長しない）"""
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            entry = self._sessions.get(user_id)
+            return dict(entry[0]) if entry else None
+
+    def touch(self, user_id: str) -> bool:
+        """最終アクセスを更新して期限を延長（セッションがなければ False）"""
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._sessions.get(user_id)
+            if entry is None:
+                return False
+            self._sessions[user_id] = (entry[0], now)
+            self._sessions.move_to_end(user_id)
+            return True
+
+    def update(self, user_id: str, data: Dict[str, Any]) -> bool:
+        """セッションの内容を置き換えて期限を延長（セッションがなければ作成せず False）"""
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            if user_id not in self._sessions:
+                return False
+            self._sessions[user_id] = (dict(data), now)
+            self._sessions.move_to_end(user_id)
+            return True
+
+    def append_items(self, user_id: str, items: List[Any]) -> bool:
+        """セッションのリストに要素を追記して期限を延長（セッションがなければ False）"""
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._sessions.get(user_id)
+            if entry is None:
+                return False
+            self._items.setdefault(user_id, []).extend(items)
+            self._sessions[user_id] = (entry[0], now)
+            self._sessions.move_to_end(user_id)
+            return True
+
+    def pop_items(self, user_id: str) -> List[Any]:
+        """append_items で追記した要素をすべて取り出す（取り出した要素は消える）"""
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return self._items.pop(user_id, [])
+
+    def acquire_slot(self, user_id: str, limit: int, ttl: float) -> bool:
+        """
+        ユーザーの処理中の件数を1つ増やす（上限に達していれば増やさずに False）
+
+        ttl は Redis 版との互換のための引数（プロセス内の件数はプロセスと共に消える）。
+        """
+        with self._lock:
+            active = self._slots.get(user_id, 0)
+            if limit and active >= limit:
+                return False
+            self._slots[user_id] = active + 1
+            return True
+
+    def release_slot(self, user_id: str) -> bool:
+        """acquire_slot で増やした件数を戻す（処理中の件数がなければ False）"""
+        with self._lock:
+            active = self._slots.get(user_id, 0)
+            if active > 1:
+                self._slots[user_id] = active - 1
+            else:
+                self._slots.pop(user_id, None)
+            return active > 0
+
+    def delete(self, user_id: str) -> bool:
+        with self._lock:
+            self._items.pop(user_id, None)
+            return self._sessions.pop(user_id, None) is not None
+
+    def count(self) -> int:
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return len(self._sessions)
+
+
+class RedisSessionRegistry:
+    """
+    Redis で共有するセッション登録簿（全ワーカーで同じセッションを参照する）
+
+    RedisSessionManager（utils.redis_manager）の接続を使い、未接続・接続断の間は
+    プロセス内の InMemorySessionRegistry で継続する（再接続後は Redis に戻る）。
+    """
+
+    def __init__(
+        self,
+        manager,
+        namespace: str,
+        idle_ttl: float = 1800,
+        max_sessions: int = 1000,
+        key_prefix: str = DEFAULT_KEY_PREFIX,
+    ):
+        """
+        Args:
+            manager: RedisSessionManager
+            namespace: キーの名前空間（例: "three_way"）
+            idle_ttl: 最終アクセスからセッションが消えるまでの秒数
+            max_sessions: 同時セッション数の上限（0 は無制限）
+            key_prefix: キーの接頭辞
+        """
+        self.manager = manager
+        self.idle_ttl = int(idle_ttl)
+        self.max_sessions = max_sessions
+        # ハッシュタグで同じスロットに置く（Redis Cluster でも Lua スクリプトから両方のキーを操作できる）
+        self._key_base = f"{key_prefix}:{{{namespace}}}"
+        self._index_key = f"{self._key_base}:index"
+        self._fallback = InMemorySessionRegistry(idle_ttl, max_sessions)
+        self._scripts: Dict[str, Any] = {}
+
+    def _session_key(self, user_id: str) -> str:
+        return f"{self._key_base}:session:{user_id}"
+
+    def _items_key(self, user_id: str) -> str:
+        return f"{self._key_base}:session:{user_id}:items"
+
+    def _slots_key(self, user_id: str) -> str:
+        return f"{self._key_base}:slots:{user_id}"
+
+    def _client(self):
+        """接続中の Redis クライアント（未接続なら None）"""
+        if not getattr(self.manager, "_is_connected", False):
+            return None
+        return self.manager._client
+
+    def _script(self, client, source: str):
+        script = self._scripts.get(source)
+        if script is None:
+            # EVALSHA で送り、サーバーにスクリプトがなければ自動で読み込み直す
+            script = self._scripts[source] = client.register_script(source)
+        return script
+
+    def _on_error(self, operation: str, error: Exception) -> None:
+        logger.warning(f"Redisセッション登録簿の{operation}に失敗、プロセス内の登録簿を使用: {error}")
+
+    def create(self, user_id: str, data: Dict[str, Any]) -> str:
+        """
+        セッションを作成
+
+        Returns:
+            CREATED / EXISTS（既に参加中。他のワーカーで参加した場合を含む）/ FULL（同時セッション数の上限）
+        """
+        client = self._client()
+        if client is not None:
+            try:
+                result = self._script(client, _CREATE_SCRIPT)(
+                    keys=[self._session_key(user_id), self._index_key, self._items_key(user_id)],
+                    args=[
+                        user_id,
+                        json.dumps(data, ensure_ascii=False),
+                        self.idle_ttl,
+                        time.time(),
+                        self.max_sessions,
+                    ],
+                )
+                return _CREATE_RESULTS[int(result)]
+            except redis.RedisError as e:
+                self._on_error("作成", e)
+        return self._fallback.create(user_id, data)
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """セッションの内容を取得（期限を延長しない）"""
+        client = self._client()
+        if client is not None:
+            try:
+                raw = client.get(self._session_key(user_id))
+                return json.loads(raw) if raw else None
+            except redis.RedisError as e:
+                self._on_error("取得", e)
+        return self._fallback.get(user_id)
+
+    def touch(self, user_id: str) -> bool:
+        """最終アクセスを更新して期限を延長（セッションがなければ False）"""
+        client = self._client()
+        if client is not None:
+            try:
+                result = self._script(client, _TOUCH_SCRIPT)(
+                    keys=[self._session_key(user_id), self._index_key, self._items_key(user_id)],
+                    args=[user_id, self.idle_ttl, time.time()],
+                )
+                return bool(int(result))
+            except redis.RedisError as e:
+                self._on_error("延長", e)
+        return self._fallback.touch(user_id)
+
+    def update(self, user_id: str, data: Dict[str, Any]) -> bool:
+        """セッションの内容を置き換えて期限を延長（セッションがなければ作成せず False）"""
+        client = self._client()
+        if client is not None:
+            try:
+                result = self._script(client, _UPDATE_SCRIPT)(
+                    keys=[self._session_key(user_id), self._index_key],
+                    args=[user_id, json.dumps(data, ensure_ascii=False), self.idle_ttl, time.time()],
+                )
+                return bool(int(result))
+            except redis.RedisError as e:
+                self._on_error("更新", e)
+        return self._fallback.update(user_id, data)
+
+    def append_items(self, user_id: str, items: List[Any]) -> bool:
+        """セッションのリストに要素を追記して期限を延長（セッションがなければ False）"""
+        client = self._client()
+        if client is not None:
+            try:
+                result = self._script(client, _APPEND_SCRIPT)(
+                    keys=[self._session_key(user_id), self._index_key, self._items_key(user_id)],
+                    args=[user_id, self.idle_ttl, time.time()]
+                    + [json.dumps(item, ensure_ascii=False) for item in items],
+                )
+                return bool(int(result))
+            except redis.RedisError as e:
+                self._on_error("追記", e)
+        return self._fallback.append_items(user_id, items)
+
+    def pop_items(self, user_id: str) -> List[Any]:
+        """append_items で追記した要素をすべて取り出す（取り出した要素は消える）"""
+        client = self._client()
+        if client is not None:
+            try:
+                raw_items = self._script(client, _POP_SCRIPT)(keys=[self._items_key(user_id)])
+                return [json.loads(raw) for raw in raw_items or []]
+            except redis.RedisError as e:
+                self._on_error("取り出し", e)
+        return self._fallback.pop_items(user_id)
+
+    def acquire_slot(self, user_id: str, limit: int, ttl: float) -> bool:
+        """
+        ユーザーの処理中の件数を1つ増やす（上限に達していれば増やさずに False）
+
+        件数は全ワーカーで共有し、ttl 秒で消える（確保したワーカーが release_slot せずに落ちた場合の回収）。
+        """
+        client = self._client()
+        if client is not None:
+            try:
+                result = self._script(client, _ACQUIRE_SLOT_SCRIPT)(
+                    keys=[self._slots_key(user_id)], args=[limit, max(1, int(ttl))]
+                )
+                return bool(int(result))
+            except redis.RedisError as e:
+                self._on_error("枠の確保", e)
+        return self._fallback.acquire_slot(user_id, limit, ttl)
+
+    def release_slot(self, user_id: str) -> bool:
+        """acquire_slot で増やした件数を戻す"""
+        # 接続断の間にプロセス内で確保した枠はプロセス内で戻す（Redis の件数は減らさない）
+        if self._fallback.release_slot(user_id):
+            return True
+        client = self._client()
+        if client is not None:
+            try:
+                self._script(client, _RELEASE_SLOT_SCRIPT)(keys=[self._slots_key(user_id)])
+                return True
+            except redis.RedisError as e:
+                self._on_error("枠の解放", e)
+        return False
+
+    def delete(self, user_id: str) -> bool:
+        # 接続断の間にプロセス内で作成したセッションも消す
+        deleted = self._fallback.delete(user_id)
+        client = self._client()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                pipe.delete(self._session_key(user_id), self._items_key(user_id))
+                pipe.zrem(self._index_key, user_id)
+                removed, _ = pipe.execute()
+                deleted = deleted or bool(removed)
+            except redis.RedisError as e:
+                self._on_error("削除", e)
+        return deleted
+
+    def count(self) -> int:
+        client = self._client()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                pipe.zremrangebyscore(self._index_key, "-inf", time.time() - self.idle_ttl)
+                pipe.zcard(self._index_key)
+                return int(pipe.execute()[1])
+            except redis.RedisError as e:
+                self._on_error("件数取得", e)
+        return self._fallback.count()
+
+
+def create_session_registry(namespace: str, idle_ttl: float = 1800, max_sessions: int = 1000):
+    """
+    セッション登録簿を作成
+
+    Redisセッションストア（core.extensions）が有効なら全ワーカーで共有する Redis 版、
+    そうでなければ単一プロセス用のインメモリ版を返す。
+    """
+    from core.extensions import get_redis_session_manager
+
+    manager = get_redis_session_manager()
+    if manager is not None:
+        return RedisSessionRegistry(manager, namespace, idle_ttl=idle_ttl, max_sessions=max_sessions)
+    return InMemorySessionRegistry(idle_ttl=idle_ttl, max_sessions=max_sessions)
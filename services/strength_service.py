@@ -122,24 +122,39 @@ class StrengthService:
             else:
                 history = session.get("scenario_history", {}).get(scenario_id, [])
 
-            if history:
-                # 強み分析を実行
-                formatted_history = format_conversation_history(history)
-                scores = analyze_user_strengths(formatted_history)
-
-                # トップ3の強みを取得
-                top_strengths = get_top_strengths(scores, 3)
-
+            strength_analysis = self.build_strength_analysis(history)
+            if strength_analysis:
                 # フィードバックレスポンスに追加
-                feedback_response["strength_analysis"] = {
-                    "scores": scores,
-                    "top_strengths": top_strengths,
-                }
+                feedback_response["strength_analysis"] = strength_analysis
         except Exception as e:
             print(f"Error adding strength analysis to feedback: {str(e)}")
 
         return feedback_response
 
+    def build_strength_analysis(self, history: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        会話履歴から強み分析（スコアとトップ3）を構築する
+
+        セッションに依存しないため、バックグラウンドタスクからも利用できる。
+
+        Args:
+            history: 会話履歴
+
+        Returns:
+            Dict[str, Any]: {"scores", "top_strengths"}（履歴が空の場合は空辞書）
+        """
+        if not history:
+            return {}
+
+        # 強み分析を実行
+        formatted_history = format_conversation_history(history)
+        scores = analyze_user_strengths(formatted_history)
+
+        # トップ3の強みを取得
+        top_strengths = get_top_strengths(scores, 3)
+
+        return {"scores": scores, "top_strengths": top_strengths}
+
 
 # グローバルインスタンス
 _strength_service: "StrengthService" = None
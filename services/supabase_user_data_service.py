@@ -1,42 +1,206 @@
 """
 Supabase 上のユーザーデータ（user_data テーブル想定）
+
+永続化モード（環境変数 SUPABASE_PERSISTENCE_MODE）:
+- document（デフォルト）: user_data.data に JSONB 全体を UPSERT する
+- normalized: 変更部分のみを書き込む。skill_xp は変更された軸のみ、xp_history は追加された行のみ、
+  badges は獲得したバッジのみ INSERT し、user_data.data にはそれ以外（コア部分）が変わった場合だけ書き込む。
+  1回の保存の書き込み量は XP 履歴の件数によらず一定（migrations/004_normalized_user_data.sql が必要）。
 """
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
-from services.gamification_constants import utc_now_iso
+from services.gamification_constants import SIX_AXES, utc_now_iso
 from services.user_data_service import UserDataService
 
+ENV_SUPABASE_PERSISTENCE_MODE = "SUPABASE_PERSISTENCE_MODE"
+PERSISTENCE_DOCUMENT = "document"
+PERSISTENCE_NORMALIZED = "normalized"
+
+# normalized モードで user_data.data ではなく正規化テーブルに保存するキー
+NORMALIZED_KEYS = ("skill_xp", "xp_history", "badges")
+
+# xp_history の行IDの名前空間（ユーザーID・日時・獲得元から決定的に生成し、再送時の重複を防ぐ）
+_XP_HISTORY_NAMESPACE = uuid.UUID("0f6b7f7e-3c1e-4d8a-9a57-2f7c1f0e6b11")
+
+
+def _fingerprint(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def _canonical_timestamp(value: Any) -> str:
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return str(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def _earned_badges(data: Dict[str, Any]) -> List[Any]:
+    badges = data.get("badges")
+    earned = badges.get("earned") if isinstance(badges, dict) else None
+    return earned if isinstance(earned, list) else []
+
+
+def _core(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in data.items() if k not in NORMALIZED_KEYS}
+
+
+@dataclass
+class _ListSnapshot:
+    """追記のみのリストの状態（件数と末尾要素の指紋）"""
+
+    length: int
+    last: Optional[str]
+
+    @classmethod
+    def of(cls, items: List[Any]) -> "_ListSnapshot":
+        return cls(len(items), _fingerprint(items[-1]) if items else None)
+
+    def appended(self, items: List[Any]) -> Optional[List[Any]]:
+        """追記された要素（既存部分が書き換えられていれば None）"""
+        if len(items) < self.length:
+            return None
+        if self.length and _fingerprint(items[self.length - 1]) != self.last:
+            return None
+        return items[self.length :]
+
+
+@dataclass
+class _DocumentSnapshot:
+    skill_xp: Dict[str, int]
+    xp_history: _ListSnapshot
+    badges: _ListSnapshot
+    core: str
+    legacy: bool
+
+
+@dataclass
+class UserDocumentChanges:
+    """前回の読み込み（保存）時点からの変更"""
+
+    # 差分を求められない（スナップショットなし・履歴の書き換え・旧形式からの移行）ため全体を書き込む
+    full: bool = False
+    skill_xp: Dict[str, int] = field(default_factory=dict)
+    xp_history: List[Tuple[int, Dict[str, Any]]] = field(default_factory=list)
+    badges: List[Dict[str, Any]] = field(default_factory=list)
+    core_changed: bool = False
+
+    @property
+    def empty(self) -> bool:
+        return not (self.full or self.skill_xp or self.xp_history or self.badges or self.core_changed)
+
+
+class UserDocumentTracker:
+    """
+    ユーザードキュメントの変更追跡
+
+    読み込み・保存時にスナップショットを記録し、次の保存時に差分を求める。
+    xp_history と badges.earned は追記のみとして件数と末尾要素の指紋、skill_xp は軸ごとの値、
+    それ以外（コア部分）は JSON の指紋を保持するため、スナップショットの大きさは履歴の件数によらない。
+    """
+
+    # 長時間使うインスタンスでもスナップショットが増え続けないよう、古いユーザーから破棄する
+    MAX_USERS = 1024
+
+    def __init__(self) -> None:
+        self._snapshots: "OrderedDict[str, _DocumentSnapshot]" = OrderedDict()
+
+    def snapshot(self, user_id: str, data: Dict[str, Any], legacy: bool = False) -> None:
+        """
+        現在の状態を記録
+
+        Args:
+            legacy: 正規化テーブルに未移行（user_data.data に履歴を含む旧形式）の場合 True。次回は全体を書き込む
+        """
+        skill = data.get("skill_xp") if isinstance(data.get("skill_xp"), dict) else {}
+        history = data.get("xp_history") if isinstance(data.get("xp_history"), list) else []
+        self._snapshots[user_id] = _DocumentSnapshot(
+            skill_xp={axis: int(skill.get(axis, 0) or 0) for axis in SIX_AXES},
+            xp_history=_ListSnapshot.of(history),
+            badges=_ListSnapshot.of(_earned_badges(data)),
+            core=self._core_fingerprint(data),
+            legacy=legacy,
+        )
+        self._snapshots.move_to_end(user_id)
+        while len(self._snapshots) > self.MAX_USERS:
+            self._snapshots.popitem(last=False)
+
+    def forget(self, user_id: str) -> None:
+        self._snapshots.pop(user_id, None)
+
+    def diff(self, user_id: str, data: Dict[str, Any]) -> UserDocumentChanges:
+        snap = self._snapshots.get(user_id)
+        if snap is None or snap.legacy:
+            return UserDocumentChanges(full=True)
+
+        history = data.get("xp_history") if isinstance(data.get("xp_history"), list) else []
+        appended_history = snap.xp_history.appended(history)
+        appended_badges = snap.badges.appended(_earned_badges(data))
+        if appended_history is None or appended_badges is None:
+            return UserDocumentChanges(full=True)
+
+        skill = data.get("skill_xp") if isinstance(data.get("skill_xp"), dict) else {}
+        changed_skill = {
+            axis: int(skill.get(axis, 0) or 0)
+            for axis in SIX_AXES
+            if int(skill.get(axis, 0) or 0) != snap.skill_xp[axis]
+        }
+        return UserDocumentChanges(
+            skill_xp=changed_skill,
+            xp_history=[(snap.xp_history.length + i, entry) for i, entry in enumerate(appended_history)],
+            badges=[b for b in appended_badges if isinstance(b, dict) and b.get("badge_id")],
+            core_changed=self._core_fingerprint(data) != snap.core,
+        )
+
+    @staticmethod
+    def _core_fingerprint(data: Dict[str, Any]) -> str:
+        # 保存のたびに更新される日時は比較しない
+        core = {k: v for k, v in _core(data).items() if k not in ("updated_at", "created_at")}
+        return _fingerprint(core)
+
 
 class SupabaseUserDataService(UserDataService):
     """user_id + data(JSON) を UPSERT で永続化する UserDataService。"""
 
     TABLE = "user_data"
+    SKILL_XP_TABLE = "skill_xp"
+    XP_HISTORY_TABLE = "xp_history"
+    BADGES_TABLE = "badges"
 
-    def __init__(self, client: Any, data_dir: Optional[str] = None) -> None:
-        super().__init__(data_dir=data_dir)
+    def __init__(self, client: Any, data_dir: Optional[str] = None, mode: Optional[str] = None) -> None:
+        # data_dir=None のままだと UserDataService が Supabase への委譲先（自分自身の型）を再帰的に生成するため既定値を渡す
+        super().__init__(data_dir=data_dir if data_dir is not None else self.DATA_DIR)
         self._client = client
+        if mode is None:
+            mode = (os.environ.get(ENV_SUPABASE_PERSISTENCE_MODE) or PERSISTENCE_DOCUMENT).strip().lower()
+        self._mode = mode if mode in (PERSISTENCE_DOCUMENT, PERSISTENCE_NORMALIZED) else PERSISTENCE_DOCUMENT
+        self._tracker = UserDocumentTracker()
+
+    @property
+    def mode(self) -> str:
+        return self._mode
 
     def get_user_data(self, user_id: str) -> Dict[str, Any]:
         if not user_id or not isinstance(user_id, str):
             raise ValueError("user_id must be a non-empty string")
+        if self._mode == PERSISTENCE_NORMALIZED:
+            return self._get_normalized(user_id.strip())
         try:
-            res = (
-                self._client.table(self.TABLE)
-                .select("data")
-                .eq("user_id", user_id.strip())
-                .limit(1)
-                .execute()
-            )
-            rows = getattr(res, "data", None)
-            if isinstance(rows, list) and len(rows) > 0:
-                row = rows[0]
-                if isinstance(row, dict):
-                    d = row.get("data")
-                    if isinstance(d, dict):
-                        return d
+            stored = self._fetch_document(user_id.strip())
+            if stored is not None:
+                return stored
             return self._create_default_data(user_id)
         except Exception:
             return self._create_default_data(user_id)
@@ -44,6 +208,8 @@ class SupabaseUserDataService(UserDataService):
     def save_user_data(self, user_id: str, data: Dict[str, Any]) -> None:
         if data is None or not isinstance(data, dict):
             raise TypeError("data must be a dict")
+        if self._mode == PERSISTENCE_NORMALIZED:
+            return self._save_normalized(user_id, data)
         payload = dict(data)
         payload["user_id"] = user_id
         payload["updated_at"] = utc_now_iso()
@@ -54,3 +220,130 @@ class SupabaseUserDataService(UserDataService):
             "data": payload,
         }
         self._client.table(self.TABLE).upsert(row, on_conflict="user_id").execute()
+
+    def _fetch_document(self, user_id: str) -> Optional[Dict[str, Any]]:
+        res = self._client.table(self.TABLE).select("data").eq("user_id", user_id).limit(1).execute()
+        rows = getattr(res, "data", None)
+        if isinstance(rows, list) and len(rows) > 0:
+            row = rows[0]
+            if isinstance(row, dict):
+                d = row.get("data")
+                if isinstance(d, dict):
+                    return d
+        return None
+
+    # ========== normalized モード ==========
+
+    def _get_normalized(self, user_id: str) -> Dict[str, Any]:
+        try:
+            stored = self._fetch_document(user_id)
+            if stored is not None and any(key in stored for key in NORMALIZED_KEYS):
+                # 旧形式（document モードで保存済み）: 次回の保存で正規化テーブルに移行する
+                self._tracker.snapshot(user_id, stored, legacy=True)
+                return stored
+
+            data = stored if stored is not None else self._create_default_data(user_id)
+            data["skill_xp"] = self._fetch_skill_xp(user_id)
+            data["xp_history"] = self._fetch_xp_history(user_id)
+            data["badges"] = {"earned": self._fetch_badges(user_id)}
+        except Exception:
+            # 読み込みに失敗した場合は追跡しない（次の保存は全体の書き込みになる）
+            self._tracker.forget(user_id)
+            return self._create_default_data(user_id)
+        self._tracker.snapshot(user_id, data)
+        return data
+
+    def _fetch_skill_xp(self, user_id: str) -> Dict[str, int]:
+        res = self._client.table(self.SKILL_XP_TABLE).select("*").eq("user_id", user_id).limit(1).execute()
+        rows = getattr(res, "data", None) or []
+        row = rows[0] if rows and isinstance(rows[0], dict) else {}
+        return {axis: int(row.get(axis, 0) or 0) for axis in SIX_AXES}
+
+    def _fetch_xp_history(self, user_id: str) -> List[Dict[str, Any]]:
+        res = (
+            self._client.table(self.XP_HISTORY_TABLE)
+            .select("source,scenario_id,xp_gains,scores_snapshot,created_at")
+            .eq("user_id", user_id)
+            .order("created_at")
+            .execute()
+        )
+        return [
+            {
+                "timestamp": row.get("created_at"),
+                "source": row.get("source"),
+                "scenario_id": row.get("scenario_id"),
+                "xp_gains": row.get("xp_gains") or {},
+                "scores_snapshot": row.get("scores_snapshot") or {},
+            }
+            for row in getattr(res, "data", None) or []
+            if isinstance(row, dict)
+        ]
+
+    def _fetch_badges(self, user_id: str) -> List[Dict[str, Any]]:
+        res = (
+            self._client.table(self.BADGES_TABLE)
+            .select("badge_id,earned_at")
+            .eq("user_id", user_id)
+            .order("earned_at")
+            .execute()
+        )
+        return [
+            {"badge_id": row.get("badge_id"), "earned_at": row.get("earned_at")}
+            for row in getattr(res, "data", None) or []
+            if isinstance(row, dict)
+        ]
+
+    def _save_normalized(self, user_id: str, data: Dict[str, Any]) -> None:
+        changes = self._tracker.diff(user_id, data)
+        now = utc_now_iso()
+
+        if changes.full:
+            skill = data.get("skill_xp") if isinstance(data.get("skill_xp"), dict) else {}
+            skill_xp = {axis: int(skill.get(axis, 0) or 0) for axis in SIX_AXES}
+            history = data.get("xp_history") if isinstance(data.get("xp_history"), list) else []
+            xp_history = list(enumerate(history))
+            badges = [b for b in _earned_badges(data) if isinstance(b, dict) and b.get("badge_id")]
+        else:
+            skill_xp, xp_history, badges = changes.skill_xp, changes.xp_history, changes.badges
+
+        if skill_xp:
+            row = {"user_id": user_id, **skill_xp, "updated_at": now}
+            self._client.table(self.SKILL_XP_TABLE).upsert(row, on_conflict="user_id").execute()
+        if xp_history:
+            rows = [self._xp_history_row(user_id, index, entry) for index, entry in xp_history if isinstance(entry, dict)]
+            self._client.table(self.XP_HISTORY_TABLE).upsert(rows, on_conflict="id", ignore_duplicates=True).execute()
+        if badges:
+            rows = [
+                {"user_id": user_id, "badge_id": b["badge_id"], "earned_at": b.get("earned_at") or now} for b in badges
+            ]
+            self._client.table(self.BADGES_TABLE).upsert(
+                rows, on_conflict="user_id,badge_id", ignore_duplicates=True
+            ).execute()
+        if changes.full or changes.core_changed:
+            payload = _core(data)
+            payload["user_id"] = user_id
+            payload["updated_at"] = now
+            if "created_at" not in payload:
+                payload["created_at"] = now
+            self._client.table(self.TABLE).upsert({"user_id": user_id, "data": payload}, on_conflict="user_id").execute()
+
+        self._tracker.snapshot(user_id, data)
+
+    @staticmethod
+    def _xp_history_row(user_id: str, index: int, entry: Dict[str, Any]) -> Dict[str, Any]:
+        timestamp = entry.get("timestamp")
+        if timestamp:
+            # 読み戻した created_at は表記が変わるため、UTC の正規形でIDを作る（全体の再書き込みで重複させない）
+            key = f"{user_id}:{_canonical_timestamp(timestamp)}:{entry.get('source')}:{entry.get('scenario_id')}"
+        else:
+            timestamp = utc_now_iso()
+            key = f"{user_id}:#{index}"
+        return {
+            "id": str(uuid.uuid5(_XP_HISTORY_NAMESPACE, key)),
+            "user_id": user_id,
+            "source": entry.get("source") or "unknown",
+            "scenario_id": entry.get("scenario_id"),
+            "xp_gains": entry.get("xp_gains") or {},
+            "scores_snapshot": entry.get("scores_snapshot") or {},
+            "created_at": timestamp,
+        }
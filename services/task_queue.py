@@ -0,0 +1,496 @@
+"""
+バックグラウンドタスクキュー
+
+レスポンス返却後に実行すればよい処理（ゲーミフィケーション、永続化、
+リアルタイムフィードバック等）をSQLiteベースの永続キューに積み、
+ワーカースレッドで非同期に実行する。
+
+- タスクはSQLiteに保存されるため、プロセス再起動後も未完了タスクを再実行できる
+- 実行中のタスクには実行プロセスのPIDとリース期限を記録し、プロセスが終了しているか
+  リース期限を過ぎたものだけを再実行対象に戻す（同じDBを共有する他ワーカーが実行中のタスクは戻さない）
+- 失敗したタスクは指数バックオフで max_retries 回まで再試行する
+- 結果は task_id で取得できる（/api/tasks/<task_id> でポーリング）
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from services.llm_instrumentation import llm_call_context
+
+logger = logging.getLogger(__name__)
+
+# タスク状態
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# タスク名 → ハンドラ のレジストリ
+_TASK_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+
+# このプロセスで実行中のタスクID（PIDが再利用された場合に前のプロセスのタスクと区別する）
+_running_here: Set[str] = set()
+_running_here_lock = threading.Lock()
+
+
+def register_task(name: str) -> Callable:
+    """
+    タスクハンドラを登録するデコレータ
+
+    ハンドラはペイロード辞書を受け取り、JSONシリアライズ可能な結果を返す。
+    Flaskのリクエストコンテキスト外で実行されるため、セッション等に依存してはならない。
+
+    使用例:
+        @register_task("scenario_feedback_post")
+        def handle(payload):
+            ...
+    """
+
+    def decorator(func: Callable[[Dict[str, Any]], Any]) -> Callable[[Dict[str, Any]], Any]:
+        _TASK_HANDLERS[name] = func
+        return func
+
+    return decorator
+
+
+def get_task_handler(name: str) -> Optional[Callable[[Dict[str, Any]], Any]]:
+    """登録済みのタスクハンドラを取得"""
+    return _TASK_HANDLERS.get(name)
+
+
+class TaskQueue:
+    """SQLite永続化付きのスレッドプール型タスクキュー"""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            owner TEXT,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_retries INTEGER NOT NULL,
+            result TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            run_after REAL NOT NULL,
+            worker_pid INTEGER,
+            lease_until REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_status_run_after ON tasks (status, run_after);
+        CREATE INDEX IF NOT EXISTS idx_tasks_owner ON tasks (owner, created_at);
+    """
+
+    # 古いスキーマのDBに追加する列
+    _ADDED_COLUMNS = (("worker_pid", "INTEGER"), ("lease_until", "REAL"))
+
+    # 実行中タスクの回収を確認する間隔（秒）
+    RECOVER_INTERVAL_SECONDS = 30.0
+
+    def __init__(
+        self,
+        db_path: str,
+        workers: int = 2,
+        max_retries: int = 3,
+        retry_backoff_seconds: float = 1.0,
+        poll_interval_seconds: float = 0.5,
+        eager: bool = False,
+        lease_seconds: float = 600.0,
+    ) -> None:
+        """
+        Args:
+            db_path: SQLiteデータベースのパス（":memory:" も可）
+            workers: ワーカースレッド数
+            max_retries: 失敗時の最大再試行回数
+            retry_backoff_seconds: 再試行の基準待機時間（attempts に応じて倍増）
+            poll_interval_seconds: キューが空の時のポーリング間隔
+            eager: Trueの場合、enqueue時に同期実行する（テスト・デバッグ用）
+            lease_seconds: 実行中タスクのリース期間（過ぎると他プロセスが再実行対象に戻す）
+        """
+        self.db_path = db_path
+        self.workers = max(1, int(workers))
+        self.max_retries = max(0, int(max_retries))
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.eager = eager
+        self.lease_seconds = lease_seconds
+        self._last_recover = time.monotonic()
+
+        self._db_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        if db_path != ":memory:":
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._db_lock:
+            if db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(self._SCHEMA)
+            columns = {r["name"] for r in self._conn.execute("PRAGMA table_info(tasks)")}
+            for column, column_type in self._ADDED_COLUMNS:
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE tasks ADD COLUMN {column} {column_type}")
+        self.recover_stale()
+
+    # ========== 投入・参照 ==========
+
+    def enqueue(self, name: str, payload: Dict[str, Any], owner: Optional[str] = None) -> str:
+        """
+        タスクをキューに投入
+
+        Args:
+            name: 登録済みタスク名
+            payload: JSONシリアライズ可能なペイロード
+            owner: 結果を参照できるユーザーID（オプション）
+
+        Returns:
+            str: タスクID
+
+        Raises:
+            ValueError: 未登録のタスク名の場合
+        """
+        if name not in _TASK_HANDLERS:
+            raise ValueError(f"Unknown task: {name!r}")
+
+        task_id = uuid.uuid4().hex
+        now = time.time()
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT INTO tasks (id, name, owner, payload, status, attempts, max_retries, "
+                "created_at, updated_at, run_after) VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, ?)",
+                (
+                    task_id,
+                    name,
+                    owner,
+                    json.dumps(payload, ensure_ascii=False),
+                    STATUS_PENDING,
+                    self.max_retries,
+                    now,
+                    now,
+                    now,
+                ),
+            )
+
+        if self.eager:
+            while self.run_pending_once(task_id):
+                pass
+        else:
+            self._wakeup.set()
+        return task_id
+
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        タスクの状態と結果を取得
+
+        Returns:
+            Optional[Dict[str, Any]]: タスク情報（存在しない場合はNone）
+        """
+        with self._db_lock:
+            row = self._conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list_tasks(self, owner: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        ユーザーの最近のタスクを新しい順に取得
+
+        Args:
+            owner: ユーザーID
+            limit: 最大件数
+        """
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT * FROM tasks WHERE owner = ? ORDER BY created_at DESC LIMIT ?",
+                (owner, max(1, min(int(limit), 100))),
+            ).fetchall()
+        return [self._row_to_dict(r) for r in rows]
+
+    def purge_finished(self, older_than_seconds: float = 86400) -> int:
+        """
+        完了・失敗済みの古いタスクを削除
+
+        Returns:
+            int: 削除件数
+        """
+        cutoff = time.time() - older_than_seconds
+        with self._db_lock:
+            cur = self._conn.execute(
+                "DELETE FROM tasks WHERE status IN (?, ?) AND updated_at < ?",
+                (STATUS_DONE, STATUS_FAILED, cutoff),
+            )
+        return cur.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """状態別のタスク件数を取得"""
+        with self._db_lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status").fetchall()
+        counts = {STATUS_PENDING: 0, STATUS_RUNNING: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        for r in rows:
+            counts[r["status"]] = r["n"]
+        return {"counts": counts, "workers": self.workers, "running": self.is_running()}
+
+    def recover_stale(self) -> int:
+        """
+        実行中のまま残ったタスクを再実行対象に戻す
+
+        実行したプロセスが終了している、またはリース期限を過ぎたタスクのみが対象
+        （PID・リースが記録されていない古いタスクも含む）。
+
+        Returns:
+            int: 戻した件数
+        """
+        now = time.time()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT id, worker_pid, lease_until FROM tasks WHERE status = ?", (STATUS_RUNNING,)
+            ).fetchall()
+            stale = [
+                r["id"]
+                for r in rows
+                if r["lease_until"] is None or r["lease_until"] < now or not _owner_alive(r["id"], r["worker_pid"])
+            ]
+            for task_id in stale:
+                self._conn.execute(
+                    "UPDATE tasks SET status = ?, worker_pid = NULL, lease_until = NULL, updated_at = ? "
+                    "WHERE id = ? AND status = ?",
+                    (STATUS_PENDING, now, task_id, STATUS_RUNNING),
+                )
+        if stale:
+            logger.warning(f"Recovered {len(stale)} stale running task(s)")
+        return len(stale)
+
+    # ========== 実行 ==========
+
+    def run_pending_once(self, task_id: Optional[str] = None) -> bool:
+        """
+        実行可能なタスクを1件取り出して実行する
+
+        Args:
+            task_id: 指定した場合はそのタスクのみを対象にする
+
+        Returns:
+            bool: タスクを実行した場合True（実行後に再試行待ちとなった場合も含む）
+        """
+        task = self._claim_next(task_id)
+        if task is None:
+            return False
+        self._execute(task)
+        return True
+
+    def start(self) -> None:
+        """ワーカースレッドを起動（起動済みの場合は何もしない）"""
+        if self.eager or self.is_running():
+            return
+        self._stop.clear()
+        self._threads = []
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker_loop, name=f"task-queue-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """ワーカースレッドを停止"""
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def is_running(self) -> bool:
+        """ワーカーが稼働中か"""
+        return any(t.is_alive() for t in self._threads)
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - self._last_recover >= self.RECOVER_INTERVAL_SECONDS:
+                    self._last_recover = time.monotonic()
+                    self.recover_stale()
+                executed = self.run_pending_once()
+            except Exception as e:  # ワーカーを落とさない
+                logger.error(f"Task queue worker error: {e}", exc_info=True)
+                executed = False
+            if not executed:
+                self._wakeup.wait(self.poll_interval_seconds)
+                self._wakeup.clear()
+
+    def _claim_next(self, task_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """実行可能なタスクを running に遷移させて取得（ワーカー間で排他）"""
+        now = time.time()
+        with self._db_lock:
+            if task_id:
+                row = self._conn.execute(
+                    "SELECT * FROM tasks WHERE id = ? AND status = ?", (task_id, STATUS_PENDING)
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT * FROM tasks WHERE status = ? AND run_after <= ? ORDER BY run_after LIMIT 1",
+                    (STATUS_PENDING, now),
+                ).fetchone()
+            if row is None:
+                return None
+            # 同じDBを共有する他プロセスと取り合いになった場合は取得しない
+            cur = self._conn.execute(
+                "UPDATE tasks SET status = ?, attempts = attempts + 1, updated_at = ?, worker_pid = ?, lease_until = ? "
+                "WHERE id = ? AND status = ?",
+                (STATUS_RUNNING, now, os.getpid(), now + self.lease_seconds, row["id"], STATUS_PENDING),
+            )
+            if cur.rowcount != 1:
+                return None
+            with _running_here_lock:
+                _running_here.add(row["id"])
+        task = self._row_to_dict(row)
+        task["attempts"] += 1
+        task["payload"] = json.loads(row["payload"])
+        task["queued_at"] = row["run_after"]
+        return task
+
+    def _execute(self, task: Dict[str, Any]) -> None:
+        handler = _TASK_HANDLERS.get(task["name"])
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown task: {task['name']!r}")
+            # キュー投入（再試行時は再実行予定時刻）から実行開始までをLLM呼び出しのキュー待ちとして記録
+            with llm_call_context(queued_at=task.get("queued_at")):
+                result = handler(task["payload"])
+            self._finish(task["id"], STATUS_DONE, result=result)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if task["attempts"] <= task["max_retries"]:
+                delay = self.retry_backoff_seconds * (2 ** (task["attempts"] - 1))
+                logger.warning(f"Task {task['name']} ({task['id']}) failed, retrying in {delay:.1f}s: {error}")
+                self._reschedule(task["id"], delay, error)
+            else:
+                logger.error(f"Task {task['name']} ({task['id']}) failed permanently: {error}")
+                self._finish(task["id"], STATUS_FAILED, error=error)
+
+    def _finish(self, task_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with _running_here_lock:
+            _running_here.discard(task_id)
+        with self._db_lock:
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = ?, updated_at = ?, worker_pid = NULL, "
+                "lease_until = NULL WHERE id = ?",
+                (
+                    status,
+                    json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                    error,
+                    time.time(),
+                    task_id,
+                ),
+            )
+
+    def _reschedule(self, task_id: str, delay: float, error: str) -> None:
+        now = time.time()
+        with _running_here_lock:
+            _running_here.discard(task_id)
+        with self._db_lock:
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, error = ?, updated_at = ?, run_after = ?, worker_pid = NULL, "
+                "lease_until = NULL WHERE id = ?",
+                (STATUS_PENDING, error, now, now + delay, task_id),
+            )
+        if self.eager:
+            # 同期モードでは待機せずに即時再試行する
+            with self._db_lock:
+                self._conn.execute("UPDATE tasks SET run_after = ? WHERE id = ?", (now, task_id))
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "owner": row["owner"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "max_retries": row["max_retries"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+
+def _owner_alive(task_id: str, pid: Optional[int]) -> bool:
+    """タスクを実行したプロセスが動いているか（PIDが記録されていない場合はFalse）"""
+    if not pid:
+        return False
+    if pid == os.getpid():
+        # 自プロセスのPIDでも、このプロセスで実行していなければ同じPIDだった前のプロセスのタスク
+        with _running_here_lock:
+            return task_id in _running_here
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+# グローバルインスタンス
+_task_queue: Optional[TaskQueue] = None
+_task_queue_lock = threading.Lock()
+
+
+def get_task_queue() -> TaskQueue:
+    """TaskQueueのシングルトンインスタンスを取得（初回呼び出し時にワーカーを起動）"""
+    global _task_queue
+    if _task_queue is None:
+        with _task_queue_lock:
+            if _task_queue is None:
+                from config import get_cached_config
+
+                config = get_cached_config()
+                queue = TaskQueue(
+                    db_path=config.TASK_QUEUE_DB_PATH,
+                    workers=config.TASK_QUEUE_WORKERS,
+                    max_retries=config.TASK_QUEUE_MAX_RETRIES,
+                    lease_seconds=config.TASK_QUEUE_LEASE_SECONDS,
+                    eager=config.TESTING,
+                )
+                # ハンドラの登録
+                import services.post_response_tasks  # noqa: F401
+
+                queue.start()
+                _task_queue = queue
+    return _task_queue
+
+
+def reset_task_queue() -> None:
+    """テスト用: シングルトンを停止してクリアする"""
+    global _task_queue
+    with _task_queue_lock:
+        if _task_queue is not None:
+            _task_queue.shutdown()
+        _task_queue = None
+
+
+def describe_task(task_id: str) -> Dict[str, str]:
+    """レスポンスに埋め込むタスク参照（ポーリング先URL付き）を生成"""
+    return {"task_id": task_id, "status_url": f"/api/tasks/{task_id}"}
+
+
+def background_tasks_enabled() -> bool:
+    """バックグラウンド実行が有効か（無効時は従来どおりリクエスト内で同期実行する）"""
+    try:
+        from config import get_cached_config
+
+        return bool(get_cached_config().ENABLE_BACKGROUND_TASKS)
+    except Exception:
+        return False
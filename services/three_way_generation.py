@@ -0,0 +1,230 @@
+"""
+3者会話の AI 応答の並列生成
+
+ユーザーの発言のあとは A → B の順に応答するが、B の応答が A の発言内容に依存しない場合は
+A と同時に B の生成を投機的に開始し、2回分の LLM 往復の待ち時間を1回分に縮める。
+
+- 投機はユーザーの発言の直後で、ユーザーが A だけに呼びかけていない場合のみ行う
+- A の応答が B に問いかけている、または B の下書きが A の応答とほぼ同じ内容の場合は、
+  A の応答を履歴に加えて B を生成し直す
+- 応答は会話の順に、それぞれ完成した時点で返す（A は B の完了を待たない）
+- ユーザーごとの同時生成数に上限を設け、超過した要求は受け付けない
+  （件数はセッション登録簿で数え、Redis 版なら全ワーカーで共有する）
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# 話者 → 表示名（観戦モードと同じ）
+SPEAKER_NAMES = {"A": "太郎", "B": "花子"}
+
+# 下書きと先行する応答の類似度がこれ以上なら、同じ内容の繰り返しとみなして生成し直す
+DUPLICATE_RATIO = 0.6
+
+
+def entry_speaker(entry: dict) -> str:
+    """履歴の1件の話者（観戦の {"speaker", "message"} と 3者会話の {"role", "content"} の両方に対応）"""
+    return entry.get("speaker") or entry.get("role") or ""
+
+
+def entry_message(entry: dict) -> str:
+    """履歴の1件の発言内容"""
+    return entry.get("message") or entry.get("content") or ""
+
+
+def reply_speakers(turn_order: List[str]) -> List[str]:
+    """ユーザーの発言のあとに続けて応答する AI の話者（次にユーザーの番が来るまで）"""
+    if "user" not in turn_order:
+        return [speaker for speaker in turn_order if speaker in SPEAKER_NAMES]
+    start = turn_order.index("user")
+    rotated = turn_order[start + 1 :] + turn_order[:start]
+    speakers: List[str] = []
+    for speaker in rotated:
+        if speaker == "user":
+            break
+        speakers.append(speaker)
+    return speakers
+
+
+def _asks(text: str, speaker: str) -> bool:
+    """text が speaker に名指しで問いかけているか"""
+    name = SPEAKER_NAMES.get(speaker)
+    return bool(name) and name in text and ("？" in text or "?" in text)
+
+
+def can_speculate(history: List[dict], speakers: List[str]) -> bool:
+    """
+    2番目以降の話者の生成を、先行する話者の応答を待たずに開始してよいか
+
+    直前がユーザーの発言で、ユーザーが最初の話者だけに呼びかけていない場合に限る
+    （最初の話者だけへの呼びかけには、他の話者はその応答を受けて話すのが自然なため）。
+    """
+    if len(speakers) < 2 or not history or entry_speaker(history[-1]) != "user":
+        return False
+    message = entry_message(history[-1])
+    first, others = speakers[0], speakers[1:]
+    addresses_first = SPEAKER_NAMES.get(first, first) in message
+    addresses_others = any(SPEAKER_NAMES.get(speaker, speaker) in message for speaker in others)
+    return not (addresses_first and not addresses_others)
+
+
+def needs_regeneration(speaker: str, draft: str, previous: List[dict]) -> bool:
+    """投機的に生成した下書きが、先行する応答と噛み合わないか"""
+    for entry in previous:
+        text = entry_message(entry)
+        if _asks(text, speaker):
+            return True
+        if SequenceMatcher(None, draft, text).ratio() >= DUPLICATE_RATIO:
+            return True
+    return False
+
+
+class ThreeWayGenerationEngine:
+    """3者会話の AI 応答の生成（投機的な並列生成とユーザーごとの同時生成数の制限）"""
+
+    def __init__(
+        self,
+        speculative: bool = True,
+        max_per_user: int = 1,
+        max_workers: int = 8,
+        timeout_seconds: float = 60.0,
+        registry: Optional[Any] = None,
+    ) -> None:
+        """
+        Args:
+            speculative: 2番目以降の話者を並列に生成するか（False なら常に順番に生成）
+            max_per_user: ユーザーごとの同時生成数の上限（0 は無制限）
+            max_workers: このプロセスで生成に使うスレッド数
+            timeout_seconds: 1件の応答の生成を待つ最大時間
+            registry: 同時生成数を数えるセッション登録簿（InMemorySessionRegistry / RedisSessionRegistry）。
+                省略時はこのインスタンス専用のインメモリ版
+        """
+        from services.session_registry import InMemorySessionRegistry
+
+        self.speculative = speculative
+        self.max_per_user = max(0, int(max_per_user))
+        self.max_workers = max(1, int(max_workers))
+        self.timeout_seconds = timeout_seconds
+        # 確保したワーカーが落ちた場合に枠が戻るまでの秒数（1回の生成は最大で話者2人×生成し直し）
+        self.slot_ttl_seconds = timeout_seconds * 4
+        self._registry = registry if registry is not None else InMemorySessionRegistry()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {"speculated": 0, "accepted": 0, "regenerated": 0, "sequential": 0, "busy": 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="three-way")
+            return self._executor
+
+    def acquire(self, user_id: str) -> bool:
+        """
+        ユーザーの生成枠を確保
+
+        Returns:
+            bool: 確保できた場合 True（上限に達している場合は False。確保したら必ず release する）
+        """
+        if not self._registry.acquire_slot(user_id, self.max_per_user, self.slot_ttl_seconds):
+            self._count("busy")
+            return False
+        self._count_in_flight(1)
+        return True
+
+    def release(self, user_id: str) -> None:
+        """acquire で確保した生成枠を返す"""
+        self._registry.release_slot(user_id)
+        self._count_in_flight(-1)
+
+    def generate(
+        self,
+        history: List[dict],
+        speakers: List[str],
+        generate_reply: Callable[[str, List[dict]], str],
+    ) -> Iterator[Dict[str, str]]:
+        """
+        speakers の順に応答を生成し、完成したものから返す
+
+        Args:
+            history: ユーザーの発言までの会話履歴
+            speakers: 応答する話者（会話の順）
+            generate_reply: (話者, 会話履歴) から発言を生成する関数（別スレッドで実行される）
+
+        Yields:
+            {"speaker": str, "message": str}
+        """
+        base = [dict(entry) for entry in history]
+        executor = self._get_executor()
+        futures: Dict[str, Future] = {}
+        if self.speculative and can_speculate(base, speakers):
+            for speaker in speakers:
+                futures[speaker] = executor.submit(generate_reply, speaker, base)
+            self._count("speculated", len(speakers) - 1)
+
+        replies: List[dict] = []
+        try:
+            for speaker in speakers:
+                future = futures.pop(speaker, None)
+                if future is None:
+                    if replies:
+                        self._count("sequential")
+                    message = executor.submit(generate_reply, speaker, base + replies).result(self.timeout_seconds)
+                else:
+                    message = future.result(timeout=self.timeout_seconds)
+                    if replies and needs_regeneration(speaker, message, replies):
+                        self._count("regenerated")
+                        message = executor.submit(generate_reply, speaker, base + replies).result(self.timeout_seconds)
+                    elif replies:
+                        self._count("accepted")
+                reply = {"speaker": speaker, "message": message}
+                replies.append(reply)
+                yield dict(reply)
+        finally:
+            # 途中で失敗・切断した場合、未着手の生成は取り消す（実行中の LLM 呼び出しは結果を捨てる）
+            for future in futures.values():
+                future.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        """生成の統計情報を取得"""
+        with self._lock:
+            return dict(self._stats, in_flight=self._in_flight)
+
+    def shutdown(self) -> None:
+        """スレッドプールを停止"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def _count_in_flight(self, amount: int) -> None:
+        with self._lock:
+            self._in_flight = max(0, self._in_flight + amount)
+
+
+# グローバルインスタンス
+_three_way_engine: Optional[ThreeWayGenerationEngine] = None
+
+
+def get_three_way_engine() -> ThreeWayGenerationEngine:
+    """ThreeWayGenerationEngineのシングルトンインスタンスを取得"""
+    global _three_way_engine
+    if _three_way_engine is None:
+        from config import get_cached_config
+        from services.session_registry import create_session_registry
+
+        config = get_cached_config()
+        _three_way_engine = ThreeWayGenerationEngine(
+            speculative=config.THREE_WAY_SPECULATIVE_ENABLED,
+            max_per_user=config.THREE_WAY_MAX_CONCURRENT_PER_USER,
+            registry=create_session_registry("three_way", idle_ttl=config.THREE_WAY_SESSION_IDLE_SECONDS),
+        )
+    return _three_way_engine
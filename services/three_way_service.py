@@ -1,10 +1,23 @@
 """
 三者（A / B / ユーザー）観戦・参加会話の順番管理
+
+参加中のユーザーはセッション登録簿（services.session_registry）で管理する。
+Redisセッションストアが有効なら全ワーカーで共有し、退出しないユーザーのセッションは無操作時間で消える。
 """
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import re
+from typing import TYPE_CHECKING, List, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from services.session_registry import CREATED, EXISTS, InMemorySessionRegistry
+from services.three_way_generation import SPEAKER_NAMES, entry_message, entry_speaker
+from utils.helpers import extract_content
+
+if TYPE_CHECKING:  # 実行時の import は langsmith 等を読み込み重いため型チェック時のみ
+    from langchain_core.language_models import BaseChatModel
 
 
 class ThreeWayConversationService:
@@ -14,30 +27,39 @@ class ThreeWayConversationService:
 
     DEFAULT_TURN_ORDER = ["A", "B", "user"]
     ERR_ALREADY_JOINED = "already_joined"
+    ERR_TOO_MANY_SESSIONS = "too_many_sessions"
 
-    def __init__(self) -> None:
-        self._sessions: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, registry=None) -> None:
+        """
+        Args:
+            registry: セッション登録簿（InMemorySessionRegistry / RedisSessionRegistry）。
+                省略時はこのインスタンス専用のインメモリ版
+        """
+        self._sessions = registry if registry is not None else InMemorySessionRegistry()
 
     def join_conversation(self, user_id: str, watch_history: list) -> dict:
         """
         Returns:
             成功: {"joined": True, "turn_order": list[str]}
-            重複: {"joined": False, "error": str, "turn_order": None}
+            重複・上限: {"joined": False, "error": str, "turn_order": None}
         """
-        if user_id in self._sessions:
+        turn_order = list(self.DEFAULT_TURN_ORDER)
+        status = self._sessions.create(
+            user_id,
+            {"turn_order": turn_order, "watch_history": list(watch_history or [])},
+        )
+        if status != CREATED:
             return {
                 "joined": False,
-                "error": self.ERR_ALREADY_JOINED,
+                "error": self.ERR_ALREADY_JOINED if status == EXISTS else self.ERR_TOO_MANY_SESSIONS,
                 "turn_order": None,
             }
-
-        turn_order = list(self.DEFAULT_TURN_ORDER)
-        self._sessions[user_id] = {
-            "turn_order": turn_order,
-            "watch_history": list(watch_history or []),
-        }
         return {"joined": True, "turn_order": turn_order}
 
+    def is_joined(self, user_id: str) -> bool:
+        """参加中なら True（最終アクセスを更新し、無操作での期限切れを延長する）"""
+        return self._sessions.touch(user_id)
+
     def get_next_speaker(self, history: list, turn_order: List[str]) -> str:
         """
         Returns:
@@ -79,10 +101,88 @@ class ThreeWayConversationService:
         next_s = self.get_next_speaker(h, turn_order)
         return {"next_speaker": next_s, "updated_history": h}
 
+    def generate_reply(self, llm: "BaseChatModel", history: list, speaker: str) -> str:
+        """
+        AI の話者（"A" / "B"）として次の発言を生成
+
+        Args:
+            llm: LLMインスタンス
+            history: 会話履歴（観戦の発言とユーザーの発言を含む）
+            speaker: 発言する話者
+
+        Returns:
+            str: 生成された発言（話者名を含まない）
+        """
+        name = SPEAKER_NAMES[speaker]
+        others = "、".join(f"{n}さん" for s, n in SPEAKER_NAMES.items() if s != speaker)
+        lines = []
+        for entry in history or []:
+            if not isinstance(entry, dict):
+                continue
+            role = entry_speaker(entry)
+            display = "ユーザー" if role == "user" else SPEAKER_NAMES.get(role, role)
+            lines.append(f"{display}: {entry_message(entry)}")
+
+        system_prompt = f"""あなたは{name}という名前の社員です。
+{others}と、途中から会話に参加したユーザーの3人で職場の会話をしています。
+
+1. 直前の発言（特にユーザーの発言）に適切に応答する
+2. 職場での適切な距離感を保つ
+3. 自然な会話の流れを維持する
+
+応答の制約：
+- 1回の応答は3行程度まで
+- 必ず日本語のみを使用する
+- 重要：話者名を含めず、発言内容のみを返してください
+- 動作描写やト書き、括弧書きの感情表現は含めないでください
+"""
+        messages = [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=f"以下の会話履歴に基づいて、{name}として次の発言をしてください：\n\n" + "\n".join(lines)),
+        ]
+        content = extract_content(llm.invoke(messages))
+        return re.sub(rf"^{name}:\s*", "", content.strip())
+
+    def save_replies(self, user_id: str, replies: List[dict]) -> bool:
+        """
+        生成した AI の応答を参加セッションに保存（次のリクエストで会話履歴に反映する）
+
+        応答はストリーミングで返すため、Flask のセッションにはその場で書き込めない。
+        登録簿のリストへの追記で保存するため、別ワーカーの保存・取り出しと重なっても応答を失わない。
+
+        Returns:
+            bool: 保存した場合 True（退出・期限切れで参加セッションがない場合は False）
+        """
+        return self._sessions.append_items(user_id, list(replies))
+
+    def pop_replies(self, user_id: str) -> List[dict]:
+        """save_replies で保存した応答を取り出す（取り出した応答は参加セッションから消える）"""
+        return self._sessions.pop_items(user_id)
+
     def leave_conversation(self, user_id: str) -> dict:
         """
         Returns:
             {"left": bool, "mode": str}
         """
-        self._sessions.pop(user_id, None)
+        self._sessions.delete(user_id)
         return {"left": True, "mode": "watch"}
+
+
+_three_way_service: Optional[ThreeWayConversationService] = None
+
+
+def get_three_way_service() -> ThreeWayConversationService:
+    """全リクエストで共有する ThreeWayConversationService を取得"""
+    global _three_way_service
+    if _three_way_service is None:
+        from config import get_cached_config
+        from services.session_registry import create_session_registry
+
+        config = get_cached_config()
+        registry = create_session_registry(
+            "three_way",
+            idle_ttl=config.THREE_WAY_SESSION_IDLE_SECONDS,
+            max_sessions=config.THREE_WAY_MAX_SESSIONS,
+        )
+        _three_way_service = ThreeWayConversationService(registry)
+    return _three_way_service
@@ -0,0 +1,442 @@
+"""
+TTS（音声合成）パイプライン
+
+高額請求（1,667万文字）で停止した TTS を安全に再開するための仕組み。
+
+- 応答を文単位に分割して順に合成し、最初の文の音声から再生を始められるようにする
+- 合成した音声は (テキスト, 音声, スタイル, 言語) のハッシュをキーにファイルへ保存し、
+  シナリオの initial_message など同じ文は二度と合成しない（全ワーカーで共有）
+- 1日（UTC）あたりの合成文字数に上限を設け、全ワーカーの合計で超えたら合成しない。
+  ユーザーごとの上限も同じ集計先で別に数える（1人のユーザーが全体の上限を使い切らないように）。
+  キャッシュから返す文は数えない。Redisセッションストアが有効なら Redis、
+  そうでなければキャッシュディレクトリ内のファイル（ファイルロック）で数える
+
+合成エンジンは TTS_ENGINE に "モジュール:ファクトリ" 形式で指定する（未指定なら TTS は停止のまま）。
+エンジンは name・audio_format 属性と synthesize(text, voice, style, lang) -> bytes を持つこと。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Protocol
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 1文の最大文字数（これを超える文は読点・空白、なければ文字数で分割する）
+MAX_SENTENCE_CHARS = 200
+
+_SENTENCE_END = re.compile(r"(?<=[。！？!?\n])|(?<=\.)\s+")
+_SOFT_BREAK = re.compile(r"(?<=[、，,])|\s+")
+
+# Redis の日別カウンタ（日付が変わった後も集計を確認できるよう2日間残す）
+_BUDGET_KEY_PREFIX = "workplace-roleplay:tts:chars:"
+_BUDGET_KEY_TTL = 2 * 24 * 3600
+
+# KEYS: 日別カウンタ / ARGV: 追加する文字数, 上限, 有効期限（秒）
+_RESERVE_SCRIPT = """
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+if used + tonumber(ARGV[1]) > tonumber(ARGV[2]) then
+    return -1
+end
+used = redis.call('INCRBY', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return used
+"""
+
+
+class TTSBudgetExceededError(Exception):
+    """1日の合成文字数の上限に達した"""
+
+    pass
+
+
+class TTSEngine(Protocol):
+    """合成エンジン"""
+
+    name: str
+    audio_format: str
+
+    def synthesize(self, text: str, voice: str, style: Optional[str], lang: str) -> bytes:
+        ...
+
+
+def split_sentences(text: str, max_chars: int = MAX_SENTENCE_CHARS) -> List[str]:
+    """
+    テキストを合成単位の文に分割
+
+    句点・感嘆符・疑問符・改行で区切り、max_chars を超える文は読点や空白で、
+    それでも長い場合は文字数で分割する。空の文は除く。
+    """
+    sentences: List[str] = []
+    for sentence in _SENTENCE_END.split(text or ""):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            sentences.append(sentence)
+            continue
+        current = ""
+        for part in _SOFT_BREAK.split(sentence):
+            if current and len(current) + len(part) > max_chars:
+                sentences.append(current.strip())
+                current = ""
+            current += part
+            while len(current) > max_chars:
+                sentences.append(current[:max_chars])
+                current = current[max_chars:]
+        if current.strip():
+            sentences.append(current.strip())
+    return sentences
+
+
+def audio_cache_key(text: str, voice: str, style: Optional[str], lang: str) -> str:
+    """音声キャッシュのキー（テキスト・音声・スタイル・言語の SHA-256）"""
+    payload = json.dumps([text, voice, style or "", lang], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSAudioCache:
+    """
+    内容アドレスの音声キャッシュ（ファイル）
+
+    <cache_dir>/<キーの先頭2文字>/<キー>.<形式> に保存する。書き込みは一時ファイルからの
+    置き換えで行うため、同じ文を複数のワーカーが同時に合成しても壊れたファイルは読まれない。
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _path(self, key: str, audio_format: str) -> str:
+        if not re.fullmatch(r"[0-9a-f]{64}", key) or not re.fullmatch(r"[0-9a-z]{1,8}", audio_format):
+            raise ValueError("Invalid cache key")
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{audio_format}")
+
+    def get(self, key: str, audio_format: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key, audio_format), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key: str, audio_format: str, audio: bytes) -> None:
+        path = self._path(key, audio_format)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _hash_user_key(user_key: str) -> str:
+    # 集計のキー・ファイル名に使うため、ユーザーIDをそのまま入れない
+    return hashlib.sha256(user_key.encode("utf-8")).hexdigest()[:32]
+
+
+class FileSpendCounter:
+    """
+    日別の合成文字数をファイルで数える（同じホストの全ワーカーで共有）
+
+    ユーザーごとのファイル（chars-<日付>-user-<ハッシュ>.json）は毎日増えるため、
+    日付が変わって最初の予約で前日以前のファイルを削除する。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._pruned_day: Optional[str] = None
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.directory, f"chars-{day}.json")
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # 同じプロセスのスレッドはロック、他のワーカーとはファイルロックで排他する
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _write(self, path: str, used: int) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"chars": used}, f)
+        os.replace(tmp, path)
+
+    def _prune(self, day: str) -> None:
+        """day（キーの先頭の日付）より前の日のファイルを削除（ロック内で呼ぶ）"""
+        today = day[:10]
+        if self._pruned_day == today:
+            return
+        for name in os.listdir(self.directory):
+            if name.startswith("chars-") and name.endswith(".json") and name[6:16] < today:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        self._pruned_day = today
+
+    def _read(self, path: str) -> int:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return int(json.load(f).get("chars", 0))
+        except (OSError, ValueError, AttributeError):
+            return 0
+
+    def reserve(self, day: str, chars: int, limit: int) -> Optional[int]:
+        """上限内なら chars を加算して合計を返す（超える場合は加算せず None）"""
+        path = self._path(day)
+        with self._locked():
+            self._prune(day)
+            used = self._read(path)
+            if used + chars > limit:
+                return None
+            used += chars
+            self._write(path, used)
+            return used
+
+    def release(self, day: str, chars: int) -> None:
+        """reserve で加算した chars を取り消す"""
+        path = self._path(day)
+        with self._locked():
+            self._write(path, max(0, self._read(path) - chars))
+
+    def used(self, day: str) -> int:
+        return self._read(self._path(day))
+
+
+class RedisSpendCounter:
+    """日別の合成文字数を Redis で数える（全ホストのワーカーで共有）"""
+
+    def __init__(self, client):
+        self.client = client
+        self._script = None
+
+    def reserve(self, day: str, chars: int, limit: int) -> Optional[int]:
+        """上限内なら chars を加算して合計を返す（超える場合は加算せず None）"""
+        if self._script is None:
+            self._script = self.client.register_script(_RESERVE_SCRIPT)
+        used = int(self._script(keys=[_BUDGET_KEY_PREFIX + day], args=[chars, limit, _BUDGET_KEY_TTL]))
+        return None if used < 0 else used
+
+    def release(self, day: str, chars: int) -> None:
+        """reserve で加算した chars を取り消す"""
+        self.client.decrby(_BUDGET_KEY_PREFIX + day, chars)
+
+    def used(self, day: str) -> int:
+        return int(self.client.get(_BUDGET_KEY_PREFIX + day) or 0)
+
+
+class TTSSpendGuard:
+    """
+    1日の合成文字数の上限（全体とユーザーごと）
+
+    合成の前に文字数を予約し、上限を超える予約は拒否する。
+    ユーザーごとの上限を先に予約する（ユーザーの上限で拒否した分を全体の上限から減らさない）。
+    全体の上限で拒否した場合は、合成しない分をユーザーの予約から取り消す。
+    集計に失敗した場合（Redis 停止など）は合成しない側に倒す。
+    """
+
+    def __init__(self, counter, daily_char_budget: int, user_daily_char_budget: int = 0):
+        """
+        Args:
+            counter: FileSpendCounter / RedisSpendCounter
+            daily_char_budget: 全体の1日の上限
+            user_daily_char_budget: ユーザーごとの1日の上限（0 は無制限）
+        """
+        self.counter = counter
+        self.daily_char_budget = max(0, int(daily_char_budget))
+        self.user_daily_char_budget = max(0, int(user_daily_char_budget))
+
+    def reserve(self, chars: int, user_key: Optional[str] = None) -> None:
+        """
+        Args:
+            chars: 合成する文字数
+            user_key: ユーザーごとの上限を数えるキー（None ならユーザーごとには数えない）
+
+        Raises:
+            TTSBudgetExceededError: 上限に達した、または集計できない場合
+        """
+        day = _today()
+        user_day = None
+        if user_key and self.user_daily_char_budget:
+            user_day = f"{day}-user-{_hash_user_key(user_key)}"
+            if self._reserve(user_day, chars, self.user_daily_char_budget) is None:
+                raise TTSBudgetExceededError("本日のTTS利用上限（ユーザーごと）に達しました")
+        reserved = None
+        try:
+            reserved = self._reserve(day, chars, self.daily_char_budget)
+        finally:
+            if reserved is None and user_day is not None:
+                self._release(user_day, chars)
+        if reserved is None:
+            raise TTSBudgetExceededError("本日のTTS利用上限に達しました")
+
+    def _reserve(self, key: str, chars: int, limit: int) -> Optional[int]:
+        try:
+            return self.counter.reserve(key, chars, limit)
+        except Exception as e:
+            logger.error(f"TTS spend counter unavailable, refusing synthesis: {e}")
+            raise TTSBudgetExceededError("TTSの利用量を確認できないため合成を停止しています") from e
+
+    def _release(self, key: str, chars: int) -> None:
+        try:
+            self.counter.release(key, chars)
+        except Exception as e:
+            logger.warning(f"Failed to release TTS reservation: {e}")
+
+    def remaining(self) -> int:
+        try:
+            used = self.counter.used(_today())
+        except Exception:
+            return 0
+        return max(0, self.daily_char_budget - used)
+
+
+class TTSPipeline:
+    """文単位の逐次合成（キャッシュ・利用上限付き）"""
+
+    def __init__(self, engine: TTSEngine, cache: TTSAudioCache, guard: TTSSpendGuard):
+        self.engine = engine
+        self.cache = cache
+        self.guard = guard
+        self._lock = threading.Lock()
+        self._stats = {"sentences": 0, "cache_hits": 0, "synthesized_chars": 0}
+
+    def synthesize_sentence(
+        self, text: str, voice: str, style: Optional[str] = None, lang: str = "ja", user_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        1文を合成（キャッシュにあればそれを返す）
+
+        Args:
+            user_key: ユーザーごとの上限を数えるキー（None ならユーザーごとには数えない）
+
+        Returns:
+            {"key": str, "text": str, "audio": bytes, "format": str, "cached": bool}
+
+        Raises:
+            TTSBudgetExceededError: キャッシュになく、1日の上限に達している場合
+        """
+        audio_format = self.engine.audio_format
+        key = audio_cache_key(text, voice, style, lang)
+        audio = self.cache.get(key, audio_format)
+        cached = audio is not None
+        if audio is None:
+            # 合成に失敗しても予約は戻さない（エンジン側で課金済みの場合があるため）
+            self.guard.reserve(len(text), user_key)
+            audio = self.engine.synthesize(text, voice, style, lang)
+            try:
+                self.cache.put(key, audio_format, audio)
+            except OSError as e:
+                logger.warning(f"Failed to cache TTS audio: {e}")
+        with self._lock:
+            self._stats["sentences"] += 1
+            if cached:
+                self._stats["cache_hits"] += 1
+            else:
+                self._stats["synthesized_chars"] += len(text)
+        return {"key": key, "text": text, "audio": audio, "format": audio_format, "cached": cached}
+
+    def stream(
+        self, text: str, voice: str, style: Optional[str] = None, lang: str = "ja", user_key: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        テキストを文に分割し、1文ずつ合成して返す
+
+        Yields:
+            synthesize_sentence の結果に文の番号（index）を加えたもの
+        """
+        for index, sentence in enumerate(split_sentences(text)):
+            yield dict(self.synthesize_sentence(sentence, voice, style, lang, user_key), index=index)
+
+    def cached_audio(self, key: str) -> Optional[bytes]:
+        """キャッシュ済みの音声を取得（キーが不正・未キャッシュなら None）"""
+        try:
+            return self.cache.get(key, self.engine.audio_format)
+        except ValueError:
+            return None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, remaining_chars=self.guard.remaining())
+
+
+def load_tts_engine(spec: str) -> TTSEngine:
+    """"モジュール:ファクトリ" 形式の指定から合成エンジンを作成"""
+    module_name, _, attr = spec.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"TTS_ENGINE must be 'module:factory': {spec!r}")
+    factory = getattr(importlib.import_module(module_name), attr)
+    return factory()
+
+
+def _create_spend_counter(cache_dir: str):
+    from core.extensions import get_redis_session_manager
+
+    manager = get_redis_session_manager()
+    if manager is not None and getattr(manager, "_client", None) is not None:
+        # フォールバックストアはワーカーごとになるため使わず、Redis に直接数える
+        return RedisSpendCounter(manager._client)
+    return FileSpendCounter(os.path.join(cache_dir, "spend"))
+
+
+# グローバルインスタンス（TTS無効・エンジン未指定なら None）
+_tts_pipeline: Optional[TTSPipeline] = None
+_tts_pipeline_loaded = False
+
+
+def get_tts_pipeline() -> Optional[TTSPipeline]:
+    """TTSPipelineのシングルトンインスタンスを取得（TTS無効・エンジン未指定なら None）"""
+    global _tts_pipeline, _tts_pipeline_loaded
+    if not _tts_pipeline_loaded:
+        from config import get_cached_config
+
+        config = get_cached_config()
+        if config.ENABLE_TTS and config.TTS_ENGINE:
+            try:
+                engine = load_tts_engine(config.TTS_ENGINE)
+            except Exception as e:
+                logger.error(f"Failed to load TTS engine {config.TTS_ENGINE!r}: {e}")
+            else:
+                guard = TTSSpendGuard(
+                    _create_spend_counter(config.TTS_CACHE_DIR),
+                    config.TTS_DAILY_CHAR_BUDGET,
+                    config.TTS_USER_DAILY_CHAR_BUDGET,
+                )
+                _tts_pipeline = TTSPipeline(engine, TTSAudioCache(config.TTS_CACHE_DIR), guard)
+        _tts_pipeline_loaded = True
+    return _tts_pipeline
+
+
+def reset_tts_pipeline() -> None:
+    """シングルトンを破棄する（次回取得時に設定から作り直す。主にテスト用）"""
+    global _tts_pipeline, _tts_pipeline_loaded
+    _tts_pipeline = None
+    _tts_pipeline_loaded = False
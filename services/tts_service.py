@@ -1,8 +1,10 @@
 """
 TTS (Text-to-Speech) service for the workplace-roleplay application.
-NOTE: TTS functionality is currently disabled due to high costs.
+NOTE: TTS functionality is disabled unless ENABLE_TTS and TTS_ENGINE are set
+(see services.tts_pipeline for the audio cache and daily character budget).
 """
 
+import base64
 from typing import Any, Dict, Optional
 
 
@@ -43,17 +45,30 @@ class TTSService:
         emotion: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
-        テキストを音声に変換（現在は停止中）
+        テキストを音声に変換（合成エンジン未設定の場合は停止中）
 
         Args:
             text: 変換するテキスト
             voice_name: 音声名
             voice_style: 音声スタイル（オプション）
-            emotion: 感情（オプション）
+            emotion: 感情（オプション。指定時は感情に合う音声を使う）
 
         Returns:
-            Dict[str, Any]: エラーレスポンス（機能停止中）
+            Dict[str, Any]: 文ごとの音声（segments）、または停止中・利用上限のエラーレスポンス
         """
+        from services.tts_pipeline import TTSBudgetExceededError, get_tts_pipeline
+
+        pipeline = get_tts_pipeline()
+        if pipeline is not None:
+            voice = self.get_voice_for_emotion(emotion) if emotion else voice_name
+            segments = []
+            try:
+                for segment in pipeline.stream(text, voice, voice_style):
+                    segments.append(dict(segment, audio=base64.b64encode(segment["audio"]).decode("ascii")))
+            except TTSBudgetExceededError as e:
+                return {"error": str(e), "budget_exceeded": True, "segments": segments, "fallback_available": True}
+            return {"segments": segments, "voice": voice, "provider": pipeline.engine.name}
+
         return {
             "error": "TTS機能は現在停止中です",
             "message": "高額請求が発生したため、TTS機能を停止しています。",
@@ -0,0 +1,157 @@
+"""
+観戦モードの次ターン先読み（プリフェッチ）
+
+ターンNを返した直後にターンN+1の生成をバックグラウンドで開始し、
+次の /api/watch/next リクエストで結果を引き渡す。
+
+- 観戦セッションごとに最大1件。話題変更（観戦の再開始）時は破棄する
+- 先読みの前提（履歴の長さ・話者）が一致しない結果は使用しない
+- プロセス（ワーカー）ごとの同時先読み数に上限を設け、超過時は先読みしない
+  （破棄・取り出し済みでも実行中のLLM呼び出しは完了するまで数える）
+- 先読み結果はプロセス内メモリに保持するため、別ワーカーに振り分けられた場合は通常生成になる
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WatchPrefetcher:
+    """観戦セッション単位の先読み管理"""
+
+    def __init__(self, max_concurrent: int = 4, wait_timeout_seconds: float = 30.0) -> None:
+        """
+        Args:
+            max_concurrent: このプロセスで同時に実行する先読みの上限（0で無効）
+            wait_timeout_seconds: 実行中の先読みの完了を待つ最大時間
+        """
+        self.max_concurrent = max(0, int(max_concurrent))
+        self.wait_timeout_seconds = wait_timeout_seconds
+        # Future の取り消し・完了時のコールバックはロック保持中の呼び出し元で実行されることがある
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Tuple[Hashable, Future]] = {}
+        self._active = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {"scheduled": 0, "hits": 0, "misses": 0, "skipped": 0, "cancelled": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="watch-prefetch")
+        return self._executor
+
+    def _on_done(self, _future: Future) -> None:
+        with self._lock:
+            self._active -= 1
+
+    def schedule(self, key: str, fingerprint: Hashable, generate: Callable[[], str]) -> bool:
+        """
+        次ターンの先読みを開始
+
+        Args:
+            key: 観戦セッションID
+            fingerprint: 先読みの前提（履歴の長さ・話者など）
+            generate: 次の発言を生成する関数（リクエストコンテキスト外で実行される）
+
+        Returns:
+            bool: 先読みを開始した場合True
+        """
+        if not self.enabled or not key:
+            return False
+        with self._lock:
+            self._discard(key)
+            if self._active >= self.max_concurrent:
+                self._stats["skipped"] += 1
+                return False
+            future = self._get_executor().submit(generate)
+            self._active += 1
+            future.add_done_callback(self._on_done)
+            self._entries[key] = (fingerprint, future)
+            self._stats["scheduled"] += 1
+        return True
+
+    def take(self, key: str, fingerprint: Hashable) -> Optional[str]:
+        """
+        先読み結果を取り出す（実行中の場合は完了を待つ）
+
+        Returns:
+            Optional[str]: 前提が一致し生成に成功した場合は発言、それ以外はNone
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+
+        expected, future = entry
+        if expected != fingerprint:
+            future.cancel()
+            self._count("misses")
+            return None
+        try:
+            result = future.result(timeout=self.wait_timeout_seconds)
+        except FutureTimeoutError:
+            self._count("misses")
+            return None
+        except Exception as e:
+            logger.warning(f"Watch prefetch failed for {key}: {e}")
+            self._count("misses")
+            return None
+        self._count("hits")
+        return result
+
+    def cancel(self, key: Optional[str]) -> None:
+        """観戦セッションの先読みを破棄（話題変更・観戦再開始時）"""
+        if not key:
+            return
+        with self._lock:
+            self._discard(key)
+
+    def stats(self) -> Dict[str, int]:
+        """先読みの統計情報を取得"""
+        with self._lock:
+            return dict(self._stats, active=self._active, max_concurrent=self.max_concurrent)
+
+    def shutdown(self) -> None:
+        """実行中でない先読みを取り消し、スレッドプールを停止"""
+        with self._lock:
+            for key in list(self._entries):
+                self._discard(key)
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _discard(self, key: str) -> None:
+        # ロック保持中に呼び出すこと。実行中のLLM呼び出しは中断できないため結果を捨てる
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[1].cancel()
+            self._stats["cancelled"] += 1
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+
+# グローバルインスタンス
+_watch_prefetcher: Optional[WatchPrefetcher] = None
+
+
+def get_watch_prefetcher() -> WatchPrefetcher:
+    """WatchPrefetcherのシングルトンインスタンスを取得"""
+    global _watch_prefetcher
+    if _watch_prefetcher is None:
+        from config import get_cached_config
+
+        config = get_cached_config()
+        max_concurrent = config.WATCH_PREFETCH_MAX_CONCURRENT if config.WATCH_PREFETCH_ENABLED else 0
+        _watch_prefetcher = WatchPrefetcher(max_concurrent=max_concurrent)
+    return _watch_prefetcher
@@ -4,9 +4,8 @@ Handles watch mode (AI conversation observation) business logic.
 """
 
 import re
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List
 
-from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import HumanMessage, SystemMessage
 
 from utils.helpers import (
@@ -16,11 +15,14 @@ from utils.helpers import (
     get_topic_description,
 )
 
+if TYPE_CHECKING:  # 実行時の import は langsmith 等を読み込み重いため型チェック時のみ
+    from langchain_core.language_models import BaseChatModel
+
 
 class WatchService:
     """観戦モード関連のビジネスロジックを処理するサービス"""
 
-    def generate_initial_message(self, llm: BaseChatModel, partner_type: str, situation: str, topic: str) -> str:
+    def generate_initial_message(self, llm: "BaseChatModel", partner_type: str, situation: str, topic: str) -> str:
         """
         観戦モードの最初のメッセージを生成
 
@@ -69,7 +71,7 @@ class WatchService:
         response = llm.invoke(messages)
         return extract_content(response)
 
-    def generate_next_message(self, llm: BaseChatModel, history: List[Dict[str, Any]]) -> str:
+    def generate_next_message(self, llm: "BaseChatModel", history: List[Dict[str, Any]]) -> str:
         """
         観戦モードの次のメッセージを生成
 
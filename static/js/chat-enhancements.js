@@ -36,15 +36,20 @@
     }
 
     function showRealtimeFeedback(fb) {
-        if (!fb || !fb.has_feedback) return;
+        const alternatives = Array.isArray(fb && fb.alternatives) ? fb.alternatives : [];
+        if (!fb || (!fb.has_feedback && alternatives.length === 0)) return;
         ensureHosts();
         const host = document.getElementById("realtime-feedback-host");
         if (!host) return;
         host.style.display = "block";
+        const alternativesHtml = alternatives.length
+            ? `<p>言い換えの例:</p><ul>${alternatives.map((a) => `<li>${esc(a)}</li>`).join("")}</ul>`
+            : "";
         host.innerHTML = `
       <div class="card-shadow">
         <h3><i class="fas fa-lightbulb"></i> リアルタイムフィードバック</h3>
-        <p>${esc(fb.suggestion || "")}</p>
+        ${fb.has_feedback ? `<p>${esc(fb.suggestion || "")}</p>` : ""}
+        ${alternativesHtml}
         <p id="summary-trigger-wrap"><button type="button" class="secondary-button" id="btn-open-summary"><i class="fas fa-align-left"></i> 要約を見る</button></p>
       </div>`;
         document.getElementById("btn-open-summary")?.addEventListener("click", () => {
@@ -105,6 +110,29 @@
         )}</div>`;
     }
 
+    /**
+     * バックグラウンド実行中のリアルタイムフィードバックをポーリングして表示
+     */
+    async function pollRealtimeFeedback(fetchFn, task, attempt = 0) {
+        if (!task || !task.status_url || attempt >= 20) return;
+        try {
+            const res = await fetchFn(task.status_url, { credentials: "same-origin" });
+            if (!res.ok) return;
+            const data = await res.json();
+            if (data.status === "done") {
+                if (data.result && data.result.realtime_feedback) {
+                    showRealtimeFeedback(data.result.realtime_feedback);
+                }
+                return;
+            }
+            if (data.status === "failed") return;
+        } catch (e) {
+            console.warn("chat-enhancements", e);
+            return;
+        }
+        setTimeout(() => pollRealtimeFeedback(fetchFn, task, attempt + 1), 1000);
+    }
+
     function patchFetch() {
         const prev = window.fetch.bind(window);
         window.fetch = async function (input, init) {
@@ -118,6 +146,8 @@
                         showModerationWarning(data);
                     } else if (res.ok && data.realtime_feedback) {
                         showRealtimeFeedback(data.realtime_feedback);
+                    } else if (res.ok && data.realtime_feedback_task) {
+                        pollRealtimeFeedback(prev, data.realtime_feedback_task);
                     }
                 }
             } catch (e) {
@@ -32,6 +32,7 @@ class CSRFManager {
                 '/api/summary/generate',
                 '/api/export/csv',
                 '/api/export/json',
+                '/api/export/ndjson',
                 '/api/tutorial/complete'
             ]
         };
@@ -183,11 +183,17 @@ function displayMessage(text, className, enableTTS = false) {
         // 画像生成リクエスト
         generateCharacterImage(scenarioId, emotion || 'neutral', text.replace('相手役: ', ''))
             .then(imageData => {
-                if (imageData && imageData.image) {
+                if (imageData && (imageData.url || imageData.image)) {
                     imageContainer.innerHTML = ''; // ローディングをクリア
                     
                     const img = document.createElement("img");
-                    img.src = `data:image/${imageData.format || 'png'};base64,${imageData.image}`;
+                    if (imageData.url) {
+                        // 内容アドレスのURL（ブラウザ・CDNにキャッシュされる）
+                        img.src = `${imageData.url}?w=512`;
+                        img.srcset = `${imageData.url}?w=512 1x, ${imageData.url}?w=1024 2x`;
+                    } else {
+                        img.src = `data:image/${imageData.format || 'png'};base64,${imageData.image}`;
+                    }
                     img.className = "character-image";
                     img.alt = "相手役の表情";
                     
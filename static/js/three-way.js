@@ -1,5 +1,5 @@
 /**
- * 3者会話: /api/three-way/join, /message, /leave
+ * 3者会話: /api/three-way/join, /message, /respond, /leave
  */
 (function () {
     let active = false;
@@ -74,11 +74,45 @@
             if (typeof displayMessage === "function") {
                 displayMessage("あなた: " + msg, "user-message");
             }
+            await streamReplies(status);
         } catch (e) {
             if (status) status.textContent = e.message;
         }
     }
 
+    // A・B の応答を SSE で受け取り、届いた順に表示する
+    async function streamReplies(status) {
+        const res = await fetch("/api/three-way/respond", {
+            method: "POST",
+            credentials: "same-origin",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({}),
+        });
+        if (!res.ok) {
+            const data = await res.json().catch(() => ({}));
+            throw new Error(data.error || "respond failed");
+        }
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split("\n\n");
+            buffer = events.pop();
+            for (const event of events) {
+                if (!event.startsWith("data: ")) continue;
+                const data = JSON.parse(event.slice(6));
+                if (data.error) throw new Error(data.error);
+                if (data.message && typeof displayMessage === "function") {
+                    displayMessage(data.message, "bot-message");
+                }
+                if (data.done && status) status.textContent = "あなたの番です。";
+            }
+        }
+    }
+
     async function onLeave() {
         const status = document.getElementById("three-way-status");
         try {
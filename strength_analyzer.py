@@ -5,8 +5,14 @@
 
 import json
 import random
+import re
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List, Any, Tuple
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
 
 
 # コミュニケーションスキルの強み項目定義
@@ -230,37 +236,198 @@ def generate_encouragement_messages(scores: Dict[str, float], history: List[Dict
     return messages
 
 
+# ===== ローカルの強みスコア計算 =====
+# ユーザーの発言ごとに語彙・構造の特徴量を抽出し、STRENGTH_CATEGORIES の軸ごとの重みで合成する。
+# 決定的（同じ会話なら同じスコア）で、ネットワークを使わない。
+
+# 発言ごとの特徴（0/1）。正規表現のいずれかに一致すれば1
+UTTERANCE_FEATURES = OrderedDict(
+    [
+        ("polite", re.compile(r"です|ます|ございます|でしょうか|ください")),
+        ("humble", re.compile(r"恐れ入り|申し訳|お手数|いただ|させて|よろしくお願い|承知")),
+        ("question", re.compile(r"[？?]|(?:ですか|ますか|でしょうか|かな)[。！!]?$")),
+        ("acknowledge", re.compile(r"なるほど|そうですね|確かに|おっしゃる|わかりました|分かりました|了解|承知|(?:^|[、。\s])はい")),
+        ("empathy", re.compile(r"大変|お疲れ|気持ち|心配|大丈夫|無理(?:せず|しないで)|つら|辛|不安|助かり")),
+        ("positive", re.compile(r"ありがと|感謝|嬉し|うれし|いいですね|素晴らし|すごい|楽しみ|頑張|がんば")),
+        ("negative", re.compile(r"無理です|できません|(?<!機)嫌|いや(?:です|だ)|ダメ|だめ|知らない|別に|面倒|めんどう")),
+        ("structure", re.compile(r"まず|次に|最後に|つまり|なぜなら|理由は|例えば|具体的|結論|ポイント|[0-9０-９]+[つ点]")),
+        ("solution", re.compile(r"しましょう|しませんか|どうでしょう|提案|対応します|いたします|進めます|確認します|調整")),
+        ("confirm", re.compile(r"ということ|という理解|確認|認識で|でよろしい|で合って|ですよね")),
+    ]
+)
+
+# 会話全体の特徴（UTTERANCE_FEATURES の出現率に続く）
+AGGREGATE_FEATURES = ("length_fit", "length_variation")
+FEATURE_NAMES = tuple(UTTERANCE_FEATURES) + AGGREGATE_FEATURES
+
+# 軸ごとの特徴量の重み（正は強みの根拠、負は減点）
+STRENGTH_FEATURE_WEIGHTS = {
+    "empathy": {"empathy": 0.45, "acknowledge": 0.2, "positive": 0.15, "humble": 0.1, "negative": -0.5},
+    "clarity": {"structure": 0.45, "length_fit": 0.3, "confirm": 0.1, "solution": 0.15},
+    "active_listening": {"question": 0.35, "acknowledge": 0.3, "confirm": 0.35, "negative": -0.2},
+    "adaptability": {"length_variation": 0.35, "question": 0.2, "solution": 0.25, "humble": 0.2, "negative": -0.3},
+    "positivity": {"positive": 0.55, "solution": 0.25, "empathy": 0.1, "negative": -0.6},
+    "professionalism": {"polite": 0.45, "humble": 0.35, "length_fit": 0.1, "solution": 0.1, "negative": -0.4},
+}
+
+# 軸 × 特徴量の重み行列
+_WEIGHT_MATRIX = np.array(
+    [[STRENGTH_FEATURE_WEIGHTS[axis].get(name, 0.0) for name in FEATURE_NAMES] for axis in STRENGTH_CATEGORIES],
+    dtype=np.float64,
+)
+
+STRENGTH_BASE_SCORE = 55
+STRENGTH_SCORE_RANGE = 40
+STRENGTH_MIN_SCORE = 40
+STRENGTH_MAX_SCORE = 95
+# 発言が少ないうちは基準点に寄せる（n / (n + STRENGTH_PRIOR_TURNS)）
+STRENGTH_PRIOR_TURNS = 2
+# 質問の割合はこの値で満点（質問ばかりでも傾聴とは言えないため）
+QUESTION_RATE_TARGET = 0.3
+# 1発言の長さの目安（文字数。対数で離れるほど length_fit が下がる）
+PREFERRED_UTTERANCE_LENGTH = 40
+# 発言の長さの変動係数はこの値で満点
+LENGTH_VARIATION_TARGET = 0.5
+
+_QUESTION_INDEX = FEATURE_NAMES.index("question")
+_SPEAKER_PREFIX = re.compile(r"^(?:ユーザー|user|User)[:：]\s*")
+_MARKER_LINE = re.compile(r"^\[[^\]]*\]$")
+
+
+@lru_cache(maxsize=4096)
+def utterance_features(utterance: str) -> Tuple[float, ...]:
+    """発言1件の特徴量（UTTERANCE_FEATURES の 0/1 と、長さの適合度）。結果はキャッシュする"""
+    indicators = [1.0 if pattern.search(utterance) else 0.0 for pattern in UTTERANCE_FEATURES.values()]
+    length_fit = float(np.exp(-0.5 * np.log(max(len(utterance), 1) / PREFERRED_UTTERANCE_LENGTH) ** 2))
+    return tuple(indicators) + (length_fit,)
+
+
+class StrengthScorer:
+    """
+    ユーザーの発言を1件ずつ積み上げて強みスコアを計算する
+
+    発言ごとの特徴量の合計と長さの合計・二乗和だけを保持するため、
+    update は新しい発言の特徴抽出のみ、scores は発言数によらず一定の計算量になる。
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._sums = np.zeros(len(UTTERANCE_FEATURES) + 1, dtype=np.float64)
+        self._length_sum = 0.0
+        self._length_sq_sum = 0.0
+
+    def copy(self) -> "StrengthScorer":
+        other = StrengthScorer()
+        other.count = self.count
+        other._sums = self._sums.copy()
+        other._length_sum = self._length_sum
+        other._length_sq_sum = self._length_sq_sum
+        return other
+
+    def update(self, utterance: str) -> None:
+        """発言を1件追加"""
+        utterance = utterance.strip()
+        if not utterance:
+            return
+        self._sums += utterance_features(utterance)
+        length = float(len(utterance))
+        self.count += 1
+        self._length_sum += length
+        self._length_sq_sum += length * length
+
+    def feature_vector(self) -> np.ndarray:
+        """会話全体の特徴量（FEATURE_NAMES の順。0〜1）"""
+        if self.count == 0:
+            return np.zeros(len(FEATURE_NAMES), dtype=np.float64)
+        means = self._sums / self.count
+        rates = means[:-1].copy()
+        rates[_QUESTION_INDEX] = min(rates[_QUESTION_INDEX] / QUESTION_RATE_TARGET, 1.0)
+        mean_length = self._length_sum / self.count
+        variance = max(self._length_sq_sum / self.count - mean_length * mean_length, 0.0)
+        variation = min((variance**0.5 / mean_length) / LENGTH_VARIATION_TARGET, 1.0) if self.count > 1 else 0.0
+        return np.concatenate([rates, [means[-1], variation]])
+
+    def scores(self) -> Dict[str, int]:
+        """軸ごとのスコア（発言がなければ全て50）"""
+        if self.count == 0:
+            return {key: 50 for key in STRENGTH_CATEGORIES}
+        confidence = self.count / (self.count + STRENGTH_PRIOR_TURNS)
+        raw = STRENGTH_BASE_SCORE + STRENGTH_SCORE_RANGE * confidence * (_WEIGHT_MATRIX @ self.feature_vector())
+        clipped = np.clip(np.rint(raw), STRENGTH_MIN_SCORE, STRENGTH_MAX_SCORE)
+        return {key: int(score) for key, score in zip(STRENGTH_CATEGORIES, clipped)}
+
+
+# 会話履歴（文字列）→ StrengthScorer。1ターン前の履歴が残っていれば新しい発言だけ追加する
+_SCORER_CACHE_SIZE = 512
+_scorer_cache: "OrderedDict[str, StrengthScorer]" = OrderedDict()
+_scorer_cache_lock = threading.Lock()
+
+
+def _user_utterance(line: str) -> Optional[str]:
+    line = _SPEAKER_PREFIX.sub("", line.strip())
+    if not line or _MARKER_LINE.match(line):
+        return None
+    return line
+
+
+def _cached_scorer(conversation_history: str) -> Optional[StrengthScorer]:
+    with _scorer_cache_lock:
+        scorer = _scorer_cache.get(conversation_history)
+        if scorer is not None:
+            _scorer_cache.move_to_end(conversation_history)
+        return scorer
+
+
+def _store_scorer(conversation_history: str, scorer: StrengthScorer) -> None:
+    with _scorer_cache_lock:
+        _scorer_cache[conversation_history] = scorer
+        _scorer_cache.move_to_end(conversation_history)
+        while len(_scorer_cache) > _SCORER_CACHE_SIZE:
+            _scorer_cache.popitem(last=False)
+
+
+def get_strength_scorer(conversation_history: str) -> StrengthScorer:
+    """
+    会話履歴（format_conversation_history の形式）の StrengthScorer を取得
+
+    直前のターンまでの履歴を計算済みであれば、その結果に最後の発言だけを追加する。
+    """
+    scorer = _cached_scorer(conversation_history)
+    if scorer is not None:
+        return scorer
+
+    prefix, _, last_line = conversation_history.rpartition("\n")
+    previous = _cached_scorer(prefix) if prefix else None
+    if previous is not None:
+        scorer = previous.copy()
+        lines = [last_line]
+    else:
+        scorer = StrengthScorer()
+        lines = conversation_history.split("\n")
+    for line in lines:
+        utterance = _user_utterance(line)
+        if utterance:
+            scorer.update(utterance)
+    _store_scorer(conversation_history, scorer)
+    return scorer
+
+
 def analyze_user_strengths(conversation_history: str) -> Dict[str, float]:
     """
-    会話履歴からユーザーの強みを分析（シンプルバージョン）
+    会話履歴からユーザーの強みを分析（ローカルの特徴量スコア）
     会話履歴が空の場合はデフォルト値を返す
 
+    丁寧語・質問の割合・相づち・発言の長さのばらつきなどの特徴量を軸ごとの重みで合成する。
+    決定的で、LLM（ネットワーク）を使わない。
+
     Returns:
         スコア辞書
     """
     # 会話履歴が空の場合はデフォルト値を返す
     if not conversation_history or conversation_history.strip() == "":
-        return {
-            "empathy": 50,
-            "clarity": 50,
-            "active_listening": 50,
-            "adaptability": 50,
-            "positivity": 50,
-            "professionalism": 50,
-        }
-
-    # 会話履歴の長さに基づいて基本スコアを設定
-    base_score = min(60 + len(conversation_history.split("\n")) * 2, 85)
-
-    # 各カテゴリにランダムな変動を加える（実際のAI分析の代わり）
-    import random
-
-    scores = {}
-    for category in STRENGTH_CATEGORIES.keys():
-        variation = random.randint(-10, 10)
-        scores[category] = max(40, min(95, base_score + variation))
+        return {key: 50 for key in STRENGTH_CATEGORIES}
 
-    return scores
+    return get_strength_scorer(conversation_history).scores()
 
 
 def create_personalized_message_prompt(scores: Dict[str, float], base_message: str) -> str:
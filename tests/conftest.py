@@ -3,12 +3,20 @@ Pytestの共通設定とフィクスチャ
 """
 import os
 import sys
+import tempfile
 import pytest
 from unittest.mock import patch
 
 # プロジェクトのルートディレクトリをPythonパスに追加
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+# テスト中に作られるセッション・ユーザーデータ・タスクキュー・ログはリポジトリの外に書く
+# （app の import 時に設定が読み込まれるため、モジュールの読み込み時に設定する）
+_TEST_RUNTIME_DIR = tempfile.mkdtemp(prefix="workplace-roleplay-test-")
+os.environ.setdefault("SESSION_FILE_DIR", os.path.join(_TEST_RUNTIME_DIR, "flask_session"))
+os.environ.setdefault("TASK_QUEUE_DB_PATH", os.path.join(_TEST_RUNTIME_DIR, "task_queue.db"))
+os.environ.setdefault("GAMIFICATION_VIBE_LOG_FILE", os.path.join(_TEST_RUNTIME_DIR, "logs", "gamification.log"))
+
 
 # テスト用の環境変数を設定
 @pytest.fixture(scope="session", autouse=True)
@@ -32,8 +40,31 @@ def setup_test_env():
     os.environ["GOOGLE_API_KEY_3"] = "test-api-key-3"
     os.environ["GOOGLE_API_KEY_4"] = "test-api-key-4"
 
+    # JSONのユーザーデータも一時ディレクトリに保存
+    from services.user_data_service import UserDataService
+
+    UserDataService.DATA_DIR = os.path.join(_TEST_RUNTIME_DIR, "user_data")
+
+    # バックグラウンドタスクはインメモリキューで同期実行（ワーカースレッドを起動しない）
+    import services.post_response_tasks  # noqa: F401
+    import services.task_queue as task_queue_module
+
+    task_queue_module._task_queue = task_queue_module.TaskQueue(":memory:", eager=True)
+
+    # 観戦モードの先読みは無効化（テスト終了後にバックグラウンドでLLMを呼ばないため）
+    import services.watch_prefetch as watch_prefetch_module
+
+    watch_prefetch_module._watch_prefetcher = watch_prefetch_module.WatchPrefetcher(max_concurrent=0)
+
+    # 観戦クイズの事前生成も同様に無効化
+    import services.quiz_pregeneration as quiz_pregeneration_module
+
+    quiz_pregeneration_module._quiz_pregenerator = quiz_pregeneration_module.QuizPregenerator(max_concurrent=0)
+
     yield
 
+    task_queue_module.reset_task_queue()
+
     # テスト後のクリーンアップ
     for key in ["TESTING", "FLASK_ENV"]:
         os.environ.pop(key, None)
@@ -0,0 +1,158 @@
+"""
+設定スナップショット（config/snapshot.py）のテスト
+"""
+import os
+import signal
+from dataclasses import FrozenInstanceError
+
+import pytest
+
+import config.snapshot as snapshot_module
+from config import get_cached_config
+from config.config import Config
+from config.snapshot import (
+    get_config_snapshot,
+    install_reload_signal,
+    reload_config_snapshot,
+    request_config_reload,
+    reset_config_snapshot,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_snapshot():
+    reset_config_snapshot()
+    yield
+    reset_config_snapshot()
+
+
+def _config(**values):
+    return Config(_env_file=None, **values)
+
+
+class TestConfigSnapshot:
+    def test_スナップショットは変更不可(self):
+        # Given: 構築済みのスナップショット
+        snapshot = get_config_snapshot()
+
+        # When/Then: 設定の差し替えもモデルの解決表の書き換えもできない
+        with pytest.raises(FrozenInstanceError):
+            snapshot.config = Config(_env_file=None)
+        with pytest.raises(TypeError):
+            snapshot.models["chat"] = "gemini/gemini-2.5-pro"
+
+    def test_元の設定クラスのインスタンスとして扱える(self):
+        reload_config_snapshot(_config(DEFAULT_MODEL="gemini/gemini-2.5-pro"))
+
+        config = get_config_snapshot().config
+
+        assert isinstance(config, Config)
+        assert config.DEFAULT_MODEL == "gemini/gemini-2.5-pro"
+
+    def test_モード別モデルの解決表(self, monkeypatch):
+        # Given: CHAT_MODEL のみ設定
+        for key in ("SCENARIO_MODEL", "CHAT_MODEL", "WATCH_MODEL", "FEEDBACK_MODEL"):
+            monkeypatch.delenv(key, raising=False)
+        monkeypatch.setenv("CHAT_MODEL", "ollama/gemma4:31b-cloud")
+
+        # When
+        reload_config_snapshot(_config(DEFAULT_MODEL="gemini/gemini-2.5-flash"))
+
+        # Then: 未設定のモードは DEFAULT_MODEL
+        assert dict(get_config_snapshot().models) == {
+            "scenario": "gemini/gemini-2.5-flash",
+            "chat": "ollama/gemma4:31b-cloud",
+            "watch": "gemini/gemini-2.5-flash",
+            "feedback": "gemini/gemini-2.5-flash",
+        }
+
+    def test_アクセスごとに設定を構築しない(self, monkeypatch):
+        first = get_config_snapshot()
+
+        monkeypatch.setattr(snapshot_module, "get_config", lambda: pytest.fail("config rebuilt"))
+
+        assert get_config_snapshot() is first
+        assert get_cached_config() is first.config
+
+
+class TestReload:
+    def test_再読み込みで差し替わる(self, monkeypatch):
+        # Given
+        first = get_config_snapshot()
+        monkeypatch.setenv("SCENARIO_MODEL", "ollama/gemma4:31b-cloud")
+
+        # When
+        assert reload_config_snapshot() is True
+
+        # Then: 新しい版のスナップショット（取得済みの古いスナップショットは変わらない）
+        current = get_config_snapshot()
+        assert current.version == first.version + 1
+        assert current.models["scenario"] == "ollama/gemma4:31b-cloud"
+        assert first.models["scenario"] != "ollama/gemma4:31b-cloud"
+
+    def test_不正な設定では直前のスナップショットを使い続ける(self, monkeypatch):
+        # Given
+        first = get_config_snapshot()
+        monkeypatch.setenv("CHAT_MODEL", "invalid/random-model")
+
+        # When
+        assert reload_config_snapshot() is False
+
+        # Then
+        assert get_config_snapshot() is first
+
+    @pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="SIGHUP のないプラットフォーム")
+    def test_SIGHUPで次回アクセス時に再読み込み(self, monkeypatch):
+        # Given: SIGHUP のハンドラを登録
+        first = get_config_snapshot()
+        previous = signal.getsignal(signal.SIGHUP)
+        try:
+            assert install_reload_signal() is True
+            monkeypatch.setenv("WATCH_MODEL", "ollama/gemma4:31b-cloud")
+
+            # When
+            os.kill(os.getpid(), signal.SIGHUP)
+
+            # Then
+            current = get_config_snapshot()
+            assert current.version == first.version + 1
+            assert current.models["watch"] == "ollama/gemma4:31b-cloud"
+        finally:
+            signal.signal(signal.SIGHUP, previous)
+
+    def test_envファイルの更新で再読み込み(self, tmp_path, monkeypatch):
+        # Given: 監視対象の .env
+        env_file = tmp_path / ".env"
+        env_file.write_text("")
+        monkeypatch.setattr(snapshot_module, "ENV_FILE", str(env_file))
+        first = get_config_snapshot()
+        monkeypatch.setenv("FEEDBACK_MODEL", "ollama/gemma4:31b-cloud")
+
+        # When: 確認間隔が経過する前は再読み込みしない
+        assert get_config_snapshot() is first
+
+        # When: 更新後に確認間隔が経過
+        os.utime(env_file, (first.env_file_mtime + 10, first.env_file_mtime + 10))
+        monkeypatch.setattr(snapshot_module, "_next_check", 0.0)
+
+        # Then
+        assert get_config_snapshot().models["feedback"] == "ollama/gemma4:31b-cloud"
+
+    def test_envファイルが変わらなければ再読み込みしない(self, tmp_path, monkeypatch):
+        env_file = tmp_path / ".env"
+        env_file.write_text("")
+        monkeypatch.setattr(snapshot_module, "ENV_FILE", str(env_file))
+        first = get_config_snapshot()
+
+        monkeypatch.setattr(snapshot_module, "_next_check", 0.0)
+
+        assert get_config_snapshot() is first
+
+    def test_再読み込みの要求は構築せずに記録する(self, monkeypatch):
+        first = get_config_snapshot()
+        monkeypatch.setattr(snapshot_module, "get_config", lambda: pytest.fail("built in handler"))
+
+        request_config_reload()
+
+        monkeypatch.setattr(snapshot_module, "get_config", lambda: _config())
+        assert get_config_snapshot().version == first.version + 1
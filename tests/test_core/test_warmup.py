@@ -0,0 +1,55 @@
+"""
+フォーク前のウォームアップのテスト
+"""
+
+import gc
+import os
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+from core.warmup import warmup
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def _unfreeze():
+    yield
+    # 凍結したオブジェクトを以降のテストでGC対象に戻す
+    if hasattr(gc, "unfreeze"):
+        gc.unfreeze()
+
+
+class TestWarmup:
+    """warmup のテスト"""
+
+    def test_全ステップを実行して所要時間を返す(self):
+        # Given: テンプレートを持つアプリ
+        app = Flask(__name__, root_path=PROJECT_ROOT)
+
+        # When: SDK読み込みなしでウォームアップ
+        with patch.object(app.jinja_env, "get_template", wraps=app.jinja_env.get_template) as get_template:
+            report = warmup(app, preload_sdks=False, freeze=False)
+
+        # Then: 各ステップの所要時間が記録され、テンプレートが事前コンパイルされる
+        assert list(report["steps_ms"]) == ["scenarios", "categories", "matchers", "prompts", "templates"]
+        assert report["frozen_objects"] == 0
+        assert "index.html" in [call.args[0] for call in get_template.call_args_list]
+
+    @pytest.mark.skipif(not hasattr(gc, "freeze"), reason="gc.freeze が利用できない環境")
+    def test_読み込んだオブジェクトを凍結(self):
+        report = warmup(preload_sdks=False)
+
+        assert report["frozen_objects"] > 0
+        assert gc.get_freeze_count() > 0
+
+    def test_失敗したステップがあっても続行(self):
+        # Given: シナリオ読み込みが失敗する
+        with patch("services.scenario_service.get_scenario_service", side_effect=RuntimeError("boom")):
+            # When: ウォームアップ
+            report = warmup(preload_sdks=False, freeze=False)
+
+        # Then: 残りのステップも実行される
+        assert "templates" in report["steps_ms"]
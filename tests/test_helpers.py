@@ -84,6 +84,48 @@ class TestExtractContent:
         assert result == "123"
 
 
+class TestExtractLlmText:
+    """extract_llm_text関数のテスト"""
+
+    def test_パート配列を連結(self):
+        """Gemini のパート配列はテキストを連結する"""
+        from utils.helpers import extract_llm_text
+
+        msg = AIMessage(content=[{"type": "text", "text": "こん"}, {"type": "text", "text": "にちは"}])
+
+        assert extract_llm_text(msg) == "こんにちは"
+
+    def test_Noneは空文字(self):
+        """応答がない場合は空文字"""
+        from utils.helpers import extract_llm_text
+
+        assert extract_llm_text(None) == ""
+
+
+class TestLoadJsonLenient:
+    """load_json_lenient関数のテスト"""
+
+    def test_コードフェンスと説明文を除いて読み取る(self):
+        """フェンス内の最初のJSON値を返す"""
+        from utils.helpers import load_json_lenient
+
+        text = '結果です:\n```json\n{"question": "Q", "choices": ["a", "b"]}\n```'
+
+        assert load_json_lenient(text, "{") == {"question": "Q", "choices": ["a", "b"]}
+
+    def test_打ち切られた出力は読み取れる範囲で返す(self):
+        """末尾が切れていても完結している要素までを返す"""
+        from utils.helpers import load_json_lenient
+
+        assert load_json_lenient('["一つ目", "二つ目", "三つ', "[") == ["一つ目", "二つ目", "三つ"]
+
+    def test_JSONがなければNone(self):
+        """開き括弧がない場合は None"""
+        from utils.helpers import load_json_lenient
+
+        assert load_json_lenient("JSONはありません", "{") is None
+
+
 class TestFormatConversationHistory:
     """format_conversation_history関数のテスト"""
 
@@ -0,0 +1,75 @@
+"""
+起動時の import コストのテスト
+
+`python -X importtime` の出力から、app の import とアプリ生成で重いSDKが読み込まれないこと、
+import 時間が予算内であることを確認する（gunicorn ワーカーの起動時間の劣化防止）。
+予算は IMPORT_TIME_BUDGET_MS で上書きできる。
+"""
+
+import os
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 初回利用時まで読み込まないSDK（import だけで数百ミリ秒かかる）
+DEFERRED_MODULES = [
+    "google.generativeai",
+    "google.api_core",
+    "langchain_google_genai",
+    "langchain_openai",
+    "openai",
+    "langsmith.client",
+    "langchain_core.language_models",
+]
+
+DEFAULT_BUDGET_MS = 1500
+
+
+def _import_times(code: str) -> Dict[str, int]:
+    """コードを別プロセスで実行し、モジュールごとの累積 import 時間（マイクロ秒）を返す"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    times: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        times[name.strip()] = int(cumulative_us)
+    return times
+
+
+@pytest.fixture(scope="module")
+def app_creation_times():
+    # アプリ生成（Blueprint登録を含む）まで行う
+    return _import_times("from app import app")
+
+
+class TestImportTime:
+    """起動時の import コストのテスト"""
+
+    def test_アプリ生成で重いSDKを読み込まない(self, app_creation_times):
+        loaded = [module for module in DEFERRED_MODULES if module in app_creation_times]
+
+        assert loaded == []
+
+    def test_appのimportは予算内(self):
+        # Given: 予算（ミリ秒）
+        budget_ms = float(os.environ.get("IMPORT_TIME_BUDGET_MS", DEFAULT_BUDGET_MS))
+
+        # When: app モジュールを import する
+        times = _import_times("import app")
+
+        # Then: 累積 import 時間が予算内
+        assert times["app"] / 1000 < budget_ms
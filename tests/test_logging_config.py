@@ -22,9 +22,17 @@ def app():
 
 @pytest.fixture
 def temp_log_dir():
-    """一時ログディレクトリ"""
+    """一時ログディレクトリ（終了時に非同期リスナーを止め、ルートロガーのハンドラを元に戻す）"""
+    from utils.logging_config import shutdown_logging
+
+    root_logger = logging.getLogger()
+    saved_handlers = list(root_logger.handlers)
+    saved_level = root_logger.level
     with tempfile.TemporaryDirectory() as tmpdir:
         yield tmpdir
+        shutdown_logging()
+    root_logger.handlers[:] = saved_handlers
+    root_logger.setLevel(saved_level)
 
 
 class TestJSONFormatter:
@@ -197,7 +205,23 @@ class TestSetupLogging:
         )
 
         assert logger is not None
+        # 非同期モード（デフォルト）ではキューハンドラのみで、実際のハンドラはリスナー側
+        from logging.handlers import QueueHandler
+
+        from utils.logging_config import _listener
+
+        assert [type(h) for h in logger.handlers] == [type(logger.handlers[0])]
+        assert isinstance(logger.handlers[0], QueueHandler)
+        assert len(_listener.handlers) >= 2  # コンソール + ファイル
+
+    def test_同期モード(self, temp_log_dir):
+        """async_logging=False ではハンドラをルートロガーに直接登録する"""
+        from utils.logging_config import is_async_logging_active, setup_logging
+
+        logger = setup_logging(log_dir=temp_log_dir, app_name="test-sync", async_logging=False)
+
         assert len(logger.handlers) >= 2  # コンソール + ファイル
+        assert is_async_logging_active() is False
 
     def test_テキストフォーマット(self, temp_log_dir):
         """テキストフォーマットでのセットアップ"""
@@ -316,3 +340,227 @@ class TestLogException:
 
         # リクエストコンテキストなしでも動作
         log_exception(error)
+
+
+class TestAsyncLogging:
+    """非同期ログ（QueueHandler / QueueListener）のテスト"""
+
+    def _read_json_lines(self, path):
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def test_リスナースレッドでファイルに書き込む(self, app, temp_log_dir):
+        from utils.logging_config import setup_logging, shutdown_logging
+
+        # Given: 非同期モードのログ設定
+        setup_logging(log_dir=temp_log_dir, app_name="async-app", log_level="INFO")
+
+        # When: リクエスト中にログを出力し、リスナーを停止（残りを書き出す）
+        with app.test_request_context("/api/chat", method="POST"):
+            g.request_id = "req-async"
+            logging.getLogger("test.async").info("hello %s", "world")
+        shutdown_logging()
+
+        # Then: メッセージとリクエスト情報がJSONで記録される
+        (entry,) = [
+            e for e in self._read_json_lines(os.path.join(temp_log_dir, "async-app.log")) if e["logger"] == "test.async"
+        ]
+        assert entry["message"] == "hello world"
+        assert entry["request"]["path"] == "/api/chat"
+        assert entry["request_id"] == "req-async"
+
+    def test_例外情報をリスナー側で出力(self, temp_log_dir):
+        from utils.logging_config import setup_logging, shutdown_logging
+
+        setup_logging(log_dir=temp_log_dir, app_name="async-exc")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("test.async").exception("failed")
+        shutdown_logging()
+
+        (entry,) = self._read_json_lines(os.path.join(temp_log_dir, "async-exc-error.log"))
+        assert "ValueError: boom" in entry["exception"]
+
+    def test_アクセスログは専用ファイルにも出力(self, temp_log_dir):
+        from utils.logging_config import setup_logging, shutdown_logging
+
+        setup_logging(log_dir=temp_log_dir, app_name="async-access")
+        logging.getLogger("access").info("GET / - 200")
+        logging.getLogger("other").info("not access")
+        shutdown_logging()
+
+        entries = self._read_json_lines(os.path.join(temp_log_dir, "async-access-access.log"))
+        assert [e["message"] for e in entries] == ["GET / - 200"]
+
+    def test_キュー満杯時はWARNING未満を破棄(self):
+        import queue
+
+        from utils.logging_config import DroppingQueueHandler
+
+        # Given: 上限1件のキュー
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.LogRecord("t", logging.INFO, __file__, 1, "msg", None, None)
+
+        # When: 2件目は満杯で破棄され、空いた後の投入で破棄件数が通知される
+        handler.handle(record)
+        handler.handle(record)
+        handler.queue.get_nowait()
+        handler.handle(record)
+
+        # Then: 破棄は1件で、通知はキューに入らなければ次回に持ち越される
+        assert handler.dropped == 1
+        assert handler.queue.get_nowait().getMessage() == "msg"
+        assert handler._unreported_drops == 1
+
+    def test_キュー満杯でもWARNING以上は空きを待つ(self):
+        import queue
+
+        from utils.logging_config import DroppingQueueHandler
+
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        handler.BLOCK_TIMEOUT_SECONDS = 0.01
+        handler.handle(logging.LogRecord("t", logging.INFO, __file__, 1, "first", None, None))
+
+        handler.handle(logging.LogRecord("t", logging.ERROR, __file__, 1, "error", None, None))
+
+        # 空きができなければ破棄として数える
+        assert handler.dropped == 1
+
+    def test_deferはリスナースレッドで実行(self, temp_log_dir):
+        import threading
+
+        from utils.logging_config import defer, setup_logging, shutdown_logging
+
+        # Given: 非同期モードなし
+        calls = []
+        assert defer(calls.append, "sync") is False
+
+        # When: 非同期モードで予約
+        setup_logging(log_dir=temp_log_dir, app_name="async-defer")
+        assert defer(lambda: calls.append(threading.current_thread().name)) is True
+        shutdown_logging()
+
+        # Then: 呼び出し元とは別のスレッドで実行される
+        assert len(calls) == 1
+        assert calls[0] != threading.current_thread().name
+
+
+
+class TestNativeThreadListener:
+    """gevent 環境向けのOSスレッドのリスナーとキューのテスト"""
+
+    def test_NativeQueueは上限を超えると満杯(self):
+        import queue
+
+        from utils.logging_config import DroppingQueueHandler, NativeQueue
+
+        handler = DroppingQueueHandler(NativeQueue(maxsize=1))
+        handler.BLOCK_TIMEOUT_SECONDS = 0.01
+        handler.handle(logging.LogRecord("t", logging.INFO, __file__, 1, "first", None, None))
+        handler.handle(logging.LogRecord("t", logging.ERROR, __file__, 1, "error", None, None))
+
+        assert handler.dropped == 1
+        assert handler.queue.get_nowait().getMessage() == "first"
+        with pytest.raises(queue.Empty):
+            handler.queue.get_nowait()
+
+    def test_OSスレッドで書き込み停止時に残りを書き出す(self):
+        import threading
+
+        from utils.logging_config import LogQueueListener, NativeQueue
+
+        written = []
+
+        class Recorder(logging.Handler):
+            def emit(self, record):
+                written.append((record.getMessage(), threading.get_ident()))
+
+        log_queue = NativeQueue(maxsize=10)
+        listener = LogQueueListener(log_queue, Recorder(), native_thread=True)
+        listener.start()
+        for i in range(3):
+            log_queue.put_nowait(logging.LogRecord("t", logging.INFO, __file__, 1, f"msg{i}", None, None))
+        listener.stop()
+
+        assert [m for m, _ in written] == ["msg0", "msg1", "msg2"]
+        assert all(ident != threading.get_ident() for _, ident in written)
+        assert log_queue.qsize() == 0
+
+    def test_geventでパッチ済みでも書き込みがリクエストのgreenletを止めない(self, tmp_path):
+        import subprocess
+        import sys
+        import textwrap
+
+        pytest.importorskip("gevent")
+        # Given: パッチ済みのプロセスで、書き込みに 0.5 秒かかるハンドラを非同期ログの後ろに置く
+        script = textwrap.dedent(
+            f"""
+            from gevent import monkey
+            monkey.patch_all()
+
+            import logging
+            import time
+            import gevent
+            from utils import logging_config
+
+            blocking_sleep = monkey.get_original("time", "sleep")
+
+            class SlowHandler(logging.Handler):
+                def emit(self, record):
+                    blocking_sleep(0.5)
+
+            logging_config.setup_logging(log_dir={str(tmp_path)!r}, app_name="gevent-test")
+            listener = logging_config._listener
+            listener.handlers = listener.handlers + (SlowHandler(),)
+            assert listener.native_thread
+            assert isinstance(logging_config._queue_handler.queue, logging_config.NativeQueue)
+
+            # When: ログを出力した直後に、greenlet の切り替えを20回行う
+            logging.getLogger("test").warning("slow write")
+            started = time.monotonic()
+            for _ in range(20):
+                gevent.sleep(0.01)
+            elapsed = time.monotonic() - started
+            logging_config.shutdown_logging()
+            print(elapsed)
+            """
+        )
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run(
+            [sys.executable, "-c", script], cwd=project_root, capture_output=True, text=True, timeout=60
+        )
+
+        # Then: 書き込み中もハブは止まらない（20回の sleep が 0.5 秒の書き込みを待たずに進む）
+        assert result.returncode == 0, result.stderr
+        assert float(result.stdout.strip().splitlines()[-1]) < 0.45
+
+
+class TestAccessLogSampler:
+    """アクセスログのサンプリングのテスト"""
+
+    def _record(self, status_code, response_time_ms=5.0, level=logging.INFO):
+        record = logging.LogRecord("access", level, __file__, 1, "GET /", None, None)
+        record.extra_data = {"status_code": status_code, "response_time_ms": response_time_ms}
+        return record
+
+    def test_正常で速いリクエストはサンプリング(self):
+        from utils.logging_config import AccessLogSampler
+
+        sampler = AccessLogSampler(sample_rate=0.0)
+
+        assert sampler.filter(self._record(200)) is False
+
+    def test_エラーと遅いリクエストは常に記録(self):
+        from utils.logging_config import AccessLogSampler
+
+        sampler = AccessLogSampler(sample_rate=0.0, slow_ms=500.0)
+
+        assert sampler.filter(self._record(500)) is True
+        assert sampler.filter(self._record(200, response_time_ms=800.0)) is True
+        assert sampler.filter(self._record(200, level=logging.WARNING)) is True
+
+    def test_サンプリング率1なら全件記録(self):
+        from utils.logging_config import AccessLogSampler
+
+        assert AccessLogSampler(sample_rate=1.0).filter(self._record(200)) is True
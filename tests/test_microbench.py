@@ -0,0 +1,110 @@
+"""
+ホットパスのマイクロベンチマーク（benchmarks.microbench）のテスト
+
+通常のテスト実行では各ケースがオフラインで動作することと比較ロジックのみを確認する。
+ベースラインとの比較（性能劣化ゲート）は RUN_MICROBENCH=1 の場合のみ実行する。
+"""
+
+import os
+
+import pytest
+
+from benchmarks.microbench import (
+    CASES,
+    BenchContext,
+    compare,
+    load_baseline,
+    measure,
+    run_suite,
+    save_baseline,
+)
+
+REQUIRED_CASES = {
+    "llm_service.build_messages",
+    "helpers.add_messages_from_history",
+    "security.sanitize_input",
+    "security.escape_html",
+    "security.escape_json",
+    "moderation.check_message",
+    "harassment.detect_harassment",
+    "csp.inject_nonce_to_html",
+    "user_data.load",
+    "user_data.save",
+    "analytics.reports",
+    "scenarios.load_scenarios",
+}
+
+
+class TestMicrobenchCases:
+    """ベンチマークケースのテスト"""
+
+    def test_対象のホットパスが登録されている(self):
+        assert REQUIRED_CASES <= set(CASES)
+
+    def test_全ケースのベースラインが保存されている(self):
+        assert set(CASES) <= set(load_baseline())
+
+    @pytest.mark.parametrize("name", sorted(CASES))
+    def test_各ケースがオフラインで実行できる(self, name):
+        # Given: ケースのセットアップ（スタブLLM・一時ディレクトリ）
+        ctx = BenchContext()
+        try:
+            fn = CASES[name].setup(ctx)
+
+            # When/Then: 例外なく実行できる
+            fn()
+        finally:
+            ctx.close()
+
+    def test_スタブLLMの応答を返す(self):
+        ctx = BenchContext()
+        try:
+            result = CASES["llm_service.invoke_sync_stub"].setup(ctx)()
+        finally:
+            ctx.close()
+
+        assert "承知しました" in result
+
+
+class TestMicrobenchRunner:
+    """計測・比較ロジックのテスト"""
+
+    def test_計測値は正の値(self):
+        assert measure(lambda: sum(range(100)), min_time=0.001, repeat=2) > 0
+
+    def test_ベースラインとの比較(self):
+        # Given: ベースラインと今回の結果
+        baseline = {"a": {"relative": 1.0}, "b": {"relative": 1.0}, "c": {"relative": 1.0}}
+        results = {
+            "a": {"relative": 1.2},
+            "b": {"relative": 1.5},
+            "c": {"relative": 0.5},
+            "d": {"relative": 1.0},
+        }
+
+        # When: 30%のしきい値で比較する
+        rows = {row["name"]: row["status"] for row in compare(results, baseline, threshold=0.3)}
+
+        # Then: しきい値を超えた増加のみ劣化とみなす
+        assert rows == {"a": "ok", "b": "regression", "c": "improved", "d": "new"}
+
+    def test_ベースラインの保存は既存ケースを残す(self, tmp_path):
+        # Given: 既存のベースライン
+        path = str(tmp_path / "baseline.json")
+        save_baseline({"calibration_ns": 1.0, "results": {"a": {"ns_per_op": 1.0, "relative": 1.0}}}, path)
+
+        # When: 別ケースの結果で更新する
+        save_baseline({"calibration_ns": 1.0, "results": {"b": {"ns_per_op": 2.0, "relative": 2.0}}}, path)
+
+        # Then: 両方のケースが保存されている
+        assert set(load_baseline(path)) == {"a", "b"}
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(os.environ.get("RUN_MICROBENCH") != "1", reason="RUN_MICROBENCH=1 の場合のみ実行")
+def test_ホットパスの性能劣化がない():
+    suite = run_suite()
+
+    regressions = [row for row in compare(suite["results"], load_baseline()) if row["status"] == "regression"]
+
+    assert regressions == []
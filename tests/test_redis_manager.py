@@ -2,6 +2,8 @@
 Redis manager tests for improved coverage.
 """
 
+import asyncio
+
 import pytest
 from unittest.mock import patch, MagicMock, PropertyMock
 import json
@@ -196,12 +198,12 @@ class TestRedisSessionManager:
             assert result is True
 
     def test_clear_pattern(self):
-        """パターンに一致するキーの削除"""
+        """パターンに一致するキーの削除（KEYS ではなく SCAN で走査）"""
         with patch("utils.redis_manager.redis.Redis") as mock_redis:
             mock_client = MagicMock()
             mock_client.ping.return_value = True
-            mock_client.keys.return_value = ["key1", "key2"]
-            mock_client.delete.return_value = 2
+            mock_client.scan_iter.return_value = iter(["key1", "key2"])
+            mock_client.unlink.return_value = 2
             mock_redis.return_value = mock_client
 
             from utils.redis_manager import RedisSessionManager
@@ -210,6 +212,7 @@ class TestRedisSessionManager:
             result = manager.clear_pattern("key*")
 
             assert result == 2
+            mock_client.keys.assert_not_called()
 
     def test_health_check_接続時(self):
         """接続時のヘルスチェック"""
@@ -431,3 +434,315 @@ class TestRedisConnectionError:
         exc = RedisConnectionError("Connection failed")
 
         assert str(exc) == "Connection failed"
+
+
+def _connected_manager(mock_redis, **kwargs):
+    from utils.redis_manager import RedisSessionManager
+
+    mock_client = MagicMock()
+    mock_client.ping.return_value = True
+    mock_redis.return_value = mock_client
+    return RedisSessionManager(**kwargs), mock_client
+
+
+def _wait_until(predicate, timeout=2.0):
+    import time
+
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestFallbackStore:
+    """フォールバックストア（有効期限・件数上限）のテスト"""
+
+    def test_有効期限を守る(self):
+        from utils.redis_manager import FallbackStore
+
+        # Given: 10秒で期限切れのキー
+        store = FallbackStore()
+        with patch("utils.redis_manager.time.monotonic", return_value=100.0):
+            store.set("session:1", "value", expire=10)
+            store.set("session:2", "value")
+
+        # When: 期限後にアクセス
+        with patch("utils.redis_manager.time.monotonic", return_value=111.0):
+            # Then: 期限切れのキーのみ消える
+            assert store.get("session:1") is None
+            assert "session:2" in store
+            assert len(store) == 1
+
+    def test_件数上限で最も古く使われたキーから削除(self):
+        from utils.redis_manager import FallbackStore
+
+        store = FallbackStore(max_items=2)
+        store.set("a", 1)
+        store.set("b", 2)
+        store.get("a")  # a を最近使ったものにする
+
+        store.set("c", 3)
+
+        assert store.keys() == ["a", "c"]
+        assert store.stats()["evictions"] == 1
+
+    def test_globパターンで削除(self):
+        from utils.redis_manager import FallbackStore
+
+        store = FallbackStore()
+        for key in ("session:1", "session:2", "cache:session"):
+            store[key] = "v"
+
+        assert store.delete_matching("session:*") == 2
+        assert store.keys() == ["cache:session"]
+
+
+class TestResilience:
+    """再接続とフォールバックの切り替えのテスト"""
+
+    def test_接続失敗後にバックグラウンドで再接続(self, monkeypatch):
+        import redis
+
+        from utils import redis_manager
+
+        monkeypatch.setattr(redis_manager, "RECONNECT_INITIAL_DELAY", 0.01)
+        with patch("utils.redis_manager.redis.Redis") as mock_redis:
+            # Given: 初回の接続確認は失敗し、2回目以降は成功する
+            mock_client = MagicMock()
+            mock_client.ping.side_effect = [redis.ConnectionError("refused"), redis.ConnectionError("refused"), True]
+            mock_redis.return_value = mock_client
+
+            manager = redis_manager.RedisSessionManager(fallback_enabled=True)
+            try:
+                # When/Then: フォールバックで継続し、その後 Redis に戻る
+                assert manager._is_connected is False
+                assert _wait_until(lambda: manager._is_connected)
+                mock_client.get.return_value = "from-redis"
+                assert manager.get("key") == "from-redis"
+            finally:
+                manager.close()
+
+    def test_操作中の接続断でフォールバックに切り替える(self, monkeypatch):
+        import redis
+
+        from utils import redis_manager
+
+        monkeypatch.setattr(redis_manager, "RECONNECT_INITIAL_DELAY", 60.0)
+        with patch("utils.redis_manager.redis.Redis") as mock_redis:
+            manager, mock_client = _connected_manager(mock_redis)
+            mock_client.setex.side_effect = redis.ConnectionError("reset by peer")
+            try:
+                # When: 接続断で失敗した書き込み
+                assert manager.set("key", "value", expire=30) is True
+
+                # Then: フォールバックに保存され、再接続スレッドが動く
+                assert manager._is_connected is False
+                assert manager._fallback_storage.get("key") == "value"
+                assert manager._reconnect_thread.is_alive()
+            finally:
+                manager.close()
+
+    def test_再接続したらフォールバックの値を破棄する(self, monkeypatch):
+        import redis
+
+        from utils import redis_manager
+
+        monkeypatch.setattr(redis_manager, "RECONNECT_INITIAL_DELAY", 0.01)
+        with patch("utils.redis_manager.redis.Redis") as mock_redis:
+            # Given: 停止中にフォールバックへ書き込む
+            mock_client = MagicMock()
+            mock_client.ping.side_effect = [redis.ConnectionError("refused")] * 3 + [True] * 10
+            mock_redis.return_value = mock_client
+            manager = redis_manager.RedisSessionManager(fallback_enabled=True)
+            try:
+                manager._fallback_storage.set("key", "stale")
+
+                # When: 再接続スレッドが復旧を確認する
+                assert _wait_until(lambda: manager._is_connected)
+
+                # Then: 停止中の値は残らない
+                assert len(manager._fallback_storage) == 0
+            finally:
+                manager.close()
+
+    def test_ヘルスチェックで復旧を確認したらフォールバックの値を破棄する(self, monkeypatch):
+        import redis
+
+        from utils import redis_manager
+
+        monkeypatch.setattr(redis_manager, "RECONNECT_INITIAL_DELAY", 60.0)
+        with patch("utils.redis_manager.redis.Redis") as mock_redis:
+            mock_client = MagicMock()
+            mock_client.ping.side_effect = [redis.ConnectionError("refused"), True]
+            mock_redis.return_value = mock_client
+            manager = redis_manager.RedisSessionManager(fallback_enabled=True)
+            try:
+                manager.set("key", "stale")
+
+                result = manager.health_check()
+
+                assert result["connected"] is True and manager._is_connected is True
+                assert len(manager._fallback_storage) == 0
+            finally:
+                manager.close()
+
+    def test_フォールバックでもexpireを守る(self):
+        import redis
+
+        with patch("utils.redis_manager.redis.Redis") as mock_redis:
+            mock_client = MagicMock()
+            mock_client.ping.side_effect = redis.ConnectionError("refused")
+            mock_redis.return_value = mock_client
+
+            from utils.redis_manager import RedisSessionManager
+
+            manager = RedisSessionManager(fallback_enabled=True)
+            try:
+                with patch("utils.redis_manager.time.monotonic", return_value=100.0):
+                    manager.set("key", "value", expire=5)
+                with patch("utils.redis_manager.time.monotonic", return_value=106.0):
+                    assert manager.get("key") is None
+            finally:
+                manager.close()
+
+
+class TestBulkOperations:
+    """一括操作のテスト"""
+
+    def test_clear_patternはバッチごとにunlink(self):
+        with patch("utils.redis_manager.redis.Redis") as mock_redis:
+            manager, mock_client = _connected_manager(mock_redis)
+            mock_client.scan_iter.return_value = iter(f"key:{i}" for i in range(1200))
+            mock_client.unlink.side_effect = lambda *keys: len(keys)
+
+            assert manager.clear_pattern("key:*") == 1200
+            assert [len(c.args) for c in mock_client.unlink.call_args_list] == [500, 500, 200]
+
+    def test_get_manyは1往復で取得(self):
+        with patch("utils.redis_manager.redis.Redis") as mock_redis:
+            manager, mock_client = _connected_manager(mock_redis)
+            mock_client.mget.return_value = ['{"n": 1}', None, "plain"]
+
+            result = manager.get_many(["a", "b", "c"])
+
+            assert result == {"a": {"n": 1}, "c": "plain"}
+            mock_client.mget.assert_called_once_with(["a", "b", "c"])
+
+    def test_set_manyはパイプラインで保存(self):
+        with patch("utils.redis_manager.redis.Redis") as mock_redis:
+            manager, mock_client = _connected_manager(mock_redis)
+            pipe = mock_client.pipeline.return_value
+            pipe.execute.return_value = [True, True]
+
+            assert manager.set_many({"a": {"n": 1}, "b": "x"}, expire=60) is True
+            mock_client.pipeline.assert_called_once_with(transaction=False)
+            assert pipe.setex.call_count == 2
+            pipe.execute.assert_called_once()
+
+    def test_health_checkに接続プールの使用率(self):
+        with patch("utils.redis_manager.redis.Redis") as mock_redis:
+            manager, mock_client = _connected_manager(mock_redis, max_connections=10)
+            mock_client.connection_pool._in_use_connections = {object(), object()}
+            mock_client.connection_pool._available_connections = [object()]
+
+            pool = manager.health_check()["pool"]
+
+            assert pool == {"max_connections": 10, "in_use": 2, "available": 1, "created": 3, "utilization": 0.2}
+
+
+class TestAsyncRedisSessionManager:
+    """asyncio 版のテスト"""
+
+    def _manager(self, client, **kwargs):
+        from utils.redis_manager import AsyncRedisSessionManager
+
+        with patch("redis.asyncio.Redis", return_value=client):
+            return AsyncRedisSessionManager(**kwargs)
+
+    async def test_接続時はRedisを使う(self):
+        from unittest.mock import AsyncMock
+
+        client = AsyncMock()
+        client.mget.return_value = ['{"n": 1}', None]
+        manager = self._manager(client)
+
+        assert await manager.connect() is True
+        assert await manager.get_many(["a", "b"]) == {"a": {"n": 1}}
+
+    async def test_接続失敗時はフォールバック(self, monkeypatch):
+        import redis
+        from unittest.mock import AsyncMock
+
+        from utils import redis_manager
+
+        monkeypatch.setattr(redis_manager, "RECONNECT_INITIAL_DELAY", 60.0)
+        client = AsyncMock()
+        client.ping.side_effect = redis.ConnectionError("refused")
+        manager = self._manager(client)
+        try:
+            assert await manager.connect() is False
+
+            assert await manager.set("key", {"n": 1}, expire=30) is True
+            assert await manager.get("key") == {"n": 1}
+            client.set.assert_not_called()
+            assert manager._reconnect_task is not None
+        finally:
+            await manager.close()
+
+    async def test_再接続したらフォールバックの値を破棄する(self, monkeypatch):
+        import redis
+        from unittest.mock import AsyncMock
+
+        from utils import redis_manager
+
+        monkeypatch.setattr(redis_manager, "RECONNECT_INITIAL_DELAY", 0.01)
+        client = AsyncMock()
+        client.ping.side_effect = [redis.ConnectionError("refused"), True]
+        manager = self._manager(client)
+        try:
+            # Given: 停止中にフォールバックへ書き込む
+            assert await manager.connect() is False
+            await manager.set("key", "stale")
+
+            # When: 再接続タスクが復旧を確認する
+            await asyncio.wait_for(manager._reconnect_task, timeout=5)
+
+            # Then: 停止中の値は残らない
+            assert manager._is_connected is True
+            assert len(manager._fallback_storage) == 0
+        finally:
+            await manager.close()
+
+    async def test_ヘルスチェックで復旧を確認したらフォールバックの値を破棄する(self, monkeypatch):
+        import redis
+        from unittest.mock import AsyncMock
+
+        from utils import redis_manager
+
+        monkeypatch.setattr(redis_manager, "RECONNECT_INITIAL_DELAY", 60.0)
+        client = AsyncMock()
+        client.ping.side_effect = [redis.ConnectionError("refused"), True]
+        manager = self._manager(client)
+        try:
+            assert await manager.connect() is False
+            await manager.set("key", "stale")
+
+            result = await manager.health_check()
+
+            assert result["connected"] is True
+            assert len(manager._fallback_storage) == 0
+        finally:
+            await manager.close()
+
+    async def test_フォールバック無効なら例外(self):
+        import redis
+        from unittest.mock import AsyncMock
+
+        from utils.redis_manager import RedisConnectionError
+
+        client = AsyncMock()
+        client.ping.side_effect = redis.ConnectionError("refused")
+        manager = self._manager(client, fallback_enabled=False)
+
+        with pytest.raises(RedisConnectionError):
+            await manager.connect()
@@ -0,0 +1,74 @@
+"""
+データエクスポートAPIのテスト
+POST /api/export/csv, /api/export/json, /api/export/ndjson
+"""
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+HISTORY = [
+    {"role": "user", "content": "おはようございます", "timestamp": "2026-09-30T09:00:00"},
+    {"role": "assistant", "content": "おはよう", "timestamp": "2026-10-01T09:00:01"},
+    {"role": "user", "content": "資料の件で", "timestamp": "2026-10-02T10:00:00"},
+]
+
+
+class TestExportRoutes:
+    """会話履歴エクスポートのテスト"""
+
+    def test_CSVをストリーミングで返す(self, client):
+        response = client.post("/api/export/csv", json={"history": HISTORY})
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.headers["Content-Disposition"] == "attachment; filename=conversations.csv"
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        assert rows[0] == ["user_id", "role", "content"]
+        assert [row[2] for row in rows[1:]] == ["おはようございます", "おはよう", "資料の件で"]
+
+    def test_NDJSONは1行1件(self, client):
+        response = client.post("/api/export/ndjson", json={"history": HISTORY})
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [r["content"] for r in records] == ["おはようございます", "おはよう", "資料の件で"]
+        assert all("user_id" in r for r in records)
+
+    def test_日付範囲で絞り込み(self, client):
+        # Given: 10/1〜10/1 の範囲（終端の日付はその日の終わりまで含む）
+        response = client.post("/api/export/json?since=2026-10-01&until=2026-10-01", json={"history": HISTORY})
+
+        # Then: 範囲内の履歴のみ
+        data = json.loads(response.get_data(as_text=True))
+        assert [c["content"] for c in data["conversations"]] == ["おはよう"]
+
+    def test_日付範囲はボディでも指定できる(self, client):
+        response = client.post("/api/export/ndjson", json={"history": HISTORY, "since": "2026-10-02T00:00:00"})
+
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [r["content"] for r in records] == ["資料の件で"]
+
+    def test_不正な日付は400(self, client):
+        response = client.post("/api/export/csv?since=yesterday", json={"history": HISTORY})
+
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize("bounds", [{"since": 20261001}, {"until": ["2026-10-01"]}, {"since": {"day": 1}}])
+    def test_文字列以外の日付は400(self, client, bounds):
+        response = client.post("/api/export/json", json={"history": HISTORY, **bounds})
+
+        assert response.status_code == 400
+
+    def test_gzip対応クライアントには圧縮して返す(self, client):
+        # When: Accept-Encoding: gzip でリクエスト
+        response = client.post("/api/export/csv", json={"history": HISTORY}, headers={"Accept-Encoding": "gzip"})
+
+        # Then: gzip 圧縮され、展開すると CSV
+        assert response.headers["Content-Encoding"] == "gzip"
+        text = gzip.decompress(response.get_data()).decode("utf-8")
+        assert text.splitlines()[0] == "user_id,role,content"
@@ -531,3 +531,134 @@ class TestSecurityUtilsFallback:
         # サニタイズされたメッセージまたは元のメッセージが返される
         assert result is not None
         assert isinstance(result, str)
+
+
+class TestContentAddressedImages:
+    """生成画像の URL 返却と /img/<hash>.webp 配信のテスト"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        from services.image_store import ImageStore
+
+        store = ImageStore(str(tmp_path / "images"))
+        with patch("routes.image_routes.get_image_store", return_value=store):
+            yield store
+
+    @staticmethod
+    def make_png():
+        import io
+
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (600, 800), (10, 120, 200)).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def mock_genai(self, image_bytes):
+        mock_part = MagicMock()
+        mock_part.text = None
+        mock_part.inline_data.data = image_bytes
+        mock_response = MagicMock()
+        mock_response.candidates[0].content.parts = [mock_part]
+        mock_genai = MagicMock()
+        mock_genai.Client.return_value.models.generate_content.return_value = mock_response
+        return mock_genai
+
+    def generate(self, client, image_bytes):
+        mock_genai = self.mock_genai(image_bytes)
+        mock_google = MagicMock(genai=mock_genai)
+        with patch.dict(
+            "sys.modules",
+            {"google": mock_google, "google.genai": mock_genai, "google.genai.types": MagicMock()},
+        ):
+            response = client.post(
+                "/api/generate_character_image",
+                json={"scenario_id": "scenario1", "emotion": "happy"},
+            )
+        return response, mock_genai
+
+    def test_生成結果はbase64ではなくURLで返す(self, client, store):
+        import routes.image_routes
+
+        routes.image_routes.image_cache.clear()
+
+        response, _ = self.generate(client, self.make_png())
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert "image" not in data
+        assert data["url"] == f"/img/{data['hash']}.webp"
+        assert data["format"] == "webp"
+        # プロセス内のキャッシュはメタデータのみ
+        assert "image" not in routes.image_routes.image_cache["scenario1_happy"]
+        routes.image_routes.image_cache.clear()
+
+    def test_他のワーカーが生成済みなら生成しない(self, client, store):
+        import routes.image_routes
+
+        # Given: 別ワーカーで生成・索引登録済み（このプロセスのキャッシュは空）
+        routes.image_routes.image_cache.clear()
+        self.generate(client, self.make_png())
+        routes.image_routes.image_cache.clear()
+
+        # When
+        response, mock_genai = self.generate(client, self.make_png())
+
+        # Then: API を呼ばずに索引から返す
+        assert response.get_json()["cache_hit"] is True
+        mock_genai.Client.assert_not_called()
+        routes.image_routes.image_cache.clear()
+
+    def test_WebPを長期キャッシュ可能な形で配信する(self, client, store):
+        image_hash = store.put(self.make_png())
+
+        response = client.get(f"/img/{image_hash}.webp")
+
+        assert response.status_code == 200
+        assert response.mimetype == "image/webp"
+        assert response.headers["ETag"] == f'"{image_hash}-w0"'
+        assert "immutable" in response.headers["Cache-Control"]
+        assert "max-age=31536000" in response.headers["Cache-Control"]
+        assert response.data[:4] == b"RIFF"
+
+    def test_ETagが一致すれば304(self, client, store):
+        image_hash = store.put(self.make_png())
+
+        response = client.get(
+            f"/img/{image_hash}.webp?w=256",
+            headers={"If-None-Match": f'"{image_hash}-w256"'},
+        )
+
+        assert response.status_code == 304
+        assert response.data == b""
+
+    def test_Range指定で部分的に返す(self, client, store):
+        image_hash = store.put(self.make_png())
+        full = client.get(f"/img/{image_hash}.webp").data
+
+        response = client.get(f"/img/{image_hash}.webp", headers={"Range": "bytes=0-9"})
+
+        assert response.status_code == 206
+        assert response.data == full[:10]
+
+    def test_幅ごとの派生画像(self, client, store):
+        import io
+
+        from PIL import Image
+
+        image_hash = store.put(self.make_png())
+
+        response = client.get(f"/img/{image_hash}.webp?w=128")
+
+        with Image.open(io.BytesIO(response.data)) as image:
+            assert image.width == 128
+
+    def test_許可していない幅は400(self, client, store):
+        image_hash = store.put(self.make_png())
+
+        assert client.get(f"/img/{image_hash}.webp?w=300").status_code == 400
+        assert client.get(f"/img/{image_hash}.webp?w=abc").status_code == 400
+
+    def test_存在しない画像は404(self, client, store):
+        assert client.get(f"/img/{'0' * 64}.webp").status_code == 404
+        assert client.get("/img/not-a-hash.webp").status_code == 404
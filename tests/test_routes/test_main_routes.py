@@ -44,6 +44,26 @@ class TestGetPerformanceMetrics:
             assert response.status_code in [200, 500, 503]
 
 
+class TestPrometheusMetrics:
+    """GET /metrics のテスト"""
+
+    def test_Prometheus形式で取得(self, client):
+        """Prometheusテキスト形式で返る"""
+        client.get("/health")
+        client.get("/api/metrics")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.content_type.startswith("text/plain; version=0.0.4")
+        body = response.get_data(as_text=True)
+        assert "# TYPE workplace_roleplay_http_request_duration_seconds histogram" in body
+        assert 'endpoint="/api/metrics"' in body
+        # /metrics 自身と除外対象は記録しない
+        assert 'endpoint="/metrics"' not in body
+        assert 'endpoint="/health"' not in body
+
+
 class TestIndexPage:
     """GET / のテスト"""
 
@@ -0,0 +1,126 @@
+"""
+プロファイル管理APIとプロファイリングミドルウェアのテスト
+GET /api/admin/profiles, GET /api/admin/profiles/<id>, POST/DELETE /api/admin/profiles/window
+"""
+
+import time
+from unittest.mock import patch
+
+import pytest
+from flask import Flask, jsonify
+
+from core.middleware import register_middleware
+from routes.profiling_routes import profiling_bp
+from utils.profiler import RequestProfiler
+
+TOKEN = "profiler-secret"
+
+
+def _slow_view():
+    end = time.perf_counter() + 0.05
+    while time.perf_counter() < end:
+        pass
+    return jsonify({"ok": True})
+
+
+def _build_app(profiler):
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.config["SECRET_KEY"] = "test"
+    with patch("utils.profiler._profiler", profiler):
+        register_middleware(app)
+    app.register_blueprint(profiling_bp)
+    app.add_url_rule("/slow", "slow", _slow_view)
+    return app
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiler = RequestProfiler(admin_token=TOKEN, interval_ms=1.0, output_dir=str(tmp_path))
+    with patch("utils.profiler._profiler", profiler):
+        yield profiler
+
+
+@pytest.fixture
+def profiling_client(profiler):
+    return _build_app(profiler).test_client()
+
+
+class TestProfilingMiddleware:
+    """プロファイリングミドルウェアのテスト"""
+
+    def test_管理者ヘッダー付きのリクエストをプロファイル(self, profiling_client, profiler):
+        # When: 管理者ヘッダーを付けてリクエスト
+        response = profiling_client.get("/slow", headers={"X-Profile-Token": TOKEN})
+
+        # Then: プロファイルIDが返り、メタデータが保存される
+        profile_id = response.headers["X-Profile-Id"]
+        (metadata,) = profiler.store.list()
+        assert metadata["id"] == profile_id
+        assert metadata["endpoint"] == "/slow"
+        assert metadata["trigger"] == "header"
+        assert metadata["status_code"] == 200
+
+    def test_通常のリクエストはプロファイルしない(self, profiling_client, profiler):
+        response = profiling_client.get("/slow", headers={"X-Profile-Token": "wrong"})
+
+        assert "X-Profile-Id" not in response.headers
+        assert profiler.store.list() == []
+
+    def test_トークン未設定ならフックを登録しない(self, tmp_path):
+        # Given: 無効なプロファイラ
+        app = _build_app(RequestProfiler(output_dir=str(tmp_path)))
+
+        # Then: プロファイリング用のフックが登録されない
+        hooks = [f.__name__ for f in app.before_request_funcs.get(None, [])]
+        assert "start_profiling" not in hooks
+
+
+class TestProfilingRoutes:
+    """プロファイル管理APIのテスト"""
+
+    def test_トークンがなければ403(self, profiling_client):
+        assert profiling_client.get("/api/admin/profiles").status_code == 403
+
+    def test_無効な場合は404(self, tmp_path):
+        disabled = RequestProfiler(output_dir=str(tmp_path))
+        with patch("utils.profiler._profiler", disabled):
+            client = _build_app(disabled).test_client()
+            response = client.get("/api/admin/profiles", headers={"X-Profile-Token": TOKEN})
+
+        assert response.status_code == 404
+
+    def test_一覧とダウンロード(self, profiling_client):
+        # Given: プロファイル済みのリクエスト
+        headers = {"X-Profile-Token": TOKEN}
+        profile_id = profiling_client.get("/slow", headers=headers).headers["X-Profile-Id"]
+
+        # When: 一覧と各形式のダウンロード
+        listing = profiling_client.get("/api/admin/profiles", headers=headers).get_json()
+        collapsed = profiling_client.get(f"/api/admin/profiles/{profile_id}", headers=headers)
+        speedscope = profiling_client.get(f"/api/admin/profiles/{profile_id}?format=speedscope", headers=headers)
+
+        # Then: 一覧に含まれ、collapsed-stack と speedscope 形式で取得できる
+        assert [p["id"] for p in listing["profiles"]] == [profile_id]
+        assert collapsed.status_code == 200
+        assert "_slow_view (tests/test_routes/test_profiling_routes.py" in collapsed.get_data(as_text=True)
+        assert speedscope.get_json()["profiles"][0]["type"] == "sampled"
+
+    def test_存在しないプロファイルは404(self, profiling_client):
+        response = profiling_client.get("/api/admin/profiles/" + "0" * 32, headers={"X-Profile-Token": TOKEN})
+
+        assert response.status_code == 404
+
+    def test_ウィンドウ内の全リクエストをプロファイル(self, profiling_client, profiler):
+        headers = {"X-Profile-Token": TOKEN}
+
+        # When: ウィンドウを有効化してヘッダーなしでリクエスト
+        enabled = profiling_client.post("/api/admin/profiles/window", json={"seconds": 30}, headers=headers)
+        profiling_client.get("/slow")
+        disabled = profiling_client.delete("/api/admin/profiles/window", headers=headers)
+        profiling_client.get("/slow")
+
+        # Then: ウィンドウ内のリクエストのみ記録される
+        assert enabled.get_json()["window"]["active"] is True
+        assert disabled.get_json()["window"]["active"] is False
+        assert [p["trigger"] for p in profiler.store.list()] == ["window"]
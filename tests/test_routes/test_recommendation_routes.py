@@ -0,0 +1,38 @@
+"""
+シナリオ推薦 API（/api/recommendations）のテスト
+"""
+from unittest.mock import MagicMock, patch
+
+
+class TestRecommendations:
+    def test_おすすめシナリオを返す(self, client):
+        recommender = MagicMock()
+        recommender.recommend.return_value = {
+            "recommendations": [{"scenario_id": "scenario1", "score": 1.2}],
+            "weakness": {"empathy": 0.5},
+        }
+        with patch("services.scenario_recommender.get_scenario_recommender", return_value=recommender):
+            response = client.get("/api/recommendations?limit=3")
+
+        assert response.status_code == 200
+        assert response.get_json()["recommendations"][0]["scenario_id"] == "scenario1"
+        assert recommender.recommend.call_args.kwargs["limit"] == 3
+
+    def test_実際のカタログから推薦する(self, client):
+        response = client.get("/api/recommendations")
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert 0 < len(data["recommendations"]) <= 5
+        # 新規ユーザーは初級のみアンロック
+        assert {r["difficulty"] for r in data["recommendations"]} == {"beginner"}
+
+    def test_不正な件数は400(self, client):
+        assert client.get("/api/recommendations?limit=0").status_code == 400
+        assert client.get("/api/recommendations?limit=21").status_code == 400
+
+    def test_整数でない件数は400(self, client):
+        for value in ("abc", "1.5", ""):
+            response = client.get(f"/api/recommendations?limit={value}")
+            assert response.status_code == 400
+            assert "integer" in response.get_json()["error"]
@@ -0,0 +1,179 @@
+"""
+SSEストリーミング版チャットAPIのテスト
+POST /api/chat/stream, POST /api/scenario_chat/stream
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+from langchain_core.messages import AIMessageChunk
+
+from utils.streaming import format_sse
+
+
+def _parse_sse(body: bytes) -> list:
+    """SSEレスポンスボディをイベントのリストに変換"""
+    events = []
+    for block in body.decode("utf-8").split("\n\n"):
+        for line in block.splitlines():
+            if line.startswith("data: "):
+                events.append(json.loads(line[len("data: "):]))
+    return events
+
+
+def _streaming_llm(*chunks):
+    """指定チャンクを順に返すストリーミングLLMのモック"""
+    llm = MagicMock()
+    llm.stream.return_value = iter([AIMessageChunk(content=c) for c in chunks])
+    return llm
+
+
+class TestFormatSse:
+    """format_sse のテスト"""
+
+    def test_データのみのイベント(self):
+        # Given: 日本語を含むデータ
+        # When: SSE文字列に変換
+        result = format_sse({"content": "こんにちは"})
+        # Then: ASCIIエスケープされたdata行で終わる
+        assert result.startswith("data: ")
+        assert result.endswith("\n\n")
+        assert json.loads(result[len("data: "):]) == {"content": "こんにちは"}
+
+    def test_イベント名付き(self):
+        result = format_sse({"done": True}, event="done")
+        assert result.startswith("event: done\n")
+
+
+class TestChatStream:
+    """POST /api/chat/stream のテスト"""
+
+    def test_トークンを逐次配信し完了後に履歴へ保存する(self, csrf_client):
+        # Given: 初期化済みのチャットセッション
+        with csrf_client.session_transaction() as sess:
+            sess["chat_settings"] = {"system_prompt": "テスト用プロンプト", "model": "gemini-1.5-flash"}
+            sess["chat_history"] = []
+
+        # When: ストリーミングAPIにメッセージを送信
+        with patch("app.initialize_llm", return_value=_streaming_llm("こんにちは", "！元気です")):
+            response = csrf_client.post(
+                "/api/chat/stream", json={"message": "こんにちは", "model": "gemini-1.5-flash"}
+            )
+            events = _parse_sse(response.data)
+
+        # Then: チャンクと完了イベント（TTFT付き）が届き、履歴に全文が保存される
+        assert response.status_code == 200
+        assert response.mimetype == "text/event-stream"
+        assert [e["content"] for e in events if "content" in e] == ["こんにちは", "！元気です"]
+        done = events[-1]
+        assert done["done"] is True
+        assert done["full_content"] == "こんにちは！元気です"
+        assert done["ttft_ms"] is not None
+        assert done["total_ms"] >= done["ttft_ms"]
+
+        with csrf_client.session_transaction() as sess:
+            assert sess["chat_history"][-1]["human"] == "こんにちは"
+            assert sess["chat_history"][-1]["ai"] == "こんにちは！元気です"
+
+    def test_出力はHTMLエスケープされる(self, csrf_client):
+        with csrf_client.session_transaction() as sess:
+            sess["chat_settings"] = {"system_prompt": "テスト用プロンプト"}
+            sess["chat_history"] = []
+
+        with patch("app.initialize_llm", return_value=_streaming_llm("<script>alert(1)</script>")):
+            response = csrf_client.post("/api/chat/stream", json={"message": "こんにちは"})
+            events = _parse_sse(response.data)
+
+        assert "<script>" not in events[0]["content"]
+
+    def test_LLMエラー時はエラーイベントを返し履歴を保存しない(self, csrf_client):
+        # Given: ストリーミング中に例外を送出するLLM
+        with csrf_client.session_transaction() as sess:
+            sess["chat_settings"] = {"system_prompt": "テスト用プロンプト"}
+            sess["chat_history"] = []
+        llm = MagicMock()
+        llm.stream.side_effect = Exception("connection reset")
+
+        # When: ストリーミングAPIを呼び出す
+        with patch("app.initialize_llm", return_value=llm):
+            response = csrf_client.post("/api/chat/stream", json={"message": "こんにちは"})
+            events = _parse_sse(response.data)
+
+        # Then: エラーイベントのみが届く
+        assert "error" in events[-1]
+        with csrf_client.session_transaction() as sess:
+            assert sess["chat_history"] == []
+
+    def test_セッション未初期化で400(self, csrf_client):
+        response = csrf_client.post("/api/chat/stream", json={"message": "テスト"})
+        assert response.status_code == 400
+
+    def test_空メッセージで400(self, csrf_client):
+        with csrf_client.session_transaction() as sess:
+            sess["chat_settings"] = {"system_prompt": "テスト用プロンプト"}
+
+        response = csrf_client.post("/api/chat/stream", json={"message": ""})
+        assert response.status_code == 400
+
+    def test_CSRFトークンなしで403(self, client):
+        response = client.post("/api/chat/stream", json={"message": "テスト"})
+        assert response.status_code == 403
+
+
+class TestScenarioChatStream:
+    """POST /api/scenario_chat/stream のテスト"""
+
+    def test_シナリオ応答を逐次配信し履歴へ保存する(self, csrf_client):
+        # Given: 開始済みのシナリオ履歴
+        scenario_id = "scenario1"
+        with csrf_client.session_transaction() as sess:
+            sess["scenario_history"] = {scenario_id: [{"human": "[シナリオ開始]", "ai": "よろしく"}]}
+
+        # When: ストリーミングAPIにメッセージを送信
+        with patch("app.initialize_llm", return_value=_streaming_llm("承知", "しました")):
+            response = csrf_client.post(
+                "/api/scenario_chat/stream",
+                json={"message": "お願いします", "scenario_id": scenario_id, "model": "gemini-1.5-flash"},
+            )
+            events = _parse_sse(response.data)
+
+        # Then: 全文が完了イベントと履歴に反映される
+        assert response.status_code == 200
+        assert events[-1]["full_content"] == "承知しました"
+        with csrf_client.session_transaction() as sess:
+            last = sess["scenario_history"][scenario_id][-1]
+            assert last["human"] == "お願いします"
+            assert last["ai"] == "承知しました"
+
+    def test_LLMエラー時は謝罪文を履歴に残す(self, csrf_client):
+        scenario_id = "scenario1"
+        with csrf_client.session_transaction() as sess:
+            sess["scenario_history"] = {scenario_id: [{"human": "[シナリオ開始]", "ai": "よろしく"}]}
+        llm = MagicMock()
+        llm.stream.side_effect = Exception("boom")
+
+        with patch("app.initialize_llm", return_value=llm):
+            response = csrf_client.post(
+                "/api/scenario_chat/stream",
+                json={"message": "お願いします", "scenario_id": scenario_id},
+            )
+            events = _parse_sse(response.data)
+
+        assert "error" in events[-1]
+        with csrf_client.session_transaction() as sess:
+            assert sess["scenario_history"][scenario_id][-1]["ai"].startswith("申し訳ありません。")
+
+    def test_無効なシナリオIDで400(self, csrf_client):
+        with patch("routes.scenario_routes.scenario_service") as mock_service:
+            mock_service.get_scenario_by_id.return_value = None
+
+            response = csrf_client.post(
+                "/api/scenario_chat/stream",
+                json={"message": "テスト", "scenario_id": "invalid_id"},
+            )
+
+        assert response.status_code == 400
+
+    def test_JSONなしでエラー(self, csrf_client):
+        response = csrf_client.post("/api/scenario_chat/stream", data="invalid", content_type="application/json")
+        assert response.status_code in [400, 500]
@@ -0,0 +1,180 @@
+"""
+バックグラウンドタスク結果APIのテスト
+GET /api/tasks/<task_id>, GET /api/tasks
+"""
+
+from unittest.mock import MagicMock, patch
+
+from services.post_response_tasks import REALTIME_FEEDBACK
+from services.task_queue import get_task_queue
+
+
+class TestTaskRoutes:
+    """タスク結果APIのテスト"""
+
+    def test_自分のタスク結果を取得できる(self, client):
+        # Given: セッションユーザーが所有する完了済みタスク
+        with client.session_transaction() as sess:
+            sess["user_id"] = "task-owner"
+        with patch.dict("services.task_queue._TASK_HANDLERS", {REALTIME_FEEDBACK: lambda p: {"ok": True}}):
+            task_id = get_task_queue().enqueue(REALTIME_FEEDBACK, {"message": "x"}, owner="task-owner")
+
+        # When: 結果を取得
+        response = client.get(f"/api/tasks/{task_id}")
+
+        # Then: 状態と結果が返り、ペイロードは含まれない
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["status"] == "done"
+        assert data["result"] == {"ok": True}
+        assert "payload" not in data
+
+    def test_他ユーザーのタスクは404(self, client):
+        with patch.dict("services.task_queue._TASK_HANDLERS", {REALTIME_FEEDBACK: lambda p: {}}):
+            task_id = get_task_queue().enqueue(REALTIME_FEEDBACK, {}, owner="someone-else")
+        with client.session_transaction() as sess:
+            sess["user_id"] = "task-owner"
+
+        response = client.get(f"/api/tasks/{task_id}")
+
+        assert response.status_code == 404
+
+    def test_存在しないタスクは404(self, client):
+        response = client.get("/api/tasks/does-not-exist")
+        assert response.status_code == 404
+
+    def test_タスク一覧(self, client):
+        with client.session_transaction() as sess:
+            sess["user_id"] = "list-owner"
+        with patch.dict("services.task_queue._TASK_HANDLERS", {REALTIME_FEEDBACK: lambda p: {}}):
+            get_task_queue().enqueue(REALTIME_FEEDBACK, {}, owner="list-owner")
+
+        response = client.get("/api/tasks")
+
+        assert response.status_code == 200
+        assert len(response.get_json()["tasks"]) == 1
+
+
+class TestChatRealtimeFeedbackTask:
+    """/api/chat がリアルタイムフィードバックをバックグラウンドに回すことのテスト"""
+
+    def test_フィードバック対象ターンではタスク参照を返す(self, csrf_client):
+        # Given: 2ターン済みの会話（3ターン目でフィードバック対象）
+        with csrf_client.session_transaction() as sess:
+            sess["chat_settings"] = {"system_prompt": "テスト用プロンプト"}
+            sess["chat_history"] = [{"human": "a", "ai": "b"}, {"human": "c", "ai": "d"}]
+
+        # When: 3ターン目を送信
+        with patch("routes.chat_routes._get_llm_and_invoke", return_value="了解です"), patch(
+            "routes.chat_routes.realtime_feedback_enabled", return_value=True
+        ), patch.dict(
+            "services.task_queue._TASK_HANDLERS",
+            {REALTIME_FEEDBACK: lambda p: {"realtime_feedback": {"has_feedback": True, "turns": len(p["history"])}}},
+        ):
+            response = csrf_client.post("/api/chat", json={"message": "よろしくお願いします"})
+
+        # Then: 応答と同時にタスク参照が返り、結果はポーリングで取得できる
+        assert response.status_code == 200
+        data = response.get_json()
+        assert "realtime_feedback" not in data
+        task_url = data["realtime_feedback_task"]["status_url"]
+        result = csrf_client.get(task_url).get_json()["result"]
+        assert result["realtime_feedback"]["turns"] == 6
+
+    def test_無効時はLLMを呼ばずタスクも積まない(self, csrf_client):
+        with csrf_client.session_transaction() as sess:
+            sess["chat_settings"] = {"system_prompt": "テスト用プロンプト"}
+            sess["chat_history"] = [{"human": "a", "ai": "b"}, {"human": "c", "ai": "d"}]
+
+        with patch("routes.chat_routes._get_llm_and_invoke", return_value="了解です"), patch(
+            "routes.chat_routes.realtime_feedback_enabled", return_value=False
+        ), patch("routes.chat_routes.run_realtime_feedback") as run_feedback:
+            response = csrf_client.post("/api/chat", json={"message": "よろしくお願いします"})
+
+        data = response.get_json()
+        assert "realtime_feedback_task" not in data
+        assert "realtime_feedback" not in data
+        run_feedback.assert_not_called()
+
+    def test_バックグラウンド無効時は同じ処理をリクエスト内で実行する(self, csrf_client):
+        with csrf_client.session_transaction() as sess:
+            sess["chat_settings"] = {"system_prompt": "テスト用プロンプト"}
+            sess["chat_history"] = [{"human": "a", "ai": "b"}, {"human": "c", "ai": "d"}]
+
+        with patch("routes.chat_routes._get_llm_and_invoke", return_value="了解です"), patch(
+            "routes.chat_routes.realtime_feedback_enabled", return_value=True
+        ), patch("routes.chat_routes.background_tasks_enabled", return_value=False), patch(
+            "routes.chat_routes.run_realtime_feedback",
+            side_effect=lambda p: {"realtime_feedback": {"has_feedback": True, "turns": len(p["history"])}},
+        ):
+            response = csrf_client.post("/api/chat", json={"message": "よろしくお願いします"})
+
+        data = response.get_json()
+        assert "realtime_feedback_task" not in data
+        # バックグラウンド実行と同じ role/content 形式の履歴で実行される
+        assert data["realtime_feedback"]["turns"] == 6
+
+
+class TestFeedbackPostProcessingFallback:
+    """フィードバック後処理のタスク登録に失敗した場合はリクエスト内で実行することのテスト"""
+
+    def _failing_queue(self):
+        queue = MagicMock()
+        queue.enqueue.side_effect = RuntimeError("queue unavailable")
+        return queue
+
+    def test_シナリオフィードバックは登録失敗時に強み分析とゲーミフィケーションを実行する(self, csrf_client):
+        # Given: バックグラウンド実行が有効だが、タスクの登録が失敗する
+        with csrf_client.session_transaction() as sess:
+            sess["scenario_history"] = {"test_scenario": [{"human": "報告があります", "ai": "どうぞ"}]}
+        scenario = {"id": "test_scenario", "title": "テストシナリオ", "role_type": "normal"}
+
+        with patch("routes.scenario_routes.scenario_service") as scenario_service, patch(
+            "services.feedback_service.FeedbackService.build_scenario_feedback_prompt", return_value="prompt"
+        ), patch(
+            "services.feedback_service.FeedbackService.try_multiple_models_for_prompt",
+            return_value=("良い報告でした", "gemini-1.5-flash", None),
+        ), patch("routes.scenario_routes.background_tasks_enabled", return_value=True), patch(
+            "routes.scenario_routes.get_task_queue", return_value=self._failing_queue()
+        ), patch(
+            "services.strength_service.StrengthService.update_feedback_with_strength_analysis",
+            side_effect=lambda data, *args: dict(data, strength_analysis={"scores": {"empathy": 70}}),
+        ) as strength, patch(
+            "services.gamification_hooks.on_scenario_feedback", return_value={"xp_gained": 10}
+        ) as on_feedback:
+            scenario_service.get_scenario_by_id.return_value = scenario
+            response = csrf_client.post("/api/scenario_feedback", json={"scenario_id": "test_scenario"})
+
+        # Then: タスク参照はないが、後処理はこの場で実行されている
+        assert response.status_code == 200
+        data = response.get_json()
+        assert "post_processing" not in data
+        assert data["gamification"] == {"xp_gained": 10}
+        strength.assert_called_once()
+        assert on_feedback.call_args.args[0] == {"empathy": 70}
+
+    def test_雑談フィードバックは登録失敗時にゲーミフィケーションを実行する(self, csrf_client):
+        with csrf_client.session_transaction() as sess:
+            sess["chat_settings"] = {"partner_type": "colleague", "situation": "break"}
+            sess["chat_history"] = [{"human": "こんにちは", "ai": "こんにちは！"}]
+
+        with patch(
+            "services.feedback_service.FeedbackService.build_chat_feedback_prompt", return_value="prompt"
+        ), patch(
+            "services.feedback_service.FeedbackService.try_multiple_models_for_prompt",
+            return_value=("良い雑談でした", "gemini-1.5-flash", None),
+        ), patch("routes.chat_routes.background_tasks_enabled", return_value=True), patch(
+            "routes.chat_routes.get_task_queue", return_value=self._failing_queue()
+        ), patch(
+            "services.strength_service.StrengthService.update_feedback_with_strength_analysis",
+            side_effect=lambda data, *args: dict(data, strength_analysis={"scores": {"clarity": 60}}),
+        ), patch(
+            "services.gamification_hooks.on_chat_feedback", return_value={"xp_gained": 5}
+        ) as on_feedback:
+            response = csrf_client.post("/api/chat_feedback", json={"partner_type": "colleague", "situation": "break"})
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert "post_processing" not in data
+        assert data["gamification"] == {"xp_gained": 5}
+        on_feedback.assert_called_once_with({"clarity": 60})
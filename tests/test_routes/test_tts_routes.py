@@ -84,3 +84,108 @@ class TestGetVoiceForEmotion:
             result = get_voice_for_emotion("neutral")
 
             assert isinstance(result, str)
+
+
+class TestTextToSpeechPipeline:
+    """合成エンジン設定時の POST /api/tts（ローカルの FakeTTSEngine を使用）"""
+
+    @pytest.fixture
+    def pipeline(self, tmp_path):
+        from services.tts_pipeline import FileSpendCounter, TTSAudioCache, TTSPipeline, TTSSpendGuard
+        from tests.test_services.test_tts_pipeline import FakeTTSEngine
+
+        guard = TTSSpendGuard(FileSpendCounter(str(tmp_path / "spend")), 12)
+        pipeline = TTSPipeline(FakeTTSEngine(), TTSAudioCache(str(tmp_path / "cache")), guard)
+        with patch("config.feature_flags.get_feature_flags") as mock_flags, patch(
+            "services.tts_pipeline.get_tts_pipeline", return_value=pipeline
+        ):
+            mock_flags.return_value.tts_enabled = True
+            yield pipeline
+
+    def _lines(self, response):
+        import json
+
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+    def test_文ごとにNDJSONで返す(self, csrf_client, pipeline):
+        import base64
+
+        response = csrf_client.post("/api/tts", json={"text": "はい。了解です。"})
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        lines = self._lines(response)
+        assert [line["text"] for line in lines] == ["はい。", "了解です。"]
+        assert base64.b64decode(lines[0]["audio"]) == "kore|ja|はい。".encode()
+
+    def test_上限に達したら429(self, csrf_client, pipeline):
+        csrf_client.post("/api/tts", json={"text": "一二三四五六七八九十。"})
+
+        response = csrf_client.post("/api/tts", json={"text": "別の文です。"})
+
+        assert response.status_code == 429
+        assert response.get_json()["budget_exceeded"] is True
+
+    def test_途中で上限に達したらエラー行で終わる(self, csrf_client, pipeline):
+        response = csrf_client.post("/api/tts", json={"text": "一二三四五。六七八九十一二。"})
+
+        lines = self._lines(response)
+        assert lines[0]["text"] == "一二三四五。"
+        assert lines[-1]["budget_exceeded"] is True
+
+    def test_空のテキストは400(self, csrf_client, pipeline):
+        response = csrf_client.post("/api/tts", json={"text": "  "})
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize(
+        "options",
+        [{"voice": "../../etc"}, {"voice": 123}, {"style": "x" * 500}, {"style": ["calm"]}, {"lang": "xx"}],
+    )
+    def test_許可されていない音声スタイル言語は400(self, csrf_client, pipeline, options):
+        response = csrf_client.post("/api/tts", json={"text": "はい。", **options})
+
+        assert response.status_code == 400
+        assert pipeline.engine.calls == []
+
+    def test_許可された音声スタイル言語は合成する(self, csrf_client, pipeline):
+        response = csrf_client.post("/api/tts", json={"text": "はい。", "voice": "Orus", "style": "calm", "lang": "en"})
+
+        assert response.status_code == 200
+        assert pipeline.engine.calls == [("はい。", "orus", "calm", "en")]
+
+    def test_文字列以外のテキストは400(self, csrf_client, pipeline):
+        response = csrf_client.post("/api/tts", json={"text": 123})
+
+        assert response.status_code == 400
+
+    def test_文字列以外の感情は既定の音声で合成する(self, csrf_client, pipeline):
+        response = csrf_client.post("/api/tts", json={"text": "はい。", "emotion": {"a": 1}})
+
+        assert response.status_code == 200
+        assert pipeline.engine.calls[0][1] == "kore"
+
+    def test_ユーザーごとの上限は全体の上限と別に数える(self, csrf_client, pipeline):
+        from services.tts_pipeline import FileSpendCounter, TTSSpendGuard
+
+        # Given: 全体は十分、ユーザーごとは6文字まで
+        pipeline.guard = TTSSpendGuard(FileSpendCounter(pipeline.cache.cache_dir + "-spend"), 1000, 6)
+        with csrf_client.session_transaction() as sess:
+            sess["user_id"] = "tts-user"
+        assert csrf_client.post("/api/tts", json={"text": "あいうえお。"}).status_code == 200
+
+        # When: 同じユーザーが続けて合成する
+        response = csrf_client.post("/api/tts", json={"text": "かきくけこ。"})
+
+        # Then: ユーザーの上限で 429
+        assert response.status_code == 429
+        assert response.get_json()["budget_exceeded"] is True
+
+    def test_合成済みの音声をキーで取得(self, csrf_client, client, pipeline):
+        key = self._lines(csrf_client.post("/api/tts", json={"text": "はい。"}))[0]["key"]
+
+        response = client.get(f"/api/tts/audio/{key}")
+
+        assert response.status_code == 200
+        assert response.data == "kore|ja|はい。".encode()
+        assert "immutable" in response.headers["Cache-Control"]
+        assert client.get("/api/tts/audio/" + "0" * 64).status_code == 404
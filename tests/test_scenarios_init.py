@@ -272,3 +272,21 @@ class TestScenariosGlobalVariable:
         # 内容は同じだが、異なるオブジェクト
         assert first is not second
         assert first == second
+
+
+class TestLoadScenariosParseCache:
+    """解析済みYAMLのキャッシュのテスト"""
+
+    def test_変更のないファイルは再解析しない(self):
+        # Given: 一度ロード済み
+        import scenarios
+
+        scenarios.load_scenarios()
+
+        # When: 再度ロードする
+        with patch("scenarios.yaml.load") as mock_load:
+            result = scenarios.load_scenarios()
+
+        # Then: YAMLを解析せずに同じ内容を返す
+        mock_load.assert_not_called()
+        assert len(result) > 0
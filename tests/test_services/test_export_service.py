@@ -86,3 +86,80 @@ class TestLearningReport:
         r2 = svc.export_learning_report("y", {})
         assert r2["skill_xp"] == {}
         assert r2["badges"] == {}
+
+
+class TestStreamingExport:
+    HISTORY = [
+        {"role": "user", "content": "a", "timestamp": "2026-10-01T09:00:00"},
+        {"role": "assistant", "content": "b", "timestamp": "2026-10-02T09:00:00+09:00"},
+        {"role": "user", "content": "c"},
+    ]
+
+    def test_csv_is_yielded_row_by_row(self, svc):
+        # Given/When: ジェネレータで取得
+        lines = list(svc.iter_conversations_csv("u", self.HISTORY))
+
+        # Then: ヘッダ + 各行が1要素ずつ
+        assert len(lines) == 4
+        assert lines[0] == "user_id,role,content\r\n"
+
+    def test_json_stream_matches_document(self, svc):
+        data = json.loads("".join(svc.iter_conversations_json("u", self.HISTORY)))
+        assert data == {"user_id": "u", "conversations": self.HISTORY}
+
+    def test_ndjson_adds_user_id_to_each_line(self, svc):
+        lines = list(svc.iter_conversations_ndjson("u", self.HISTORY + ["plain"]))
+        assert [json.loads(line)["user_id"] for line in lines] == ["u"] * 4
+        assert json.loads(lines[-1])["content"] == "plain"
+
+    def test_ndjson_user_id_is_not_overridden_by_turn(self, svc):
+        turn = {"human": "hi", "user_id": "someone-else"}
+        line = next(svc.iter_conversations_ndjson("u", [turn]))
+        assert json.loads(line) == {"human": "hi", "user_id": "u"}
+
+    def test_date_range_excludes_turns_without_timestamp(self, svc):
+        from services.export_service import parse_date_bound
+
+        since = parse_date_bound("2026-10-01")
+        until = parse_date_bound("2026-10-01", end_of_day=True)
+        lines = list(svc.iter_conversations_ndjson("u", self.HISTORY, since=since, until=until))
+        assert [json.loads(line)["content"] for line in lines] == ["a"]
+
+    def test_parse_date_bound_rejects_invalid(self):
+        from services.export_service import parse_date_bound
+
+        assert parse_date_bound("") is None
+        with pytest.raises(ValueError):
+            parse_date_bound("2026/10/01")
+        with pytest.raises(ValueError):
+            parse_date_bound(20261001)
+        with pytest.raises(ValueError):
+            parse_date_bound(["2026-10-01"])
+
+    def test_generator_does_not_materialize_history(self, svc):
+        # Given: 遅延生成される大量の履歴
+        produced = []
+
+        def history():
+            for i in range(100000):
+                produced.append(i)
+                yield {"role": "user", "content": str(i)}
+
+        # When: 先頭の数行だけ読む
+        stream = svc.iter_conversations_csv("u", history())
+        for _ in range(3):
+            next(stream)
+
+        # Then: 読んだ分しか生成されない
+        assert len(produced) == 2
+
+    def test_gzip_stream_roundtrip_and_batching(self):
+        import gzip
+
+        from services.export_service import batch_stream, gzip_stream
+
+        lines = [f"line{i}\n" for i in range(5000)]
+        batches = list(batch_stream(lines, size=1024))
+        assert "".join(batches) == "".join(lines)
+        assert all(len(b) < 1024 + 16 for b in batches)
+        assert gzip.decompress(b"".join(gzip_stream(batches))).decode() == "".join(lines)
@@ -0,0 +1,183 @@
+"""
+負荷試験用フェイクLLMサーバーと負荷試験ハーネスのテスト
+"""
+
+import json
+
+import pytest
+import requests
+
+from benchmarks.fake_llm_server import FakeLLMConfig, FakeLLMServer, select_reply, split_tokens
+from benchmarks.load_test import Recorder, percentile
+from config.snapshot import reset_config_snapshot
+
+
+@pytest.fixture
+def fresh_config():
+    """環境変数を変えた後の設定を読み直し、テスト後に元に戻す"""
+    yield reset_config_snapshot
+    reset_config_snapshot()
+
+
+@pytest.fixture
+def fake_llm():
+    server = FakeLLMServer(config=FakeLLMConfig(latency_ms=0, tokens_per_second=0, chars_per_token=4))
+    with server:
+        yield server
+
+
+class TestFakeLLMServer:
+    """FakeLLMServer のテスト"""
+
+    def test_OpenAI互換のチャット補完(self, fake_llm):
+        # When: OpenAI互換APIで問い合わせる
+        response = requests.post(
+            f"{fake_llm.url}/v1/chat/completions",
+            json={"model": "fake", "messages": [{"role": "user", "content": "こんにちは"}]},
+            timeout=5,
+        )
+
+        # Then: 決定的な応答と使用量が返る
+        body = response.json()
+        assert response.status_code == 200
+        assert body["choices"][0]["message"]["content"] == select_reply("こんにちは")
+        assert body["usage"]["completion_tokens"] > 0
+
+    def test_OpenAI互換のSSEストリーミング(self, fake_llm):
+        # When: stream=true で問い合わせる
+        response = requests.post(
+            f"{fake_llm.url}/v1/chat/completions",
+            json={"model": "fake", "stream": True, "messages": [{"role": "user", "content": "相談です"}]},
+            timeout=5,
+        )
+
+        # Then: トークン単位のチャンクを連結すると全文になる
+        chunks = [
+            json.loads(line[len("data: ") :])
+            for line in response.content.decode("utf-8").splitlines()
+            if line.startswith("data: ") and line != "data: [DONE]"
+        ]
+        text = "".join(c["choices"][0]["delta"].get("content") or "" for c in chunks)
+        assert text == select_reply("相談です")
+        assert fake_llm.stats["streams"] == 1
+
+    def test_Gemini互換のgenerateContent(self, fake_llm):
+        # When: Gemini互換APIで問い合わせる
+        response = requests.post(
+            f"{fake_llm.url}/v1beta/models/gemini-1.5-flash:generateContent",
+            json={"contents": [{"role": "user", "parts": [{"text": "こんにちは"}]}]},
+            timeout=5,
+        )
+
+        # Then: candidates 形式で応答が返る
+        body = response.json()
+        assert body["candidates"][0]["content"]["parts"][0]["text"] == select_reply("こんにちは")
+
+    def test_Geminiモデル一覧(self, fake_llm):
+        response = requests.get(f"{fake_llm.url}/v1beta/models", timeout=5)
+
+        names = [m["name"] for m in response.json()["models"]]
+        assert "models/gemini-1.5-flash" in names
+
+    def test_エラー注入はシードで決定的(self):
+        # Given: 同じシード・エラー率の2つのサーバー
+        config = FakeLLMConfig(error_rate=0.5, seed=7)
+        first = FakeLLMServer(config=config)
+        second = FakeLLMServer(config=config)
+
+        # When: 同じ回数だけ判定する
+        try:
+            a = [first.next_request_fails() for _ in range(20)]
+            b = [second.next_request_fails() for _ in range(20)]
+        finally:
+            first._httpd.server_close()
+            second._httpd.server_close()
+
+        # Then: 同じ失敗パターンになり、一部だけ失敗する
+        assert a == b
+        assert 0 < sum(a) < 20
+        assert first.stats["errors"] == sum(a)
+
+    def test_エラー注入時はエラーステータスを返す(self):
+        with FakeLLMServer(config=FakeLLMConfig(latency_ms=0, error_rate=1.0, error_status=503)) as server:
+            response = requests.post(
+                f"{server.url}/v1/chat/completions",
+                json={"messages": [{"role": "user", "content": "x"}]},
+                timeout=5,
+            )
+
+        assert response.status_code == 503
+
+    def test_ChatOpenAIクライアントから利用できる(self, fake_llm):
+        langchain_openai = pytest.importorskip("langchain_openai")
+
+        llm = langchain_openai.ChatOpenAI(model="fake", base_url=f"{fake_llm.url}/v1", api_key="fake")
+
+        assert llm.invoke("こんにちは").content == select_reply("こんにちは")
+        assert "".join(chunk.content for chunk in llm.stream("こんにちは")) == select_reply("こんにちは")
+
+    def test_GEMINI_API_BASE_URLでLLMServiceの接続先を切り替える(self, fake_llm, monkeypatch, fresh_config):
+        from services.llm_service import LLMService, gemini_endpoint_options
+
+        # Given: 接続先をフェイクLLMサーバーに向ける
+        monkeypatch.setenv("GEMINI_API_BASE_URL", fake_llm.url)
+        fresh_config()
+        assert gemini_endpoint_options()["client_options"] == {"api_endpoint": fake_llm.url}
+
+        # When: LLMService経由でGeminiモデルを呼び出す
+        llm = LLMService().create_gemini_llm("gemini-1.5-flash")
+
+        # Then: フェイクLLMサーバーの応答が返る
+        assert llm.invoke("こんにちは").content == select_reply("こんにちは")
+
+    def test_環境変数でなく設定から読む(self, monkeypatch, fresh_config):
+        # Given: .env などから読み込まれ、os.environ にはない設定
+        from config import Config
+        from config.snapshot import reload_config_snapshot
+        from services.llm_service import gemini_endpoint_options
+
+        monkeypatch.delenv("GEMINI_API_BASE_URL", raising=False)
+        assert reload_config_snapshot(Config(_env_file=None, GEMINI_API_BASE_URL="http://127.0.0.1:9"))
+
+        # Then
+        assert gemini_endpoint_options()["client_options"] == {"api_endpoint": "http://127.0.0.1:9"}
+
+    def test_接続先未設定なら上書きしない(self, monkeypatch, fresh_config):
+        from services.llm_service import gemini_endpoint_options
+
+        monkeypatch.delenv("GEMINI_API_BASE_URL", raising=False)
+        fresh_config()
+
+        assert gemini_endpoint_options() == {}
+
+
+class TestHelpers:
+    """フェイクLLM・負荷試験ハーネスの補助関数のテスト"""
+
+    def test_トークン分割(self):
+        assert split_tokens("abcdefg", 3) == ["abc", "def", "g"]
+        assert split_tokens("", 3) == [""]
+
+    def test_パーセンタイル(self):
+        values = [float(v) for v in range(1, 101)]
+
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 95) == 0.0
+
+    def test_エンドポイントごとの集計(self):
+        # Given: 成功2件・失敗1件を記録
+        recorder = Recorder()
+        recorder.record("POST /api/chat", 10.0, 200, True)
+        recorder.record("POST /api/chat", 30.0, 200, True)
+        recorder.record("POST /api/chat", 50.0, 500, False)
+
+        # When: 集計する
+        (row,) = recorder.summary(elapsed_seconds=1.0)
+
+        # Then: 件数・スループット・エラー率が集計される
+        assert row["count"] == 3
+        assert row["rps"] == 3.0
+        assert row["p50_ms"] == 30.0
+        assert row["error_rate"] == pytest.approx(0.3333, abs=1e-4)
+        assert row["statuses"] == {"200": 2, "500": 1}
@@ -0,0 +1,152 @@
+"""
+キャラクター画像の事前生成（services.image_prewarm）のユニットテスト
+
+Gemini の代わりに PNG を返すローカルの生成関数、CompliantAPIManager の代わりにモックを使う。
+"""
+import io
+import json
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from PIL import Image
+
+from compliant_api_manager import RateLimitException
+from services.character_image_generation import build_character_prompt
+from services.image_prewarm import ImagePrewarmer
+from services.image_store import ImageStore
+
+SCENARIOS = {
+    "scenario1": {"character_setting": {"personality": "40代男性部長"}},
+    "scenario7": {"character_setting": {"personality": "女性課長"}},
+}
+
+
+class FakeGenerator:
+    """プロンプトごとに異なる色の PNG を返す生成関数"""
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, api_key):
+        with self._lock:
+            self.calls.append(prompt)
+            color = (len(self.calls) * 7 % 256, 0, 0)
+        if self.fail_on and self.fail_on in prompt:
+            raise RuntimeError("generation failed")
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), color).save(buffer, format="PNG")
+        return buffer.getvalue(), None
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ImageStore(str(tmp_path / "images"))
+
+
+@pytest.fixture
+def api_manager():
+    manager = MagicMock()
+    manager.get_api_key.return_value = "test-key"
+    return manager
+
+
+def make_prewarmer(store, api_manager, generate, tmp_path, **kwargs):
+    return ImagePrewarmer(
+        store,
+        api_manager,
+        generate=generate,
+        checkpoint_path=str(tmp_path / "checkpoint.json"),
+        sleep=lambda seconds: None,
+        **kwargs,
+    )
+
+
+class TestRun:
+    def test_全シナリオと感情の組み合わせを生成して索引に登録する(self, store, api_manager, tmp_path):
+        generate = FakeGenerator()
+        prewarmer = make_prewarmer(store, api_manager, generate, tmp_path, max_workers=3)
+
+        stats = prewarmer.run(SCENARIOS, ["happy", "neutral"])
+
+        assert stats == {"total": 4, "skipped": 0, "generated": 4, "failed": 0}
+        entry = store.get_index("scenario7_happy")
+        assert entry["url"] == f"/img/{entry['hash']}.webp"
+        # ルートと同じプロンプトで生成する
+        assert entry["prompt"] == build_character_prompt("scenario7", SCENARIOS["scenario7"], "happy")["prompt"]
+        assert api_manager.record_success.call_count == 4
+
+    def test_生成済みの組み合わせは飛ばす(self, store, api_manager, tmp_path):
+        make_prewarmer(store, api_manager, FakeGenerator(), tmp_path).run(SCENARIOS, ["happy"])
+
+        # When: 感情を増やして再実行
+        generate = FakeGenerator()
+        stats = make_prewarmer(store, api_manager, generate, tmp_path).run(SCENARIOS, ["happy", "sad"])
+
+        # Then: 新しい感情の分だけ生成
+        assert stats["skipped"] == 2
+        assert stats["generated"] == 2
+        assert len(generate.calls) == 2
+
+    def test_進捗をチェックポイントに記録する(self, store, api_manager, tmp_path):
+        prewarmer = make_prewarmer(store, api_manager, FakeGenerator(fail_on="woman"), tmp_path)
+
+        stats = prewarmer.run(SCENARIOS, ["happy"])
+
+        with open(tmp_path / "checkpoint.json", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        assert stats["failed"] == 1
+        assert list(checkpoint["done"]) == ["scenario1_happy"]
+        assert checkpoint["failed"]["scenario7_happy"]["attempts"] == 1
+        api_manager.record_error.assert_called_once()
+
+    def test_失敗が上限に達した組み合わせは再試行しない(self, store, api_manager, tmp_path):
+        # Given: 2回失敗済み（上限 2）
+        for _ in range(2):
+            make_prewarmer(store, api_manager, FakeGenerator(fail_on="woman"), tmp_path, max_attempts=2).run(
+                SCENARIOS, ["happy"]
+            )
+
+        # When
+        generate = FakeGenerator()
+        prewarmer = make_prewarmer(store, api_manager, generate, tmp_path, max_attempts=2)
+
+        # Then
+        assert prewarmer.pending(SCENARIOS, ["happy"]) == []
+        assert prewarmer.run(SCENARIOS, ["happy"])["generated"] == 0
+
+    def test_レート制限中は待ってから生成する(self, store, api_manager, tmp_path):
+        # Given: 最初の1回だけレート制限
+        api_manager.get_api_key.side_effect = [RateLimitException("wait"), "test-key"]
+        api_manager.get_status.return_value = {"wait_seconds": 6.0}
+        waits = []
+        prewarmer = ImagePrewarmer(store, api_manager, generate=FakeGenerator(), sleep=waits.append)
+
+        stats = prewarmer.run({"scenario1": SCENARIOS["scenario1"]}, ["happy"])
+
+        assert waits == [6.0]
+        assert stats["generated"] == 1
+
+    def test_同時生成数はワーカー数までに制限する(self, store, api_manager, tmp_path):
+        active = [0]
+        peak = [0]
+        lock = threading.Lock()
+        inner = FakeGenerator()
+
+        def generate(prompt, api_key):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            try:
+                threading.Event().wait(0.01)
+                return inner(prompt, api_key)
+            finally:
+                with lock:
+                    active[0] -= 1
+
+        scenarios = {f"s{i}": {"character_setting": {}} for i in range(6)}
+        make_prewarmer(store, api_manager, generate, tmp_path, max_workers=2).run(scenarios, ["happy"])
+
+        assert peak[0] <= 2
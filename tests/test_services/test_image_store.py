@@ -0,0 +1,103 @@
+"""
+内容アドレスの画像ストア（services.image_store）のユニットテスト
+"""
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from services.image_store import ImageStore, image_url
+
+
+def make_png(width=600, height=800, color=(200, 100, 50)):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ImageStore(str(tmp_path / "images"))
+
+
+class TestPut:
+    def test_内容のハッシュをキーに保存する(self, store):
+        data = make_png()
+
+        image_hash = store.put(data)
+
+        assert len(image_hash) == 64
+        assert store.exists(image_hash)
+        # 同じ内容は同じキー
+        assert store.put(data) == image_hash
+        assert store.put(make_png(color=(0, 0, 0))) != image_hash
+
+    def test_画像でないデータは保存しない(self, store):
+        with pytest.raises(ValueError):
+            store.put(b"not an image")
+
+
+class TestVariantPath:
+    def test_WebPに変換する(self, store):
+        image_hash = store.put(make_png())
+
+        path = store.variant_path(image_hash)
+
+        with Image.open(path) as image:
+            assert image.format == "WEBP"
+            assert image.size == (600, 800)
+
+    def test_幅を指定して縮小する(self, store):
+        image_hash = store.put(make_png())
+
+        with Image.open(store.variant_path(image_hash, 256)) as image:
+            assert image.size == (256, 341)
+
+    def test_元より大きい幅には拡大しない(self, store):
+        image_hash = store.put(make_png())
+
+        with Image.open(store.variant_path(image_hash, 1024)) as image:
+            assert image.size == (600, 800)
+
+    def test_作成済みの派生画像を再利用する(self, store):
+        image_hash = store.put(make_png())
+        path = store.variant_path(image_hash, 128)
+        mtime = os.path.getmtime(path)
+
+        assert store.variant_path(image_hash, 128) == path
+        assert os.path.getmtime(path) == mtime
+
+    def test_許可していない幅はエラー(self, store):
+        image_hash = store.put(make_png())
+
+        with pytest.raises(ValueError):
+            store.variant_path(image_hash, 300)
+
+    def test_不正なハッシュはエラー(self, store):
+        with pytest.raises(ValueError):
+            store.variant_path("../../etc/passwd")
+
+    def test_未保存のハッシュはNone(self, store):
+        assert store.variant_path("0" * 64) is None
+
+
+class TestIndex:
+    def test_索引を別のインスタンスから参照できる(self, store, tmp_path):
+        # Given: あるワーカーが保存した画像と索引
+        image_hash = store.put(make_png())
+        store.set_index("scenario1_happy", {"hash": image_hash, "url": image_url(image_hash)})
+
+        # When: 同じディレクトリを使う別のワーカー
+        other = ImageStore(str(tmp_path / "images"))
+
+        # Then
+        assert other.get_index("scenario1_happy")["url"] == f"/img/{image_hash}.webp"
+        assert other.get_index("scenario1_sad") is None
+
+    def test_未保存の画像は索引に登録しない(self, store):
+        with pytest.raises(ValueError):
+            store.set_index("scenario1_happy", {"hash": "0" * 64})
+
+    def test_不正なキーは見つからない扱い(self, store):
+        assert store.get_index("../secret") is None
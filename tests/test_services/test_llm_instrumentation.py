@@ -0,0 +1,196 @@
+"""
+LLM呼び出しの計測（LLMCallTracker / LLMMetrics）のテスト
+"""
+
+import json
+import time
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from services.llm_instrumentation import (
+    LLMCallRecord,
+    LLMCallTracker,
+    LLMMetrics,
+    llm_call_context,
+    reset_llm_context,
+)
+
+
+@pytest.fixture
+def metrics():
+    return LLMMetrics()
+
+
+@pytest.fixture(autouse=True)
+def _reset_context():
+    reset_llm_context()
+    yield
+    reset_llm_context()
+
+
+def _fake_llm(metrics, reply="承知しました。確認します。", count=1):
+    return GenericFakeChatModel(
+        messages=iter([AIMessage(content=reply) for _ in range(count)]),
+        callbacks=[LLMCallTracker("fake/model", metrics=metrics)],
+    )
+
+
+class TestLLMCallTracker:
+    """LLMCallTracker のテスト"""
+
+    def test_invokeの呼び出しを記録(self, metrics):
+        # Given: モードを指定したコンテキスト
+        llm = _fake_llm(metrics)
+
+        # When: invoke する
+        with llm_call_context(mode="chat"):
+            llm.invoke([HumanMessage(content="こんにちは")])
+
+        # Then: モデル・モード・文字数・レイテンシが記録される
+        (record,) = metrics.records()
+        assert record.model == "fake/model"
+        assert record.mode == "chat"
+        assert record.prompt_chars == len("こんにちは")
+        assert record.completion_chars == len("承知しました。確認します。")
+        assert record.error is None
+        assert record.ttft_ms is not None and record.ttft_ms <= record.latency_ms
+
+    def test_streamは初回トークンまでの時間を記録(self, metrics):
+        llm = _fake_llm(metrics, reply="承知 しました 確認 します")
+
+        chunks = [chunk.content for chunk in llm.stream("こんにちは")]
+
+        (record,) = metrics.records()
+        assert len(chunks) > 1
+        assert record.streamed is True
+        assert record.mode == "unknown"
+        assert record.ttft_ms <= record.latency_ms
+
+    def test_キュー待ち時間は最初の呼び出しのみ(self, metrics):
+        # Given: 0.2秒前にキューへ投入された処理
+        llm = _fake_llm(metrics, count=2)
+
+        # When: 2回呼び出す
+        with llm_call_context(mode="realtime_feedback", queued_at=time.time() - 0.2):
+            llm.invoke("1回目")
+            llm.invoke("2回目")
+
+        # Then: キュー待ちは1回目にのみ計上される
+        first, second = metrics.records()
+        assert first.queue_wait_ms >= 200
+        assert second.queue_wait_ms is None
+
+    def test_エラーを記録(self, metrics):
+        tracker = LLMCallTracker("fake/model", metrics=metrics)
+        run_id = uuid.uuid4()
+
+        tracker.on_llm_start({}, ["prompt"], run_id=run_id)
+        tracker.on_llm_error(TimeoutError("deadline exceeded"), run_id=run_id)
+
+        (record,) = metrics.records()
+        assert record.error == "TimeoutError: deadline exceeded"
+        assert record.ttft_ms is None
+
+    def test_トークン使用量を取り出す(self, metrics):
+        tracker = LLMCallTracker("fake/model", metrics=metrics)
+        run_id = uuid.uuid4()
+        response = MagicMock()
+        response.generations = [[MagicMock(text="応答", message=MagicMock(usage_metadata=None))]]
+        response.llm_output = {"token_usage": {"prompt_tokens": 12, "completion_tokens": 5}}
+
+        tracker.on_llm_start({}, ["prompt"], run_id=run_id)
+        tracker.on_llm_end(response, run_id=run_id)
+
+        (record,) = metrics.records()
+        assert (record.prompt_tokens, record.completion_tokens) == (12, 5)
+
+    def test_resolve_modelでモードが設定される(self, metrics):
+        from services.model_selector import resolve_model
+
+        llm = _fake_llm(metrics)
+
+        resolve_model("scenario", "gemini/gemini-1.5-flash")
+        llm.invoke("こんにちは")
+
+        assert metrics.records()[0].mode == "scenario"
+
+
+class TestLLMMetrics:
+    """LLMMetrics の集計のテスト"""
+
+    def _record(self, started_at, latency_ms=100.0, error=None, mode="chat"):
+        return LLMCallRecord(
+            model="gemini/gemini-1.5-flash",
+            mode=mode,
+            started_at=started_at,
+            latency_ms=latency_ms,
+            ttft_ms=latency_ms / 2,
+            completion_tokens=10,
+            error=error,
+        )
+
+    def test_ローリングウィンドウごとに集計(self, metrics):
+        # Given: 30秒前に2件（うち1件エラー）、10分前に1件
+        now = 10_000.0
+        metrics.record(self._record(now - 30, latency_ms=100))
+        metrics.record(self._record(now - 30, error="TimeoutError: x"))
+        metrics.record(self._record(now - 600, latency_ms=300))
+
+        # When: 集計する
+        windows = metrics.summary(now=now)["windows"]
+
+        # Then: ウィンドウに含まれる記録のみ集計される
+        (one_minute,) = windows["1m"]
+        assert one_minute["calls"] == 2
+        assert one_minute["errors"] == 1
+        assert one_minute["error_rate"] == 0.5
+        assert one_minute["latency_p50_ms"] == 100
+        assert one_minute["completion_tokens_per_second"] == 100.0
+        assert windows["5m"][0]["calls"] == 2
+        assert windows["15m"][0]["calls"] == 3
+
+    def test_モードごとに分けて集計(self, metrics):
+        now = time.time()
+        metrics.record(self._record(now, mode="chat"))
+        metrics.record(self._record(now, mode="feedback"))
+
+        modes = [group["mode"] for group in metrics.summary()["windows"]["1m"]]
+
+        assert modes == ["chat", "feedback"]
+
+    def test_JSONLトレースを書き出す(self, tmp_path):
+        path = tmp_path / "trace" / "llm.jsonl"
+        metrics = LLMMetrics(trace_path=str(path))
+
+        metrics.record(self._record(time.time()))
+        metrics.record(self._record(time.time(), error="ValueError: x"))
+
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[1])["error"] == "ValueError: x"
+
+
+class TestLLMServiceIntegration:
+    """LLMService との統合のテスト"""
+
+    def test_生成するモデルに計測ハンドラーを登録(self):
+        from services.llm_service import LLMService
+
+        with patch("services.llm_service.genai.configure"), patch("services.llm_service.CompliantAPIManager"):
+            service = LLMService()
+        with patch("services.llm_service.ChatGoogleGenerativeAI") as mock_chat:
+            service.create_gemini_llm("gemini-1.5-flash")
+
+        (tracker,) = mock_chat.call_args.kwargs["callbacks"]
+        assert isinstance(tracker, LLMCallTracker)
+        assert tracker.model_name == "gemini/gemini-1.5-flash"
+
+    def test_api_metricsにLLM集計を含む(self, client):
+        response = client.get("/api/metrics")
+
+        assert response.status_code == 200
+        assert set(response.get_json()["llm"]["windows"]) == {"1m", "5m", "15m"}
@@ -3,20 +3,27 @@ services/model_selector.py の優先順位テスト（Phase B）
 """
 from __future__ import annotations
 
-from unittest.mock import MagicMock, patch
-
 import pytest
 
+from config.config import Config
+from config.snapshot import reload_config_snapshot, reset_config_snapshot
 from services.model_selector import resolve_model
 
 
 @pytest.fixture
 def default_model_config():
-    """get_config() が DEFAULT_MODEL="gemini/gemini-2.5-flash" を返すようモック"""
-    cfg = MagicMock()
-    cfg.DEFAULT_MODEL = "gemini/gemini-2.5-flash"
-    with patch("services.model_selector.get_config", return_value=cfg):
-        yield cfg
+    """DEFAULT_MODEL="gemini/gemini-2.5-flash" の設定スナップショットを使う
+
+    モデルの解決表はスナップショットの構築時に計算されるため、環境変数を変更した後に
+    返り値の関数を呼んで再読み込みする。
+    """
+
+    def reload():
+        assert reload_config_snapshot(Config(_env_file=None, DEFAULT_MODEL="gemini/gemini-2.5-flash"))
+
+    reload()
+    yield reload
+    reset_config_snapshot()
 
 
 class TestFeedbackModeUsesEnvOnly:
@@ -24,11 +31,13 @@ class TestFeedbackModeUsesEnvOnly:
 
     def test_feedbackはUI選択よりFEEDBACK_MODELが優先(self, default_model_config, monkeypatch):
         monkeypatch.setenv("FEEDBACK_MODEL", "ollama/gemma4:31b-cloud")
+        default_model_config()
         result = resolve_model("feedback", session_selected="gemini/gemini-2.5-flash-lite")
         assert result == "ollama/gemma4:31b-cloud"
 
     def test_feedback_Feedback未設定はDEFAULT_MODEL(self, default_model_config, monkeypatch):
         monkeypatch.delenv("FEEDBACK_MODEL", raising=False)
+        default_model_config()
         result = resolve_model("feedback", session_selected="gemini/gemini-2.5-pro")
         assert result == "gemini/gemini-2.5-flash"
 
@@ -38,34 +47,39 @@ class TestResolveModelPriority:
 
     def test_session_selectedが最優先される(self, default_model_config, monkeypatch):
         monkeypatch.setenv("SCENARIO_MODEL", "ollama/gemma4:31b-cloud")
+        default_model_config()
         result = resolve_model("scenario", session_selected="gemini/gemini-2.5-pro")
         assert result == "gemini/gemini-2.5-pro"
 
     def test_session_selectedが空文字なら無視される(self, default_model_config, monkeypatch):
         monkeypatch.setenv("SCENARIO_MODEL", "ollama/gemma4:31b-cloud")
+        default_model_config()
         result = resolve_model("scenario", session_selected="   ")
         assert result == "ollama/gemma4:31b-cloud"
 
     def test_mode別env変数が使われる(self, default_model_config, monkeypatch):
         monkeypatch.setenv("SCENARIO_MODEL", "ollama/gemma4:31b-cloud")
+        default_model_config()
         result = resolve_model("scenario")
         assert result == "ollama/gemma4:31b-cloud"
 
     def test_env未設定時はDEFAULT_MODELにフォールバック(self, default_model_config, monkeypatch):
         monkeypatch.delenv("SCENARIO_MODEL", raising=False)
+        default_model_config()
         result = resolve_model("scenario")
         assert result == "gemini/gemini-2.5-flash"
 
     def test_全4モードのenv変数を正しく参照する(self, default_model_config, monkeypatch):
-        monkeypatch.setenv("SCENARIO_MODEL", "m-scenario")
-        monkeypatch.setenv("CHAT_MODEL", "m-chat")
-        monkeypatch.setenv("WATCH_MODEL", "m-watch")
-        monkeypatch.setenv("FEEDBACK_MODEL", "m-feedback")
+        monkeypatch.setenv("SCENARIO_MODEL", "ollama/m-scenario")
+        monkeypatch.setenv("CHAT_MODEL", "ollama/m-chat")
+        monkeypatch.setenv("WATCH_MODEL", "ollama/m-watch")
+        monkeypatch.setenv("FEEDBACK_MODEL", "ollama/m-feedback")
+        default_model_config()
 
-        assert resolve_model("scenario") == "m-scenario"
-        assert resolve_model("chat") == "m-chat"
-        assert resolve_model("watch") == "m-watch"
-        assert resolve_model("feedback") == "m-feedback"
+        assert resolve_model("scenario") == "ollama/m-scenario"
+        assert resolve_model("chat") == "ollama/m-chat"
+        assert resolve_model("watch") == "ollama/m-watch"
+        assert resolve_model("feedback") == "ollama/m-feedback"
 
     def test_未知のmodeでValueError(self, default_model_config):
         with pytest.raises(ValueError, match="Unknown mode"):
@@ -73,6 +87,7 @@ class TestResolveModelPriority:
 
     def test_モード別envが空文字ならDEFAULT_MODELにフォールバック(self, default_model_config, monkeypatch):
         monkeypatch.setenv("CHAT_MODEL", "")
+        default_model_config()
         result = resolve_model("chat")
         assert result == "gemini/gemini-2.5-flash"
 
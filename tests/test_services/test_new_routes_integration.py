@@ -82,3 +82,46 @@ class TestNewRoutesIntegration:
         assert response.status_code == 200
         data = response.get_json()
         assert data.get("joined") is True
+
+    def test_post_three_way_join_twice_keeps_joined(self, client):
+        # Given: 参加済みのセッション（ページの再読み込みで再度参加する場合）
+        assert client.post("/api/three-way/join", json={}).get_json()["joined"] is True
+
+        # When: 同じセッションから再度参加
+        response = client.post("/api/three-way/join", json={})
+
+        # Then: 参加中のまま続ける
+        assert response.status_code == 200
+        assert response.get_json()["joined"] is True
+
+    def test_post_three_way_respond_streams_replies(self, client):
+        # Given: 参加してユーザーが発言済み
+        from unittest.mock import MagicMock, patch
+
+        client.post("/api/three-way/join", json={})
+        client.post("/api/three-way/message", json={"message": "皆さん週末はどうでしたか"})
+        llm = MagicMock()
+        llm.invoke.return_value = "映画を観ました"
+
+        # When: 応答を SSE で受け取る
+        with patch("app.initialize_llm", return_value=llm):
+            response = client.post("/api/three-way/respond", json={})
+            events = [
+                json.loads(line[len("data: ") :])
+                for line in response.get_data(as_text=True).split("\n\n")
+                if line.startswith("data: ")
+            ]
+
+        # Then: 太郎・花子の順に届き、次の発言で会話履歴に反映される
+        assert response.mimetype == "text/event-stream"
+        assert [e.get("speaker") for e in events[:2]] == ["A", "B"]
+        assert events[0]["message"] == "太郎: 映画を観ました"
+        assert events[-1] == {"done": True}
+        client.post("/api/three-way/message", json={"message": "いいですね"})
+        with client.session_transaction() as sess:
+            speakers = [e.get("speaker") or e.get("role") for e in sess["watch_history"]]
+        assert speakers[-3:] == ["A", "B", "user"]
+
+    def test_post_three_way_respond_requires_join(self, client):
+        response = client.post("/api/three-way/respond", json={})
+        assert response.status_code == 400
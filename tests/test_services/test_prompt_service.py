@@ -171,3 +171,21 @@ class TestGetPromptService:
         service1 = get_prompt_service()
         service2 = get_prompt_service()
         assert service1 is service2
+
+
+class TestScenarioSystemPromptCache:
+    """build_scenario_system_prompt のキャッシュのテスト"""
+
+    def test_同じ内容のシナリオはキャッシュから返す(self):
+        from unittest.mock import patch
+
+        scenario = {"character": {"name": "キャッシュ確認用の佐藤"}, "situation": "朝会"}
+
+        with patch.object(
+            PromptService, "_render_scenario_system_prompt", wraps=PromptService._render_scenario_system_prompt
+        ) as render:
+            first = PromptService.build_scenario_system_prompt(scenario)
+            second = PromptService.build_scenario_system_prompt(dict(scenario))
+
+        assert first == second
+        assert render.call_count == 1
@@ -0,0 +1,160 @@
+"""
+観戦クイズの事前生成（QuizPregenerator）のテスト
+"""
+
+import threading
+import time
+
+import pytest
+
+from services.quiz_pregeneration import QuizPregenerator
+from services.quiz_service import QuizService
+
+QUIZ = {"question": "要点は？", "choices": ["甲", "乙", "丙"], "correct_answer": 0}
+
+
+@pytest.fixture
+def pregenerator():
+    p = QuizPregenerator(lead_turns=1, max_concurrent=2, wait_timeout_seconds=5)
+    yield p
+    p.shutdown()
+
+
+class TestTargetTurn:
+    def test_クイズの1ターン前に生成を始める(self, pregenerator):
+        should = QuizService().should_generate_quiz
+
+        assert pregenerator.target_turn(should, 4) == 5
+        assert pregenerator.target_turn(should, 3) is None
+        assert pregenerator.target_turn(should, 5) is None
+
+    def test_2ターン前から始める設定(self):
+        p = QuizPregenerator(lead_turns=2)
+        should = QuizService().should_generate_quiz
+
+        assert p.target_turn(should, 3) == 5
+        assert p.target_turn(should, 4) == 5
+
+
+class TestQuizPregenerator:
+    def test_事前生成したクイズを引き渡す(self, pregenerator):
+        assert pregenerator.schedule("watch-1", 5, lambda: QUIZ) is True
+
+        assert pregenerator.take("watch-1", 5) == QUIZ
+        # 一度取り出したら残らない
+        assert pregenerator.take("watch-1", 5) is None
+        assert pregenerator.stats()["hits"] == 1
+
+    def test_ターンが違えば使わない(self, pregenerator):
+        pregenerator.schedule("watch-1", 5, lambda: QUIZ)
+
+        assert pregenerator.take("watch-1", 10) is None
+        assert pregenerator.take("watch-2", 5) is None
+
+    def test_実行中なら完了を待って返す(self, pregenerator):
+        # Given: 生成中のクイズ
+        release = threading.Event()
+
+        def generate():
+            release.wait(2)
+            return QUIZ
+
+        pregenerator.schedule("watch-1", 5, generate)
+
+        # When: 完了前に取り出す
+        threading.Timer(0.05, release.set).start()
+
+        # Then: 完了を待って返る
+        assert pregenerator.take("watch-1", 5) == QUIZ
+
+    def test_生成に失敗したらNone(self, pregenerator):
+        def generate():
+            raise RuntimeError("LLM error")
+
+        pregenerator.schedule("watch-1", 5, generate)
+        pregenerator.schedule("watch-2", 5, lambda: None)
+
+        assert pregenerator.take("watch-1", 5) is None
+        assert pregenerator.take("watch-2", 5) is None
+        assert pregenerator.stats()["misses"] == 2
+
+    def test_同じ会話とターンは二重に生成しない(self, pregenerator):
+        calls = []
+        pregenerator.schedule("watch-1", 5, lambda: calls.append(1) or QUIZ)
+
+        assert pregenerator.schedule("watch-1", 5, lambda: calls.append(2) or QUIZ) is False
+        assert pregenerator.take("watch-1", 5) == QUIZ
+        assert calls == [1]
+
+    def test_同時生成数の上限を超えたら生成しない(self):
+        p = QuizPregenerator(max_concurrent=1)
+        release = threading.Event()
+        p.schedule("watch-1", 5, lambda: release.wait(2) and QUIZ)
+
+        assert p.schedule("watch-2", 5, lambda: QUIZ) is False
+        assert p.stats()["skipped"] == 1
+        release.set()
+        p.shutdown()
+
+    def test_破棄した生成も実行中は上限に数える(self):
+        p = QuizPregenerator(max_concurrent=1)
+        release = threading.Event()
+        p.schedule("watch-1", 5, lambda: release.wait(2) and QUIZ)
+
+        # When: 実行中の生成を破棄してから次を登録しようとする
+        p.cancel("watch-1")
+        scheduled = p.schedule("watch-2", 5, lambda: QUIZ)
+        release.set()
+
+        # Then: 実行中のあいだは上限に数え、完了後は登録できる
+        assert scheduled is False
+        deadline = time.monotonic() + 5
+        while p.stats()["active"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert p.schedule("watch-2", 5, lambda: QUIZ) is True
+        p.shutdown()
+
+    def test_会話ごとに破棄できる(self, pregenerator):
+        pregenerator.schedule("watch-1", 5, lambda: QUIZ)
+        pregenerator.schedule("watch-2", 5, lambda: QUIZ)
+
+        pregenerator.cancel("watch-1")
+
+        assert pregenerator.take("watch-1", 5) is None
+        assert pregenerator.take("watch-2", 5) == QUIZ
+
+    def test_取り出されない結果は期限で破棄する(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr("services.quiz_pregeneration.time.monotonic", lambda: now[0])
+        p = QuizPregenerator(ttl_seconds=60)
+        p.schedule("watch-1", 5, lambda: QUIZ)
+
+        # When: 期限後に別の事前生成を登録
+        now[0] += 61
+        p.schedule("watch-2", 5, lambda: QUIZ)
+
+        assert p.stats()["expired"] == 1
+        assert p.take("watch-1", 5) is None
+        p.shutdown()
+
+    def test_無効化できる(self):
+        assert QuizPregenerator(lead_turns=0).schedule("watch-1", 5, lambda: QUIZ) is False
+        assert QuizPregenerator(max_concurrent=0).schedule("watch-1", 5, lambda: QUIZ) is False
+
+
+class TestGenerateQuizWithoutFallback:
+    def test_LLMがなければNone(self):
+        assert QuizService().generate_quiz([], fallback=False) is None
+        assert QuizService().has_llm is False
+
+    def test_LLMの応答が不正ならNone(self):
+        class BrokenLLM:
+            def generate_quiz_content(self, ctx):
+                return {"question": "?", "choices": ["a"], "correct_answer": 0}
+
+        svc = QuizService(llm_service=BrokenLLM())
+
+        assert svc.has_llm is True
+        assert svc.generate_quiz([], fallback=False) is None
+        # 既定ではフォールバックのクイズ
+        assert svc.generate_quiz([])["choices"] == ["選択肢A", "選択肢B", "選択肢C"]
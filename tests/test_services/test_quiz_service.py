@@ -11,7 +11,7 @@ from unittest.mock import MagicMock
 import pytest
 from hypothesis import given, settings, strategies as st
 
-from services.quiz_service import QuizService
+from services.quiz_service import QuizLLM, QuizService, create_llm_quiz_service
 
 
 # Feature: gamification, Property 9: クイズ生成タイミング判定
@@ -101,3 +101,63 @@ class TestQuizServiceUnit:
     def test_message_count_zero_false(self):
         svc = QuizService()
         assert svc.should_generate_quiz(0) is False
+
+
+class TestQuizLLM:
+    """チャットモデルでクイズを生成するアダプタ"""
+
+    _CONTEXT = [{"role": "user", "content": "報告が遅れました"}, {"role": "assistant", "content": "次は早めにね"}]
+
+    def _chat_model(self, text):
+        model = MagicMock()
+        model.invoke.return_value = MagicMock(content=text)
+        return model
+
+    def test_モデルのJSONからクイズと解説を作る(self):
+        # Given: コードフェンス付きのJSONを返すチャットモデル
+        model = self._chat_model(
+            '```json\n{"question": "Q", "choices": ["a", "b", "c"], "correct_answer": 1, "explanation": "E"}\n```'
+        )
+        factory = MagicMock(return_value=model)
+        svc = QuizService(llm_service=QuizLLM("gemini/test", llm_factory=factory))
+
+        # When: クイズを生成して回答する
+        quiz = svc.generate_quiz(self._CONTEXT, fallback=False)
+        result = svc.evaluate_answer(quiz, 1, self._CONTEXT)
+
+        # Then: LLMのクイズが返り、解説は生成時のものを使う（回答時にLLMを呼ばない）
+        assert svc.has_llm
+        assert quiz["question"] == "Q" and quiz["choices"] == ["a", "b", "c"]
+        assert result["is_correct"] and result["explanation"] == "E"
+        factory.assert_called_once_with("gemini/test")
+        assert model.invoke.call_count == 1
+
+    def test_会話が空ならモデルを作らずフォールバック(self):
+        factory = MagicMock()
+        svc = QuizService(llm_service=QuizLLM("gemini/test", llm_factory=factory))
+
+        assert svc.generate_quiz([], fallback=False) is None
+        assert svc.generate_quiz([])["choices"]
+        factory.assert_not_called()
+
+    def test_JSONでない応答はフォールバック(self):
+        llm = QuizLLM("gemini/test", llm_factory=lambda name: self._chat_model("クイズは作れません"))
+        svc = QuizService(llm_service=llm)
+
+        assert svc.generate_quiz(self._CONTEXT, fallback=False) is None
+        assert 3 <= len(svc.generate_quiz(self._CONTEXT)["choices"]) <= 4
+
+    def test_本番のQuizServiceはフィードバック用モデルでLLMを持つ(self):
+        from config import Config
+        from config.snapshot import reload_config_snapshot, reset_config_snapshot
+
+        reload_config_snapshot(
+            Config(_env_file=None, DEFAULT_MODEL="gemini/gemini-2.5-pro", FEEDBACK_MODEL="gemini/gemini-2.5-flash")
+        )
+        try:
+            svc = create_llm_quiz_service()
+        finally:
+            reset_config_snapshot()
+
+        assert svc.has_llm
+        assert svc._llm.model_name == "gemini/gemini-2.5-flash"
@@ -112,3 +112,87 @@ class TestShouldProvideFeedback:
 
         h3 = h2 + [{"role": "assistant", "content": "d"}, {"role": "user", "content": "e"}]
         assert svc.should_provide_feedback(h3, interval=3) is True
+
+
+class TestAnalyzeWithAlternatives:
+    def test_one_llm_call_returns_feedback_and_alternatives(self):
+        # Given: 統合スキーマの JSON を返すモック
+        llm = _mock_llm_analyze_ok()
+        svc = RealtimeFeedbackService(llm=llm)
+
+        # When: 統合モードで分析する
+        result = svc.analyze_with_alternatives("まあなんとかやってます", [], {"title": "定例報告"})
+
+        # Then: LLM 呼び出しは 1 回でフィードバックと代替案が揃う
+        assert llm.invoke.call_count == 1
+        assert result["has_feedback"] is True
+        assert result["alternatives"] == ["お忙しいところ恐れ入ります", "ご確認ください"]
+        prompt = llm.invoke.call_args[0][0][0].content
+        assert '"required"' in prompt
+
+    def test_empty_message_skips_llm(self):
+        llm = Mock()
+        svc = RealtimeFeedbackService(llm=llm)
+
+        assert svc.analyze_with_alternatives("  ", [], None)["has_feedback"] is False
+        llm.invoke.assert_not_called()
+
+    def test_llm_failure_does_not_raise(self):
+        llm = Mock()
+        llm.invoke.side_effect = RuntimeError("API down")
+        svc = RealtimeFeedbackService(llm=llm)
+
+        assert svc.analyze_with_alternatives("テスト", [], None)["alternatives"] == []
+
+
+class TestLenientParsing:
+    def test_prose_around_json_is_ignored(self):
+        svc = RealtimeFeedbackService()
+        text = 'はい、結果です。\n{"has_feedback":true,"feedback_type":"tone","suggestion":"s","alternatives":["a"]}\n以上です。'
+
+        result = svc._parse_analyze_response(text)
+
+        assert result["has_feedback"] is True
+        assert result["alternatives"] == ["a"]
+
+    def test_unterminated_fence_and_truncated_output_are_recovered(self):
+        # Given: ストリーミングが途中で切れた出力（フェンス未閉じ・配列と文字列が未閉じ）
+        svc = RealtimeFeedbackService()
+        text = '```json\n{"has_feedback": true, "feedback_type": "tone", "suggestion": "敬語を", "alternatives": ["案1", "案'
+
+        # When: パースする
+        result = svc._parse_analyze_response(text)
+
+        # Then: 受信済みの部分から構造を復元する
+        assert result["has_feedback"] is True
+        assert result["suggestion"] == "敬語を"
+        assert result["alternatives"] == ["案1", "案"]
+
+    def test_dangling_key_is_dropped(self):
+        svc = RealtimeFeedbackService()
+
+        result = svc._parse_analyze_response('{"has_feedback": true, "suggestion": "OK", "alternatives":')
+
+        assert result["has_feedback"] is True
+        assert result["suggestion"] == "OK"
+        assert result["alternatives"] == []
+
+    def test_truncated_string_list(self):
+        svc = RealtimeFeedbackService()
+
+        assert svc._parse_string_list('["A", "B", "C', max_items=3) == ["A", "B", "C"]
+
+    def test_unparseable_text_returns_empty(self):
+        svc = RealtimeFeedbackService()
+
+        assert svc._parse_analyze_response("JSONではありません")["has_feedback"] is False
+        assert svc._parse_string_list("なし", max_items=3) == []
+
+
+def test_benchmark_combined_mode_halves_llm_calls():
+    from benchmarks.bench_realtime_feedback import run_benchmark
+
+    separate, combined = run_benchmark(latency_ms=0, iterations=2)
+
+    assert separate["llm_calls_per_turn"] == 2
+    assert combined["llm_calls_per_turn"] == 1
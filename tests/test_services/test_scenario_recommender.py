@@ -0,0 +1,212 @@
+"""
+弱点に基づくシナリオ推薦（services.scenario_recommender）のユニットテスト
+"""
+import copy
+
+import numpy as np
+import pytest
+
+from services.gamification_constants import SIX_AXES
+from services.scenario_recommender import (
+    ScenarioRecommender,
+    SkillMatrix,
+    scenario_axis_vector,
+    weakness_vector,
+)
+
+SCENARIOS = {
+    "listen": {
+        "title": "傾聴の練習",
+        "difficulty": "初級",
+        "learning_points": ["相手の話を最後まで聞く", "質問で意図を確認する"],
+        "feedback_points": ["要約して確認しましたか？"],
+    },
+    "clear": {
+        "title": "報告の練習",
+        "difficulty": "初級",
+        "learning_points": ["結論から簡潔に説明する"],
+        "feedback_points": ["要点が明確でしたか？"],
+    },
+    "care": {
+        "title": "気遣いの練習",
+        "difficulty": "中級",
+        "learning_points": ["相手の気持ちに寄り添う"],
+        "feedback_points": ["相手の立場に配慮しましたか？"],
+    },
+    "hard": {
+        "title": "難しい交渉",
+        "difficulty": "上級",
+        "learning_points": ["相手の気持ちを受け止める"],
+        "feedback_points": [],
+    },
+}
+
+
+class FakeUserDataService:
+    def __init__(self, data):
+        self.data = data
+        self.reads = 0
+
+    def get_user_data(self, user_id):
+        self.reads += 1
+        return copy.deepcopy(self.data)
+
+    def save_user_data(self, user_id, data):
+        self.data = copy.deepcopy(data)
+
+
+class FakeScenarioService:
+    def __init__(self, scenarios):
+        self.matrix = SkillMatrix(scenarios)
+
+    def get_skill_matrix(self):
+        return self.matrix
+
+    def get_scenario_by_id(self, scenario_id):
+        return SCENARIOS.get(scenario_id)
+
+
+def user_data(skill_xp=None, unlock_status=None, completions=None, history=0):
+    return {
+        "skill_xp": skill_xp or {},
+        "unlock_status": unlock_status or {"beginner": True, "intermediate": False, "advanced": False},
+        "scenario_completions": completions or {},
+        "xp_history": [{}] * history,
+    }
+
+
+@pytest.fixture
+def recommender():
+    return ScenarioRecommender(FakeScenarioService(SCENARIOS))
+
+
+class TestSkillMatrix:
+    def test_学習ポイントからスキル軸を推定する(self):
+        vector = scenario_axis_vector(SCENARIOS["listen"])
+
+        assert vector.sum() == pytest.approx(1.0)
+        assert SIX_AXES[int(np.argmax(vector))] == "active_listening"
+
+    def test_キーワードがなければ全軸に等しく配分する(self):
+        vector = scenario_axis_vector({"title": "雑談"})
+
+        assert np.allclose(vector, 1 / len(SIX_AXES))
+
+    def test_カタログ全体を行列にする(self):
+        matrix = SkillMatrix(SCENARIOS)
+
+        assert matrix.axes.shape == (4, len(SIX_AXES))
+        assert matrix.difficulties == ["beginner", "beginner", "intermediate", "advanced"]
+        assert len(SkillMatrix({})) == 0
+
+    def test_実際のシナリオカタログから作成できる(self):
+        from scenarios import load_scenarios
+
+        matrix = SkillMatrix(load_scenarios())
+
+        assert len(matrix) > 0
+        assert np.allclose(matrix.axes.sum(axis=1), 1.0)
+
+
+class TestWeaknessVector:
+    def test_XPが少ない軸ほど重い(self):
+        weakness = weakness_vector({"empathy": 100, "clarity": 0})
+
+        assert weakness.sum() == pytest.approx(1.0)
+        assert weakness[SIX_AXES.index("clarity")] > weakness[SIX_AXES.index("empathy")]
+
+    def test_XPがなければ全軸に等しい(self):
+        assert np.allclose(weakness_vector({}), 1 / len(SIX_AXES))
+
+
+class TestRecommend:
+    def test_弱点の軸を練習するシナリオを上位にする(self, recommender):
+        # Given: 傾聴が弱く、明確さが強いユーザー
+        uds = FakeUserDataService(user_data({"clarity": 200, "empathy": 200, "active_listening": 0}))
+
+        # When
+        result = recommender.recommend("u1", uds)
+
+        # Then
+        ids = [r["scenario_id"] for r in result["recommendations"]]
+        assert ids[0] == "listen"
+        assert "active_listening" in result["recommendations"][0]["focus_axes"]
+
+    def test_アンロックされていない難易度は推薦しない(self, recommender):
+        uds = FakeUserDataService(user_data({"clarity": 200, "active_listening": 200}))
+
+        ids = [r["scenario_id"] for r in recommender.recommend("u1", uds)["recommendations"]]
+
+        assert set(ids) == {"listen", "clear"}
+
+    def test_アンロック済みの難易度が推薦に加わる(self, recommender):
+        uds = FakeUserDataService(
+            user_data(
+                {"clarity": 200, "active_listening": 200},
+                unlock_status={"beginner": True, "intermediate": True, "advanced": False},
+            )
+        )
+
+        ids = [r["scenario_id"] for r in recommender.recommend("u1", uds)["recommendations"]]
+
+        assert ids[0] == "care"
+        assert "hard" not in ids
+
+    def test_何度も完了したシナリオは順位を下げる(self, recommender):
+        # Given: 弱点のないユーザー（同点ならカタログ順で listen が先）
+        uds = FakeUserDataService(user_data(completions={"listen": {"count": 5}}))
+
+        ids = [r["scenario_id"] for r in recommender.recommend("u1", uds)["recommendations"]]
+
+        assert ids == ["clear", "listen"]
+
+    def test_件数を制限する(self, recommender):
+        uds = FakeUserDataService(user_data())
+
+        result = recommender.recommend("u1", uds, limit=1)
+
+        assert len(result["recommendations"]) == 1
+        assert set(result["weakness"]) == set(SIX_AXES)
+
+
+class TestCache:
+    def test_XPを獲得するまで推薦結果を再利用する(self, recommender, monkeypatch):
+        uds = FakeUserDataService(user_data({"active_listening": 0, "clarity": 100}, history=1))
+        calls = []
+        original = recommender.rank
+        monkeypatch.setattr(recommender, "rank", lambda *args: calls.append(1) or original(*args))
+
+        first = recommender.recommend("u1", uds)
+        second = recommender.recommend("u1", uds)
+
+        assert len(calls) == 1
+        assert first == second
+
+    def test_XP獲得で推薦結果を作り直す(self, recommender):
+        # Given: 傾聴が弱いユーザーへの推薦
+        uds = FakeUserDataService(user_data({"active_listening": 0, "clarity": 100, "empathy": 100}, history=1))
+        assert recommender.recommend("u1", uds)["recommendations"][0]["scenario_id"] == "listen"
+
+        # When: 傾聴の XP を獲得
+        uds.data["skill_xp"] = {"active_listening": 300, "clarity": 0, "empathy": 300}
+        uds.data["xp_history"].append({})
+
+        # Then
+        assert recommender.recommend("u1", uds)["recommendations"][0]["scenario_id"] == "clear"
+
+    def test_保持するユーザー数に上限がある(self):
+        recommender = ScenarioRecommender(FakeScenarioService(SCENARIOS), max_cached_users=2)
+        uds = FakeUserDataService(user_data())
+
+        for user_id in ("u1", "u2", "u3"):
+            recommender.recommend(user_id, uds)
+
+        assert list(recommender._cache) == ["u2", "u3"]
+
+    def test_破棄後は作り直す(self, recommender):
+        uds = FakeUserDataService(user_data())
+        recommender.recommend("u1", uds)
+
+        recommender.invalidate("u1")
+
+        assert "u1" not in recommender._cache
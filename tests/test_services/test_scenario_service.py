@@ -274,3 +274,88 @@ class TestScenarioServiceErrorHandling:
             # シナリオは空の辞書になる
             assert service._scenarios == {}
             assert service.get_all_scenarios() == {}
+
+
+class TestScenarioPromptCache:
+    """シナリオプロンプトの事前生成とキャッシュのテスト"""
+
+    @pytest.fixture
+    def scenarios(self):
+        return {
+            "scenario1": {
+                "title": "進捗報告",
+                "description": "週次の進捗報告",
+                "role_info": "AIは上司、あなたは部下",
+                "character_setting": {"personality": "厳格", "initial_approach": "淡々と"},
+                "system_prompt": "あなたは部下です。",
+                "initial_context": "部下が報告に来た",
+            }
+        }
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        from utils.performance import get_prompt_cache
+
+        get_prompt_cache().clear()
+        yield
+        get_prompt_cache().clear()
+
+    def _make_service(self, scenarios):
+        with patch("services.scenario_service.load_scenarios", return_value=scenarios):
+            from services.scenario_service import ScenarioService
+
+            return ScenarioService()
+
+    def test_ロード時に全種類のプロンプトを事前生成する(self, scenarios):
+        # Given / When: シナリオをロード
+        from utils.performance import content_hash, get_prompt_cache
+
+        self._make_service(scenarios)
+
+        # Then: 通常/リバースロールのプロンプトと初期メッセージが内容ハッシュをキーにキャッシュ済み
+        digest = content_hash(scenarios["scenario1"])
+        cache = get_prompt_cache()
+        assert cache.stats()["size"] == 4
+        assert cache.get(f"scenario:{digest}:system_reverse") == "あなたは部下です。"
+        assert "淡々と" in cache.get(f"scenario:{digest}:initial")
+
+    def test_キャッシュ済みのプロンプトを再利用する(self, scenarios):
+        service = self._make_service(scenarios)
+        data = service.get_scenario_by_id("scenario1")
+
+        with patch.object(service, "_render_system_prompt", wraps=service._render_system_prompt) as render:
+            first = service.build_system_prompt(data)
+            second = service.build_system_prompt(data)
+
+        assert first == second
+        render.assert_not_called()
+        assert service.get_initial_message(data, is_reverse_role=True).startswith("【状況】")
+
+    def test_内容が異なるシナリオは別キーになる(self, scenarios):
+        service = self._make_service(scenarios)
+        changed = dict(scenarios["scenario1"], description="別の説明")
+
+        assert "別の説明" in service.build_system_prompt(changed)
+        assert "週次の進捗報告" in service.build_system_prompt(scenarios["scenario1"])
+
+    def test_シナリオファイル変更時に再ロードして古いエントリを破棄する(self, scenarios):
+        from utils.performance import content_hash, get_prompt_cache
+
+        service = self._make_service(scenarios)
+        old_digest = content_hash(scenarios["scenario1"])
+        updated = {"scenario1": dict(scenarios["scenario1"], description="更新後の説明")}
+
+        # When: ファイルの更新を検知
+        with patch("services.scenario_service.get_data_signature", return_value=(("scenario1.yaml", 1.0, 1),)), patch(
+            "services.scenario_service.load_scenarios", return_value=updated
+        ):
+            assert service.reload_if_changed(force=True) is True
+
+        # Then: 新しい内容で生成され、古いキーは削除されている
+        assert "更新後の説明" in service.build_system_prompt(service.get_scenario_by_id("scenario1"))
+        assert get_prompt_cache().get(f"scenario:{old_digest}:system") is None
+
+    def test_変更がなければ再ロードしない(self, scenarios):
+        service = self._make_service(scenarios)
+        assert service.reload_if_changed(force=True) is False
+        assert service.reload_if_changed() is False
@@ -0,0 +1,325 @@
+"""
+セッション登録簿（services.session_registry）のユニットテスト
+"""
+from unittest.mock import MagicMock
+
+import pytest
+import redis
+
+from services.session_registry import (
+    CREATED,
+    EXISTS,
+    FULL,
+    InMemorySessionRegistry,
+    RedisSessionRegistry,
+    create_session_registry,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.monotonic を手動で進められる時計"""
+    now = [1000.0]
+    monkeypatch.setattr("services.session_registry.time.monotonic", lambda: now[0])
+    return now
+
+
+class TestInMemorySessionRegistry:
+    def test_作成と取得(self):
+        registry = InMemorySessionRegistry()
+
+        assert registry.create("u1", {"turn_order": ["A", "B", "user"]}) == CREATED
+        assert registry.get("u1") == {"turn_order": ["A", "B", "user"]}
+        assert registry.count() == 1
+
+    def test_同じユーザーの二重作成はEXISTS(self):
+        registry = InMemorySessionRegistry()
+        registry.create("u1", {})
+
+        assert registry.create("u1", {}) == EXISTS
+
+    def test_上限を超える作成はFULL(self):
+        # Given: 上限 2 件が埋まっている
+        registry = InMemorySessionRegistry(max_sessions=2)
+        registry.create("u1", {})
+        registry.create("u2", {})
+
+        # When / Then: 3 件目は作成できない
+        assert registry.create("u3", {}) == FULL
+        assert registry.count() == 2
+
+    def test_上限0は無制限(self):
+        registry = InMemorySessionRegistry(max_sessions=0)
+        for i in range(50):
+            assert registry.create(f"u{i}", {}) == CREATED
+
+    def test_無操作時間を過ぎると消える(self, clock):
+        # Given: idle_ttl 10 秒
+        registry = InMemorySessionRegistry(idle_ttl=10)
+        registry.create("u1", {})
+
+        # When: 10 秒経過
+        clock[0] += 10
+
+        # Then: 取得・延長できず、件数にも含まれない
+        assert registry.get("u1") is None
+        assert registry.touch("u1") is False
+        assert registry.count() == 0
+
+    def test_touchで期限が延びる(self, clock):
+        # Given: 作成から 8 秒後に touch
+        registry = InMemorySessionRegistry(idle_ttl=10)
+        registry.create("u1", {})
+        registry.create("u2", {})
+        clock[0] += 8
+        assert registry.touch("u1") is True
+
+        # When: 作成から 12 秒後
+        clock[0] += 4
+
+        # Then: touch したセッションだけ残る
+        assert registry.get("u1") == {}
+        assert registry.get("u2") is None
+
+    def test_期限切れのセッションは上限に数えない(self, clock):
+        registry = InMemorySessionRegistry(idle_ttl=10, max_sessions=1)
+        registry.create("u1", {})
+        clock[0] += 11
+
+        assert registry.create("u2", {}) == CREATED
+
+    def test_削除(self):
+        registry = InMemorySessionRegistry()
+        registry.create("u1", {})
+
+        assert registry.delete("u1") is True
+        assert registry.delete("u1") is False
+        assert registry.get("u1") is None
+
+
+@pytest.fixture
+def manager():
+    """接続中の RedisSessionManager を模したモック"""
+    m = MagicMock()
+    m._is_connected = True
+    return m
+
+
+class TestRedisSessionRegistry:
+    def test_作成はスクリプト1回で判定する(self, manager):
+        # Given: 作成スクリプトが 1（作成）を返す
+        script = MagicMock(return_value=1)
+        manager._client.register_script.return_value = script
+        registry = RedisSessionRegistry(manager, "three_way", idle_ttl=60, max_sessions=5)
+
+        # When
+        result = registry.create("u1", {"turn_order": ["A"]})
+
+        # Then: セッションキーとインデックスをハッシュタグ付きで渡す
+        assert result == CREATED
+        kwargs = script.call_args.kwargs
+        assert kwargs["keys"] == [
+            "workplace-roleplay:{three_way}:session:u1",
+            "workplace-roleplay:{three_way}:index",
+            "workplace-roleplay:{three_way}:session:u1:items",
+        ]
+        assert kwargs["args"][0] == "u1"
+        assert kwargs["args"][2] == 60
+        assert kwargs["args"][4] == 5
+
+    @pytest.mark.parametrize("raw, expected", [(0, EXISTS), (-1, FULL)])
+    def test_スクリプトの結果を変換する(self, manager, raw, expected):
+        manager._client.register_script.return_value = MagicMock(return_value=raw)
+        registry = RedisSessionRegistry(manager, "three_way")
+
+        assert registry.create("u1", {}) == expected
+
+    def test_スクリプトは一度だけ登録する(self, manager):
+        manager._client.register_script.return_value = MagicMock(return_value=1)
+        registry = RedisSessionRegistry(manager, "three_way")
+
+        registry.touch("u1")
+        registry.touch("u2")
+
+        manager._client.register_script.assert_called_once()
+
+    def test_取得はJSONを復元する(self, manager):
+        manager._client.get.return_value = '{"turn_order": ["A", "B", "user"]}'
+        registry = RedisSessionRegistry(manager, "three_way")
+
+        assert registry.get("u1") == {"turn_order": ["A", "B", "user"]}
+        manager._client.get.assert_called_once_with("workplace-roleplay:{three_way}:session:u1")
+
+    def test_Redisエラー時はプロセス内の登録簿で継続する(self, manager):
+        # Given: スクリプト実行が失敗する
+        manager._client.register_script.return_value = MagicMock(side_effect=redis.ConnectionError("down"))
+        manager._client.get.side_effect = redis.ConnectionError("down")
+        registry = RedisSessionRegistry(manager, "three_way")
+
+        # When / Then: インメモリで作成・重複判定できる
+        assert registry.create("u1", {"a": 1}) == CREATED
+        assert registry.create("u1", {"a": 1}) == EXISTS
+        assert registry.get("u1") == {"a": 1}
+
+    def test_未接続ならRedisを使わない(self, manager):
+        manager._is_connected = False
+        registry = RedisSessionRegistry(manager, "three_way")
+
+        assert registry.create("u1", {}) == CREATED
+        assert registry.touch("u1") is True
+        manager._client.register_script.assert_not_called()
+
+    def test_削除はキーとインデックスを消す(self, manager):
+        pipe = manager._client.pipeline.return_value
+        pipe.execute.return_value = [1, 1]
+        registry = RedisSessionRegistry(manager, "three_way")
+
+        assert registry.delete("u1") is True
+        pipe.delete.assert_called_once_with(
+            "workplace-roleplay:{three_way}:session:u1", "workplace-roleplay:{three_way}:session:u1:items"
+        )
+        pipe.zrem.assert_called_once_with("workplace-roleplay:{three_way}:index", "u1")
+
+
+class TestCreateSessionRegistry:
+    def test_Redis無効ならインメモリ版(self, monkeypatch):
+        monkeypatch.setattr("core.extensions.get_redis_session_manager", lambda: None)
+
+        registry = create_session_registry("three_way", idle_ttl=30, max_sessions=3)
+
+        assert isinstance(registry, InMemorySessionRegistry)
+        assert registry.idle_ttl == 30
+        assert registry.max_sessions == 3
+
+    def test_Redis有効ならRedis版(self, monkeypatch, manager):
+        monkeypatch.setattr("core.extensions.get_redis_session_manager", lambda: manager)
+
+        registry = create_session_registry("three_way")
+
+        assert isinstance(registry, RedisSessionRegistry)
+        assert registry.manager is manager
+
+
+class TestUpdate:
+    def test_インメモリ版は存在するセッションだけ置き換える(self):
+        registry = InMemorySessionRegistry()
+        registry.create("u1", {"a": 1})
+
+        assert registry.update("u1", {"a": 2}) is True
+        assert registry.get("u1") == {"a": 2}
+        assert registry.update("u2", {"a": 1}) is False
+        assert registry.get("u2") is None
+
+    def test_Redis版はスクリプトの結果を返す(self, manager):
+        manager._client.register_script.return_value = MagicMock(return_value=0)
+        registry = RedisSessionRegistry(manager, "three_way")
+
+        assert registry.update("u1", {"a": 1}) is False
+
+
+class TestItems:
+    def test_インメモリ版は追記した要素を一度だけ取り出せる(self):
+        registry = InMemorySessionRegistry()
+        registry.create("u1", {})
+
+        assert registry.append_items("u1", [1, 2]) is True
+        assert registry.append_items("u1", [3]) is True
+        assert registry.pop_items("u1") == [1, 2, 3]
+        assert registry.pop_items("u1") == []
+
+    def test_インメモリ版はセッションがなければ追記しない(self):
+        registry = InMemorySessionRegistry()
+
+        assert registry.append_items("u1", [1]) is False
+        assert registry.pop_items("u1") == []
+
+    def test_インメモリ版は参加し直すと古い要素を消す(self):
+        registry = InMemorySessionRegistry()
+        registry.create("u1", {})
+        registry.append_items("u1", [1])
+        registry.delete("u1")
+        registry.create("u1", {})
+
+        assert registry.pop_items("u1") == []
+
+    def test_インメモリ版は同時の追記で要素を失わない(self):
+        import threading
+
+        # Given: 同じユーザーに8スレッドから50件ずつ追記する
+        registry = InMemorySessionRegistry()
+        registry.create("u1", {})
+
+        def append(worker):
+            for i in range(50):
+                registry.append_items("u1", [(worker, i)])
+
+        threads = [threading.Thread(target=append, args=(w,)) for w in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # Then: 全件が取り出せる
+        assert len(registry.pop_items("u1")) == 400
+
+    def test_Redis版は追記をスクリプト1回で行う(self, manager):
+        script = MagicMock(return_value=1)
+        manager._client.register_script.return_value = script
+        registry = RedisSessionRegistry(manager, "three_way", idle_ttl=60)
+
+        assert registry.append_items("u1", [{"speaker": "A", "message": "了解"}]) is True
+
+        kwargs = script.call_args.kwargs
+        assert kwargs["keys"] == [
+            "workplace-roleplay:{three_way}:session:u1",
+            "workplace-roleplay:{three_way}:index",
+            "workplace-roleplay:{three_way}:session:u1:items",
+        ]
+        assert kwargs["args"][0] == "u1" and kwargs["args"][1] == 60
+        assert kwargs["args"][3:] == ['{"speaker": "A", "message": "了解"}']
+
+    def test_Redis版の取り出しはJSONを復元する(self, manager):
+        script = MagicMock(return_value=['{"speaker": "A"}', '{"speaker": "B"}'])
+        manager._client.register_script.return_value = script
+        registry = RedisSessionRegistry(manager, "three_way")
+
+        assert registry.pop_items("u1") == [{"speaker": "A"}, {"speaker": "B"}]
+        assert script.call_args.kwargs["keys"] == ["workplace-roleplay:{three_way}:session:u1:items"]
+
+
+class TestSlots:
+    def test_インメモリ版は上限まで確保できる(self):
+        registry = InMemorySessionRegistry()
+
+        assert registry.acquire_slot("u1", 2, 60) is True
+        assert registry.acquire_slot("u1", 2, 60) is True
+        assert registry.acquire_slot("u1", 2, 60) is False
+        assert registry.acquire_slot("u2", 2, 60) is True
+        assert registry.release_slot("u1") is True
+        assert registry.acquire_slot("u1", 2, 60) is True
+
+    def test_インメモリ版は確保していない枠を戻さない(self):
+        registry = InMemorySessionRegistry()
+
+        assert registry.release_slot("u1") is False
+
+    def test_Redis版は件数のキーと上限と有効期限を渡す(self, manager):
+        script = MagicMock(return_value=0)
+        manager._client.register_script.return_value = script
+        registry = RedisSessionRegistry(manager, "three_way")
+
+        assert registry.acquire_slot("u1", 1, 240.0) is False
+        assert script.call_args.kwargs == {"keys": ["workplace-roleplay:{three_way}:slots:u1"], "args": [1, 240]}
+
+    def test_接続断の間に確保した枠はRedisの件数を減らさない(self, manager):
+        # Given: 接続断の間にプロセス内で枠を確保し、その後に再接続した
+        manager._is_connected = False
+        registry = RedisSessionRegistry(manager, "three_way")
+        assert registry.acquire_slot("u1", 1, 60) is True
+        manager._is_connected = True
+
+        # When: 枠を戻す
+        assert registry.release_slot("u1") is True
+
+        # Then: Redis のスクリプトは呼ばない
+        manager._client.register_script.assert_not_called()
@@ -0,0 +1,261 @@
+"""
+SupabaseUserDataService の normalized モード（変更部分のみの書き込み）のテスト
+
+Supabase クライアントはインメモリのテーブルを持つフェイクで代替し、書き込まれた行とペイロードサイズを記録する。
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services.badge_service import BadgeService
+from services.gamification_constants import SIX_AXES
+from services.gamification_service import GamificationService
+from services.supabase_user_data_service import (
+    PERSISTENCE_DOCUMENT,
+    PERSISTENCE_NORMALIZED,
+    SupabaseUserDataService,
+    UserDocumentTracker,
+)
+
+# テーブルごとの一意キー（upsert の on_conflict）
+_KEYS = {"user_data": ("user_id",), "skill_xp": ("user_id",), "badges": ("user_id", "badge_id"), "xp_history": ("id",)}
+
+
+class _Query:
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._filters = []
+        self._order = None
+        self._limit = None
+        self._write = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self._filters.append((column, value))
+        return self
+
+    def order(self, column):
+        self._order = column
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        self._write = (rows if isinstance(rows, list) else [rows], ignore_duplicates)
+        return self
+
+    def execute(self):
+        rows = self._client.tables.setdefault(self._table, [])
+        if self._write is not None:
+            new_rows, ignore_duplicates = self._write
+            self._client.writes.append((self._table, new_rows))
+            for new in new_rows:
+                key = tuple(new.get(k) for k in _KEYS[self._table])
+                existing = next((r for r in rows if tuple(r.get(k) for k in _KEYS[self._table]) == key), None)
+                if existing is None:
+                    rows.append(json.loads(json.dumps(new)))
+                elif not ignore_duplicates:
+                    existing.update(json.loads(json.dumps(new)))
+            return MagicMock(data=new_rows)
+        result = [r for r in rows if all(r.get(c) == v for c, v in self._filters)]
+        if self._order:
+            result.sort(key=lambda r: r.get(self._order) or "")
+        if self._limit is not None:
+            result = result[: self._limit]
+        return MagicMock(data=json.loads(json.dumps(result)))
+
+
+class FakeSupabaseClient:
+    """テーブル操作（select / eq / order / limit / upsert）のみを持つ Supabase クライアントの代替"""
+
+    def __init__(self):
+        self.tables = {}
+        self.writes = []
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def written_bytes(self):
+        return sum(len(json.dumps(rows, ensure_ascii=False)) for _, rows in self.writes)
+
+
+@pytest.fixture
+def client():
+    return FakeSupabaseClient()
+
+
+def _svc(client):
+    return SupabaseUserDataService(client, mode=PERSISTENCE_NORMALIZED)
+
+
+def _gains(value=1):
+    gains = {axis: value for axis in SIX_AXES}
+    gains["scenario_id"] = "s1"
+    return gains
+
+
+def _seed_history(client, user_id, count):
+    """XP 履歴 count 件を持つユーザーを作成"""
+    svc = _svc(client)
+    data = svc.get_user_data(user_id)
+    data["xp_history"] = [
+        {
+            "timestamp": f"2026-01-01T00:00:{i % 60:02d}.{i:06d}+00:00",
+            "source": "scenario_completion",
+            "scenario_id": "s1",
+            "xp_gains": {axis: 1 for axis in SIX_AXES},
+            "scores_snapshot": {},
+        }
+        for i in range(count)
+    ]
+    svc.save_user_data(user_id, data)
+    client.writes.clear()
+
+
+class TestNormalizedWrites:
+    def test_add_xp_writes_only_changed_parts(self, client):
+        # Given: 既存ユーザー
+        _seed_history(client, "u1", 3)
+
+        # When: XP を追加
+        GamificationService(_svc(client)).add_xp("u1", _gains(), "scenario_completion")
+
+        # Then: skill_xp と追加された履歴1行のみ書き込み、user_data（コア部分）は書き込まない
+        tables = [table for table, _ in client.writes]
+        assert sorted(tables) == ["skill_xp", "xp_history"]
+        assert len(client.writes[tables.index("xp_history")][1]) == 1
+        assert len(client.tables["xp_history"]) == 4
+
+    def test_payload_size_is_flat_as_history_grows(self, client):
+        # Given: 履歴10件と2000件のユーザー
+        sizes = {}
+        for user_id, count in (("small", 10), ("large", 2000)):
+            _seed_history(client, user_id, count)
+
+            # When: 同じ XP 追加
+            GamificationService(_svc(client)).add_xp(user_id, _gains(), "scenario_completion")
+            sizes[user_id] = client.written_bytes()
+            client.writes.clear()
+
+        # Then: 書き込み量は履歴の件数によらない（ユーザーID・件数の桁の差のみ）
+        assert abs(sizes["large"] - sizes["small"]) < 32
+
+    def test_only_changed_axes_are_written(self, client):
+        _seed_history(client, "u1", 0)
+        svc = _svc(client)
+        data = svc.get_user_data("u1")
+        data["skill_xp"]["empathy"] += 5
+
+        svc.save_user_data("u1", data)
+
+        ((table, rows),) = client.writes
+        assert table == "skill_xp"
+        assert set(rows[0]) == {"user_id", "empathy", "updated_at"}
+
+    def test_award_badge_inserts_badge_row(self, client):
+        _seed_history(client, "u1", 1)
+
+        BadgeService(_svc(client)).award_badge("u1", "first_step")
+
+        assert [table for table, _ in client.writes] == ["badges"]
+        assert client.tables["badges"][0]["badge_id"] == "first_step"
+
+    def test_core_change_writes_document_without_history(self, client):
+        _seed_history(client, "u1", 5)
+        svc = _svc(client)
+        data = svc.get_user_data("u1")
+        data["stats"]["total_scenarios_completed"] = 1
+
+        svc.save_user_data("u1", data)
+
+        ((table, rows),) = client.writes
+        assert table == "user_data"
+        assert not set(rows[0]["data"]) & {"xp_history", "skill_xp", "badges"}
+
+
+class TestNormalizedReads:
+    def test_roundtrip_assembles_document(self, client):
+        # Given: XP とバッジを保存
+        GamificationService(_svc(client)).add_xp("u1", _gains(2), "scenario_completion")
+        BadgeService(_svc(client)).award_badge("u1", "first_step")
+
+        # When: 別インスタンスで読み込む
+        data = _svc(client).get_user_data("u1")
+
+        # Then: 正規化テーブルから組み立てられる
+        assert data["skill_xp"] == {axis: 2 for axis in SIX_AXES}
+        assert [h["xp_gains"]["empathy"] for h in data["xp_history"]] == [2]
+        assert [b["badge_id"] for b in data["badges"]["earned"]] == ["first_step"]
+
+    def test_legacy_document_is_migrated_on_next_save(self, client):
+        # Given: document モードで保存された旧形式（履歴を JSONB に含む）
+        legacy = SupabaseUserDataService(client, mode=PERSISTENCE_DOCUMENT)
+        data = legacy.get_user_data("u1")
+        data["xp_history"] = [{"timestamp": "2026-01-01T00:00:00+00:00", "source": "quiz", "xp_gains": {}}]
+        legacy.save_user_data("u1", data)
+
+        # When: normalized モードで読み込み・保存
+        svc = _svc(client)
+        svc.save_user_data("u1", svc.get_user_data("u1"))
+
+        # Then: 履歴は xp_history に移り、user_data から外れる
+        assert len(client.tables["xp_history"]) == 1
+        assert "xp_history" not in client.tables["user_data"][0]["data"]
+        assert len(_svc(client).get_user_data("u1")["xp_history"]) == 1
+
+    def test_full_write_does_not_duplicate_history(self, client):
+        # Given: 読み込みと保存が別インスタンス（差分が取れず全体を書き込む）
+        _seed_history(client, "u1", 3)
+        data = _svc(client).get_user_data("u1")
+
+        # When: 全体の書き込みを2回
+        _svc(client).save_user_data("u1", data)
+        _svc(client).save_user_data("u1", data)
+
+        # Then: 決定的な行IDにより重複しない
+        assert len(client.tables["xp_history"]) == 3
+
+
+class TestUserDocumentTracker:
+    def test_rewritten_history_requires_full_write(self):
+        tracker = UserDocumentTracker()
+        data = {"xp_history": [{"n": 1}, {"n": 2}], "skill_xp": {}}
+        tracker.snapshot("u", data)
+
+        data["xp_history"] = [{"n": 1}, {"n": 3}]
+
+        assert tracker.diff("u", data).full is True
+
+    def test_unchanged_document_has_no_changes(self):
+        tracker = UserDocumentTracker()
+        data = {"xp_history": [], "skill_xp": {}, "stats": {"a": 1}, "updated_at": "t1"}
+        tracker.snapshot("u", data)
+
+        data["updated_at"] = "t2"
+
+        assert tracker.diff("u", data).empty
+
+
+class TestMode:
+    def test_default_mode_is_document(self, client, monkeypatch):
+        monkeypatch.delenv("SUPABASE_PERSISTENCE_MODE", raising=False)
+        assert SupabaseUserDataService(client).mode == PERSISTENCE_DOCUMENT
+
+    def test_mode_from_env(self, client, monkeypatch):
+        monkeypatch.setenv("SUPABASE_PERSISTENCE_MODE", "normalized")
+        assert SupabaseUserDataService(client).mode == PERSISTENCE_NORMALIZED
+
+    def test_construction_does_not_create_nested_delegate(self, client):
+        # Given: Supabase クライアントが利用可能
+        with patch("services.supabase_client.SupabaseClientManager.get_client", return_value=client):
+            svc = SupabaseUserDataService(client)
+
+        # Then: 自分自身の型の委譲先を生成しない
+        assert svc._delegate is None
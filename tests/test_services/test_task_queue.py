@@ -0,0 +1,268 @@
+"""
+バックグラウンドタスクキューのテスト
+"""
+
+import sqlite3
+import time
+from unittest.mock import patch
+
+import pytest
+
+from services.task_queue import (
+    STATUS_DONE,
+    STATUS_FAILED,
+    STATUS_PENDING,
+    STATUS_RUNNING,
+    TaskQueue,
+    describe_task,
+    register_task,
+)
+
+
+@register_task("test_echo")
+def _echo(payload):
+    return {"echo": payload["value"]}
+
+
+_flaky_calls = {"n": 0}
+
+
+@register_task("test_flaky")
+def _flaky(payload):
+    _flaky_calls["n"] += 1
+    if _flaky_calls["n"] < payload["succeed_on"]:
+        raise RuntimeError("temporary failure")
+    return {"calls": _flaky_calls["n"]}
+
+
+@register_task("test_always_fail")
+def _always_fail(payload):
+    raise RuntimeError("boom")
+
+
+@pytest.fixture(autouse=True)
+def reset_flaky():
+    _flaky_calls["n"] = 0
+
+
+class TestTaskQueueEager:
+    """同期（eager）モードのテスト"""
+
+    def test_投入と同時に実行され結果を取得できる(self):
+        # Given: 同期モードのキュー
+        queue = TaskQueue(":memory:", eager=True)
+
+        # When: タスクを投入
+        task_id = queue.enqueue("test_echo", {"value": "こんにちは"}, owner="user-1")
+
+        # Then: 完了済みで結果が保存されている
+        task = queue.get_task(task_id)
+        assert task["status"] == STATUS_DONE
+        assert task["result"] == {"echo": "こんにちは"}
+        assert task["attempts"] == 1
+
+    def test_失敗したタスクは再試行される(self):
+        queue = TaskQueue(":memory:", max_retries=3, eager=True)
+
+        task_id = queue.enqueue("test_flaky", {"succeed_on": 3})
+
+        task = queue.get_task(task_id)
+        assert task["status"] == STATUS_DONE
+        assert task["attempts"] == 3
+        assert task["result"] == {"calls": 3}
+
+    def test_再試行回数を超えると失敗になる(self):
+        queue = TaskQueue(":memory:", max_retries=2, eager=True)
+
+        task_id = queue.enqueue("test_always_fail", {})
+
+        task = queue.get_task(task_id)
+        assert task["status"] == STATUS_FAILED
+        assert task["attempts"] == 3
+        assert "RuntimeError: boom" in task["error"]
+
+    def test_未登録のタスク名はValueError(self):
+        queue = TaskQueue(":memory:", eager=True)
+        with pytest.raises(ValueError):
+            queue.enqueue("no_such_task", {})
+
+
+class TestTaskQueueWorkers:
+    """ワーカースレッドのテスト"""
+
+    def test_ワーカーがタスクを実行する(self):
+        # Given: ワーカーを起動したキュー
+        queue = TaskQueue(":memory:", workers=2, poll_interval_seconds=0.05)
+        queue.start()
+        try:
+            # When: タスクを投入
+            task_id = queue.enqueue("test_echo", {"value": 1})
+
+            # Then: 非同期に完了する
+            deadline = time.time() + 5
+            while queue.get_task(task_id)["status"] != STATUS_DONE and time.time() < deadline:
+                time.sleep(0.02)
+            assert queue.get_task(task_id)["result"] == {"echo": 1}
+        finally:
+            queue.shutdown()
+        assert not queue.is_running()
+
+    def test_再試行は指数バックオフで待機する(self):
+        queue = TaskQueue(":memory:", max_retries=1, retry_backoff_seconds=60)
+
+        task_id = queue.enqueue("test_always_fail", {})
+        assert queue.run_pending_once() is True
+
+        # バックオフ中は取り出されない
+        task = queue.get_task(task_id)
+        assert task["status"] == STATUS_PENDING
+        assert queue.run_pending_once() is False
+
+
+class TestTaskQueuePersistence:
+    """SQLite永続化のテスト"""
+
+    def test_再起動時に実行中タスクを再実行対象に戻す(self, tmp_path):
+        # Given: 実行中のまま終了したタスクがあるDB
+        db_path = str(tmp_path / "tasks.db")
+        queue = TaskQueue(db_path)
+        task_id = queue.enqueue("test_echo", {"value": "x"})
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE tasks SET status = 'running' WHERE id = ?", (task_id,))
+        conn.commit()
+        conn.close()
+
+        # When: 新しいキューで開き直す
+        restarted = TaskQueue(db_path)
+
+        # Then: pending に戻り、実行できる
+        assert restarted.get_task(task_id)["status"] == STATUS_PENDING
+        assert restarted.run_pending_once() is True
+        assert restarted.get_task(task_id)["result"] == {"echo": "x"}
+
+    def test_他のワーカーが実行中のタスクは戻さない(self, tmp_path):
+        # Given: 同じDBを共有する2つのキュー。一方がタスクを実行中
+        db_path = str(tmp_path / "tasks.db")
+        worker_a = TaskQueue(db_path)
+        task_id = worker_a.enqueue("test_echo", {"value": "x"})
+        task = worker_a._claim_next(task_id)
+        assert task is not None
+
+        # When: もう一方のワーカーが（再）起動する
+        worker_b = TaskQueue(db_path)
+
+        # Then: 実行中のまま残り、二重実行されない
+        assert worker_b.get_task(task_id)["status"] == STATUS_RUNNING
+        assert worker_b.run_pending_once() is False
+
+        worker_a._execute(task)
+        assert worker_b.get_task(task_id)["status"] == STATUS_DONE
+        assert worker_b.get_task(task_id)["attempts"] == 1
+
+    def test_終了したプロセスのタスクは戻す(self, tmp_path):
+        # Given: 終了したプロセス（存在しないPID）が実行中のまま残したタスク
+        db_path = str(tmp_path / "tasks.db")
+        queue = TaskQueue(db_path)
+        task_id = queue.enqueue("test_echo", {"value": "x"})
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "UPDATE tasks SET status = 'running', worker_pid = ?, lease_until = ? WHERE id = ?",
+            (2**22 + 1, time.time() + 600, task_id),
+        )
+        conn.commit()
+        conn.close()
+
+        # When
+        restarted = TaskQueue(db_path)
+
+        # Then
+        assert restarted.get_task(task_id)["status"] == STATUS_PENDING
+
+    def test_リース期限を過ぎたタスクは戻す(self, tmp_path):
+        # Given: 実行中のプロセスが持つが、リース期限を過ぎたタスク
+        db_path = str(tmp_path / "tasks.db")
+        worker_a = TaskQueue(db_path, lease_seconds=-1)
+        task_id = worker_a.enqueue("test_echo", {"value": "x"})
+        assert worker_a._claim_next(task_id) is not None
+
+        # When
+        worker_b = TaskQueue(db_path)
+
+        # Then
+        assert worker_b.get_task(task_id)["status"] == STATUS_PENDING
+
+    def test_ユーザーごとのタスク一覧(self):
+        queue = TaskQueue(":memory:", eager=True)
+        queue.enqueue("test_echo", {"value": 1}, owner="alice")
+        queue.enqueue("test_echo", {"value": 2}, owner="bob")
+        queue.enqueue("test_echo", {"value": 3}, owner="alice")
+
+        tasks = queue.list_tasks("alice")
+
+        assert [t["result"]["echo"] for t in tasks] == [3, 1]
+
+    def test_完了済みタスクの削除と集計(self):
+        queue = TaskQueue(":memory:", eager=True)
+        queue.enqueue("test_echo", {"value": 1})
+
+        assert queue.stats()["counts"][STATUS_DONE] == 1
+        assert queue.purge_finished(older_than_seconds=-1) == 1
+        assert queue.stats()["counts"][STATUS_DONE] == 0
+
+
+class TestPostResponseTasks:
+    """フィードバック後処理タスクのテスト"""
+
+    def test_シナリオ後処理はセッションに依存せず実行できる(self):
+        from services.post_response_tasks import SCENARIO_FEEDBACK_POST
+
+        queue = TaskQueue(":memory:", eager=True)
+        history = [{"human": "ありがとうございます、助かります", "ai": "どういたしまして"}]
+
+        with patch("services.gamification_hooks.on_scenario_feedback", return_value={"xp_gained": 10}) as mock_hook:
+            task_id = queue.enqueue(
+                SCENARIO_FEEDBACK_POST,
+                {
+                    "user_id": "user-1",
+                    "scenario_id": "scenario1",
+                    "scenario_data": {"title": "テスト"},
+                    "session_id": "scenario1_user-1_1",
+                    "history": history,
+                },
+            )
+
+        task = queue.get_task(task_id)
+        assert task["status"] == STATUS_DONE
+        assert "scores" in task["result"]["strength_analysis"]
+        assert task["result"]["gamification"] == {"xp_gained": 10}
+        kwargs = mock_hook.call_args.kwargs
+        assert kwargs["user_id"] == "user-1"
+        assert kwargs["history"] == history
+
+    def test_フィードバック不要でも言い換え候補は返す(self):
+        from services.post_response_tasks import run_realtime_feedback
+
+        combined = {"has_feedback": False, "feedback_type": None, "suggestion": "", "alternatives": ["承知しました"]}
+        with patch("app.initialize_llm"), patch(
+            "services.realtime_feedback_service.RealtimeFeedbackService.analyze_with_alternatives",
+            return_value=combined,
+        ):
+            result = run_realtime_feedback({"message": "わかった", "history": [], "model_name": "gemini/x"})
+
+        assert result == {"realtime_feedback": combined}
+
+    def test_フィードバックも言い換え候補もなければ空(self):
+        from services.post_response_tasks import run_realtime_feedback
+
+        empty = {"has_feedback": False, "feedback_type": None, "suggestion": "", "alternatives": []}
+        with patch("app.initialize_llm"), patch(
+            "services.realtime_feedback_service.RealtimeFeedbackService.analyze_with_alternatives",
+            return_value=empty,
+        ):
+            result = run_realtime_feedback({"message": "はい", "history": [], "model_name": "gemini/x"})
+
+        assert result == {}
+
+
+def test_describe_taskはポーリングURLを含む():
+    assert describe_task("abc") == {"task_id": "abc", "status_url": "/api/tasks/abc"}
@@ -0,0 +1,186 @@
+"""
+3者会話の AI 応答の並列生成（services.three_way_generation）のユニットテスト
+"""
+import threading
+import time
+
+import pytest
+
+from services.three_way_generation import (
+    ThreeWayGenerationEngine,
+    can_speculate,
+    needs_regeneration,
+    reply_speakers,
+)
+
+USER_TURN = [{"speaker": "A", "message": "おはようございます"}, {"role": "user", "content": "皆さん週末はどうでしたか"}]
+
+
+@pytest.fixture
+def engine():
+    e = ThreeWayGenerationEngine(max_workers=4, timeout_seconds=5)
+    yield e
+    e.shutdown()
+
+
+class TestReplySpeakers:
+    def test_標準のターン順ではAとB(self):
+        assert reply_speakers(["A", "B", "user"]) == ["A", "B"]
+
+    def test_ユーザーが途中でも次のユーザーの番まで(self):
+        assert reply_speakers(["A", "user", "B"]) == ["B", "A"]
+
+
+class TestCanSpeculate:
+    def test_全員への発言なら投機する(self):
+        assert can_speculate(USER_TURN, ["A", "B"]) is True
+
+    def test_最初の話者だけへの呼びかけは投機しない(self):
+        history = [{"role": "user", "content": "太郎さんはどう思いますか"}]
+        assert can_speculate(history, ["A", "B"]) is False
+
+    def test_両方への呼びかけは投機する(self):
+        history = [{"role": "user", "content": "太郎さんと花子さんはどう思いますか"}]
+        assert can_speculate(history, ["A", "B"]) is True
+
+    def test_直前がユーザーでなければ投機しない(self):
+        assert can_speculate([{"speaker": "A", "message": "こんにちは"}], ["A", "B"]) is False
+
+    def test_話者が1人なら投機しない(self):
+        assert can_speculate(USER_TURN, ["A"]) is False
+
+
+class TestNeedsRegeneration:
+    def test_Bへの問いかけがあれば生成し直す(self):
+        previous = [{"speaker": "A", "message": "花子さんはどうでした？"}]
+        assert needs_regeneration("B", "楽しかったです", previous) is True
+
+    def test_ほぼ同じ内容なら生成し直す(self):
+        previous = [{"speaker": "A", "message": "週末は家族と公園に行きました"}]
+        assert needs_regeneration("B", "週末は家族と公園に行きました！", previous) is True
+
+    def test_独立した応答はそのまま使う(self):
+        previous = [{"speaker": "A", "message": "週末は家族と公園に行きました"}]
+        assert needs_regeneration("B", "私は映画を観に行きました", previous) is False
+
+
+class TestGenerate:
+    def test_AとBを並列に生成する(self, engine):
+        # Given: 2件の生成が同時に走っていないと先に進めない関数
+        barrier = threading.Barrier(2, timeout=2)
+
+        def generate_reply(speaker, history):
+            barrier.wait()
+            return "了解です" if speaker == "A" else "私は映画を観ました"
+
+        # When
+        replies = list(engine.generate(USER_TURN, ["A", "B"], generate_reply))
+
+        # Then: 会話の順に返り、B の下書きをそのまま使う
+        assert [r["speaker"] for r in replies] == ["A", "B"]
+        assert engine.stats()["speculated"] == 1
+        assert engine.stats()["accepted"] == 1
+
+    def test_Aを返すときBの完了を待たない(self, engine):
+        # Given: B の生成だけが遅い
+        release_b = threading.Event()
+
+        def generate_reply(speaker, history):
+            if speaker == "B":
+                release_b.wait(2)
+                return "私は映画を観ました"
+            return "了解です"
+
+        gen = engine.generate(USER_TURN, ["A", "B"], generate_reply)
+
+        # When: 最初の応答を受け取る
+        started = time.monotonic()
+        first = next(gen)
+
+        # Then: B を待たずに A が返る
+        assert first == {"speaker": "A", "message": "了解です"}
+        assert time.monotonic() - started < 1
+        release_b.set()
+        assert next(gen)["speaker"] == "B"
+
+    def test_AがBに問いかけたらAの応答を踏まえて生成し直す(self, engine):
+        calls = []
+
+        def generate_reply(speaker, history):
+            calls.append((speaker, len(history)))
+            if speaker == "A":
+                return "花子さんは週末どうでした？"
+            return "映画を観ました" if len(history) > len(USER_TURN) else "皆さんお疲れさまです"
+
+        replies = list(engine.generate(USER_TURN, ["A", "B"], generate_reply))
+
+        # Then: B は A の応答を含む履歴で再生成される
+        assert replies[1]["message"] == "映画を観ました"
+        assert ("B", len(USER_TURN) + 1) in calls
+        assert engine.stats()["regenerated"] == 1
+
+    def test_投機しない場合は順番に生成する(self, engine):
+        history = [{"role": "user", "content": "太郎さん、昨日の資料はどうなりましたか"}]
+        seen = {}
+
+        def generate_reply(speaker, snapshot):
+            seen[speaker] = [dict(entry) for entry in snapshot]
+            return f"{speaker}の発言"
+
+        list(engine.generate(history, ["A", "B"], generate_reply))
+
+        # Then: B は A の応答を含む履歴で生成される
+        assert seen["B"][-1] == {"speaker": "A", "message": "Aの発言"}
+        assert engine.stats()["speculated"] == 0
+        assert engine.stats()["sequential"] == 1
+
+    def test_投機無効なら常に順番に生成する(self):
+        engine = ThreeWayGenerationEngine(speculative=False)
+        list(engine.generate(USER_TURN, ["A", "B"], lambda speaker, history: speaker))
+
+        assert engine.stats()["speculated"] == 0
+        engine.shutdown()
+
+    def test_生成の失敗は呼び出し元に送出する(self, engine):
+        def generate_reply(speaker, history):
+            raise RuntimeError("LLM error")
+
+        with pytest.raises(RuntimeError):
+            list(engine.generate(USER_TURN, ["A", "B"], generate_reply))
+
+
+class TestPerUserLimit:
+    def test_上限を超える同時生成は拒否する(self):
+        engine = ThreeWayGenerationEngine(max_per_user=1)
+
+        assert engine.acquire("u1") is True
+        assert engine.acquire("u1") is False
+        # 他のユーザーには影響しない
+        assert engine.acquire("u2") is True
+        assert engine.stats()["busy"] == 1
+
+    def test_releaseで再び生成できる(self):
+        engine = ThreeWayGenerationEngine(max_per_user=1)
+        engine.acquire("u1")
+        engine.release("u1")
+
+        assert engine.acquire("u1") is True
+        assert engine.stats()["in_flight"] == 1
+
+    def test_上限0は無制限(self):
+        engine = ThreeWayGenerationEngine(max_per_user=0)
+        assert all(engine.acquire("u1") for _ in range(10))
+
+    def test_登録簿を共有するエンジン間で上限を数える(self):
+        from services.session_registry import InMemorySessionRegistry
+
+        # Given: 同じ登録簿を使う2つのエンジン（別ワーカーに相当）
+        registry = InMemorySessionRegistry()
+        worker_a = ThreeWayGenerationEngine(max_per_user=1, registry=registry)
+        worker_b = ThreeWayGenerationEngine(max_per_user=1, registry=registry)
+
+        # When / Then: 一方で生成中なら他方では確保できず、返せば確保できる
+        assert worker_a.acquire("u1") is True
+        assert worker_b.acquire("u1") is False
+        worker_a.release("u1")
+        assert worker_b.acquire("u1") is True
@@ -8,6 +8,7 @@ import pytest
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+from services.session_registry import InMemorySessionRegistry
 from services.three_way_service import ThreeWayConversationService
 
 
@@ -82,3 +83,84 @@ class TestLeaveConversation:
         # Then
         assert out["left"] is True
         assert out["mode"] == "watch"
+
+
+class TestSessionLifetime:
+    def test_is_joined_reflects_join_and_leave(self, svc):
+        # Given: 参加済みのユーザー
+        svc.join_conversation("u-active", [])
+
+        # When / Then: 退出するまでは参加中
+        assert svc.is_joined("u-active") is True
+        svc.leave_conversation("u-active")
+        assert svc.is_joined("u-active") is False
+
+    def test_join_after_leave_succeeds(self, svc):
+        # Given: 一度退出したユーザー
+        svc.join_conversation("u-rejoin", [])
+        svc.leave_conversation("u-rejoin")
+
+        # When: 再度参加
+        r = svc.join_conversation("u-rejoin", [])
+
+        # Then: 参加できる
+        assert r["joined"] is True
+
+    def test_join_rejected_when_sessions_full(self):
+        # Given: 同時セッション数の上限が 1
+        svc = ThreeWayConversationService(registry=InMemorySessionRegistry(max_sessions=1))
+        svc.join_conversation("u-first", [])
+
+        # When: 別ユーザーが参加
+        r = svc.join_conversation("u-second", [])
+
+        # Then: 上限エラー
+        assert r["joined"] is False
+        assert r["error"] == "too_many_sessions"
+
+    def test_idle_session_expires(self, monkeypatch):
+        # Given: 無操作 10 秒で期限切れになる登録簿
+        now = [1000.0]
+        monkeypatch.setattr("services.session_registry.time.monotonic", lambda: now[0])
+        svc = ThreeWayConversationService(registry=InMemorySessionRegistry(idle_ttl=10))
+        svc.join_conversation("u-idle", [])
+
+        # When: 10 秒以上操作しない
+        now[0] += 11
+
+        # Then: 参加状態は消え、再参加できる
+        assert svc.is_joined("u-idle") is False
+        assert svc.join_conversation("u-idle", [])["joined"] is True
+
+
+class TestReplies:
+    def test_保存した応答を取り出せる(self, svc):
+        # Given: 参加済みで応答を保存
+        svc.join_conversation("u-replies", [])
+        replies = [{"speaker": "A", "message": "了解です"}, {"speaker": "B", "message": "私もです"}]
+        assert svc.save_replies("u-replies", replies) is True
+
+        # When / Then: 1回だけ取り出せる
+        assert svc.pop_replies("u-replies") == replies
+        assert svc.pop_replies("u-replies") == []
+
+    def test_参加していなければ保存しない(self, svc):
+        assert svc.save_replies("u-none", [{"speaker": "A", "message": "x"}]) is False
+        assert svc.pop_replies("u-none") == []
+
+    def test_generate_replyは話者名を除いた発言を返す(self, svc):
+        # Given: 話者名付きで返す LLM
+        from unittest.mock import MagicMock
+
+        llm = MagicMock()
+        llm.invoke.return_value = "花子: 私は映画を観ました"
+        history = [{"speaker": "A", "message": "おはよう"}, {"role": "user", "content": "週末どうでした"}]
+
+        # When
+        reply = svc.generate_reply(llm, history, "B")
+
+        # Then: 履歴は表示名で渡し、話者名を除く
+        assert reply == "私は映画を観ました"
+        prompt = llm.invoke.call_args.args[0][1].content
+        assert "太郎: おはよう" in prompt
+        assert "ユーザー: 週末どうでした" in prompt
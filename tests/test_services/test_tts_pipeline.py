@@ -0,0 +1,317 @@
+"""
+TTSパイプライン（services.tts_pipeline）のユニットテスト
+
+実際の合成エンジンの代わりに、呼び出しを記録するローカルの FakeTTSEngine を使う。
+"""
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.tts_pipeline import (
+    FileSpendCounter,
+    RedisSpendCounter,
+    TTSAudioCache,
+    TTSBudgetExceededError,
+    TTSPipeline,
+    TTSSpendGuard,
+    _hash_user_key,
+    _today,
+    audio_cache_key,
+    load_tts_engine,
+    split_sentences,
+)
+
+
+class FakeTTSEngine:
+    """テキストと音声名をそのまま音声データとして返す合成エンジン"""
+
+    name = "fake"
+    audio_format = "wav"
+
+    def __init__(self):
+        self.calls = []
+
+    def synthesize(self, text, voice, style, lang):
+        self.calls.append((text, voice, style, lang))
+        return f"{voice}|{lang}|{text}".encode("utf-8")
+
+
+def create_fake_engine():
+    return FakeTTSEngine()
+
+
+@pytest.fixture
+def engine():
+    return FakeTTSEngine()
+
+
+def make_pipeline(tmp_path, engine, budget=1000):
+    guard = TTSSpendGuard(FileSpendCounter(str(tmp_path / "spend")), budget)
+    return TTSPipeline(engine, TTSAudioCache(str(tmp_path / "cache")), guard)
+
+
+class TestSplitSentences:
+    def test_句点と感嘆符と疑問符で分割(self):
+        text = "おはようございます。今日もよろしくお願いします！準備はできていますか？"
+        assert split_sentences(text) == ["おはようございます。", "今日もよろしくお願いします！", "準備はできていますか？"]
+
+    def test_改行と英文のピリオドで分割(self):
+        assert split_sentences("了解です\nThanks. See you.") == ["了解です", "Thanks.", "See you."]
+
+    def test_空白だけの文は除く(self):
+        assert split_sentences("  。\n\n ") == ["。"]
+        assert split_sentences("") == []
+
+    def test_長い文は読点で分割(self):
+        text = "、".join(["あ" * 30] * 10) + "。"
+        sentences = split_sentences(text, max_chars=100)
+        assert all(len(s) <= 100 for s in sentences)
+        assert "".join(sentences) == text
+
+    def test_区切りのない長い文は文字数で分割(self):
+        sentences = split_sentences("あ" * 250, max_chars=100)
+        assert [len(s) for s in sentences] == [100, 100, 50]
+
+
+class TestAudioCacheKey:
+    def test_すべての要素がキーに反映される(self):
+        base = audio_cache_key("こんにちは", "kore", None, "ja")
+        assert base == audio_cache_key("こんにちは", "kore", None, "ja")
+        assert base != audio_cache_key("こんにちは", "orus", None, "ja")
+        assert base != audio_cache_key("こんにちは", "kore", "calm", "ja")
+        assert base != audio_cache_key("こんにちは", "kore", None, "en")
+
+
+class TestTTSPipeline:
+    def test_文ごとに順に合成する(self, tmp_path, engine):
+        pipeline = make_pipeline(tmp_path, engine)
+
+        segments = list(pipeline.stream("おはよう。元気？", "kore"))
+
+        assert [s["index"] for s in segments] == [0, 1]
+        assert segments[0]["audio"] == "kore|ja|おはよう。".encode()
+        assert [c[0] for c in engine.calls] == ["おはよう。", "元気？"]
+
+    def test_最初の文は残りの合成前に受け取れる(self, tmp_path, engine):
+        pipeline = make_pipeline(tmp_path, engine)
+
+        stream = pipeline.stream("一文目。二文目。三文目。", "kore")
+        first = next(stream)
+
+        # Then: 1文目だけ合成済み
+        assert first["text"] == "一文目。"
+        assert len(engine.calls) == 1
+
+    def test_同じ文は二度合成しない(self, tmp_path, engine):
+        # Given: initial_message を一度合成済み
+        pipeline = make_pipeline(tmp_path, engine)
+        list(pipeline.stream("お疲れさまです。少しお時間いいですか？", "kore"))
+
+        # When: 同じ文を含むテキストを別のパイプライン（別ワーカー相当）で合成
+        other_engine = FakeTTSEngine()
+        other = make_pipeline(tmp_path, other_engine)
+        segments = list(other.stream("お疲れさまです。今日は晴れですね。", "kore"))
+
+        # Then: キャッシュ済みの文は合成しない
+        assert [s["cached"] for s in segments] == [True, False]
+        assert [c[0] for c in other_engine.calls] == ["今日は晴れですね。"]
+
+    def test_音声が違えば別に合成する(self, tmp_path, engine):
+        pipeline = make_pipeline(tmp_path, engine)
+        pipeline.synthesize_sentence("はい。", "kore")
+        pipeline.synthesize_sentence("はい。", "orus")
+
+        assert len(engine.calls) == 2
+
+    def test_上限を超える合成は拒否する(self, tmp_path, engine):
+        # Given: 1日 10 文字まで
+        pipeline = make_pipeline(tmp_path, engine, budget=10)
+
+        # When: 5文字 + 6文字
+        stream = pipeline.stream("あいうえお。かきくけこさ。", "kore")
+        assert next(stream)["text"] == "あいうえお。"
+
+        # Then: 2文目で上限に達し、エンジンは呼ばれない
+        with pytest.raises(TTSBudgetExceededError):
+            next(stream)
+        assert len(engine.calls) == 1
+
+    def test_キャッシュ済みの文は上限に数えない(self, tmp_path, engine):
+        pipeline = make_pipeline(tmp_path, engine, budget=6)
+        pipeline.synthesize_sentence("あいうえお。", "kore")
+
+        # When / Then: 上限に達していてもキャッシュから返せる
+        for _ in range(3):
+            assert pipeline.synthesize_sentence("あいうえお。", "kore")["cached"] is True
+        assert pipeline.stats()["remaining_chars"] == 0
+
+    def test_上限は全ワーカーで共有する(self, tmp_path):
+        # Given: 同じ集計ディレクトリを使う2つのパイプライン
+        first = make_pipeline(tmp_path, FakeTTSEngine(), budget=8)
+        second = make_pipeline(tmp_path, FakeTTSEngine(), budget=8)
+
+        first.synthesize_sentence("あいうえお", "kore")
+
+        # Then: 合計で上限を超える合成は拒否される
+        with pytest.raises(TTSBudgetExceededError):
+            second.synthesize_sentence("かきくけ", "kore")
+
+    def test_キャッシュ済みの音声をキーで取得(self, tmp_path, engine):
+        pipeline = make_pipeline(tmp_path, engine)
+        segment = pipeline.synthesize_sentence("はい。", "kore")
+
+        assert pipeline.cached_audio(segment["key"]) == segment["audio"]
+        assert pipeline.cached_audio("0" * 64) is None
+        assert pipeline.cached_audio("../../etc/passwd") is None
+
+
+class TestSpendCounters:
+    def test_ファイル集計は並行しても上限を超えない(self, tmp_path):
+        counter = FileSpendCounter(str(tmp_path))
+        results = []
+
+        def reserve():
+            results.append(counter.reserve("2026-01-01", 1, 50))
+
+        threads = [threading.Thread(target=reserve) for _ in range(80)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sum(1 for r in results if r is not None) == 50
+        assert counter.used("2026-01-01") == 50
+
+    def test_日付ごとに集計する(self, tmp_path):
+        counter = FileSpendCounter(str(tmp_path))
+        counter.reserve("2026-01-01", 10, 10)
+
+        assert counter.reserve("2026-01-02", 10, 10) == 10
+
+    def test_前日以前のファイルは削除する(self, tmp_path):
+        counter = FileSpendCounter(str(tmp_path))
+        counter.reserve("2026-01-01", 1, 10)
+        counter.reserve("2026-01-01-user-abc", 1, 10)
+
+        # When: 日付が変わって最初の予約
+        counter.reserve("2026-01-02-user-abc", 1, 10)
+
+        # Then: 当日のファイルだけが残る
+        names = sorted(p.name for p in tmp_path.glob("chars-*.json"))
+        assert names == ["chars-2026-01-02-user-abc.json"]
+
+    def test_予約を取り消す(self, tmp_path):
+        counter = FileSpendCounter(str(tmp_path))
+        counter.reserve("2026-01-01", 8, 10)
+
+        counter.release("2026-01-01", 5)
+
+        assert counter.used("2026-01-01") == 3
+
+    def test_Redis集計の取り消しはカウンタを減らす(self):
+        client = MagicMock()
+        counter = RedisSpendCounter(client)
+
+        counter.release("2026-01-01", 5)
+
+        client.decrby.assert_called_once_with("workplace-roleplay:tts:chars:2026-01-01", 5)
+
+    def test_Redis集計はスクリプトで予約する(self):
+        client = MagicMock()
+        script = client.register_script.return_value
+        script.return_value = -1
+        counter = RedisSpendCounter(client)
+
+        assert counter.reserve("2026-01-01", 5, 10) is None
+        assert script.call_args.kwargs["keys"] == ["workplace-roleplay:tts:chars:2026-01-01"]
+        assert script.call_args.kwargs["args"][:2] == [5, 10]
+
+    def test_集計できなければ合成しない(self):
+        counter = MagicMock()
+        counter.reserve.side_effect = ConnectionError("redis down")
+        guard = TTSSpendGuard(counter, 1000)
+
+        with pytest.raises(TTSBudgetExceededError):
+            guard.reserve(10)
+
+
+class TestUserBudget:
+    def _guard(self, tmp_path, budget=100, user_budget=10):
+        return TTSSpendGuard(FileSpendCounter(str(tmp_path / "spend")), budget, user_budget)
+
+    def test_ユーザーごとの上限を超える合成は拒否する(self, tmp_path):
+        guard = self._guard(tmp_path)
+        guard.reserve(8, "u1")
+
+        # When / Then: 同じユーザーは上限を超えられず、他のユーザーは合成できる
+        with pytest.raises(TTSBudgetExceededError, match="ユーザーごと"):
+            guard.reserve(3, "u1")
+        guard.reserve(8, "u2")
+
+    def test_ユーザーの上限で拒否した分は全体の上限に数えない(self, tmp_path):
+        guard = self._guard(tmp_path, budget=20, user_budget=10)
+        guard.reserve(10, "u1")
+        for _ in range(5):
+            with pytest.raises(TTSBudgetExceededError):
+                guard.reserve(10, "u1")
+
+        # Then: 全体の残りは他のユーザーが使える
+        guard.reserve(10, "u2")
+
+    def test_全体の上限で拒否した分はユーザーの上限に数えない(self, tmp_path):
+        guard = self._guard(tmp_path, budget=10, user_budget=10)
+        guard.reserve(10, "u1")
+
+        # When: 全体の上限で拒否される
+        with pytest.raises(TTSBudgetExceededError, match="本日のTTS利用上限に達しました"):
+            guard.reserve(5, "u2")
+
+        # Then: u2 の予約は取り消されている
+        assert guard.counter.used(f"{_today()}-user-{_hash_user_key('u2')}") == 0
+
+    def test_全体の集計に失敗したらユーザーの予約を取り消す(self):
+        counter = MagicMock()
+        counter.reserve.side_effect = [5, ConnectionError("redis down")]
+
+        with pytest.raises(TTSBudgetExceededError):
+            TTSSpendGuard(counter, 100, 10).reserve(5, "u1")
+
+        user_key = counter.reserve.call_args_list[0].args[0]
+        counter.release.assert_called_once_with(user_key, 5)
+
+    def test_ユーザーを指定しなければ全体の上限だけ数える(self, tmp_path):
+        guard = self._guard(tmp_path)
+
+        guard.reserve(50)
+        guard.reserve(50)
+        with pytest.raises(TTSBudgetExceededError):
+            guard.reserve(1)
+
+    def test_集計のキーにユーザーIDをそのまま使わない(self):
+        counter = MagicMock()
+        counter.reserve.return_value = 1
+        TTSSpendGuard(counter, 100, 10).reserve(5, "user@example.com")
+
+        keys = [c.args[0] for c in counter.reserve.call_args_list]
+        assert len(keys) == 2 and all("user@example.com" not in key for key in keys)
+
+    def test_パイプラインはユーザーごとに数える(self, tmp_path, engine):
+        guard = self._guard(tmp_path, user_budget=6)
+        pipeline = TTSPipeline(engine, TTSAudioCache(str(tmp_path / "cache")), guard)
+
+        pipeline.synthesize_sentence("あいうえお", "kore", user_key="u1")
+        with pytest.raises(TTSBudgetExceededError):
+            pipeline.synthesize_sentence("かきくけこ", "kore", user_key="u1")
+        # キャッシュ済みの文は数えない
+        assert pipeline.synthesize_sentence("あいうえお", "kore", user_key="u1")["cached"] is True
+
+
+class TestLoadEngine:
+    def test_モジュールとファクトリを指定して作成(self):
+        engine = load_tts_engine("tests.test_services.test_tts_pipeline:create_fake_engine")
+        assert engine.name == "fake"
+
+    def test_形式が不正ならエラー(self):
+        with pytest.raises(ValueError):
+            load_tts_engine("tests.test_services.test_tts_pipeline")
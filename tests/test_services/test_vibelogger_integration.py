@@ -124,3 +124,24 @@ class TestGamificationVibeloggerIntegration:
         )
         entries = _read_vibe_entries(vibe_log_path)
         assert _has_operation_level(entries, "gamification_hooks.on_scenario_feedback", "INFO")
+
+    def test_async_logging_writes_via_listener(self, tmp_path, vibe_log_path):
+        # Given: 非同期ログが有効（vibelogger の書き込みはリスナースレッド）
+        # When: add_xp の後にリスナーを停止（残りを書き出す）
+        # Then: INFO（GamificationService.add_xp）がログに含まれる
+        import logging
+
+        from utils.logging_config import setup_logging, shutdown_logging
+
+        root_logger = logging.getLogger()
+        saved_handlers = list(root_logger.handlers)
+        setup_logging(log_dir=str(tmp_path / "logs"), log_level="WARNING")
+        try:
+            uds = UserDataService(data_dir=str(tmp_path))
+            gains = {a: 1 for a in SIX_AXES}
+            GamificationService(uds).add_xp("xp-async", gains, "scenario_completion")
+        finally:
+            shutdown_logging()
+            root_logger.handlers[:] = saved_handlers
+        entries = _read_vibe_entries(vibe_log_path)
+        assert _has_operation_level(entries, "GamificationService.add_xp", "INFO")
@@ -0,0 +1,155 @@
+"""
+観戦モードの次ターン先読み（WatchPrefetcher）のテスト
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services.watch_prefetch import WatchPrefetcher
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def prefetcher():
+    p = WatchPrefetcher(max_concurrent=2, wait_timeout_seconds=5)
+    yield p
+    p.shutdown()
+
+
+class TestWatchPrefetcher:
+    """WatchPrefetcher のテスト"""
+
+    def test_先読み結果を引き渡す(self, prefetcher):
+        # Given: 先読みを開始
+        assert prefetcher.schedule("watch-1", (1, "A"), lambda: "次の発言") is True
+
+        # When: 同じ前提で取り出す
+        result = prefetcher.take("watch-1", (1, "A"))
+
+        # Then: 先読み結果が返り、2回目は空
+        assert result == "次の発言"
+        assert prefetcher.take("watch-1", (1, "A")) is None
+        assert prefetcher.stats()["hits"] == 1
+
+    def test_前提が一致しない結果は使わない(self, prefetcher):
+        prefetcher.schedule("watch-1", (1, "A"), lambda: "古い発言")
+
+        assert prefetcher.take("watch-1", (2, "B")) is None
+        assert prefetcher.stats()["misses"] == 1
+
+    def test_実行中の先読みは完了を待つ(self, prefetcher):
+        # Given: 生成中の先読み
+        release = threading.Event()
+
+        def slow():
+            release.wait(5)
+            return "遅れて届いた発言"
+
+        prefetcher.schedule("watch-1", (1, "A"), slow)
+        threading.Timer(0.05, release.set).start()
+
+        # When / Then: 取り出し時に完了を待って結果を返す
+        assert prefetcher.take("watch-1", (1, "A")) == "遅れて届いた発言"
+
+    def test_生成失敗時はNone(self, prefetcher):
+        def fail():
+            raise RuntimeError("LLM error")
+
+        prefetcher.schedule("watch-1", (1, "A"), fail)
+
+        assert prefetcher.take("watch-1", (1, "A")) is None
+
+    def test_キャンセルすると破棄される(self, prefetcher):
+        prefetcher.schedule("watch-1", (1, "A"), lambda: "発言")
+
+        prefetcher.cancel("watch-1")
+
+        assert prefetcher.take("watch-1", (1, "A")) is None
+        assert prefetcher.stats()["cancelled"] == 1
+
+    def test_同時先読み数の上限を超えると先読みしない(self, prefetcher):
+        # Given: 上限2件がすべて実行中
+        release = threading.Event()
+        prefetcher.schedule("watch-1", (1, "A"), lambda: release.wait(5))
+        prefetcher.schedule("watch-2", (1, "A"), lambda: release.wait(5))
+
+        # When: 3件目を開始しようとする
+        scheduled = prefetcher.schedule("watch-3", (1, "A"), lambda: "発言")
+        release.set()
+
+        # Then: スキップされる
+        assert scheduled is False
+        assert prefetcher.stats()["skipped"] == 1
+
+    def test_破棄した先読みも実行中は上限に数える(self, prefetcher):
+        # Given: 上限2件が実行中で、前提の不一致と再開始でどちらも破棄される
+        release = threading.Event()
+        prefetcher.schedule("watch-1", (1, "A"), lambda: release.wait(5))
+        prefetcher.schedule("watch-2", (1, "A"), lambda: release.wait(5))
+        assert prefetcher.take("watch-1", (2, "B")) is None
+        prefetcher.cancel("watch-2")
+
+        # When: 実行中のまま3件目を開始しようとする
+        scheduled = prefetcher.schedule("watch-3", (1, "A"), lambda: "発言")
+        active = prefetcher.stats()["active"]
+        release.set()
+
+        # Then: スキップされ、完了後は数えない
+        assert scheduled is False
+        assert active == 2
+        assert _wait_until(lambda: prefetcher.stats()["active"] == 0)
+        assert prefetcher.schedule("watch-4", (1, "A"), lambda: "発言") is True
+
+    def test_上限0では無効(self):
+        p = WatchPrefetcher(max_concurrent=0)
+        assert p.enabled is False
+        assert p.schedule("watch-1", (1, "A"), lambda: "発言") is False
+
+
+class TestWatchRoutesPrefetch:
+    """観戦ルートと先読みの連携テスト"""
+
+    @pytest.fixture
+    def enabled_prefetcher(self):
+        p = WatchPrefetcher(max_concurrent=2, wait_timeout_seconds=5)
+        with patch("routes.watch_routes.get_watch_prefetcher", return_value=p):
+            yield p
+        p.shutdown()
+
+    def test_開始直後に次ターンを先読みし次のリクエストで使う(self, csrf_client, enabled_prefetcher):
+        # Given: 観戦開始（初回発言を返した直後に2ターン目の先読みが始まる）
+        llm = MagicMock()
+        with patch("app.initialize_llm", return_value=llm), patch(
+            "services.watch_service.WatchService.generate_initial_message", return_value="おはようございます"
+        ), patch(
+            "services.watch_service.WatchService.generate_next_message", return_value="おはようございます、太郎さん"
+        ):
+            csrf_client.post("/api/watch/start", json={"model_a": "gemini-1.5-flash", "model_b": "gemini-1.5-flash"})
+
+            # When: 次の発言を要求
+            response = csrf_client.post("/api/watch/next", json={})
+
+        # Then: 先読み結果が返る
+        assert response.status_code == 200
+        assert response.get_json()["message"] == "花子: おはようございます、太郎さん"
+        assert enabled_prefetcher.stats()["hits"] == 1
+
+    def test_観戦を再開始すると先読みを破棄する(self, csrf_client, enabled_prefetcher):
+        with patch("app.initialize_llm", return_value=MagicMock()), patch(
+            "services.watch_service.WatchService.generate_initial_message", return_value="こんにちは"
+        ), patch("services.watch_service.WatchService.generate_next_message", return_value="はい"):
+            csrf_client.post("/api/watch/start", json={"topic": "weekend"})
+            csrf_client.post("/api/watch/start", json={"topic": "work"})
+
+        assert enabled_prefetcher.stats()["cancelled"] >= 1
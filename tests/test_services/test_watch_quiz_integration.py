@@ -117,3 +117,47 @@ class TestWatchQuizIntegration:
         assert data["quiz"]["question"] == "INTEGRATION_LLM_QUIZ_QUESTION"
         assert data["quiz"]["choices"] == ["甲", "乙", "丙"]
         mock_llm.generate_quiz_content.assert_called_once()
+
+
+class TestWatchQuizPregeneration:
+    """クイズの1ターン前に事前生成し、クイズのターンで使う"""
+
+    def test_quiz_turn_uses_pregenerated_quiz(self, csrf_client, monkeypatch):
+        # Given: 事前生成を有効化し、LLM を持つ QuizService を使う
+        from services import quiz_pregeneration
+        from services.quiz_pregeneration import QuizPregenerator
+
+        pregenerator = QuizPregenerator(lead_turns=1, max_concurrent=1, wait_timeout_seconds=5)
+        monkeypatch.setattr(quiz_pregeneration, "_quiz_pregenerator", pregenerator)
+        mock_llm = MagicMock()
+        mock_llm.generate_quiz_content.return_value = {
+            "question": "PREGENERATED_QUESTION",
+            "choices": ["甲", "乙", "丙"],
+            "correct_answer": 2,
+        }
+        quiz_svc = QuizService(llm_service=mock_llm)
+        monkeypatch.setattr("routes.watch_routes.get_watch_quiz_service", lambda: quiz_svc)
+
+        with csrf_client.session_transaction() as sess:
+            sess["watch_settings"] = {**_watch_session_base(), "current_speaker": "A", "watch_id": "w-1"}
+            sess["watch_history"] = [
+                {"speaker": "A", "message": "a1", "timestamp": "2024-01-01T10:00:00"},
+                {"speaker": "B", "message": "b1", "timestamp": "2024-01-01T10:00:01"},
+                {"speaker": "A", "message": "a2", "timestamp": "2024-01-01T10:00:02"},
+            ]
+
+        with patch("app.initialize_llm") as mock_init:
+            mock_init.return_value = MagicMock()
+            with patch("services.watch_service.WatchService.generate_next_message") as mock_gen:
+                mock_gen.return_value = "発言"
+                # When: 4件目（クイズの1ターン前）→ 5件目（クイズのターン）
+                first = csrf_client.post("/api/watch/next", json={})
+                second = csrf_client.post("/api/watch/next", json={})
+
+        # Then: 4件目では出題せず、5件目で事前生成したクイズを返す（LLM呼び出しは1回）
+        assert "quiz" not in first.get_json()
+        assert second.get_json()["quiz"]["question"] == "PREGENERATED_QUESTION"
+        mock_llm.generate_quiz_content.assert_called_once()
+        assert len(mock_llm.generate_quiz_content.call_args.args[0]) == 4
+        assert pregenerator.stats()["hits"] == 1
+        pregenerator.shutdown()
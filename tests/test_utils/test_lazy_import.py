@@ -0,0 +1,47 @@
+"""
+遅延インポート（utils.lazy_import）のテスト
+"""
+
+import sys
+from unittest.mock import patch
+
+from utils.lazy_import import LazyImport, is_available, lazy_import
+
+
+class TestLazyImport:
+    """LazyImport のテスト"""
+
+    def test_初回アクセスまでimportしない(self):
+        # Given: 未読み込みのモジュールの遅延インポート
+        sys.modules.pop("colorsys", None)
+        proxy = lazy_import("colorsys")
+
+        # Then: 作成時点では読み込まれない
+        assert "colorsys" not in sys.modules
+        assert proxy.is_loaded is False
+
+        # When/Then: 属性アクセスで読み込まれる
+        assert proxy.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+        assert "colorsys" in sys.modules
+
+    def test_属性を指定した遅延インポートは呼び出せる(self):
+        ordered = lazy_import("collections", "OrderedDict")
+
+        assert list(ordered(a=1)) == ["a"]
+
+    def test_プロキシ経由の属性をpatchできる(self):
+        # Given: モジュールの遅延インポート
+        proxy = lazy_import("json")
+
+        # When: プロキシ経由で属性を patch する
+        with patch.object(proxy, "dumps", return_value="patched"):
+            patched = proxy.dumps({})
+
+        # Then: patch 中は置き換わり、終了後は元に戻る
+        assert patched == "patched"
+        assert proxy.dumps({}) == "{}"
+
+    def test_オプショナル依存の判定(self):
+        assert is_available(lazy_import("json")) is True
+        assert is_available(LazyImport("no_such_module_for_test")) is False
+        assert is_available(None) is False
@@ -2,6 +2,8 @@
 Extended performance utility tests for improved coverage.
 """
 
+import os
+
 import pytest
 import time
 from datetime import datetime, timedelta
@@ -68,6 +70,317 @@ class TestPerformanceMetrics:
         assert result == {}
 
 
+    def test_パーセンタイル(self):
+        """p50/p90/p99 がヒストグラムから算出される"""
+        from utils.performance import PerformanceMetrics
+
+        metrics = PerformanceMetrics()
+        metrics.reset()
+
+        for i in range(1, 101):
+            metrics.record_request("/api/test", float(i), 200)
+
+        result = metrics.get_metrics("/api/test")
+
+        # 対数バケットの相対誤差（約19%）の範囲内
+        assert result["p50_duration_ms"] == pytest.approx(50, rel=0.2)
+        assert result["p90_duration_ms"] == pytest.approx(90, rel=0.2)
+        assert result["p99_duration_ms"] == pytest.approx(99, rel=0.2)
+        assert result["p99_duration_ms"] <= result["max_duration_ms"] == 100.0
+
+    def test_並行記録で件数が失われない(self):
+        """複数スレッドから同時に記録しても件数が一致する"""
+        import threading
+
+        from utils.performance import PerformanceMetrics
+
+        metrics = PerformanceMetrics()
+        metrics.reset()
+
+        def worker():
+            for _ in range(500):
+                metrics.record_request("/api/concurrent", 5.0, 200)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert metrics.get_metrics("/api/concurrent")["count"] == 4000
+
+
+class TestLatencyHistogram:
+    """LatencyHistogramのテスト"""
+
+    def test_マージとシリアライズ(self):
+        """辞書形式を経由してマージしても件数・合計が保たれる"""
+        from utils.performance import LatencyHistogram
+
+        a = LatencyHistogram()
+        b = LatencyHistogram()
+        for v in (1.0, 10.0, 100.0):
+            a.record(v)
+        b.record(1000.0, success=False)
+
+        merged = LatencyHistogram.from_dict(a.to_dict())
+        merged.merge(LatencyHistogram.from_dict(b.to_dict()))
+
+        assert merged.count == 4
+        assert merged.total_ms == 1111.0
+        assert merged.min_ms == 1.0
+        assert merged.max_ms == 1000.0
+        assert merged.error_count == 1
+
+    def test_累積件数(self):
+        """Prometheus形式の累積バケット件数"""
+        from utils.performance import LatencyHistogram
+
+        hist = LatencyHistogram()
+        for v in (0.05, 1.5, 3.0, 500.0):
+            hist.record(v)
+
+        assert hist.cumulative_counts([1.6, 3.2, 204.8, 409.6, 819.2]) == [2, 3, 3, 3, 4]
+
+
+class TestMultiprocessCollector:
+    """MultiprocessCollectorのテスト"""
+
+    def _write(self, collector, pid, count):
+        import json
+
+        from utils.performance import LatencyHistogram
+
+        hist = LatencyHistogram()
+        for _ in range(count):
+            hist.record(10.0)
+        payload = {
+            "pid": pid,
+            "requests": {"/api/chat": hist.to_dict()},
+            "business": {"chat_sessions": count},
+            "caches": {"prompt": {"size": 1, "hits": count, "misses": 0}},
+        }
+        with open(collector.path_for(pid), "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+    def test_他ワーカーのスナップショットを集約(self, tmp_path):
+        """他プロセスのファイルとこのプロセスの記録を合計する"""
+        import os
+
+        from utils.performance import MultiprocessCollector, PerformanceMetrics
+
+        metrics = PerformanceMetrics()
+        metrics.reset()
+        collector = MultiprocessCollector(str(tmp_path))
+        self._write(collector, os.getppid(), 3)
+
+        with patch.object(metrics, "collector", collector):
+            metrics.record_request("/api/chat", 20.0, 200)
+            result = metrics.get_metrics()
+
+        assert result["/api/chat"]["count"] == 4
+        assert result["_summary"]["processes"] == 2
+
+    def test_終了したワーカーはアーカイブに統合(self, tmp_path):
+        """終了済みプロセスのファイルはアーカイブにまとめられ、件数は保たれる"""
+        import os
+
+        from utils.performance import MultiprocessCollector, merge_snapshots
+
+        collector = MultiprocessCollector(str(tmp_path))
+        dead_pid = 2**22 + 12345  # pid_max を超える（存在しない）PID
+        self._write(collector, dead_pid, 2)
+
+        first = merge_snapshots(collector.read_all())
+        self._write(collector, dead_pid + 1, 1)
+        second = merge_snapshots(collector.read_all())
+
+        assert not os.path.exists(collector.path_for(dead_pid))
+        assert os.path.exists(os.path.join(str(tmp_path), collector.ARCHIVE_FILE))
+        assert first["requests"]["/api/chat"]["count"] == 2
+        assert second["requests"]["/api/chat"]["count"] == 3
+        assert second["business"]["chat_sessions"] == 3
+
+    def test_起動時のクリア(self, tmp_path):
+        """clear() で全スナップショットを削除する"""
+        import os
+
+        from utils.performance import MultiprocessCollector
+
+        collector = MultiprocessCollector(str(tmp_path))
+        self._write(collector, os.getpid(), 1)
+
+        collector.clear()
+
+        assert collector.read_all() == []
+
+    @pytest.mark.parametrize("configured", [True, False])
+    def test_gunicornの起動時にディレクトリをクリア(self, tmp_path, monkeypatch, configured):
+        """on_starting フックで METRICS_MULTIPROC_DIR が設定されていれば前回のファイルを削除する"""
+        import importlib.util
+
+        from config import Config
+        from config.snapshot import reload_config_snapshot, reset_config_snapshot
+        from utils.performance import MultiprocessCollector
+
+        # Given: 前回の起動で残ったスナップショットとアーカイブ
+        collector = MultiprocessCollector(str(tmp_path))
+        self._write(collector, 2**22 + 54321, 1)
+        archive = os.path.join(str(tmp_path), collector.ARCHIVE_FILE)
+        with open(archive, "w", encoding="utf-8") as f:
+            f.write("{}")
+        monkeypatch.setenv("GUNICORN_WORKER_CLASS", "sync")
+        conf_path = os.path.join(os.path.dirname(__file__), "..", "..", "gunicorn.conf.py")
+        spec = importlib.util.spec_from_file_location("gunicorn_conf_under_test", conf_path)
+        gunicorn_conf = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(gunicorn_conf)
+        directory = str(tmp_path) if configured else None
+
+        # When: マスターの起動フックを呼ぶ
+        reload_config_snapshot(Config(_env_file=None, METRICS_MULTIPROC_DIR=directory))
+        try:
+            gunicorn_conf.on_starting(MagicMock())
+        finally:
+            reset_config_snapshot()
+
+        # Then: 設定時のみスナップショットとアーカイブが削除される
+        remaining = sorted(os.listdir(str(tmp_path)))
+        if configured:
+            assert remaining == []
+        else:
+            assert collector.ARCHIVE_FILE in remaining and len(remaining) == 2
+
+    def test_ワーカーごとのメモリ使用量と起動時間を集約(self, tmp_path):
+        """スナップショットの process 情報が workers にPID順で並ぶ"""
+        import os
+
+        from utils.performance import MultiprocessCollector, PerformanceMetrics
+
+        metrics = PerformanceMetrics()
+        metrics.reset()
+        collector = MultiprocessCollector(str(tmp_path))
+        self._write(collector, os.getppid(), 1)
+
+        with patch.object(metrics, "collector", collector), patch.object(metrics, "ready_ms", None):
+            metrics.mark_ready(120.0)
+            workers = metrics.get_metrics()["_summary"]["workers"]
+
+        # 他ワーカーのファイルは process 情報を持たないため、このプロセスのみ
+        assert [w["pid"] for w in workers] == [os.getpid()]
+        assert workers[0]["ready_ms"] == 120.0
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="os.fork が必要")
+class TestAfterFork:
+    """フォーク後の子プロセスで親プロセスの記録を引き継がないことのテスト"""
+
+    def test_ビジネスメトリクスとキャッシュ統計を引き継がない(self):
+        import json
+
+        from utils.performance import get_business_metrics, get_prompt_cache
+
+        # Given: フォーク前（ウォームアップ等）の記録
+        business = get_business_metrics()
+        business.increment("chat_sessions", 3)
+        cache = get_prompt_cache()
+        cache.set("after-fork-test", "value")
+        cache.get("after-fork-test")
+        cache.get("after-fork-missing")
+
+        # When: フォークした子プロセスで記録を確認する
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - 子プロセス
+            try:
+                stats = get_prompt_cache().stats()
+                result = {
+                    "chat_sessions": get_business_metrics().get_counter("chat_sessions"),
+                    "hits": stats["hits"],
+                    "misses": stats["misses"],
+                    "cached": get_prompt_cache().get("after-fork-test"),
+                }
+                os.write(write_fd, json.dumps(result).encode("utf-8"))
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd, "rb") as f:
+            result = json.loads(f.read().decode("utf-8"))
+        os.waitpid(pid, 0)
+
+        # Then: 計数は0から、キャッシュの内容は引き継ぐ。親プロセスの記録は変わらない
+        assert result == {"chat_sessions": 0, "hits": 0, "misses": 0, "cached": "value"}
+        assert business.get_counter("chat_sessions") >= 3
+        assert cache.stats()["hits"] >= 1
+
+
+class TestProcessMemory:
+    """process_memory のテスト"""
+
+    def test_RSSを取得(self):
+        from utils.performance import process_memory
+
+        memory = process_memory()
+
+        assert memory["rss_bytes"] > 0
+
+    def test_共有ページと固有ページはRSSの内訳(self):
+        import os
+
+        from utils.performance import process_memory
+
+        if not os.path.exists("/proc/self/smaps_rollup"):
+            pytest.skip("smaps_rollup が利用できない環境")
+
+        memory = process_memory()
+
+        assert memory["shared_bytes"] + memory["private_bytes"] == memory["rss_bytes"]
+
+
+class TestPrometheusExposition:
+    """Prometheusテキスト形式の出力のテスト"""
+
+    def test_ヒストグラムとビジネスメトリクスとキャッシュ統計を出力(self):
+        """レイテンシヒストグラム・ビジネスメトリクス・キャッシュ統計が含まれる"""
+        from utils.performance import PerformanceMetrics, get_business_metrics
+        from utils.prometheus import render_metrics
+
+        metrics = PerformanceMetrics()
+        metrics.reset()
+        metrics.record_request("/api/chat", 2.0, 200)
+        metrics.record_request("/api/chat", 2000.0, 500)
+        get_business_metrics().increment("chat_sessions")
+
+        text = render_metrics()
+
+        assert "# TYPE workplace_roleplay_http_request_duration_seconds histogram" in text
+        assert 'workplace_roleplay_http_request_duration_seconds_bucket{endpoint="/api/chat",le="0.0032"} 1' in text
+        assert 'workplace_roleplay_http_request_duration_seconds_bucket{endpoint="/api/chat",le="+Inf"} 2' in text
+        assert 'workplace_roleplay_http_request_duration_seconds_count{endpoint="/api/chat"} 2' in text
+        assert 'workplace_roleplay_http_requests_total{endpoint="/api/chat",outcome="error"} 1' in text
+        assert 'workplace_roleplay_business_events_total{event="chat_sessions"}' in text
+        assert 'workplace_roleplay_cache_hits_total{cache="prompt"}' in text
+        assert text.endswith("\n")
+
+    def test_ワーカーのメモリ使用量と起動時間を出力(self):
+        """workers の各プロセスがPIDラベル付きのゲージになる"""
+        from utils.prometheus import render_metrics
+
+        snapshot = {
+            "requests": {},
+            "business": {},
+            "caches": {},
+            "processes": 1,
+            "workers": [{"pid": 101, "ready_ms": 250.0, "rss_bytes": 2048, "shared_bytes": 1536, "private_bytes": 512}],
+        }
+        with patch("utils.prometheus.get_metrics") as mock_metrics:
+            mock_metrics.return_value.aggregate_snapshot.return_value = snapshot
+            text = render_metrics()
+
+        assert 'workplace_roleplay_process_resident_memory_bytes{pid="101"} 2048' in text
+        assert 'workplace_roleplay_process_shared_memory_bytes{pid="101"} 1536' in text
+        assert 'workplace_roleplay_worker_ready_seconds{pid="101"} 0.25' in text
+
+
 class TestGetMetrics:
     """get_metrics関数のテスト"""
 
@@ -0,0 +1,148 @@
+"""
+オンデマンド・サンプリングプロファイラ（utils.profiler）のテスト
+"""
+
+import time
+from unittest.mock import patch
+
+import pytest
+
+from utils.profiler import (
+    MAX_WINDOW_SECONDS,
+    Profile,
+    ProfileStore,
+    RequestProfiler,
+    parse_collapsed,
+    to_collapsed,
+    to_speedscope,
+)
+
+
+def _busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _profile(profile_id="a" * 32, started_at=1.0, samples=None):
+    return Profile(
+        id=profile_id,
+        method="POST",
+        path="/api/chat",
+        endpoint="/api/chat",
+        trigger="header",
+        started_at=started_at,
+        duration_ms=12.0,
+        interval_ms=5.0,
+        sample_count=sum((samples or {}).values()),
+        status_code=200,
+        samples=samples or {},
+    )
+
+
+class TestRequestProfiler:
+    """RequestProfiler のテスト"""
+
+    def test_トークン未設定なら無効(self):
+        profiler = RequestProfiler(sample_rate=1.0)
+
+        assert profiler.enabled is False
+        assert profiler.select_trigger("anything") is None
+
+    def test_プロファイル対象の選択(self):
+        profiler = RequestProfiler(admin_token="secret", sample_rate=0.0)
+
+        assert profiler.select_trigger("secret") == "header"
+        assert profiler.select_trigger("wrong") is None
+        assert profiler.select_trigger(None) is None
+
+        profiler.enable_window(60)
+        assert profiler.select_trigger(None) == "window"
+
+        profiler.enable_window(0)
+        profiler.sample_rate = 1.0
+        assert profiler.select_trigger(None) == "sampled"
+
+    def test_ウィンドウは上限秒数に制限される(self):
+        profiler = RequestProfiler(admin_token="secret")
+
+        remaining = profiler.enable_window(MAX_WINDOW_SECONDS * 10)
+
+        assert remaining <= MAX_WINDOW_SECONDS
+
+    def test_実行中のスタックを採取して保存(self, tmp_path):
+        # Given: 採取間隔1msのプロファイラ
+        profiler = RequestProfiler(admin_token="secret", interval_ms=1.0, output_dir=str(tmp_path))
+
+        # When: 採取中に関数を実行する
+        session = profiler.start()
+        _busy_wait(0.2)
+        profile = profiler.stop(session, method="GET", path="/slow", endpoint="/slow", trigger="header")
+
+        # Then: 実行中の関数を含むスタックが保存される
+        assert profile.sample_count > 0
+        assert any("_busy_wait (tests/test_utils/test_profiler.py" in stack for stack in profile.samples)
+        assert profiler.store.load(profile.id).samples == profile.samples
+
+    def test_geventのgreenletを採取(self, tmp_path):
+        gevent = pytest.importorskip("gevent")
+        profiler = RequestProfiler(admin_token="secret", interval_ms=1.0, output_dir=str(tmp_path))
+
+        def handler():
+            session = profiler.start()
+            gevent.sleep(0.1)
+            return profiler.stop(session, method="GET", path="/io", endpoint="/io", trigger="header")
+
+        # When: greenlet として実行し、採取対象が I/O 待ちで中断している
+        with patch("utils.profiler._original", side_effect=_gevent_original):
+            profile = gevent.spawn(handler).get(timeout=5)
+
+        # Then: 中断中の greenlet のスタックが記録される
+        assert any("handler (" in stack for stack in profile.samples)
+
+
+def _gevent_original(module, name, default):
+    # テストプロセスはモンキーパッチしていないため、対象 greenlet の取得のみ gevent 環境を模擬する
+    if (module, name) == ("_thread", "get_ident"):
+        import _thread
+
+        return _thread.get_ident
+    return default
+
+
+class TestProfileFormats:
+    """出力形式のテスト"""
+
+    def test_collapsed形式の往復変換(self):
+        samples = {"main (app.py:1);handler (routes/x.py:10)": 3, "main (app.py:1)": 1}
+
+        assert parse_collapsed(to_collapsed(samples)) == samples
+
+    def test_speedscope形式に変換(self):
+        profile = _profile(samples={"main (app.py:1);handler (routes/x.py:10)": 3})
+
+        data = to_speedscope(profile)
+
+        frames = data["shared"]["frames"]
+        (sampled,) = data["profiles"]
+        assert frames[1] == {"name": "handler", "file": "routes/x.py", "line": 10}
+        assert sampled["samples"] == [[0, 1]]
+        assert sampled["weights"] == [15.0]
+
+
+class TestProfileStore:
+    """ProfileStore のテスト"""
+
+    def test_上限を超えると古いものから削除(self, tmp_path):
+        store = ProfileStore(str(tmp_path), max_profiles=2)
+
+        for i in range(3):
+            store.save(_profile(profile_id=f"{i:032x}", started_at=float(i)))
+
+        assert [p["id"] for p in store.list()] == [f"{2:032x}", f"{1:032x}"]
+        assert store.load(f"{0:032x}") is None
+
+    def test_不正なIDはパスとして扱わない(self, tmp_path):
+        store = ProfileStore(str(tmp_path))
+
+        assert store.load("../../etc/passwd") is None
@@ -2,6 +2,8 @@
 Common helper functions for the workplace-roleplay application.
 """
 
+import json
+import re
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Union
 
@@ -44,6 +46,96 @@ def extract_content(resp: Union[AIMessage, str, List[Any], Dict[str, Any], Any])
         return "応答を文字列に変換できませんでした。"
 
 
+def extract_llm_text(response: Any) -> str:
+    """LLMの応答からテキストを取り出す（Gemini のパート配列は連結する）"""
+    if response is None:
+        return ""
+    if hasattr(response, "content"):
+        c = getattr(response, "content", "")
+        if isinstance(c, list):
+            # Gemini はパート配列を返す場合がある
+            return "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in c)
+        return c if isinstance(c, str) else str(c)
+    return str(response)
+
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)(?:```|$)")
+
+
+def _close_truncated_json(fragment: str) -> str:
+    """途中で切れたJSON断片の未閉じの文字列・括弧を閉じる。"""
+    stack: List[str] = []
+    in_str = False
+    escaped = False
+    for ch in fragment:
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch == "{":
+            stack.append("}")
+        elif ch == "[":
+            stack.append("]")
+        elif ch in "}]" and stack:
+            stack.pop()
+
+    text = fragment
+    if in_str:
+        if escaped:
+            text = text[:-1]
+        text += '"'
+    text = re.sub(r"[,:\s]+$", "", text)
+    return text + "".join(reversed(stack))
+
+
+def load_json_lenient(text: str, opener: str = "{[") -> Any:
+    """
+    LLM出力からJSON値を取り出す（ストリーミング途中・打ち切り出力にも耐える）。
+
+    - コードフェンス（閉じていないものを含む）を除去
+    - 前後の説明文を無視して最初の ``{`` / ``[`` から読み取る
+    - 末尾が切れている場合は括弧を補い、それでも失敗すれば末尾の要素を削って再試行
+
+    Returns:
+        パースできた値。取り出せない場合は None
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+    fence = _FENCE_RE.search(text)
+    if fence:
+        text = fence.group(1).strip()
+
+    starts = [i for i in (text.find(c) for c in opener) if i >= 0]
+    if not starts:
+        return None
+    text = text[min(starts):]
+
+    decoder = json.JSONDecoder()
+    try:
+        return decoder.raw_decode(text)[0]
+    except json.JSONDecodeError:
+        pass
+
+    # 打ち切られた出力: 末尾の不完全な要素を削りながら補完を試す
+    candidate = text
+    for _ in range(32):
+        try:
+            return json.loads(_close_truncated_json(candidate))
+        except json.JSONDecodeError:
+            cut = candidate.rfind(",")
+            if cut <= 0:
+                return None
+            candidate = candidate[:cut]
+    return None
+
+
 def format_conversation_history(history: List[Dict[str, Any]]) -> str:
     """
     会話履歴を読みやすい形式にフォーマット（ユーザーの発言のみ）
@@ -0,0 +1,97 @@
+"""
+重いSDKの遅延インポート
+
+google.generativeai、langchain_google_genai、langchain_openai などは import だけで
+数百ミリ秒かかるため、ワーカー起動時ではなく初回利用時に読み込む。
+プロキシはモジュール属性として置き換え可能（unittest.mock.patch の対象にできる）。
+"""
+
+from __future__ import annotations
+
+import importlib
+import threading
+from typing import Any, Optional
+
+_UNLOADED = object()
+_import_lock = threading.Lock()
+
+
+class LazyImport:
+    """
+    初回アクセス時にモジュール（または属性）を import するプロキシ
+
+    Args:
+        module: モジュール名（例: "google.generativeai"）
+        attr: モジュールから取り出す属性名（クラス等）。省略時はモジュール自体
+    """
+
+    def __init__(self, module: str, attr: Optional[str] = None):
+        object.__setattr__(self, "_lazy_module", module)
+        object.__setattr__(self, "_lazy_attr", attr)
+        object.__setattr__(self, "_lazy_target", _UNLOADED)
+
+    def _load(self) -> Any:
+        target = object.__getattribute__(self, "_lazy_target")
+        if target is _UNLOADED:
+            with _import_lock:
+                target = object.__getattribute__(self, "_lazy_target")
+                if target is _UNLOADED:
+                    target = importlib.import_module(object.__getattribute__(self, "_lazy_module"))
+                    attr = object.__getattribute__(self, "_lazy_attr")
+                    if attr:
+                        target = getattr(target, attr)
+                    object.__setattr__(self, "_lazy_target", target)
+        return target
+
+    @property
+    def is_loaded(self) -> bool:
+        return object.__getattribute__(self, "_lazy_target") is not _UNLOADED
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._load(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._load(), name)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        module = object.__getattribute__(self, "_lazy_module")
+        attr = object.__getattribute__(self, "_lazy_attr")
+        name = f"{module}.{attr}" if attr else module
+        return f"<LazyImport {name} ({'loaded' if self.is_loaded else 'not loaded'})>"
+
+
+def lazy_import(module: str, attr: Optional[str] = None) -> Any:
+    """モジュール（または属性）の遅延インポート用プロキシを作成"""
+    return LazyImport(module, attr)
+
+
+def is_available(obj: Any) -> bool:
+    """
+    オプショナル依存が利用可能か判定
+
+    None（テスト等で無効化された場合）や import に失敗するプロキシは False。
+    """
+    if obj is None:
+        return False
+    if isinstance(obj, LazyImport):
+        try:
+            obj._load()
+        except ImportError:
+            return False
+    return True
+
+
+def preload(*objs: Any) -> None:
+    """遅延インポートを明示的に読み込む（フォーク前のウォームアップ用。失敗は無視）"""
+    for obj in objs:
+        if isinstance(obj, LazyImport):
+            try:
+                obj._load()
+            except ImportError:
+                pass
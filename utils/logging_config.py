@@ -1,14 +1,24 @@
 """
 構造化ログ設定モジュール
 JSON形式のログ出力とローテーション機能を提供
+
+非同期モードでは全ハンドラを QueueListener（バックグラウンドの書き込みスレッド）の後ろに置き、
+リクエスト処理中は LogRecord をキューに入れるだけにする（JSON整形とファイル書き込みはスレッド側）。
+キューは上限付きで、満杯時は WARNING 未満のログを破棄する。アクセスログはサンプリングする。
 """
+import _thread
+import atexit
+import copy
 import json
 import logging
 import os
+import queue
+import random
 import sys
+import time
 from datetime import datetime
-from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
-from typing import Any, Dict, Optional
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Any, Callable, Dict, List, Optional
 
 from flask import Flask, g, has_request_context, request
 
@@ -39,19 +49,20 @@ class JSONFormatter(logging.Formatter):
             "function": record.funcName,
         }
 
-        # リクエストコンテキストがある場合
-        if has_request_context():
-            log_data["request"] = {
-                "method": request.method,
-                "path": request.path,
-                "remote_addr": request.remote_addr,
-            }
-            if hasattr(g, "request_id"):
-                log_data["request_id"] = g.request_id
+        # リクエストコンテキストがある場合（非同期モードではキュー投入時に取得した値を使う）
+        request_info = getattr(record, "request_info", None)
+        if request_info is None and has_request_context():
+            request_info = _request_info()
+        if request_info:
+            log_data["request"] = {key: value for key, value in request_info.items() if key != "request_id"}
+            if "request_id" in request_info:
+                log_data["request_id"] = request_info["request_id"]
 
         # 例外情報
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_data["exception"] = record.exc_text
 
         # 追加フィールド
         if self.include_extra and hasattr(record, "extra_data"):
@@ -60,6 +71,245 @@ class JSONFormatter(logging.Formatter):
         return json.dumps(log_data, ensure_ascii=False, default=str)
 
 
+def _request_info() -> Dict[str, Any]:
+    """現在のリクエストの情報（JSONFormatter の request / request_id）"""
+    info = {
+        "method": request.method,
+        "path": request.path,
+        "remote_addr": request.remote_addr,
+    }
+    if hasattr(g, "request_id"):
+        info["request_id"] = g.request_id
+    return info
+
+
+def _gevent_original(module: str, name: str, default: Any) -> Any:
+    """gevent でモンキーパッチ済みの場合はパッチ前の実装を返す"""
+    try:
+        from gevent import monkey
+
+        if monkey.is_module_patched(module):
+            return monkey.get_original(module, name)
+    except ImportError:
+        pass
+    return default
+
+
+def _gevent_patched() -> bool:
+    """threading が gevent でモンキーパッチされているか（gevent ワーカー）"""
+    try:
+        from gevent import monkey
+
+        return monkey.is_module_patched("threading")
+    except ImportError:
+        return False
+
+
+class NativeQueue:
+    """
+    gevent のパッチに影響されない上限付きキュー（書き込みスレッドへの受け渡し用）
+
+    gevent 環境では queue.Queue のロックが greenlet 用に置き換わり、OSスレッドとの間で使えないため、
+    C実装の SimpleQueue とパッチ前のロックで上限付きのキューを作る。
+    満杯時の put の待機は time.sleep で行う（gevent 環境では他の greenlet に実行を譲る）。
+    """
+
+    _PUT_POLL_SECONDS = 0.005
+
+    def __init__(self, maxsize: int = 0):
+        from _queue import SimpleQueue
+
+        self.maxsize = maxsize
+        self._queue = SimpleQueue()
+        self._lock = _gevent_original("_thread", "allocate_lock", _thread.allocate_lock)()
+        self._size = 0
+
+    def qsize(self) -> int:
+        return self._size
+
+    def put_nowait(self, item: Any) -> None:
+        with self._lock:
+            if 0 < self.maxsize <= self._size:
+                raise queue.Full
+            self._size += 1
+        self._queue.put(item)
+
+    def put(self, item: Any, block: bool = True, timeout: Optional[float] = None) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self.put_nowait(item)
+            except queue.Full:
+                if not block or (deadline is not None and time.monotonic() >= deadline):
+                    raise
+                time.sleep(self._PUT_POLL_SECONDS)
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        item = self._queue.get(block, timeout)
+        with self._lock:
+            self._size -= 1
+        return item
+
+    def get_nowait(self) -> Any:
+        return self.get(False)
+
+
+def _new_log_queue(maxsize: int) -> Any:
+    """書き込みスレッドへの受け渡しキュー（gevent 環境ではパッチの影響を受けないキュー）"""
+    return NativeQueue(maxsize) if _gevent_patched() else queue.Queue(maxsize=maxsize)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    上限付きキューに LogRecord を入れるハンドラ（リクエスト処理スレッド側）
+
+    キューが満杯の場合、WARNING 未満は即座に破棄し、WARNING 以上は短時間だけ空きを待つ。
+    破棄した件数は次にキューへ入ったときに WARNING として1件にまとめて記録する。
+    """
+
+    BLOCK_TIMEOUT_SECONDS = 0.05
+
+    def __init__(self, log_queue: Any):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported_drops = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        スレッドをまたいで渡せるようにレコードを確定する
+
+        メッセージの展開と例外のテキスト化はここで行い、整形（JSON化）はリスナー側のハンドラに任せる。
+        リクエストコンテキストはリスナーのスレッドから参照できないため、ここで値を取り出しておく。
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if not hasattr(record, "request_info") and has_request_context():
+            record.request_info = _request_info()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno < logging.WARNING or not self._put_blocking(record):
+                self.dropped += 1
+                self._unreported_drops += 1
+            return
+        if self._unreported_drops:
+            dropped, self._unreported_drops = self._unreported_drops, 0
+            notice = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0, f"Dropped {dropped} log records (queue full)", None, None
+            )
+            try:
+                self.queue.put_nowait(notice)
+            except queue.Full:
+                self._unreported_drops += dropped
+
+    def _put_blocking(self, record: logging.LogRecord) -> bool:
+        try:
+            self.queue.put(record, timeout=self.BLOCK_TIMEOUT_SECONDS)
+            return True
+        except queue.Full:
+            return False
+
+
+class DeferredCall:
+    """ログキューに入れてリスナースレッドで実行する呼び出し（vibelogger 等のファイル書き込み）"""
+
+    levelno = logging.INFO
+
+    def __init__(self, func: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+
+class LogQueueListener(QueueListener):
+    """
+    LogRecord はハンドラへ、DeferredCall はその場で実行するリスナー
+
+    gevent 環境では threading.Thread が greenlet になり、書き込みがハブ上でリクエストの greenlet を
+    止めてしまうため、パッチ前の start_new_thread でOSスレッドとして動かす（キューは NativeQueue）。
+    """
+
+    def __init__(
+        self,
+        log_queue: Any,
+        *handlers: logging.Handler,
+        respect_handler_level: bool = False,
+        native_thread: Optional[bool] = None,
+    ):
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self.native_thread = _gevent_patched() if native_thread is None else native_thread
+        self._native_done: Any = None
+
+    def start(self) -> None:
+        if not self.native_thread:
+            super().start()
+            return
+        self._native_done = _gevent_original("_thread", "allocate_lock", _thread.allocate_lock)()
+        self._native_done.acquire()
+        _gevent_original("_thread", "start_new_thread", _thread.start_new_thread)(self._run_native, ())
+
+    def _run_native(self) -> None:
+        try:
+            self._monitor()
+        finally:
+            self._native_done.release()
+
+    def enqueue_sentinel(self) -> None:
+        # 満杯でも停止できるよう、空きを待って入れる
+        self.queue.put(self._sentinel)
+
+    def stop(self) -> None:
+        if not self.native_thread:
+            super().stop()
+            return
+        if self._native_done is None:
+            return
+        self.enqueue_sentinel()
+        self._native_done.acquire()
+        self._native_done = None
+
+    def handle(self, record: Any) -> None:
+        if isinstance(record, DeferredCall):
+            try:
+                record.func(*record.args, **record.kwargs)
+            except Exception:
+                pass
+            return
+        super().handle(record)
+
+
+class AccessLogSampler(logging.Filter):
+    """
+    アクセスログのサンプリング
+
+    エラー（ステータス400以上・WARNING以上）と遅いリクエストは必ず残し、
+    それ以外は sample_rate の割合だけ残す。
+    """
+
+    def __init__(self, sample_rate: float = 1.0, slow_ms: float = 1000.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.sample_rate >= 1.0 or record.levelno >= logging.WARNING:
+            return True
+        data = getattr(record, "extra_data", None) or {}
+        if (data.get("status_code") or 0) >= 400:
+            return True
+        if (data.get("response_time_ms") or 0) >= self.slow_ms:
+            return True
+        return random.random() < self.sample_rate
+
+
 class ContextLogger(logging.LoggerAdapter):
     """コンテキスト情報を含めるロガーアダプター"""
 
@@ -78,6 +328,11 @@ class ContextLogger(logging.LoggerAdapter):
         return msg, kwargs
 
 
+# 非同期モードのキューとリスナー（setup_logging で作成）
+_queue_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[LogQueueListener] = None
+
+
 def setup_logging(
     app: Optional[Flask] = None,
     log_level: str = "INFO",
@@ -86,6 +341,11 @@ def setup_logging(
     app_name: str = "workplace-roleplay",
     max_bytes: int = 10 * 1024 * 1024,  # 10MB
     backup_count: int = 5,
+    async_logging: bool = True,
+    queue_size: int = 10000,
+    access_sample_rate: float = 1.0,
+    access_slow_ms: float = 1000.0,
+    access_log: bool = False,
 ) -> logging.Logger:
     """
     ログ設定をセットアップ
@@ -98,6 +358,11 @@ def setup_logging(
         app_name: アプリケーション名
         max_bytes: ローテーションのファイルサイズ上限
         backup_count: バックアップファイル数
+        async_logging: ハンドラをバックグラウンドの書き込みスレッドの後ろに置くか
+        queue_size: 非同期モードのキューの上限（満杯時は WARNING 未満を破棄）
+        access_sample_rate: アクセスログを残す割合（エラーと遅いリクエストは常に残す）
+        access_slow_ms: サンプリングせずに残す遅いリクエストのしきい値（ミリ秒）
+        access_log: app の全リクエストのアクセスログを記録するか
 
     Returns:
         設定されたロガー
@@ -110,7 +375,8 @@ def setup_logging(
     root_logger = logging.getLogger()
     root_logger.setLevel(getattr(logging, log_level.upper()))
 
-    # 既存のハンドラをクリア
+    # 既存のハンドラをクリア（前回の非同期リスナーは残りを書き出してから停止）
+    shutdown_logging()
     root_logger.handlers.clear()
 
     # フォーマッター選択
@@ -119,18 +385,20 @@ def setup_logging(
     else:
         formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
+    handlers: List[logging.Handler] = []
+
     # コンソールハンドラ
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(getattr(logging, log_level.upper()))
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    handlers.append(console_handler)
 
     # アプリケーションログ（サイズベースローテーション）
     app_log_path = os.path.join(log_dir, f"{app_name}.log")
     app_handler = RotatingFileHandler(app_log_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
     app_handler.setLevel(getattr(logging, log_level.upper()))
     app_handler.setFormatter(formatter)
-    root_logger.addHandler(app_handler)
+    handlers.append(app_handler)
 
     # エラーログ（日付ベースローテーション）
     error_log_path = os.path.join(log_dir, f"{app_name}-error.log")
@@ -139,26 +407,103 @@ def setup_logging(
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(formatter)
-    root_logger.addHandler(error_handler)
+    handlers.append(error_handler)
 
     # アクセスログ（日付ベースローテーション）
     access_log_path = os.path.join(log_dir, f"{app_name}-access.log")
     access_logger = logging.getLogger("access")
+    access_logger.filters = [f for f in access_logger.filters if not isinstance(f, AccessLogSampler)]
+    access_logger.addFilter(AccessLogSampler(access_sample_rate, access_slow_ms))
     access_handler = TimedRotatingFileHandler(
         access_log_path, when="midnight", interval=1, backupCount=7, encoding="utf-8"
     )
     access_handler.setLevel(logging.INFO)
     access_handler.setFormatter(formatter)
-    access_logger.addHandler(access_handler)
+
+    if async_logging:
+        # access ロガーのレコードはルートに伝播するため、リスナー側で名前により振り分ける
+        access_handler.addFilter(logging.Filter("access"))
+        _start_listener(root_logger, handlers + [access_handler], queue_size)
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
+        access_logger.addHandler(access_handler)
 
     # Flaskアプリケーションへの登録
     if app:
         app.logger.handlers = root_logger.handlers
         app.logger.setLevel(getattr(logging, log_level.upper()))
+        if access_log and log_request_info not in app.after_request_funcs.get(None, []):
+            app.after_request(log_request_info)
 
     return root_logger
 
 
+def _start_listener(root_logger: logging.Logger, handlers: List[logging.Handler], queue_size: int) -> None:
+    global _queue_handler, _listener
+    _queue_handler = DroppingQueueHandler(_new_log_queue(queue_size))
+    _listener = LogQueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    root_logger.addHandler(_queue_handler)
+
+
+def shutdown_logging() -> None:
+    """非同期モードのリスナーを停止（キューに残ったログを書き出してからハンドラを閉じる）"""
+    global _queue_handler, _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    logging.getLogger().removeHandler(_queue_handler)
+    _queue_handler = None
+
+
+def is_async_logging_active() -> bool:
+    """非同期モードのリスナーが動作中か"""
+    return _listener is not None
+
+
+def get_dropped_log_count() -> int:
+    """非同期モードでキュー満杯のため破棄したログの件数"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def defer(func: Callable[..., Any], *args: Any, **kwargs: Any) -> bool:
+    """
+    ログのファイル書き込み等をリスナースレッドで実行するよう予約
+
+    非同期モードでない場合は False を返す（呼び出し側で同期実行する）。キューが満杯の場合は破棄する。
+    """
+    handler = _queue_handler
+    if handler is None:
+        return False
+    try:
+        handler.queue.put_nowait(DeferredCall(func, args, kwargs))
+        return True
+    except queue.Full:
+        handler.dropped += 1
+        return True
+
+
+def _restart_listener_after_fork() -> None:
+    # フォーク後の子プロセスでは書き込みスレッドが存在しないため、新しいキューで起動し直す
+    # （親のキューに残っていたレコードは親が書き出す）
+    global _listener
+    if _listener is None:
+        return
+    handlers = _listener.handlers
+    _queue_handler.queue = _new_log_queue(_queue_handler.queue.maxsize)
+    _listener = LogQueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+atexit.register(shutdown_logging)
+
+
 def get_logger(name: str) -> ContextLogger:
     """
     コンテキスト付きロガーを取得
@@ -1,19 +1,349 @@
 """
 パフォーマンス計測・最適化ユーティリティ
 """
+import atexit
 import time
 import functools
+import hashlib
+import json
 import logging
-from typing import Any, Callable, Dict, Optional
+import math
+import os
+import re
+import sys
+from typing import Any, Callable, Dict, List, Optional
 from datetime import datetime, timedelta
 from threading import Lock
 from collections import OrderedDict
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
 
+# レイテンシヒストグラムのバケット（HDR方式の対数バケット）
+# 0.1ms から 2^(1/4) 倍ずつ増やし、各バケット内の相対誤差を約19%以内に抑える。最後のバケットは上限なし
+HISTOGRAM_MIN_MS = 0.1
+HISTOGRAM_STEPS_PER_DOUBLING = 4
+HISTOGRAM_BUCKET_COUNT = 84  # 上限 0.1ms * 2^(82/4) ≈ 148秒
+HISTOGRAM_BOUNDS_MS = [
+    HISTOGRAM_MIN_MS * 2 ** (i / HISTOGRAM_STEPS_PER_DOUBLING) for i in range(HISTOGRAM_BUCKET_COUNT - 1)
+]
+
+
+def _bucket_index(duration_ms: float) -> int:
+    if duration_ms <= HISTOGRAM_MIN_MS:
+        return 0
+    index = math.ceil(math.log2(duration_ms / HISTOGRAM_MIN_MS) * HISTOGRAM_STEPS_PER_DOUBLING - 1e-9)
+    return min(index, HISTOGRAM_BUCKET_COUNT - 1)
+
+
+class LatencyHistogram:
+    """
+    対数バケットのレイテンシヒストグラム
+
+    固定サイズのバケット配列のため、記録数によらずメモリ使用量が一定で、
+    プロセス間のマージ（バケットごとの加算）が可能。スレッドセーフではないため呼び出し側でロックする。
+    """
+
+    __slots__ = ("buckets", "count", "total_ms", "min_ms", "max_ms", "success_count", "error_count")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * HISTOGRAM_BUCKET_COUNT
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = float("inf")
+        self.max_ms = 0.0
+        self.success_count = 0
+        self.error_count = 0
+
+    def record(self, duration_ms: float, success: bool = True) -> None:
+        self.buckets[_bucket_index(duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.min_ms = min(self.min_ms, duration_ms)
+        self.max_ms = max(self.max_ms, duration_ms)
+        if success:
+            self.success_count += 1
+        else:
+            self.error_count += 1
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """別のヒストグラムを加算"""
+        for i, n in enumerate(other.buckets):
+            self.buckets[i] += n
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.min_ms = min(self.min_ms, other.min_ms)
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.success_count += other.success_count
+        self.error_count += other.error_count
+
+    def percentile(self, pct: float) -> float:
+        """
+        パーセンタイル値（ミリ秒）を推定
+
+        該当バケットの上限値を返す（観測された最小値・最大値の範囲に丸める）。
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        cumulative = 0
+        for i, n in enumerate(self.buckets):
+            cumulative += n
+            if cumulative >= rank:
+                upper = HISTOGRAM_BOUNDS_MS[i] if i < len(HISTOGRAM_BOUNDS_MS) else self.max_ms
+                return min(max(upper, self.min_ms), self.max_ms)
+        return self.max_ms
+
+    def cumulative_counts(self, bounds_ms: List[float]) -> List[int]:
+        """指定した上限値ごとの累積件数（Prometheusのバケット形式）"""
+        counts = []
+        cumulative = 0
+        index = 0
+        for bound in bounds_ms:
+            while index < len(HISTOGRAM_BOUNDS_MS) and HISTOGRAM_BOUNDS_MS[index] <= bound * (1 + 1e-9):
+                cumulative += self.buckets[index]
+                index += 1
+            counts.append(cumulative)
+        return counts
+
+    def summary(self) -> Dict[str, Any]:
+        """エンドポイントごとのメトリクス辞書（/api/metrics 用）"""
+        return {
+            "count": self.count,
+            "total_duration_ms": self.total_ms,
+            "min_duration_ms": self.min_ms if self.count else 0,
+            "max_duration_ms": self.max_ms,
+            "avg_duration_ms": self.total_ms / self.count if self.count else 0,
+            "p50_duration_ms": self.percentile(50),
+            "p90_duration_ms": self.percentile(90),
+            "p99_duration_ms": self.percentile(99),
+            "success_count": self.success_count,
+            "error_count": self.error_count,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        # 0件のバケットは省略して保存サイズを抑える
+        return {
+            "buckets": {str(i): n for i, n in enumerate(self.buckets) if n},
+            "count": self.count,
+            "total_ms": self.total_ms,
+            "min_ms": self.min_ms if self.count else None,
+            "max_ms": self.max_ms,
+            "success_count": self.success_count,
+            "error_count": self.error_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        hist = cls()
+        for i, n in (data.get("buckets") or {}).items():
+            hist.buckets[int(i)] = int(n)
+        hist.count = int(data.get("count", 0))
+        hist.total_ms = float(data.get("total_ms", 0.0))
+        min_ms = data.get("min_ms")
+        hist.min_ms = float(min_ms) if min_ms is not None else float("inf")
+        hist.max_ms = float(data.get("max_ms", 0.0))
+        hist.success_count = int(data.get("success_count", 0))
+        hist.error_count = int(data.get("error_count", 0))
+        return hist
+
+
+class MultiprocessCollector:
+    """
+    ファイル経由で複数ワーカープロセス（gunicorn等）のメトリクスを集約
+
+    各プロセスは自分のスナップショットを <directory>/metrics_<pid>.json に定期的に書き出し、
+    読み出し側は全ファイルをマージする。終了したプロセスのファイルはアーカイブに統合して
+    カウンターが減らないようにする。ディレクトリはサーバー起動時に clear() で空にすること。
+    """
+
+    FILE_PREFIX = "metrics_"
+    ARCHIVE_FILE = "metrics_archive.json"
+    LOCK_FILE = ".metrics.lock"
+
+    def __init__(self, directory: str, flush_interval_seconds: float = 5.0) -> None:
+        self.directory = directory
+        self.flush_interval_seconds = flush_interval_seconds
+        self._flush_lock = Lock()
+        self._next_flush = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{self.FILE_PREFIX}{pid}.json")
+
+    def write(self, payload: Dict[str, Any]) -> None:
+        """スナップショットを原子的に書き出す"""
+        path = self.path_for(os.getpid())
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def maybe_flush(self, build_payload: Callable[[], Dict[str, Any]], force: bool = False) -> None:
+        """前回の書き出しから flush_interval_seconds 経過していれば書き出す（他スレッドが書き出し中なら何もしない）"""
+        now = time.monotonic()
+        if not force and now < self._next_flush:
+            return
+        if not self._flush_lock.acquire(blocking=force):
+            return
+        try:
+            self._next_flush = now + self.flush_interval_seconds
+            self.write(build_payload())
+        except OSError as e:
+            logger.warning(f"Failed to write metrics snapshot: {e}")
+        finally:
+            self._flush_lock.release()
+
+    def read_all(self, exclude_pid: Optional[int] = None) -> List[Dict[str, Any]]:
+        """全プロセス（終了済みはアーカイブ）のスナップショットを読み込む"""
+        self._archive_dead_processes()
+        payloads = []
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith(self.FILE_PREFIX) and name.endswith(".json")):
+                continue
+            if exclude_pid is not None and name == f"{self.FILE_PREFIX}{exclude_pid}.json":
+                continue
+            payload = self._read(os.path.join(self.directory, name))
+            if payload is not None:
+                payloads.append(payload)
+        return payloads
+
+    def clear(self) -> None:
+        """全プロセスのスナップショットを削除（サーバー起動時に呼び出す）"""
+        for name in os.listdir(self.directory):
+            if name.startswith(self.FILE_PREFIX):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else None
+        except (OSError, ValueError):
+            return None
+
+    def _archive_dead_processes(self) -> None:
+        # 終了したワーカー（--max-requests による再起動等）のファイルを1つのアーカイブに統合する
+        if fcntl is None:
+            return
+        try:
+            with open(os.path.join(self.directory, self.LOCK_FILE), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                archive_path = os.path.join(self.directory, self.ARCHIVE_FILE)
+                dead = []
+                for name in os.listdir(self.directory):
+                    match = re.fullmatch(rf"{self.FILE_PREFIX}(\d+)\.json", name)
+                    if match and not _pid_alive(int(match.group(1))):
+                        dead.append(os.path.join(self.directory, name))
+                if not dead:
+                    return
+                archive = self._read(archive_path) or {}
+                for path in dead:
+                    payload = self._read(path)
+                    if payload is not None:
+                        archive = merge_snapshots([archive, payload])
+                archive["pid"] = None
+                archive["workers"] = []
+                tmp = f"{archive_path}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(archive, f, separators=(",", ":"))
+                os.replace(tmp, archive_path)
+                for path in dead:
+                    os.remove(path)
+        except OSError as e:
+            logger.warning(f"Failed to archive metrics snapshots: {e}")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# /proc/self/smaps_rollup の項目 → process_memory() のキー
+_SMAPS_FIELDS = {
+    "Rss": "rss_bytes",
+    "Pss": "pss_bytes",
+    "Shared_Clean": "shared_bytes",
+    "Shared_Dirty": "shared_bytes",
+    "Private_Clean": "private_bytes",
+    "Private_Dirty": "private_bytes",
+}
+
+
+def process_memory() -> Dict[str, int]:
+    """
+    このプロセスのメモリ使用量（バイト）
+
+    Linux では /proc/self/smaps_rollup から RSS・PSS と、フォーク元と共有しているページ（shared）、
+    このプロセス固有のページ（private）を取得する。それ以外の環境では最大RSSのみ。
+    """
+    try:
+        memory = {"rss_bytes": 0, "pss_bytes": 0, "shared_bytes": 0, "private_bytes": 0}
+        with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                name = _SMAPS_FIELDS.get(key)
+                if name is not None:
+                    memory[name] += int(value.split()[0]) * 1024  # kB
+        return memory
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+
+        # ru_maxrss は Linux ではKB、macOS ではバイト単位
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss_bytes": maxrss if sys.platform == "darwin" else maxrss * 1024}
+    except (ImportError, OSError):
+        return {}
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    プロセスごとのスナップショットをマージ
+
+    requests はヒストグラムを加算し、business・caches のカウンターは合計する。
+    workers には稼働中の各プロセスの情報（メモリ使用量・起動から処理可能になるまでの時間）を並べる。
+    """
+    requests: Dict[str, LatencyHistogram] = {}
+    business: Dict[str, int] = {}
+    caches: Dict[str, Dict[str, int]] = {}
+    workers: List[Dict[str, Any]] = []
+    for snapshot in snapshots:
+        if snapshot.get("pid") is not None and snapshot.get("process"):
+            workers.append(snapshot["process"])
+        for endpoint, data in (snapshot.get("requests") or {}).items():
+            hist = data if isinstance(data, LatencyHistogram) else LatencyHistogram.from_dict(data)
+            requests.setdefault(endpoint, LatencyHistogram()).merge(hist)
+        for name, value in (snapshot.get("business") or {}).items():
+            business[name] = business.get(name, 0) + int(value)
+        for name, stats in (snapshot.get("caches") or {}).items():
+            merged = caches.setdefault(name, {"size": 0, "hits": 0, "misses": 0})
+            for key in merged:
+                merged[key] += int(stats.get(key, 0))
+    return {
+        "requests": {endpoint: hist.to_dict() for endpoint, hist in requests.items()},
+        "business": business,
+        "caches": caches,
+        "workers": sorted(workers, key=lambda w: w.get("pid") or 0),
+    }
+
+
 class PerformanceMetrics:
-    """パフォーマンスメトリクス収集クラス"""
+    """パフォーマンスメトリクス収集クラス（エンドポイントごとのレイテンシヒストグラム）"""
 
     _instance = None
     _lock = Lock()
@@ -28,8 +358,21 @@ class PerformanceMetrics:
 
     def _initialize(self):
         """初期化"""
-        self.metrics: Dict[str, Dict] = {}
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.start_time = datetime.now()
+        self._data_lock = Lock()
+        self.collector = _create_collector()
+        # ワーカーの起動（フォーク）からリクエスト処理可能になるまでの時間（ミリ秒）
+        self.ready_ms: Optional[float] = None
+
+    def _after_fork(self):
+        # フォーク後の子プロセスでは親プロセスの記録を引き継がない（ワーカー間の二重計上を防ぐ）
+        self.histograms = {}
         self.start_time = datetime.now()
+        self._data_lock = Lock()
+        self.ready_ms = None
+        if self.collector is not None:
+            self.collector = MultiprocessCollector(self.collector.directory, self.collector.flush_interval_seconds)
 
     def record_request(self, endpoint: str, duration_ms: float, status_code: int):
         """
@@ -40,30 +383,54 @@ class PerformanceMetrics:
             duration_ms: 処理時間（ミリ秒）
             status_code: HTTPステータスコード
         """
-        if endpoint not in self.metrics:
-            self.metrics[endpoint] = {
-                "count": 0,
-                "total_duration_ms": 0,
-                "min_duration_ms": float("inf"),
-                "max_duration_ms": 0,
-                "success_count": 0,
-                "error_count": 0,
-            }
+        with self._data_lock:
+            hist = self.histograms.get(endpoint)
+            if hist is None:
+                hist = self.histograms[endpoint] = LatencyHistogram()
+            hist.record(duration_ms, 200 <= status_code < 400)
+
+        if self.collector is not None:
+            self.collector.maybe_flush(self.process_snapshot)
+
+    def mark_ready(self, ready_ms: float) -> None:
+        """ワーカーがリクエスト処理可能になった時点を記録（gunicorn の post_worker_init から呼ぶ）"""
+        self.ready_ms = ready_ms
+        if self.collector is not None:
+            self.collector.maybe_flush(self.process_snapshot, force=True)
+
+    def process_snapshot(self) -> Dict[str, Any]:
+        """このプロセスのスナップショット（リクエスト・ビジネスメトリクス・キャッシュ統計・メモリ使用量）"""
+        with self._data_lock:
+            requests = {endpoint: hist.to_dict() for endpoint, hist in self.histograms.items()}
+        return {
+            "pid": os.getpid(),
+            "start_time": self.start_time.isoformat(),
+            "process": {"pid": os.getpid(), "ready_ms": self.ready_ms, **process_memory()},
+            "requests": requests,
+            "business": get_business_metrics().get_all_counters(),
+            "caches": {name: cache.stats() for name, cache in get_cache_registry().items()},
+        }
 
-        m = self.metrics[endpoint]
-        m["count"] += 1
-        m["total_duration_ms"] += duration_ms
-        m["min_duration_ms"] = min(m["min_duration_ms"], duration_ms)
-        m["max_duration_ms"] = max(m["max_duration_ms"], duration_ms)
+    def aggregate_snapshot(self) -> Dict[str, Any]:
+        """
+        全ワーカープロセスを集約したスナップショット
 
-        if 200 <= status_code < 400:
-            m["success_count"] += 1
-        else:
-            m["error_count"] += 1
+        マルチプロセス集約が無効の場合はこのプロセスのみ。
+        """
+        local = self.process_snapshot()
+        if self.collector is None:
+            merged = merge_snapshots([local])
+            merged["processes"] = 1
+            return merged
+        self.collector.maybe_flush(self.process_snapshot, force=True)
+        others = self.collector.read_all(exclude_pid=os.getpid())
+        merged = merge_snapshots([local] + others)
+        merged["processes"] = 1 + sum(1 for s in others if s.get("pid") is not None)
+        return merged
 
     def get_metrics(self, endpoint: Optional[str] = None) -> Dict:
         """
-        メトリクスを取得
+        メトリクスを取得（マルチプロセス集約が有効な場合は全ワーカーの合計）
 
         Args:
             endpoint: 特定エンドポイント（Noneの場合は全体）
@@ -71,29 +438,72 @@ class PerformanceMetrics:
         Returns:
             メトリクス辞書
         """
+        snapshot = self.aggregate_snapshot()
+        histograms = {ep: LatencyHistogram.from_dict(data) for ep, data in snapshot["requests"].items()}
+
         if endpoint:
-            m = self.metrics.get(endpoint, {})
-            if m and m["count"] > 0:
-                m["avg_duration_ms"] = m["total_duration_ms"] / m["count"]
-            return m
+            hist = histograms.get(endpoint)
+            return hist.summary() if hist is not None and hist.count > 0 else {}
 
         # 全体メトリクス
-        result = {}
-        for ep, m in self.metrics.items():
-            result[ep] = {**m, "avg_duration_ms": m["total_duration_ms"] / m["count"] if m["count"] > 0 else 0}
-
+        result: Dict[str, Any] = {ep: hist.summary() for ep, hist in histograms.items()}
         result["_summary"] = {
             "uptime_seconds": (datetime.now() - self.start_time).total_seconds(),
-            "total_endpoints": len(self.metrics),
-            "total_requests": sum(m["count"] for m in self.metrics.values()),
+            "total_endpoints": len(histograms),
+            "total_requests": sum(hist.count for hist in histograms.values()),
+            "processes": snapshot["processes"],
+            "workers": snapshot["workers"],
         }
 
         return result
 
     def reset(self):
-        """メトリクスをリセット"""
-        self.metrics = {}
+        """メトリクスをリセット（このプロセスの記録のみ）"""
+        with self._data_lock:
+            self.histograms = {}
         self.start_time = datetime.now()
+        if self.collector is not None:
+            try:
+                os.remove(self.collector.path_for(os.getpid()))
+            except OSError:
+                pass
+
+
+def _create_collector() -> Optional[MultiprocessCollector]:
+    """設定（METRICS_MULTIPROC_DIR）に応じてマルチプロセス集約を作成"""
+    try:
+        from config import get_cached_config
+
+        config = get_cached_config()
+        directory = getattr(config, "METRICS_MULTIPROC_DIR", None)
+        if not directory:
+            return None
+        return MultiprocessCollector(directory, getattr(config, "METRICS_FLUSH_INTERVAL_SECONDS", 5.0))
+    except Exception as e:
+        logger.warning(f"Multiprocess metrics disabled: {e}")
+        return None
+
+
+def _reset_metrics_after_fork() -> None:
+    # 子プロセスは親プロセス（フォーク前のウォームアップ等）の記録を引き継がない。
+    # 引き継ぐと各ワーカーが同じ値を報告し、/metrics の集約でワーカー数倍に計上される
+    if PerformanceMetrics._instance is not None:
+        PerformanceMetrics._instance._after_fork()
+    if BusinessMetrics._instance is not None:
+        BusinessMetrics._instance._after_fork()
+    for cache in get_cache_registry().values():
+        cache._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_metrics_after_fork)
+
+
+@atexit.register
+def _flush_metrics_at_exit() -> None:
+    instance = PerformanceMetrics._instance
+    if instance is not None and instance.collector is not None:
+        instance.collector.maybe_flush(instance.process_snapshot, force=True)
 
 
 def get_metrics() -> PerformanceMetrics:
@@ -237,6 +647,12 @@ class LRUCache:
             self._hits = 0
             self._misses = 0
 
+    def _after_fork(self) -> None:
+        # キャッシュの内容は引き継ぎ（フォーク前のウォームアップを活かす）、ヒット・ミスの計数だけを戻す
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
     def stats(self) -> Dict[str, Any]:
         """
         キャッシュ統計を取得
@@ -386,7 +802,8 @@ class SessionSizeOptimizer:
 
 # グローバルキャッシュインスタンス
 _scenario_cache = LRUCache(maxsize=100, ttl_seconds=3600)  # 1時間
-_prompt_cache = LRUCache(maxsize=50, ttl_seconds=1800)  # 30分
+# キーは内容ハッシュのため期限切れは不要（内容が変われば別キーになる）
+_prompt_cache = LRUCache(maxsize=512)
 
 
 def get_scenario_cache() -> LRUCache:
@@ -399,6 +816,25 @@ def get_prompt_cache() -> LRUCache:
     return _prompt_cache
 
 
+def get_cache_registry() -> Dict[str, LRUCache]:
+    """メトリクスとして公開するキャッシュの一覧"""
+    return {"scenario": _scenario_cache, "prompt": _prompt_cache}
+
+
+def content_hash(data: Any) -> str:
+    """
+    データ内容からキャッシュキー用のハッシュを生成（辞書のキー順に依存しない）
+
+    Args:
+        data: JSONシリアライズ可能なデータ
+
+    Returns:
+        str: 16桁の16進ハッシュ
+    """
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
 class BusinessMetrics:
     """ビジネスメトリクス収集クラス"""
 
@@ -425,6 +861,12 @@ class BusinessMetrics:
         }
         self.start_time = datetime.now()
 
+    def _after_fork(self):
+        # クラス属性のロックはフォーク時に保持されたままの可能性があるため作り直す
+        BusinessMetrics._lock = Lock()
+        self.counters = {key: 0 for key in self.counters}
+        self.start_time = datetime.now()
+
     def increment(self, metric_name: str, value: int = 1):
         """
         メトリクスをインクリメント
@@ -0,0 +1,417 @@
+"""
+本番リクエスト向けのオンデマンド・サンプリングプロファイラ
+
+対象リクエストの実行中、別スレッドから一定間隔でスタックを採取して集計し、
+collapsed-stack 形式（flamegraph.pl / speedscope で読み込み可能）で保存する。
+speedscope 形式（JSON）でのダウンロードにも対応する。
+
+プロファイル対象の選び方:
+- 管理者ヘッダー（X-Profile-Token）を付けたリクエスト
+- PROFILER_SAMPLE_RATE の割合でランダムに選ばれたリクエスト
+- 管理APIで有効化した時間帯（ウィンドウ）内の全リクエスト
+
+PROFILER_ADMIN_TOKEN が未設定の場合は無効で、ミドルウェアも登録されない（通常リクエストへのコストなし）。
+gevent ワーカーではモンキーパッチ前のネイティブスレッドで採取し、対象 greenlet の
+スタック（I/O待ちで中断中の場合も含む）を記録する。
+"""
+
+from __future__ import annotations
+
+import _thread
+import functools
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 管理者ヘッダー（値は PROFILER_ADMIN_TOKEN と一致する必要がある）
+ADMIN_HEADER = "X-Profile-Token"
+# プロファイルを取得したリクエストのレスポンスに付与するヘッダー
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# 時間帯指定で有効化できる最大秒数
+MAX_WINDOW_SECONDS = 3600
+# 採取対象がない間のサンプラースレッドの待機間隔（秒）
+_IDLE_SLEEP_SECONDS = 0.05
+# 1スタックあたりの最大フレーム数（再帰が深い場合は根元側を切り詰める）
+_MAX_STACK_DEPTH = 256
+
+_PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _original(module: str, name: str, default: Any) -> Any:
+    """gevent でモンキーパッチ済みの場合はパッチ前の実装を返す"""
+    try:
+        from gevent import monkey
+
+        if monkey.is_module_patched(module):
+            return monkey.get_original(module, name)
+    except ImportError:
+        pass
+    return default
+
+
+def _current_target() -> Tuple[int, Any]:
+    """
+    現在の実行単位を取得
+
+    Returns:
+        (OSスレッドID, greenlet) のタプル。greenlet は gevent でパッチ済みの場合のみ
+    """
+    native_get_ident = _original("_thread", "get_ident", None)
+    if native_get_ident is None:
+        return threading.get_ident(), None
+    import greenlet
+
+    return native_get_ident(), greenlet.getcurrent()
+
+
+@functools.lru_cache(maxsize=4096)
+def _frame_label(code) -> str:
+    """フレームの表示名（collapsed-stack の区切り文字 ';' は含めない）"""
+    filename = code.co_filename
+    cwd = os.getcwd()
+    if filename.startswith(cwd + os.sep):
+        filename = filename[len(cwd) + 1 :]
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[-1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _collapse(frame) -> str:
+    labels: List[str] = []
+    while frame is not None and len(labels) < _MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class ProfileSession:
+    """1リクエスト分の採取状態"""
+
+    def __init__(self, thread_id: int, greenlet: Any = None):
+        self.id = uuid.uuid4().hex
+        self.thread_id = thread_id
+        self.greenlet = greenlet
+        self.started_at = time.time()
+        self.started_perf = time.perf_counter()
+        self.samples: Counter = Counter()
+
+    def current_frame(self, frames: Dict[int, Any]):
+        """採取対象のフレーム（中断中の greenlet は gr_frame、実行中はスレッドの現在フレーム）"""
+        if self.greenlet is not None:
+            if self.greenlet.dead:
+                return None
+            if self.greenlet.gr_frame is not None:
+                return self.greenlet.gr_frame
+        return frames.get(self.thread_id)
+
+
+class _Sampler:
+    """登録中のセッションのスタックを一定間隔で採取するバックグラウンドスレッド"""
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._sessions: Dict[int, ProfileSession] = {}
+        self._started = False
+        self._start_lock = _original("_thread", "allocate_lock", _thread.allocate_lock)()
+        self._sleep = _original("time", "sleep", time.sleep)
+
+    def add(self, session: ProfileSession) -> None:
+        self._sessions[id(session)] = session
+        if not self._started:
+            with self._start_lock:
+                if not self._started:
+                    # gevent 環境でも greenlet ではなくネイティブスレッドで動かす（採取が I/O 待ちに左右されない）
+                    _original("_thread", "start_new_thread", _thread.start_new_thread)(self._run, ())
+                    self._started = True
+
+    def remove(self, session: ProfileSession) -> Counter:
+        self._sessions.pop(id(session), None)
+        # GIL下での dict のコピーはアトミックなため、採取途中でも一貫したスナップショットになる
+        return Counter(dict(session.samples))
+
+    def sample_once(self) -> None:
+        sessions = list(self._sessions.values())
+        if not sessions:
+            return
+        frames = sys._current_frames()
+        for session in sessions:
+            frame = session.current_frame(frames)
+            if frame is not None:
+                session.samples[_collapse(frame)] += 1
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sample_once()
+            except Exception as e:  # 採取に失敗してもリクエストには影響させない
+                logger.debug(f"Profiler sampling failed: {e}")
+            self._sleep(self.interval_seconds if self._sessions else _IDLE_SLEEP_SECONDS)
+
+
+@dataclass
+class Profile:
+    """保存済みプロファイルのメタデータ"""
+
+    id: str
+    method: str
+    path: str
+    endpoint: str
+    trigger: str
+    started_at: float
+    duration_ms: float
+    interval_ms: float
+    sample_count: int
+    status_code: Optional[int] = None
+    samples: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def metadata(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("samples")
+        return data
+
+
+def to_collapsed(samples: Dict[str, int]) -> str:
+    """collapsed-stack 形式（1行 `root;...;leaf 件数`）に変換"""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(samples.items()))
+
+
+def parse_collapsed(text: str) -> Dict[str, int]:
+    samples: Dict[str, int] = {}
+    for line in text.splitlines():
+        stack, _, count = line.rpartition(" ")
+        if stack and count.isdigit():
+            samples[stack] = samples.get(stack, 0) + int(count)
+    return samples
+
+
+def to_speedscope(profile: Profile) -> Dict[str, Any]:
+    """speedscope のファイル形式（sampled プロファイル）に変換"""
+    frames: List[Dict[str, Any]] = []
+    index: Dict[str, int] = {}
+    stacks: List[List[int]] = []
+    weights: List[float] = []
+    for stack, count in sorted(profile.samples.items()):
+        indices = []
+        for label in stack.split(";"):
+            if label not in index:
+                index[label] = len(frames)
+                name, _, location = label.rpartition(" (")
+                file, _, line = location.rstrip(")").rpartition(":")
+                frame: Dict[str, Any] = {"name": name or label, "file": file}
+                if line.isdigit():
+                    frame["line"] = int(line)
+                frames.append(frame)
+            indices.append(index[label])
+        stacks.append(indices)
+        weights.append(count * profile.interval_ms)
+    name = f"{profile.method} {profile.path}"
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "workplace-roleplay",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": stacks,
+                "weights": weights,
+            }
+        ],
+    }
+
+
+class ProfileStore:
+    """
+    プロファイルのファイル保存（<id>.collapsed と <id>.json）
+
+    上限件数を超えた場合は古いものから削除する。
+    """
+
+    def __init__(self, directory: str, max_profiles: int = 50):
+        self.directory = directory
+        self.max_profiles = max(1, max_profiles)
+
+    def _path(self, profile_id: str, ext: str) -> str:
+        if not _PROFILE_ID_PATTERN.match(profile_id):
+            raise ValueError(f"Invalid profile id: {profile_id!r}")
+        return os.path.join(self.directory, f"{profile_id}.{ext}")
+
+    def save(self, profile: Profile) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(profile.id, "collapsed"), "w", encoding="utf-8") as f:
+            f.write(to_collapsed(profile.samples))
+        with open(self._path(profile.id, "json"), "w", encoding="utf-8") as f:
+            json.dump(profile.metadata(), f, ensure_ascii=False)
+        self._prune()
+
+    def list(self) -> List[Dict[str, Any]]:
+        """保存済みプロファイルのメタデータ（新しい順）"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda p: p.get("started_at", 0), reverse=True)
+
+    def load(self, profile_id: str) -> Optional[Profile]:
+        try:
+            with open(self._path(profile_id, "json"), encoding="utf-8") as f:
+                metadata = json.load(f)
+            with open(self._path(profile_id, "collapsed"), encoding="utf-8") as f:
+                samples = parse_collapsed(f.read())
+        except (OSError, ValueError):
+            return None
+        return Profile(**metadata, samples=samples)
+
+    def _prune(self) -> None:
+        for metadata in self.list()[self.max_profiles :]:
+            for ext in ("json", "collapsed"):
+                try:
+                    os.remove(self._path(metadata["id"], ext))
+                except (OSError, ValueError, KeyError):
+                    pass
+
+
+class RequestProfiler:
+    """
+    リクエスト単位のプロファイリングの管理
+
+    Args:
+        admin_token: 管理者ヘッダー・管理APIの認証トークン（未設定なら無効）
+        sample_rate: ランダムにプロファイルするリクエストの割合（0.0〜1.0）
+        interval_ms: スタックの採取間隔（ミリ秒）
+        output_dir: プロファイルの保存先ディレクトリ
+        max_profiles: 保存する最大件数
+    """
+
+    def __init__(
+        self,
+        admin_token: Optional[str] = None,
+        sample_rate: float = 0.0,
+        interval_ms: float = 5.0,
+        output_dir: str = "logs/profiles",
+        max_profiles: int = 50,
+    ):
+        self.admin_token = admin_token or None
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.interval_ms = max(interval_ms, 1.0)
+        self.store = ProfileStore(output_dir, max_profiles)
+        self._window_until = 0.0
+        self._sampler: Optional[_Sampler] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.admin_token is not None
+
+    def check_token(self, token: Optional[str]) -> bool:
+        if not self.enabled or not token:
+            return False
+        # タイミング攻撃を防ぐため、hmac.compare_digestを使用
+        return hmac.compare_digest(token, self.admin_token)
+
+    def enable_window(self, seconds: float) -> float:
+        """指定秒数の間、全リクエストをプロファイルする（0で解除）"""
+        seconds = min(max(seconds, 0.0), MAX_WINDOW_SECONDS)
+        self._window_until = time.time() + seconds if seconds > 0 else 0.0
+        return self.window_remaining()
+
+    def window_remaining(self) -> float:
+        return max(0.0, self._window_until - time.time())
+
+    def select_trigger(self, admin_token: Optional[str]) -> Optional[str]:
+        """リクエストをプロファイルする理由（対象外なら None）"""
+        if not self.enabled:
+            return None
+        if admin_token and self.check_token(admin_token):
+            return "header"
+        if self._window_until and time.time() < self._window_until:
+            return "window"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def start(self) -> ProfileSession:
+        if self._sampler is None:
+            self._sampler = _Sampler(self.interval_ms / 1000)
+        session = ProfileSession(*_current_target())
+        self._sampler.add(session)
+        return session
+
+    def stop(
+        self,
+        session: ProfileSession,
+        method: str,
+        path: str,
+        endpoint: str,
+        trigger: str,
+        status_code: Optional[int] = None,
+    ) -> Profile:
+        """採取を終了してプロファイルを保存"""
+        samples = self._sampler.remove(session) if self._sampler else Counter()
+        profile = Profile(
+            id=session.id,
+            method=method,
+            path=path,
+            endpoint=endpoint,
+            trigger=trigger,
+            started_at=session.started_at,
+            duration_ms=(time.perf_counter() - session.started_perf) * 1000,
+            interval_ms=self.interval_ms,
+            sample_count=sum(samples.values()),
+            status_code=status_code,
+            samples=dict(samples),
+        )
+        try:
+            self.store.save(profile)
+        except OSError as e:
+            logger.warning(f"Failed to save profile {profile.id}: {e}")
+        return profile
+
+
+_profiler: Optional[RequestProfiler] = None
+
+
+def get_profiler() -> RequestProfiler:
+    """RequestProfilerのシングルトンインスタンスを取得"""
+    global _profiler
+    if _profiler is None:
+        kwargs: Dict[str, Any] = {}
+        try:
+            from config import get_cached_config
+
+            config = get_cached_config()
+            kwargs = {
+                "admin_token": config.PROFILER_ADMIN_TOKEN,
+                "sample_rate": config.PROFILER_SAMPLE_RATE,
+                "interval_ms": config.PROFILER_INTERVAL_MS,
+                "output_dir": config.PROFILER_OUTPUT_DIR,
+                "max_profiles": config.PROFILER_MAX_PROFILES,
+            }
+        except Exception:
+            pass
+        _profiler = RequestProfiler(**kwargs)
+    return _profiler
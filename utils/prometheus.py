@@ -0,0 +1,106 @@
+"""
+Prometheus テキスト形式でのメトリクス出力（/metrics）
+
+PerformanceMetrics（エンドポイントごとのレイテンシヒストグラム）、BusinessMetrics のカウンター、
+LRUキャッシュの統計、ワーカーごとのメモリ使用量と起動時間を出力する。
+マルチプロセス集約が有効な場合は全ワーカーの合計になる。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List
+
+from utils.performance import HISTOGRAM_BOUNDS_MS, LatencyHistogram, get_metrics
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRIC_PREFIX = "workplace_roleplay"
+
+# Prometheus に出力するバケット上限（秒）。内部の対数バケット境界（0.1ms×2^n）と一致させる
+EXPORT_BOUNDS_MS: List[float] = HISTOGRAM_BOUNDS_MS[4 * 4 :: 4]  # 1.6ms 〜
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: str) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_metrics() -> str:
+    """全メトリクスを Prometheus テキスト形式で出力"""
+    snapshot = get_metrics().aggregate_snapshot()
+    histograms: Dict[str, LatencyHistogram] = {
+        endpoint: LatencyHistogram.from_dict(data) for endpoint, data in sorted(snapshot["requests"].items())
+    }
+    lines: List[str] = []
+
+    name = f"{METRIC_PREFIX}_http_request_duration_seconds"
+    lines.append(f"# HELP {name} HTTP request latency by endpoint.")
+    lines.append(f"# TYPE {name} histogram")
+    for endpoint, hist in histograms.items():
+        for bound_ms, count in zip(EXPORT_BOUNDS_MS, hist.cumulative_counts(EXPORT_BOUNDS_MS)):
+            lines.append(f"{name}_bucket{_labels(endpoint=endpoint, le=f'{bound_ms / 1000:.4g}')} {count}")
+        lines.append(f"{name}_bucket{_labels(endpoint=endpoint, le='+Inf')} {hist.count}")
+        lines.append(f"{name}_sum{_labels(endpoint=endpoint)} {_format_value(hist.total_ms / 1000)}")
+        lines.append(f"{name}_count{_labels(endpoint=endpoint)} {hist.count}")
+
+    name = f"{METRIC_PREFIX}_http_requests_total"
+    lines.append(f"# HELP {name} HTTP requests by endpoint and outcome (error: status >= 400).")
+    lines.append(f"# TYPE {name} counter")
+    for endpoint, hist in histograms.items():
+        lines.append(f"{name}{_labels(endpoint=endpoint, outcome='success')} {hist.success_count}")
+        lines.append(f"{name}{_labels(endpoint=endpoint, outcome='error')} {hist.error_count}")
+
+    name = f"{METRIC_PREFIX}_business_events_total"
+    lines.append(f"# HELP {name} Business events (sessions, completions, feedback generations, errors).")
+    lines.append(f"# TYPE {name} counter")
+    for event, value in sorted(snapshot["business"].items()):
+        lines.append(f"{name}{_labels(event=event)} {value}")
+
+    caches = sorted(snapshot["caches"].items())
+    for suffix, key, metric_type, help_text in (
+        ("cache_hits_total", "hits", "counter", "LRU cache hits."),
+        ("cache_misses_total", "misses", "counter", "LRU cache misses."),
+        ("cache_entries", "size", "gauge", "LRU cache entries (sum over workers)."),
+    ):
+        name = f"{METRIC_PREFIX}_{suffix}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for cache, stats in caches:
+            lines.append(f"{name}{_labels(cache=cache)} {stats.get(key, 0)}")
+
+    workers = snapshot.get("workers") or []
+    for suffix, key, help_text in (
+        ("process_resident_memory_bytes", "rss_bytes", "Resident memory per worker process."),
+        ("process_shared_memory_bytes", "shared_bytes", "Memory pages shared with other processes (copy-on-write)."),
+        ("process_private_memory_bytes", "private_bytes", "Memory pages private to the worker process."),
+    ):
+        name = f"{METRIC_PREFIX}_{suffix}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for worker in workers:
+            if worker.get(key) is not None:
+                lines.append(f"{name}{_labels(pid=worker['pid'])} {worker[key]}")
+
+    name = f"{METRIC_PREFIX}_worker_ready_seconds"
+    lines.append(f"# HELP {name} Time from worker fork to ready for requests.")
+    lines.append(f"# TYPE {name} gauge")
+    for worker in workers:
+        if worker.get("ready_ms") is not None:
+            lines.append(f"{name}{_labels(pid=worker['pid'])} {_format_value(worker['ready_ms'] / 1000)}")
+
+    name = f"{METRIC_PREFIX}_metrics_processes"
+    lines.append(f"# HELP {name} Worker processes included in these metrics.")
+    lines.append(f"# TYPE {name} gauge")
+    lines.append(f"{name} {snapshot['processes']}")
+
+    return "\n".join(lines) + "\n"
@@ -1,14 +1,35 @@
 # utils/redis_manager.py
-import os
-import redis
-from typing import Optional, Any, Dict
+import asyncio
+import fnmatch
 import json
 import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
 from datetime import timedelta
 from functools import wraps
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import redis
 
 logger = logging.getLogger(__name__)
 
+# 再接続のバックオフ（秒）。失敗するたびに倍にし、上限で頭打ち（±50%のゆらぎを加える）
+RECONNECT_INITIAL_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+
+# パターン削除で SCAN 1回に走査するキー数の目安と、1回の UNLINK で削除するキー数
+SCAN_COUNT = 500
+DELETE_BATCH_SIZE = 500
+
+# フォールバックストアの最大キー数（超えると最も古く使われたキーから削除）
+FALLBACK_MAX_ITEMS = 10000
+
+# 接続断とみなす例外（これ以外の RedisError はコマンド単位の失敗として扱う）
+_CONNECTION_ERRORS = (redis.ConnectionError, redis.TimeoutError)
+
 
 class RedisConnectionError(Exception):
     """Redis接続エラー専用例外"""
@@ -16,7 +37,231 @@ class RedisConnectionError(Exception):
     pass
 
 
-class RedisSessionManager:
+def _next_delay(delay: float) -> float:
+    return min(delay * 2, RECONNECT_MAX_DELAY)
+
+
+def _jitter(delay: float) -> float:
+    # 複数ワーカーの再接続が同時に集中しないようにずらす
+    return delay * random.uniform(0.5, 1.5)
+
+
+class FallbackStore:
+    """
+    Redis停止中に使うインメモリストア（スレッドセーフ）
+
+    キーごとの有効期限（set の expire）を守り、件数が上限を超えたら最も古く使われたキーから削除する。
+    期限切れのキーはアクセス時と件数の確認時に削除する。
+    dict と同じく store[key] / key in store / del store[key] / len(store) で操作できる。
+    """
+
+    def __init__(self, max_items: int = FALLBACK_MAX_ITEMS):
+        self.max_items = max_items
+        self.evictions = 0
+        # キー → (値, 期限の time.monotonic()。無期限は None)
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, key: str, now: float) -> Optional[Tuple[Any, Optional[float]]]:
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def _purge_expired(self, now: float) -> None:
+        expired = [key for key, (_, deadline) in self._data.items() if deadline is not None and deadline <= now]
+        for key in expired:
+            del self._data[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entry(key, time.monotonic())
+            if entry is None:
+                return default
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: Any, expire: Optional[float] = None) -> None:
+        """値を保存（expire 秒後に期限切れ。None / 0 は無期限）"""
+        deadline = time.monotonic() + expire if expire else None
+        with self._lock:
+            self._data[key] = (value, deadline)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._entry(key, time.monotonic()) is not None and self._data.pop(key, None) is not None
+
+    def delete_matching(self, pattern: str) -> int:
+        """パターンに一致するキーを削除（Redis と同じglob形式。従来どおり部分一致も対象）"""
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            keys = [key for key in self._data if fnmatch.fnmatchcase(key, pattern) or pattern in key]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return list(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __getitem__(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entry(key, time.monotonic())
+        if entry is None:
+            raise KeyError(key)
+        return entry[0]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return isinstance(key, str) and self._entry(key, time.monotonic()) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"items": len(self), "max_items": self.max_items, "evictions": self.evictions}
+
+
+class _RedisManagerBase:
+    """同期版・asyncio版で共通の処理（フォールバック・シリアライズ・接続情報）"""
+
+    host: str
+    port: int
+    db: int
+    fallback_enabled: bool
+    max_connections: int
+    _client: Any
+    _is_connected: bool
+    _fallback_storage: FallbackStore
+    _reconnect_attempts: int
+
+    @staticmethod
+    def _serialize(value: Any) -> str:
+        # 複雑なオブジェクトはJSON化
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        if not isinstance(value, str):
+            return str(value)
+        return value
+
+    @staticmethod
+    def _deserialize(value: Optional[str]) -> Optional[Any]:
+        if not value:
+            return None
+        try:
+            # JSON形式でデシリアライズを試行
+            return json.loads(value)
+        except json.JSONDecodeError:
+            # JSONでない場合はそのまま返す
+            return value
+
+    def _format_connection_error(self, error_detail: str) -> str:
+        """接続エラーメッセージを3要素形式でフォーマット"""
+        return (
+            f"Redisサーバーに接続できません。"
+            f"原因: {self.host}:{self.port}のRedisサーバーが起動していない、"
+            f"またはネットワーク接続に問題があります（詳細: {error_detail}）。"
+            f"対処法: 1) Redisサーバーが起動しているか確認 "
+            f"2) docker-compose up -d redis コマンドでRedisを起動 "
+            f"3) ファイアウォール設定を確認してください。"
+        )
+
+    def _mark_reconnected(self) -> None:
+        """接続の復旧を記録し、停止中にフォールバックへ書いた値を破棄する"""
+        self._is_connected = True
+        # 停止中の書き込みは Redis に反映されていないため、次に停止したときに古い値を返さないよう消す
+        self._fallback_storage.clear()
+
+    def _log_redis_error(self, operation: str, error_detail: str) -> None:
+        """Redis操作エラーのログ出力"""
+        error_msg = (
+            f"Redis{operation}エラー。"
+            f"原因: ネットワーク接続またはRedisサーバーの問題（{error_detail}）。"
+            f"対処法: Redisサーバーの状態を確認し、必要に応じて再起動してください。"
+        )
+        logger.error(error_msg)
+
+    def _fallback_operation(self, operation: str, *args, **kwargs) -> Any:
+        """フォールバック操作（インメモリストレージ使用）"""
+        if operation == "get":
+            key = args[0] if args else kwargs.get("key")
+            return self._fallback_storage.get(key)
+        elif operation == "set":
+            key = args[0] if args else kwargs.get("key")
+            value = args[1] if len(args) > 1 else kwargs.get("value")
+            expire = args[2] if len(args) > 2 else kwargs.get("expire")
+            self._fallback_storage.set(key, value, expire)
+            return True
+        elif operation == "delete":
+            key = args[0] if args else kwargs.get("key")
+            return self._fallback_storage.delete(key)
+        elif operation == "exists":
+            key = args[0] if args else kwargs.get("key")
+            return key in self._fallback_storage
+        elif operation == "clear_pattern":
+            pattern = args[0] if args else kwargs.get("pattern")
+            return self._fallback_storage.delete_matching(pattern)
+        elif operation == "get_many":
+            keys = args[0] if args else kwargs.get("keys")
+            values = ((key, self._fallback_storage.get(key)) for key in keys)
+            return {key: value for key, value in values if value is not None}
+        elif operation == "set_many":
+            mapping = args[0] if args else kwargs.get("mapping")
+            expire = args[1] if len(args) > 1 else kwargs.get("expire")
+            for key, value in mapping.items():
+                self._fallback_storage.set(key, value, expire)
+            return True
+        return None
+
+    def _pool_stats(self) -> Dict[str, Any]:
+        """接続プールの使用状況（使用中・待機中の接続数と上限に対する使用率）"""
+        pool = getattr(self._client, "connection_pool", None)
+        in_use = len(getattr(pool, "_in_use_connections", None) or ())
+        available = len(getattr(pool, "_available_connections", None) or ())
+        return {
+            "max_connections": self.max_connections,
+            "in_use": in_use,
+            "available": available,
+            "created": in_use + available,
+            "utilization": round(in_use / self.max_connections, 3) if self.max_connections else 0.0,
+        }
+
+    def has_fallback(self) -> bool:
+        """フォールバック機能が有効かどうか"""
+        return self.fallback_enabled
+
+    def get_connection_info(self) -> Dict[str, Any]:
+        """接続情報を取得"""
+        return {
+            "host": self.host,
+            "port": self.port,
+            "db": self.db,
+            "connected": self._is_connected,
+            "fallback_enabled": self.fallback_enabled,
+            "fallback_items": len(self._fallback_storage) if self.fallback_enabled else 0,
+        }
+
+
+class RedisSessionManager(_RedisManagerBase):
     """
     Redisセッション管理のラッパークラス
 
@@ -24,10 +269,19 @@ class RedisSessionManager:
     - 何が起きたか（What）
     - なぜ起きたか（Why）
     - どうすればよいか（How）
+
+    接続が切れるとフォールバックストアで継続し、バックグラウンドのスレッドが
+    バックオフしながら再接続する（再接続後は Redis に戻る。停止中の書き込みは Redis に反映しない）。
     """
 
     def __init__(
-        self, host: Optional[str] = None, port: Optional[int] = None, db: int = 0, fallback_enabled: bool = True
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        db: int = 0,
+        fallback_enabled: bool = True,
+        max_connections: int = 10,
+        fallback_max_items: int = FALLBACK_MAX_ITEMS,
     ):
         """
         Redis Session Managerの初期化
@@ -37,14 +291,22 @@ class RedisSessionManager:
             port: Redisサーバーのポート
             db: 使用するRedisデータベース番号
             fallback_enabled: フォールバック機能を有効にするか
+            max_connections: 接続プールの最大接続数
+            fallback_max_items: フォールバックストアの最大キー数
         """
         self.host = host or os.getenv("REDIS_HOST", "localhost")
         self.port = port or int(os.getenv("REDIS_PORT", 6379))
         self.db = db
         self.fallback_enabled = fallback_enabled
+        self.max_connections = max_connections
         self._client = None
         self._is_connected = False
-        self._fallback_storage = {}  # インメモリフォールバック
+        self._fallback_storage = FallbackStore(fallback_max_items)  # インメモリフォールバック
+
+        self._reconnect_lock = threading.Lock()
+        self._reconnect_thread: Optional[threading.Thread] = None
+        self._reconnect_attempts = 0
+        self._stop = threading.Event()
 
         self._connect()
 
@@ -60,7 +322,7 @@ class RedisSessionManager:
                 socket_timeout=5,
                 retry_on_timeout=True,
                 health_check_interval=30,
-                max_connections=10,
+                max_connections=self.max_connections,
             )
             # 接続テスト
             self._client.ping()
@@ -73,20 +335,51 @@ class RedisSessionManager:
 
             if self.fallback_enabled:
                 logger.warning(f"⚠️ Redis接続失敗、フォールバックモードで継続: {error_msg}")
+                self._ensure_reconnecting()
             else:
                 logger.error(f"❌ Redis接続失敗: {error_msg}")
                 raise RedisConnectionError(error_msg) from e
 
-    def _format_connection_error(self, error_detail: str) -> str:
-        """接続エラーメッセージを3要素形式でフォーマット"""
-        return (
-            f"Redisサーバーに接続できません。"
-            f"原因: {self.host}:{self.port}のRedisサーバーが起動していない、"
-            f"またはネットワーク接続に問題があります（詳細: {error_detail}）。"
-            f"対処法: 1) Redisサーバーが起動しているか確認 "
-            f"2) docker-compose up -d redis コマンドでRedisを起動 "
-            f"3) ファイアウォール設定を確認してください。"
-        )
+    def _mark_disconnected(self, error: Exception) -> None:
+        if self._is_connected:
+            self._is_connected = False
+            logger.warning(f"⚠️ Redisとの接続が切れました。再接続するまでフォールバックで継続します: {error}")
+        self._ensure_reconnecting()
+
+    def _ensure_reconnecting(self) -> None:
+        """再接続スレッドが動いていなければ起動（フォーク後の子プロセスでは次回の操作時に起動し直す）"""
+        thread = self._reconnect_thread
+        if (thread is not None and thread.is_alive()) or self._stop.is_set() or self._client is None:
+            return
+        with self._reconnect_lock:
+            thread = self._reconnect_thread
+            if thread is not None and thread.is_alive():
+                return
+            self._reconnect_thread = threading.Thread(
+                target=self._reconnect_loop, name="redis-reconnect", daemon=True
+            )
+            self._reconnect_thread.start()
+
+    def _reconnect_loop(self) -> None:
+        delay = RECONNECT_INITIAL_DELAY
+        while not self._is_connected and not self._stop.wait(_jitter(delay)):
+            try:
+                # 接続プールは使い回す（切れた接続は次のコマンドで張り直される）
+                self._client.ping()
+            except redis.RedisError as e:
+                self._reconnect_attempts += 1
+                delay = _next_delay(delay)
+                logger.debug(f"Redis再接続失敗（{self._reconnect_attempts}回目、次は約{delay:.0f}秒後）: {e}")
+                continue
+            self._mark_reconnected()
+            logger.info(f"✅ Redisに再接続しました: {self.host}:{self.port}（{self._reconnect_attempts}回失敗後）")
+            self._reconnect_attempts = 0
+
+    def close(self) -> None:
+        """再接続スレッドを止め、接続プールを閉じる"""
+        self._stop.set()
+        if self._client is not None:
+            self._client.close()
 
     def _with_fallback(func):
         """フォールバック機能付きデコレータ"""
@@ -96,10 +389,17 @@ class RedisSessionManager:
             try:
                 if self._is_connected:
                     return func(self, *args, **kwargs)
-                elif self.fallback_enabled:
+                self._ensure_reconnecting()
+                if self.fallback_enabled:
                     return self._fallback_operation(func.__name__, *args, **kwargs)
                 else:
                     raise RedisConnectionError("Redis接続が無効で、フォールバックも無効です")
+            except _CONNECTION_ERRORS as e:
+                # 接続断はフォールバックに切り替え、バックグラウンドで再接続する
+                self._mark_disconnected(e)
+                if self.fallback_enabled:
+                    return self._fallback_operation(func.__name__, *args, **kwargs)
+                raise
             except redis.RedisError as e:
                 if self.fallback_enabled:
                     logger.warning(f"Redis操作失敗、フォールバックを使用: {str(e)}")
@@ -109,43 +409,11 @@ class RedisSessionManager:
 
         return wrapper
 
-    def _fallback_operation(self, operation: str, *args, **kwargs) -> Any:
-        """フォールバック操作（インメモリストレージ使用）"""
-        if operation == "get":
-            key = args[0] if args else kwargs.get("key")
-            return self._fallback_storage.get(key)
-        elif operation == "set":
-            key = args[0] if args else kwargs.get("key")
-            value = args[1] if len(args) > 1 else kwargs.get("value")
-            self._fallback_storage[key] = value
-            return True
-        elif operation == "delete":
-            key = args[0] if args else kwargs.get("key")
-            return self._fallback_storage.pop(key, None) is not None
-        elif operation == "exists":
-            key = args[0] if args else kwargs.get("key")
-            return key in self._fallback_storage
-        elif operation == "clear_pattern":
-            pattern = args[0] if args else kwargs.get("pattern")
-            keys_to_remove = [k for k in self._fallback_storage.keys() if pattern in k]
-            for k in keys_to_remove:
-                del self._fallback_storage[k]
-            return len(keys_to_remove)
-        return None
-
     @_with_fallback
     def get(self, key: str) -> Optional[Any]:
         """キーに対応する値を取得"""
         try:
-            value = self._client.get(key)
-            if value:
-                try:
-                    # JSON形式でデシリアライズを試行
-                    return json.loads(value)
-                except json.JSONDecodeError:
-                    # JSONでない場合はそのまま返す
-                    return value
-            return None
+            return self._deserialize(self._client.get(key))
         except redis.RedisError as e:
             self._log_redis_error("データ取得", str(e))
             raise
@@ -154,12 +422,7 @@ class RedisSessionManager:
     def set(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
         """キーと値のペアを保存"""
         try:
-            # 複雑なオブジェクトはJSON化
-            if isinstance(value, (dict, list)):
-                value = json.dumps(value, ensure_ascii=False)
-            elif not isinstance(value, str):
-                value = str(value)
-
+            value = self._serialize(value)
             if expire:
                 return bool(self._client.setex(key, expire, value))
             else:
@@ -168,6 +431,37 @@ class RedisSessionManager:
             self._log_redis_error("データ保存", str(e))
             raise
 
+    @_with_fallback
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """複数キーの値を1往復（MGET）で取得（存在しないキーは結果に含めない）"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            values = self._client.mget(keys)
+        except redis.RedisError as e:
+            self._log_redis_error("一括取得", str(e))
+            raise
+        pairs = ((key, self._deserialize(value)) for key, value in zip(keys, values))
+        return {key: value for key, value in pairs if value is not None}
+
+    @_with_fallback
+    def set_many(self, mapping: Dict[str, Any], expire: Optional[int] = None) -> bool:
+        """複数のキーと値をパイプラインで1往復で保存"""
+        if not mapping:
+            return True
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key, value in mapping.items():
+                if expire:
+                    pipe.setex(key, expire, self._serialize(value))
+                else:
+                    pipe.set(key, self._serialize(value))
+            return all(pipe.execute())
+        except redis.RedisError as e:
+            self._log_redis_error("一括保存", str(e))
+            raise
+
     @_with_fallback
     def delete(self, key: str) -> bool:
         """キーを削除"""
@@ -182,23 +476,36 @@ class RedisSessionManager:
         """キーの存在確認"""
         try:
             return bool(self._client.exists(key))
+        except _CONNECTION_ERRORS:
+            raise
         except redis.RedisError:
             return False
 
     @_with_fallback
     def clear_pattern(self, pattern: str) -> int:
-        """パターンに一致するキーをすべて削除"""
+        """
+        パターンに一致するキーをすべて削除
+
+        KEYS はキー数に比例してサーバーを止めるため、SCAN で少しずつ走査し、
+        DELETE_BATCH_SIZE 件ずつ UNLINK（値の解放はサーバーのバックグラウンド）で削除する。
+        """
         try:
-            keys = self._client.keys(pattern)
-            if keys:
-                return self._client.delete(*keys)
-            return 0
+            deleted = 0
+            batch: List[str] = []
+            for key in self._client.scan_iter(match=pattern, count=SCAN_COUNT):
+                batch.append(key)
+                if len(batch) >= DELETE_BATCH_SIZE:
+                    deleted += self._client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += self._client.unlink(*batch)
+            return deleted
         except redis.RedisError as e:
             self._log_redis_error("パターン削除", str(e))
-            return 0
+            raise
 
     def health_check(self) -> Dict[str, Any]:
-        """Redisの健全性チェック"""
+        """Redisの健全性チェック（接続プールの使用状況を含む）"""
         result = {
             "connected": False,
             "fallback_active": not self._is_connected and self.fallback_enabled,
@@ -210,34 +517,239 @@ class RedisSessionManager:
                 self._client.ping()
                 result["connected"] = True
                 result["info"] = {"host": self.host, "port": self.port, "db": self.db}
+                if not self._is_connected:
+                    # 再接続スレッドより先に復旧を確認した場合
+                    self._mark_reconnected()
+                    result["fallback_active"] = False
         except Exception as e:
             result["error"] = str(e)
 
+        if self._client:
+            result["pool"] = self._pool_stats()
+        result["reconnect_attempts"] = self._reconnect_attempts
+        if self.fallback_enabled:
+            result["fallback"] = self._fallback_storage.stats()
         return result
 
-    def has_fallback(self) -> bool:
-        """フォールバック機能が有効かどうか"""
-        return self.fallback_enabled
 
-    def _log_redis_error(self, operation: str, error_detail: str) -> None:
-        """Redis操作エラーのログ出力"""
-        error_msg = (
-            f"Redis{operation}エラー。"
-            f"原因: ネットワーク接続またはRedisサーバーの問題（{error_detail}）。"
-            f"対処法: Redisサーバーの状態を確認し、必要に応じて再起動してください。"
+class AsyncRedisSessionManager(_RedisManagerBase):
+    """
+    RedisSessionManager の asyncio 版（redis.asyncio を使用）
+
+    同じフォールバック・再接続・一括操作を async メソッドで提供する。
+    接続確認は await connect() で行い、失敗時や接続断ではイベントループ上のタスクが
+    バックオフしながら再接続する。
+    """
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        db: int = 0,
+        fallback_enabled: bool = True,
+        max_connections: int = 10,
+        fallback_max_items: int = FALLBACK_MAX_ITEMS,
+    ):
+        from redis import asyncio as redis_asyncio
+
+        self.host = host or os.getenv("REDIS_HOST", "localhost")
+        self.port = port or int(os.getenv("REDIS_PORT", 6379))
+        self.db = db
+        self.fallback_enabled = fallback_enabled
+        self.max_connections = max_connections
+        self._client = redis_asyncio.Redis(
+            host=self.host,
+            port=self.port,
+            db=self.db,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+            retry_on_timeout=True,
+            health_check_interval=30,
+            max_connections=self.max_connections,
         )
-        logger.error(error_msg)
+        self._is_connected = False
+        self._fallback_storage = FallbackStore(fallback_max_items)
+        self._reconnect_task: Optional["asyncio.Task"] = None
+        self._reconnect_attempts = 0
+        self._closed = False
 
-    def get_connection_info(self) -> Dict[str, Any]:
-        """接続情報を取得"""
-        return {
-            "host": self.host,
-            "port": self.port,
-            "db": self.db,
-            "connected": self._is_connected,
-            "fallback_enabled": self.fallback_enabled,
-            "fallback_items": len(self._fallback_storage) if self.fallback_enabled else 0,
+    async def connect(self) -> bool:
+        """
+        Redisへの接続を確認
+
+        Returns:
+            接続できた場合 True（フォールバック有効時は失敗してもバックグラウンドで再接続を続ける）
+
+        Raises:
+            RedisConnectionError: 接続できず、フォールバックも無効の場合
+        """
+        try:
+            await self._client.ping()
+        except _CONNECTION_ERRORS as e:
+            error_msg = self._format_connection_error(str(e))
+            if not self.fallback_enabled:
+                logger.error(f"❌ Redis接続失敗: {error_msg}")
+                raise RedisConnectionError(error_msg) from e
+            logger.warning(f"⚠️ Redis接続失敗、フォールバックモードで継続: {error_msg}")
+            self._ensure_reconnecting()
+            return False
+        self._is_connected = True
+        logger.info(f"✅ Redisに接続しました: {self.host}:{self.port}")
+        return True
+
+    def _ensure_reconnecting(self) -> None:
+        task = self._reconnect_task
+        if self._closed or (task is not None and not task.done()):
+            return
+        self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self) -> None:
+        delay = RECONNECT_INITIAL_DELAY
+        while not self._is_connected and not self._closed:
+            await asyncio.sleep(_jitter(delay))
+            try:
+                await self._client.ping()
+            except redis.RedisError as e:
+                self._reconnect_attempts += 1
+                delay = _next_delay(delay)
+                logger.debug(f"Redis再接続失敗（{self._reconnect_attempts}回目、次は約{delay:.0f}秒後）: {e}")
+                continue
+            self._mark_reconnected()
+            logger.info(f"✅ Redisに再接続しました: {self.host}:{self.port}（{self._reconnect_attempts}回失敗後）")
+            self._reconnect_attempts = 0
+
+    async def close(self) -> None:
+        """再接続タスクを止め、接続プールを閉じる"""
+        self._closed = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        await self._client.aclose()
+
+    async def _run(self, operation: str, call, *args, **kwargs) -> Any:
+        """Redisの操作 call を実行し、接続断・失敗時はフォールバックストアで同じ操作を行う"""
+        if not self._is_connected:
+            self._ensure_reconnecting()
+            if not self.fallback_enabled:
+                raise RedisConnectionError("Redis接続が無効で、フォールバックも無効です")
+            return self._fallback_operation(operation, *args, **kwargs)
+        try:
+            return await call()
+        except _CONNECTION_ERRORS as e:
+            if self._is_connected:
+                self._is_connected = False
+                logger.warning(f"⚠️ Redisとの接続が切れました。再接続するまでフォールバックで継続します: {e}")
+            self._ensure_reconnecting()
+            if not self.fallback_enabled:
+                raise
+        except redis.RedisError as e:
+            if not self.fallback_enabled:
+                raise
+            logger.warning(f"Redis操作失敗、フォールバックを使用: {str(e)}")
+        return self._fallback_operation(operation, *args, **kwargs)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """キーに対応する値を取得"""
+
+        async def call():
+            return self._deserialize(await self._client.get(key))
+
+        return await self._run("get", call, key)
+
+    async def set(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
+        """キーと値のペアを保存"""
+
+        async def call():
+            if expire:
+                return bool(await self._client.setex(key, expire, self._serialize(value)))
+            return bool(await self._client.set(key, self._serialize(value)))
+
+        return await self._run("set", call, key, value, expire)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """複数キーの値を1往復（MGET）で取得（存在しないキーは結果に含めない）"""
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        async def call():
+            values = await self._client.mget(keys)
+            pairs = ((key, self._deserialize(value)) for key, value in zip(keys, values))
+            return {key: value for key, value in pairs if value is not None}
+
+        return await self._run("get_many", call, keys)
+
+    async def set_many(self, mapping: Dict[str, Any], expire: Optional[int] = None) -> bool:
+        """複数のキーと値をパイプラインで1往復で保存"""
+        if not mapping:
+            return True
+
+        async def call():
+            pipe = self._client.pipeline(transaction=False)
+            for key, value in mapping.items():
+                if expire:
+                    pipe.setex(key, expire, self._serialize(value))
+                else:
+                    pipe.set(key, self._serialize(value))
+            return all(await pipe.execute())
+
+        return await self._run("set_many", call, mapping, expire)
+
+    async def delete(self, key: str) -> bool:
+        """キーを削除"""
+
+        async def call():
+            return bool(await self._client.delete(key))
+
+        return await self._run("delete", call, key)
+
+    async def exists(self, key: str) -> bool:
+        """キーの存在確認"""
+
+        async def call():
+            return bool(await self._client.exists(key))
+
+        return await self._run("exists", call, key)
+
+    async def clear_pattern(self, pattern: str) -> int:
+        """パターンに一致するキーをすべて削除（SCAN で走査し、DELETE_BATCH_SIZE 件ずつ UNLINK）"""
+
+        async def call():
+            deleted = 0
+            batch: List[str] = []
+            async for key in self._client.scan_iter(match=pattern, count=SCAN_COUNT):
+                batch.append(key)
+                if len(batch) >= DELETE_BATCH_SIZE:
+                    deleted += await self._client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += await self._client.unlink(*batch)
+            return deleted
+
+        return await self._run("clear_pattern", call, pattern)
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Redisの健全性チェック（接続プールの使用状況を含む）"""
+        result = {
+            "connected": False,
+            "fallback_active": not self._is_connected and self.fallback_enabled,
+            "error": None,
         }
+        try:
+            await self._client.ping()
+            result["connected"] = True
+            result["info"] = {"host": self.host, "port": self.port, "db": self.db}
+            if not self._is_connected:
+                self._mark_reconnected()
+                result["fallback_active"] = False
+        except Exception as e:
+            result["error"] = str(e)
+
+        result["pool"] = self._pool_stats()
+        result["reconnect_attempts"] = self._reconnect_attempts
+        if self.fallback_enabled:
+            result["fallback"] = self._fallback_storage.stats()
+        return result
 
 
 class SessionConfig:
@@ -0,0 +1,140 @@
+"""
+SSE（Server-Sent Events）ストリーミングユーティリティ
+チャット系エンドポイントでLLMのトークンを逐次配信する
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from flask import Response, current_app, session, stream_with_context
+
+from utils.security import SecurityUtils
+
+logger = logging.getLogger("performance")
+
+# SSEレスポンス共通ヘッダー（プロキシのバッファリングを無効化）
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """
+    SSEイベント文字列を生成
+
+    Args:
+        data: 送信するデータ
+        event: イベント名（オプション）
+
+    Returns:
+        str: SSE形式の文字列
+    """
+    payload = SecurityUtils.escape_json(data)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+
+def iter_llm_chunks(llm: Any, messages: List[Any]) -> Iterator[str]:
+    """
+    LLMのストリーミング出力からテキストのみを取り出す
+
+    Args:
+        llm: LangChainのチャットモデル
+        messages: 送信するメッセージリスト
+
+    Yields:
+        str: テキストチャンク（空チャンクは除外）
+    """
+    for chunk in llm.stream(messages):
+        content = getattr(chunk, "content", chunk)
+        if isinstance(content, list):
+            # Geminiはパート配列を返す場合がある
+            content = "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+        if content:
+            yield str(content)
+
+
+def persist_session() -> None:
+    """
+    ストリーミング中に更新したセッションをストアへ書き戻す
+
+    レスポンスヘッダー送信後はFlaskが自動保存しないため明示的に保存する。
+    サーバーサイドセッション（filesystem / redis）を前提とする。
+    """
+    session.modified = True
+    current_app.session_interface.save_session(current_app, session, Response())
+
+
+def stream_llm_reply(
+    llm: Any,
+    messages: List[Any],
+    on_complete: Callable[[str], None],
+    on_error: Callable[[Exception], str],
+    endpoint: str = "",
+) -> Iterator[str]:
+    """
+    LLM応答をSSEで逐次配信し、完了後に履歴を保存する
+
+    イベントの形式:
+        {"content": "..."}                           # トークンチャンク
+        {"done": true, "full_content": "...",
+         "ttft_ms": 123.4, "total_ms": 2345.6}        # 完了
+        {"error": "..."}                              # エラー
+
+    Args:
+        llm: LangChainのチャットモデル
+        messages: 送信するメッセージリスト
+        on_complete: 完了時に全文を受け取るコールバック（履歴保存用）
+        on_error: 例外を受け取りユーザー向けメッセージを返すコールバック
+        endpoint: ログ用のエンドポイント名
+
+    Yields:
+        str: SSE形式の文字列
+    """
+    start = time.perf_counter()
+    ttft_ms: Optional[float] = None
+    chunks: List[str] = []
+
+    try:
+        for text in iter_llm_chunks(llm, messages):
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000
+            chunks.append(text)
+            yield format_sse({"content": SecurityUtils.escape_html(text)})
+    except Exception as e:
+        error_message = on_error(e)
+        persist_session()
+        yield format_sse({"error": error_message})
+        return
+
+    full_content = "".join(chunks)
+    on_complete(full_content)
+    persist_session()
+
+    total_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"[STREAM] {endpoint} ttft={ttft_ms if ttft_ms is not None else -1:.1f}ms total={total_ms:.1f}ms")
+
+    yield format_sse(
+        {
+            "done": True,
+            "full_content": SecurityUtils.escape_html(full_content),
+            "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+            "total_ms": round(total_ms, 1),
+        }
+    )
+
+
+def sse_response(generator: Iterator[str]) -> Response:
+    """
+    リクエストコンテキストを維持したSSEレスポンスを生成
+
+    Args:
+        generator: SSE文字列を返すジェネレータ
+
+    Returns:
+        Response: text/event-streamレスポンス
+    """
+    return Response(stream_with_context(generator), mimetype="text/event-stream", headers=SSE_HEADERS)